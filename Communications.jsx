@@ -8,6 +8,7 @@ import { Label } from '@/components/ui/label.jsx'
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select.jsx'
 import { Textarea } from '@/components/ui/textarea.jsx'
 import { Plus, Search, Edit, Eye, Phone, Mail, MessageSquare, Calendar, AlertCircle } from 'lucide-react'
+import { subscribeToChanges } from '@/utils/api.js'
 
 const Communications = () => {
   const [communications, setCommunications] = useState([])
@@ -40,6 +41,19 @@ const Communications = () => {
     fetchOrders()
   }, [typeFilter, statusFilter])
 
+  // Änderungen direkt in die Liste übernehmen, statt sie neu zu laden
+  useEffect(() => subscribeToChanges({ entity: 'communication' }, (change) => {
+    if (change.action === 'updated') {
+      setCommunications((current) => current.map((communication) =>
+        communication.id === change.entity_id ? { ...communication, ...change.data } : communication))
+    } else if (change.action === 'deleted') {
+      setCommunications((current) => current.filter((communication) => communication.id !== change.entity_id))
+    } else {
+      // Neue Nachrichten: Filter und Kundennamen kennt nur der Server
+      fetchCommunications()
+    }
+  }, fetchCommunications), [typeFilter, statusFilter])
+
   const fetchCommunications = async () => {
     try {
       const params = new URLSearchParams()
@@ -61,7 +75,7 @@ const Communications = () => {
 
   const fetchCustomers = async () => {
     try {
-      const response = await fetch('/api/customers?per_page=100')
+      const response = await fetch('/api/customers?view=picker')
       if (response.ok) {
         const data = await response.json()
         setCustomers(data.customers)
@@ -73,7 +87,7 @@ const Communications = () => {
 
   const fetchOrders = async () => {
     try {
-      const response = await fetch('/api/orders?per_page=100')
+      const response = await fetch('/api/orders?view=picker')
       if (response.ok) {
         const data = await response.json()
         setOrders(data.orders)
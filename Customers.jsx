@@ -41,6 +41,7 @@ const Customers = () => {
       if (searchTerm) params.append('search', searchTerm)
       if (customerType) params.append('customer_type', customerType)
       params.append('per_page', '50')
+      params.append('view', 'list')
 
       const response = await fetch(`/api/customers?${params}`)
       if (response.ok) {
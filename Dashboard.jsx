@@ -3,6 +3,7 @@ import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/com
 import { Badge } from '@/components/ui/badge.jsx'
 import { Button } from '@/components/ui/button.jsx'
 import { Users, ClipboardList, CheckCircle, Clock, AlertCircle, Calendar } from 'lucide-react'
+import { subscribeToChanges } from '@/utils/api.js'
 
 const Dashboard = () => {
   const [dashboardData, setDashboardData] = useState({
@@ -22,6 +23,21 @@ const Dashboard = () => {
     fetchDashboardData()
   }, [])
 
+  // Zähler bei jeder Auftrags- oder Kundenänderung neu laden; ein Import
+  // schickt viele Änderungen auf einmal, daher kurz sammeln
+  useEffect(() => {
+    let timer
+    const refresh = () => {
+      clearTimeout(timer)
+      timer = setTimeout(fetchDashboardData, 500)
+    }
+    const unsubscribe = subscribeToChanges({ entity: 'order,customer' }, refresh, refresh)
+    return () => {
+      clearTimeout(timer)
+      unsubscribe()
+    }
+  }, [])
+
   const fetchDashboardData = async () => {
     try {
       const response = await fetch('/api/orders/dashboard')
@@ -53,7 +53,7 @@ const Invoices = () => {
 
   const fetchCustomers = async () => {
     try {
-      const response = await fetch('/api/customers?per_page=100')
+      const response = await fetch('/api/customers?view=picker')
       if (response.ok) {
         const data = await response.json()
         setCustomers(data.customers)
@@ -25,7 +25,7 @@ export function OrderForm({ isOpen, onClose, onSuccess }) {
 
   const fetchCustomers = async () => {
     try {
-      const response = await fetch(`${config.API_BASE_URL}/api/customers`)
+      const response = await fetch(`${config.API_BASE_URL}/api/customers?view=picker`)
       if (response.ok) {
         const data = await response.json()
         setCustomers(data)
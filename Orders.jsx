@@ -8,10 +8,12 @@ import { Label } from '@/components/ui/label.jsx'
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select.jsx'
 import { Textarea } from '@/components/ui/textarea.jsx'
 import { Plus, Search, Edit, Eye, Calendar, Clock, MapPin, Euro } from 'lucide-react'
+import { subscribeToChanges } from '@/utils/api.js'
 
 const Orders = () => {
   const [orders, setOrders] = useState([])
   const [customers, setCustomers] = useState([])
+  const [customerSearch, setCustomerSearch] = useState('')
   const [loading, setLoading] = useState(true)
   const [statusFilter, setStatusFilter] = useState('')
   const [serviceTypeFilter, setServiceTypeFilter] = useState('')
@@ -38,15 +40,35 @@ const Orders = () => {
 
   useEffect(() => {
     fetchOrders()
-    fetchCustomers()
   }, [statusFilter, serviceTypeFilter])
 
+  // Kundenauswahl: nur die besten Treffer zur Eingabe laden, nicht die ganze Kundenliste
+  useEffect(() => {
+    if (!showAddDialog) return
+    const timer = setTimeout(() => fetchCustomers(customerSearch), 200)
+    return () => clearTimeout(timer)
+  }, [showAddDialog, customerSearch])
+
+  // Änderungen direkt in die Liste übernehmen, statt sie neu zu laden
+  useEffect(() => subscribeToChanges({ entity: 'order' }, (change) => {
+    if (change.action === 'updated') {
+      setOrders((current) => current.map((order) =>
+        order.id === change.entity_id ? { ...order, ...change.data } : order))
+    } else if (change.action === 'deleted') {
+      setOrders((current) => current.filter((order) => order.id !== change.entity_id))
+    } else {
+      // Neue Aufträge: Filter und Kundennamen kennt nur der Server
+      fetchOrders()
+    }
+  }, fetchOrders), [statusFilter, serviceTypeFilter])
+
   const fetchOrders = async () => {
     try {
       const params = new URLSearchParams()
       if (statusFilter) params.append('status', statusFilter)
       if (serviceTypeFilter) params.append('service_type', serviceTypeFilter)
       params.append('per_page', '50')
+      params.append('view', 'list')
 
       const response = await fetch(`/api/orders?${params}`)
       if (response.ok) {
@@ -60,9 +82,9 @@ const Orders = () => {
     }
   }
 
-  const fetchCustomers = async () => {
+  const fetchCustomers = async (search = '') => {
     try {
-      const response = await fetch('/api/customers?per_page=100')
+      const response = await fetch(`/api/customers/lookup?${new URLSearchParams({ q: search })}`)
       if (response.ok) {
         const data = await response.json()
         setCustomers(data.customers)
@@ -230,6 +252,12 @@ const Orders = () => {
               <div className="grid grid-cols-2 gap-4">
                 <div>
                   <Label htmlFor="customer_id">Kunde *</Label>
+                  <Input
+                    placeholder="Kunde suchen (Name, Firma, Ort)"
+                    value={customerSearch}
+                    onChange={(e) => setCustomerSearch(e.target.value)}
+                    className="mb-2"
+                  />
                   <Select value={newOrder.customer_id} onValueChange={(value) => setNewOrder({...newOrder, customer_id: value})}>
                     <SelectTrigger>
                       <SelectValue placeholder="Kunde auswählen" />
@@ -237,7 +265,7 @@ const Orders = () => {
                     <SelectContent>
                       {customers.map((customer) => (
                         <SelectItem key={customer.id} value={customer.id.toString()}>
-                          {customer.first_name} {customer.last_name} {customer.company_name && `(${customer.company_name})`}
+                          {customer.display_name}
                         </SelectItem>
                       ))}
                     </SelectContent>
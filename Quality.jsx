@@ -59,7 +59,7 @@ const Quality = () => {
 
   const fetchCustomers = async () => {
     try {
-      const response = await fetch('/api/customers?per_page=100')
+      const response = await fetch('/api/customers?view=picker')
       if (response.ok) {
         const data = await response.json()
         setCustomers(data.customers)
@@ -71,7 +71,7 @@ const Quality = () => {
 
   const fetchOrders = async () => {
     try {
-      const response = await fetch('/api/orders?per_page=100')
+      const response = await fetch('/api/orders?view=picker')
       if (response.ok) {
         const data = await response.json()
         setOrders(data.orders)
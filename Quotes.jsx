@@ -63,7 +63,7 @@ const Quotes = () => {
 
   const fetchCustomers = async () => {
     try {
-      const response = await fetch('/api/customers?per_page=100')
+      const response = await fetch('/api/customers?view=picker')
       if (response.ok) {
         const data = await response.json()
         setCustomers(data.customers)
@@ -60,7 +60,7 @@ const TimeTracking = () => {
 
   const fetchCustomers = async () => {
     try {
-      const response = await fetch('/api/customers?per_page=100')
+      const response = await fetch('/api/customers?view=picker')
       if (response.ok) {
         const data = await response.json()
         setCustomers(data.customers)
@@ -72,7 +72,7 @@ const TimeTracking = () => {
 
   const fetchOrders = async () => {
     try {
-      const response = await fetch('/api/orders?per_page=100')
+      const response = await fetch('/api/orders?view=picker')
       if (response.ok) {
         const data = await response.json()
         setOrders(data.orders)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point: the same API as main.py behind an async front end
+
+Usage: python asgi.py [--host HOST] [--port PORT] [--threads N] [--simple]
+       uvicorn asgi:app --port 5000        (or any other ASGI server)
+
+The event loop handles the connections, so thousands of slow clients
+(field crews on mobile networks) cost no threads; requests run on
+ASGI_THREADS (--threads, default 8) worker threads against the blocking
+SQLAlchemy session. --simple / ASGI_APP=simple serves simple_backend.py
+instead of main.py. Without uvicorn installed, python asgi.py uses the
+small HTTP/1.1 server of src/services/asgi.py.
+"""
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+from src.services.asgi import WORKER_THREADS, AsgiAdapter, serve
+
+def load_wsgi_app(name):
+    if name == 'simple':
+        from simple_backend import app as wsgi_app
+    else:
+        from main import app as wsgi_app
+    return wsgi_app
+
+def create_app(name=None, threads=None):
+    name = name or os.environ.get('ASGI_APP', 'main')
+    threads = threads or int(os.environ.get('ASGI_THREADS', WORKER_THREADS))
+    return AsgiAdapter(load_wsgi_app(name), threads=threads)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='API über ASGI ausliefern')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--simple', action='store_true', help='simple_backend.py statt main.py')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    asgi_app = create_app('simple' if args.simple else None, args.threads)
+    print(f"🚀 ASGI-Server auf http://{args.host}:{args.port} ({asgi_app.threads} Worker-Threads)")
+    try:
+        import uvicorn
+    except ImportError:
+        serve(asgi_app, args.host, args.port, max_body_bytes=asgi_app.max_body_bytes)
+    else:
+        uvicorn.run(asgi_app, host=args.host, port=args.port, lifespan='on')
+
+if __name__ == '__main__':
+    main()
+else:
+    app = create_app()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark every GET /api route on synthetic data and compare with the baseline
+
+Usage: python benchmark_api.py [--rows N] [--requests N] [--concurrency N] [--rounds N]
+                               [--database PATH] [--cached] [--update-baseline]
+  --rows             synthetic rows to generate (default 20000)
+  --requests         measured requests per route and round (default 50)
+  --concurrency      parallel clients (default 4)
+  --rounds           measurements per route, the fastest counts (default 3)
+  --database         SQLite file to use; generated first if it does not exist
+                     (default: a temporary database)
+  --cached           keep the response cache on (default: off, so every
+                     request runs its view and @cached routes are measured
+                     too; cached results are not comparable with the baseline)
+  --update-baseline  store the results as the new baseline instead of comparing
+
+Exits with 1 when a route is slower than benchmarks/baseline.json allows.
+Record the baseline on the machine the comparison runs on.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+from datetime import date
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Lasttest aller GET /api-Routen')
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--database')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--cached', action='store_true')
+    parser.add_argument('--update-baseline', action='store_true')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix='goclean-bench-')
+    database = args.database or os.path.join(workdir, 'bench.db')
+    fresh = not os.path.exists(database)
+
+    # Before main is imported: it opens the database and sets up profiling at import
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(database)}'
+    os.environ['PERF_PROFILING'] = '0'
+    # A fresh PDF cache per run, so no run starts with the renders of the last one
+    os.environ['PDF_CACHE_DIR'] = os.path.join(workdir, 'pdf_cache')
+    # With the cache on, the warmup round leaves only cache hits to measure
+    os.environ['RESPONSE_CACHE_URL'] = 'memory://' if args.cached else 'none://'
+    from main import app
+    from src.models.user import db
+    from src.services.loadtest import benchmark_targets, client_sender, compare, run_benchmark
+    from src.services.synthetic import generate
+
+    with app.app_context():
+        if fresh:
+            print(f"⏳ Erzeuge {args.rows:,} Zeilen in {database} ...")
+            with db.engine.begin() as connection:
+                generate(connection, args.rows, args.seed)
+        with db.engine.connect() as connection:
+            targets = benchmark_targets(app, connection, seed=args.seed)
+
+    results = run_benchmark(client_sender(app), targets, args.requests, args.concurrency, args.rounds)
+
+    print(f"{'Route':<48} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'Fehler':>6}")
+    for route, result in results.items():
+        print(f"{route:<48} {result['rps']:>8} {result['p50_ms']:>8} {result['p95_ms']:>8} "
+              f"{result['p99_ms']:>8} {result['errors']:>6}")
+
+    meta = {
+        'rows': args.rows,
+        'seed': args.seed,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'rounds': args.rounds,
+        'cached': args.cached,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'machine': platform.machine(),
+        'recorded': date.today().isoformat()
+    }
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({'meta': meta, 'routes': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"✅ Baseline gespeichert: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("⚠️  Keine Baseline vorhanden (--update-baseline legt sie an)")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    setup = ('rows', 'seed', 'requests', 'concurrency', 'rounds', 'cached')
+    if any(baseline['meta'].get(key) != meta[key] for key in setup):
+        print(f"⚠️  Baseline wurde mit anderen Parametern aufgenommen: "
+              f"{ {key: baseline['meta'].get(key) for key in setup} } - kein Vergleich")
+        return
+
+    regressions = compare(results, baseline['routes'])
+    for line in regressions:
+        print(f"❌ {line}")
+    if regressions:
+        sys.exit(1)
+    print(f"✅ Keine Regression gegenüber der Baseline vom {baseline['meta'].get('recorded')}")
+
+if __name__ == '__main__':
+    main()
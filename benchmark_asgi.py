@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Compare the WSGI and the ASGI deployment under slow clients
+
+Usage: python benchmark_asgi.py [--rows N] [--threads N] [--slow-clients N] [--slow-seconds S]
+                                [--requests N] [--concurrency N] [--timeout S]
+                                [--database PATH] [--route RULE ...]
+  --rows          synthetic rows to generate (default 20000)
+  --threads       worker threads of either server (default 8)
+  --slow-clients  connections that trickle their requests in (default 1000)
+  --slow-seconds  time a slow client takes to send one request (default 5)
+  --requests      measured requests per route (default 20)
+  --concurrency   parallel fast clients (default 4)
+  --timeout       a fast request counts as failed after this many seconds (default 10)
+  --database      SQLite file to use; generated first if it does not exist
+                  (default: a temporary database)
+  --route         GET route to measure, repeatable (default: time entries,
+                  customer lookup, orders)
+
+Both servers run main.py's app with the same number of threads: a WSGI
+server with a fixed thread pool (as gunicorn's threaded workers) and
+asgi.py's adapter on the built-in server. Each is measured alone, then
+while the slow clients keep requesting /api/time-entries the way field
+crews on a bad mobile network do. On the WSGI side every slow connection
+waits for a thread and holds it until its request is in, so the fast
+requests queue up behind them; with enough slow clients they run into
+--timeout, and that part takes a while.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+ROUTES = ['/api/time-entries', '/api/customers/lookup', '/api/orders']
+SLOW_URL = '/api/time-entries'
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='WSGI und ASGI unter langsamen Clients vergleichen')
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--slow-clients', type=int, default=1000)
+    parser.add_argument('--slow-seconds', type=float, default=5.0)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--timeout', type=float, default=10.0)
+    parser.add_argument('--database')
+    parser.add_argument('--route', action='append', dest='routes')
+    return parser.parse_args()
+
+def print_results(title, results, slow=None):
+    print(f"\n{title}")
+    print(f"  {'Route':<40} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'Fehler':>6}")
+    for route, result in results.items():
+        print(f"  {route:<40} {result['rps']:>8} {result['p50_ms']:>9} {result['p95_ms']:>9} "
+              f"{result['max_ms']:>9} {result['errors']:>6}")
+    if slow is not None:
+        print(f"  Langsame Clients: {slow['completed']} Anfragen beantwortet, {slow['failed']} fehlgeschlagen")
+
+def main():
+    args = parse_args()
+    database = args.database or os.path.join(tempfile.mkdtemp(prefix='goclean-bench-'), 'bench.db')
+    fresh = not os.path.exists(database)
+
+    # Before main is imported: it opens the database and sets up profiling at import
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(database)}'
+    os.environ['PERF_PROFILING'] = '0'
+    from main import app
+    from src.models.user import db
+    from src.services.asgi import AsgiAdapter
+    from src.services.loadtest import (asgi_server, benchmark_targets, http_sender, run_benchmark,
+                                       slow_clients, wsgi_server)
+    from src.services.synthetic import generate
+
+    with app.app_context():
+        if fresh:
+            print(f"⏳ Erzeuge {args.rows:,} Zeilen in {database} ...")
+            with db.engine.begin() as connection:
+                generate(connection, args.rows, args.seed)
+        with db.engine.connect() as connection:
+            targets = benchmark_targets(app, connection, seed=args.seed)
+
+    routes = args.routes or ROUTES
+    missing = [route for route in routes if route not in targets]
+    if missing:
+        sys.exit(f"❌ Unbekannte oder nicht messbare Routen: {', '.join(missing)}")
+    targets = {route: targets[route] for route in routes}
+
+    servers = {
+        'WSGI': lambda: wsgi_server(app, args.threads),
+        'ASGI': lambda: asgi_server(AsgiAdapter(app, threads=args.threads)),
+    }
+    for name, start in servers.items():
+        with start() as (host, port):
+            send = http_sender(host, port, timeout=args.timeout)
+            results = run_benchmark(send, targets, args.requests, args.concurrency, rounds=1)
+            print_results(f"{name}, {args.threads} Threads, ohne langsame Clients", results)
+
+            # Measured once every slow client is in the middle of a request, and the
+            # load is kept up until each of them could have been answered
+            with slow_clients(host, port, SLOW_URL, args.slow_clients, args.slow_seconds,
+                              ramp_seconds=args.slow_seconds) as slow:
+                started = time.perf_counter()
+                results = run_benchmark(send, targets, args.requests, args.concurrency, rounds=1, warmup=0)
+                time.sleep(max(0.0, args.slow_seconds - (time.perf_counter() - started)))
+            print_results(f"{name}, {args.threads} Threads, {args.slow_clients} langsame Clients "
+                          f"({args.slow_seconds:g} s pro Anfrage)", results, slow)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Fill the database with synthetic German customers and their documents
+
+Usage: python generate_synthetic_data.py [--rows N] [--seed S]
+  --rows    about how many rows to insert (default 10000; 10000 to 10000000)
+  --seed    random seed; the same seed gives the same data (default 0)
+
+The rows are added to the existing data in the database main.py uses
+(DATABASE_URL to pick another one).
+"""
+
+import argparse
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(__file__))
+
+from main import app
+from src.models.user import db
+from src.services.synthetic import generate
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetische Testdaten erzeugen')
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    started = time.perf_counter()
+    with app.app_context():
+        with db.engine.begin() as connection:
+            counts = generate(connection, args.rows, args.seed,
+                              progress=lambda rows: print(f"   {rows:,} Zeilen ...", end='\r', flush=True))
+    
+    for table, count in counts.items():
+        print(f"   {table:<16} {count:>10,}")
+    print(f"✅ {sum(counts.values()):,} Zeilen in {time.perf_counter() - started:.1f} s erzeugt")
+
+if __name__ == '__main__':
+    main()
@@ -22,11 +22,19 @@ const CalendarComponent = ({ customerId }) => {
 
   const fetchOrders = async () => {
     try {
-      // Für Demo-Zwecke verwenden wir Demo-Daten
-      const demoData = customerPortalAPI.getDemoData()
-      setOrders(demoData.orders)
+      // Die nächsten 90 Tage, wiederkehrende Termine eingeschlossen
+      const today = new Date()
+      const until = new Date(today.getTime() + 90 * 24 * 60 * 60 * 1000)
+      const data = await customerPortalAPI.getCustomerCalendar(
+        customerId,
+        today.toISOString().split('T')[0],
+        until.toISOString().split('T')[0]
+      )
+      setOrders(data.orders)
     } catch (error) {
       console.error('Error fetching orders:', error)
+      // Für Demo-Zwecke verwenden wir Demo-Daten
+      setOrders(customerPortalAPI.getDemoData().orders)
     } finally {
       setLoading(false)
     }
@@ -36,7 +44,8 @@ const CalendarComponent = ({ customerId }) => {
     const statusConfig = {
       'pending': { label: 'Ausstehend', className: 'bg-yellow-100 text-yellow-800' },
       'in_progress': { label: 'In Bearbeitung', className: 'bg-blue-100 text-blue-800' },
-      'completed': { label: 'Abgeschlossen', className: 'bg-green-100 text-green-800' }
+      'completed': { label: 'Abgeschlossen', className: 'bg-green-100 text-green-800' },
+      'planned': { label: 'Geplant', className: 'bg-gray-100 text-gray-800' }
     }
     
     const config = statusConfig[status] || { label: status, className: 'bg-gray-100 text-gray-800' }
@@ -57,6 +66,9 @@ const CalendarComponent = ({ customerId }) => {
     })
   }
 
+  // Geplante Termine wiederkehrender Aufträge haben noch keine Auftragsnummer
+  const appointmentKey = (order) => order.id ?? `${order.series_id}-${order.occurrence_date}`
+
   const getUpcomingAppointments = () => {
     const today = new Date()
     return orders
@@ -112,13 +124,13 @@ const CalendarComponent = ({ customerId }) => {
           <CardContent>
             <div className="space-y-4">
               {todayAppointments.map((appointment) => (
-                <div key={appointment.id} className="flex items-center justify-between p-4 bg-white rounded-lg border">
+                <div key={appointmentKey(appointment)} className="flex items-center justify-between p-4 bg-white rounded-lg border">
                   <div className="flex items-center space-x-4">
                     <div className="p-2 bg-blue-100 rounded-full">
                       {getStatusIcon(appointment.status)}
                     </div>
                     <div>
-                      <h4 className="font-medium text-gray-900">{appointment.order_number}</h4>
+                      <h4 className="font-medium text-gray-900">{appointment.order_number || appointment.title}</h4>
                       <p className="text-sm text-gray-600">{appointment.service_type}</p>
                     </div>
                   </div>
@@ -148,7 +160,7 @@ const CalendarComponent = ({ customerId }) => {
           ) : (
             <div className="space-y-4">
               {upcomingAppointments.map((appointment) => (
-                <div key={appointment.id} className="flex items-center justify-between p-4 border rounded-lg">
+                <div key={appointmentKey(appointment)} className="flex items-center justify-between p-4 border rounded-lg">
                   <div className="flex items-center space-x-4">
                     <div className={`p-2 rounded-full ${
                       appointment.status === 'completed' ? 'bg-green-100' :
@@ -157,7 +169,7 @@ const CalendarComponent = ({ customerId }) => {
                       {getStatusIcon(appointment.status)}
                     </div>
                     <div>
-                      <h4 className="font-medium text-gray-900">{appointment.order_number}</h4>
+                      <h4 className="font-medium text-gray-900">{appointment.order_number || appointment.title}</h4>
                       <p className="text-sm text-gray-600">{appointment.service_type}</p>
                       <div className="flex items-center space-x-4 text-xs text-gray-500 mt-1">
                         <span className="flex items-center">
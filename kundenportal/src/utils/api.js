@@ -15,6 +15,19 @@ export const customerPortalAPI = {
     }
   },
 
+  // Termine eines Zeitraums, inklusive der noch nicht angelegten Termine wiederkehrender Aufträge
+  getCustomerCalendar: async (customerId, dateFrom, dateTo) => {
+    try {
+      const params = new URLSearchParams({ customer_id: customerId, date_from: dateFrom, date_to: dateTo })
+      const response = await fetch(`${API_BASE_URL}/orders/calendar?${params}`)
+      if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`)
+      return await response.json()
+    } catch (error) {
+      console.error('API Error:', error)
+      throw error
+    }
+  },
+
   getCustomerInvoices: async (customerId) => {
     try {
       const response = await fetch(`${API_BASE_URL}/customer/${customerId}/invoices`)
@@ -8,6 +8,8 @@ from flask_cors import CORS
 
 # Import models and routes
 from src.models.user import db
+from src.services.migrations import run_migrations
+from src.services.profiling import init_profiling
 from src.routes.customer import customer_bp
 from src.routes.order import order_bp
 from src.routes.quote import quote_bp
@@ -16,6 +18,12 @@ from src.routes.invoice import invoice_bp
 from src.routes.quality import quality_bp
 from src.routes.inventory import inventory_bp
 from src.routes.timetracking import timetracking_bp
+from src.routes.search import search_bp
+from src.routes.jobs import jobs_bp
+from src.routes.analytics import analytics_bp
+from src.routes.schedule import schedule_bp
+from src.routes.portal import portal_bp
+from src.routes.events import events_bp
 
 app = Flask(__name__, static_folder='src/static')
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -32,9 +40,22 @@ app.register_blueprint(invoice_bp, url_prefix='/api')
 app.register_blueprint(quality_bp, url_prefix='/api')
 app.register_blueprint(inventory_bp, url_prefix='/api')
 app.register_blueprint(timetracking_bp, url_prefix='/api')
+app.register_blueprint(search_bp, url_prefix='/api')
+app.register_blueprint(jobs_bp, url_prefix='/api')
+app.register_blueprint(analytics_bp, url_prefix='/api')
+app.register_blueprint(schedule_bp, url_prefix='/api')
+app.register_blueprint(portal_bp, url_prefix='/api')
+app.register_blueprint(events_bp, url_prefix='/api')
+
+# SQL count, DB and serialization time per request: Server-Timing header and /api/_debug/perf.
+# Off unless PERF_PROFILING=1, since /api/_debug/perf shows SQL to anyone who asks
+if os.environ.get('PERF_PROFILING', '0') == '1':
+    init_profiling(app, model_base=db.Model)
 
 # Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+# DATABASE_URL points the app at another database, e.g. the benchmark's generated one
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'DATABASE_URL', f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Initialize database
@@ -43,8 +64,9 @@ db.init_app(app)
 # Create database tables
 with app.app_context():
     # Create database directory if it doesn't exist
-    os.makedirs('database', exist_ok=True)
+    os.makedirs(os.path.join(os.path.dirname(__file__), 'database'), exist_ok=True)
     db.create_all()
+    run_migrations(db.engine)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Recompute the materialized dashboard counters and report drift
+
+Usage: python rebuild_dashboard_counters.py [--check]
+  --check   only compare the counters with the source tables, exit 1 on drift
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+from main import app
+from src.models.user import db
+from src.services.counters import rebuild_counters
+
+def main():
+    check_only = '--check' in sys.argv[1:]
+    
+    with app.app_context():
+        with db.engine.begin() as connection:
+            drift = rebuild_counters(connection, dry_run=check_only)
+    
+    for name, (stored, actual) in sorted(drift.items()):
+        print(f"⚠️  {name}: gespeichert {stored}, tatsächlich {actual}")
+    
+    if not drift:
+        print("✅ Dashboard-Zähler sind konsistent")
+    elif check_only:
+        sys.exit(1)
+    else:
+        print(f"✅ {len(drift)} Zähler neu berechnet")
+
+if __name__ == '__main__':
+    main()
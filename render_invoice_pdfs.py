@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Render the invoice PDFs of a month into the PDF cache (month-end run)
+
+Usage: python render_invoice_pdfs.py [YYYY-MM] [--processes N]
+  YYYY-MM       invoice month (default: the previous month)
+  --processes   worker processes (default: one per CPU)
+
+Invoices whose PDF is already cached with the same content are skipped, so
+the run can be repeated at any time.
+"""
+
+import os
+import sys
+import time
+from datetime import date
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from main import app
+from src.models.invoice import Invoice
+from src.services.pdf import invoice_document, render_batch
+
+def invoice_month(argument):
+    if argument:
+        year, month = (int(part) for part in argument.split('-'))
+    else:
+        today = date.today()
+        year, month = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+def main():
+    args = sys.argv[1:]
+    processes = None
+    if '--processes' in args:
+        index = args.index('--processes')
+        processes = int(args[index + 1])
+        del args[index:index + 2]
+    start, end = invoice_month(args[0] if args else None)
+
+    started = time.perf_counter()
+    with app.app_context():
+        invoices = Invoice.query.options(
+            selectinload(Invoice.items), joinedload(Invoice.customer)
+        ).filter(Invoice.invoice_date >= start, Invoice.invoice_date < end).order_by(Invoice.id)
+        documents = [invoice_document(invoice) for invoice in invoices]
+
+    rendered, cached = render_batch(documents, processes=processes)
+    elapsed = time.perf_counter() - started
+    print(f"✅ {start:%m/%Y}: {rendered} Rechnungs-PDFs erstellt, {cached} unverändert ({elapsed:.1f} s)")
+
+if __name__ == '__main__':
+    main()
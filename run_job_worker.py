@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Background job worker for GoClean Harz
+
+Usage: python run_job_worker.py [--lanes high,default,low] [--once]
+  --lanes  only claim jobs from these lanes (default: all, highest first)
+  --once   stop as soon as no job is due instead of polling
+
+Run one or more of these next to the web server; a dedicated
+"--lanes high" worker keeps sending fast while reports run elsewhere.
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+from main import app
+from src.services.jobs import Worker
+
+def main():
+    args = sys.argv[1:]
+    lanes = None
+    if '--lanes' in args:
+        lanes = args[args.index('--lanes') + 1].split(',')
+    
+    worker = Worker(app, lanes=lanes)
+    print(f"🚀 Job-Worker {worker.name} gestartet (Lanes: {', '.join(worker.lanes)})")
+    try:
+        worker.run(once='--once' in args)
+    except KeyboardInterrupt:
+        pass
+    print("✅ Job-Worker beendet")
+
+if __name__ == '__main__':
+    main()
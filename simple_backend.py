@@ -1,16 +1,36 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, abort, make_response
 from flask_cors import CORS
 import sqlite3
 import json
+import base64
 from datetime import datetime, timedelta
-import random
+import os
+from sqlite_pool import ConnectionPool
+from src.services.profiling import ProfiledConnection, init_profiling
+from src.services.totals import TOTALED_TABLES, total_triggers
+from src.services.search import SEARCH_INDEXES, backfill_statement, fts_query, index_statements
+from src.services.serialization import Field, SqlSpec, json_response
+from src.services.queries import display_name
 
 app = Flask(__name__)
 CORS(app)
 
+DATABASE_PATH = 'database/app.db'
+
+def add_missing_columns(c, table, columns):
+    """Append columns an older database lacks; returns True if any were added"""
+    existing = {row[1] for row in c.execute(f'PRAGMA table_info({table})')}
+    added = False
+    for name, definition in columns:
+        if name not in existing:
+            c.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+            added = True
+    return added
+
 # Database initialization
 def init_db():
-    conn = sqlite3.connect('database/app.db')
+    os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
+    conn = sqlite3.connect(DATABASE_PATH)
     c = conn.cursor()
     
     # Create tables if they don't exist
@@ -186,139 +206,325 @@ def init_db():
                          (name, description, category, sku, quantity, unit, unit_price, reorder_point, supplier, location)
                          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', inventory)
     
+    # Materialized dashboard counters (shared with the SQLAlchemy app, see src/services/counters.py)
+    c.execute('''CREATE TABLE IF NOT EXISTS dashboard_counters
+                 (name TEXT PRIMARY KEY,
+                  value INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID''')
+    if c.execute('SELECT COUNT(*) FROM dashboard_counters').fetchone()[0] == 0:
+        c.execute('''INSERT INTO dashboard_counters (name, value)
+                     SELECT 'orders.status.' || status, COUNT(*) FROM orders WHERE status IS NOT NULL GROUP BY status
+                     UNION ALL
+                     SELECT 'orders.scheduled.' || scheduled_date, COUNT(*) FROM orders WHERE scheduled_date IS NOT NULL GROUP BY scheduled_date
+                     UNION ALL
+                     SELECT 'customers.active', COUNT(*) FROM customers WHERE is_active = 1''')
+    
+    # Stored quote/invoice totals, maintained by the same triggers as the
+    # SQLAlchemy app (src/services/totals.py)
+    c.execute('''CREATE TABLE IF NOT EXISTS invoice_items
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  invoice_id INTEGER,
+                  description TEXT NOT NULL,
+                  quantity REAL DEFAULT 1,
+                  unit TEXT DEFAULT 'Stück',
+                  unit_price REAL DEFAULT 0,
+                  notes TEXT,
+                  total_price REAL NOT NULL DEFAULT 0)''')
+    for table, item_table, foreign_key in TOTALED_TABLES:
+        add_missing_columns(c, table, [('subtotal', 'REAL NOT NULL DEFAULT 0'),
+                                       ('tax_amount', 'REAL NOT NULL DEFAULT 0'),
+                                       ('total_amount', 'REAL NOT NULL DEFAULT 0')])
+        new_items = add_missing_columns(c, item_table, [('total_price', 'REAL NOT NULL DEFAULT 0')])
+        for statement in total_triggers(table, item_table, foreign_key):
+            c.execute(statement)
+        if new_items:
+            # Touching the prices fires the triggers once for every existing item
+            c.execute(f'UPDATE {item_table} SET quantity = quantity')
+    
+    # Full-text indexes, shared with the SQLAlchemy app (src/services/search.py)
+    for table in SEARCH_INDEXES:
+        exists = c.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (f'{table}_fts',)).fetchone()
+        if not exists:
+            for statement in index_statements(table):
+                c.execute(statement)
+            c.execute(backfill_statement(table))
+    
+    # Last document number per (type, year), see next_number()
+    c.execute('''CREATE TABLE IF NOT EXISTS number_sequences
+                 (document_type TEXT NOT NULL,
+                  year INTEGER NOT NULL,
+                  last_value INTEGER NOT NULL DEFAULT 0,
+                  PRIMARY KEY (document_type, year)) WITHOUT ROWID''')
+    
     conn.commit()
     conn.close()
 
 # Initialize database
 init_db()
 
+# Pre-opened connections, checked out once per request and returned on teardown
+# SQL count, DB and serialization time per request: Server-Timing header and /api/_debug/perf.
+# Off unless PERF_PROFILING=1, since /api/_debug/perf shows SQL to anyone who asks
+PERF_PROFILING = os.environ.get('PERF_PROFILING', '0') == '1'
+if PERF_PROFILING:
+    init_profiling(app)
+
+db_pool = ConnectionPool(DATABASE_PATH, size=int(os.environ.get('DB_POOL_SIZE', 8)),
+                         factory=ProfiledConnection if PERF_PROFILING else sqlite3.Connection)
+db_pool.init_app(app)
+
+def get_db():
+    return db_pool.get_connection()
+
+# Opt-in keyset pagination for the list routes: ?limit=N returns the first page,
+# ?after=<next_cursor>&limit=N the next one. Without either, lists stay unbounded.
+MAX_PAGE_LIMIT = 500
+
+def encode_cursor(sort_value, row_id):
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return sort_value, int(row_id)
+    except Exception:
+        abort(make_response(jsonify({'error': 'Invalid cursor'}), 400))
+
+def paginate_sql(query, params, sort_column, id_column, descending=True):
+    """Append ORDER BY, and in cursor mode the seek condition and LIMIT, to a list query"""
+    direction = 'DESC' if descending else 'ASC'
+    if 'after' not in request.args and 'limit' not in request.args:
+        return query + f' ORDER BY {sort_column} {direction}', params, None
+    
+    limit = min(max(request.args.get('limit', 20, type=int) or 20, 1), MAX_PAGE_LIMIT)
+    after = request.args.get('after')
+    if after:
+        sort_value, last_id = decode_cursor(after)
+        if descending:
+            query += f' AND {sort_column} <= ? AND ({sort_column} < ? OR {id_column} > ?)'
+        else:
+            query += f' AND {sort_column} >= ? AND ({sort_column} > ? OR {id_column} > ?)'
+        params.extend([sort_value, sort_value, last_id])
+    
+    query += f' ORDER BY {sort_column} {direction}, {id_column} ASC LIMIT ?'
+    params.append(limit + 1)
+    return query, params, limit
+
+def bump_counters(c, names):
+    """Increment dashboard counters in the caller's transaction"""
+    c.executemany('''INSERT INTO dashboard_counters (name, value) VALUES (?, 1)
+                     ON CONFLICT(name) DO UPDATE SET value = value + 1''', [(name,) for name in names])
+
+# Same formats as src/services/numbering.py; customer numbers never restart
+NUMBER_FORMATS = {
+    'invoice': 'RE-{year}-{value:05d}',
+    'quote': 'AN-{year}-{value:05d}',
+    'order': 'AU-{year}-{value:05d}',
+    'customer': 'K-{value:06d}',
+}
+
+def next_number(c, document_type, year=None):
+    """Allocate the next document number in the caller's transaction (gap-free: a rollback returns it)"""
+    year = 0 if document_type == 'customer' else (year or datetime.now().year)
+    c.execute('''INSERT INTO number_sequences (document_type, year, last_value) VALUES (?, ?, 1)
+                 ON CONFLICT(document_type, year) DO UPDATE SET last_value = last_value + 1
+                 RETURNING last_value''', (document_type, year))
+    value = c.fetchone()[0]
+    return NUMBER_FORMATS[document_type].format(year=year, value=value)
+
+def insert_items(c, item_table, foreign_key, document_id, items):
+    """Insert quote/invoice items; their triggers update the document totals"""
+    if items:
+        c.executemany(f'''INSERT INTO {item_table} ({foreign_key}, description, quantity, unit, unit_price, notes)
+                          VALUES (?, ?, ?, ?, ?, ?)''',
+                      [(document_id, item['description'], item.get('quantity', 1), item.get('unit', 'Stück'),
+                        item['unit_price'], item.get('notes')) for item in items])
+
+def trim_page(rows, limit, sort_index):
+    """Drop the look-ahead row of a cursor page and build its metadata"""
+    if limit is None:
+        return rows, {}
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1][sort_index], rows[-1][0]) if has_more else None
+    return rows, {'next_cursor': next_cursor, 'has_more': has_more, 'limit': limit}
+
+# Payload keys of the list routes and the columns they come from; id and the
+# sort column are selected first, so trim_page() finds the sort key at index 1
+CUSTOMER_COLUMNS = ['id', 'customer_number', 'first_name', 'last_name', 'email', 'phone', 'mobile',
+                    'company_name', 'street', 'house_number', 'postal_code', 'city', 'customer_type',
+                    'preferred_contact_method', 'is_active', 'created_at', 'updated_at']
+ORDER_COLUMNS = ['id', 'order_number', 'customer_id', 'title', 'description', 'service_type', 'service_street',
+                 'service_house_number', 'service_postal_code', 'service_city', 'scheduled_date',
+                 'scheduled_time', 'estimated_duration', 'estimated_price', 'final_price', 'priority', 'status',
+                 'special_instructions', 'access_instructions', 'created_at', 'completed_at']
+QUOTE_COLUMNS = ['id', 'quote_number', 'customer_id', 'title', 'description', 'service_type', 'service_street',
+                 'service_house_number', 'service_postal_code', 'service_city', 'valid_until', 'tax_rate', 'status',
+                 'notes', 'terms_conditions', 'created_at', 'subtotal', 'tax_amount', 'total_amount']
+
+def nested_customer(first_name, last_name, company_name):
+    return {'first_name': first_name, 'last_name': last_name, 'company_name': company_name} if first_name else None
+
+def nested_order(order_number, title):
+    return {'order_number': order_number, 'title': title} if order_number else None
+
+def or_default(default):
+    return lambda value: value if value else default
+
+JOIN_CUSTOMER = 'LEFT JOIN customers c ON {}.customer_id = c.id'
+JOIN_ORDER = 'LEFT JOIN orders o ON {}.order_id = o.id'
+
+CUSTOMER_LIST = SqlSpec('customers', CUSTOMER_COLUMNS, always=('id', 'created_at'), views={
+    'picker': ('id', 'customer_number', 'first_name', 'last_name', 'company_name'),
+    'list': ('id', 'customer_number', 'first_name', 'last_name', 'company_name', 'customer_type', 'email',
+             'phone', 'street', 'house_number', 'postal_code', 'city')
+})
+# Qualified: customers_fts has columns of the same names
+CUSTOMER_LOOKUP = SqlSpec('customers', [
+    'customers.id', 'customers.customer_number',
+    Field('display_name', 'customers.first_name', 'customers.last_name', 'customers.company_name',
+          convert=display_name)
+], always=('customers.id',))
+LOOKUP_LIMIT = 20
+MAX_LOOKUP_LIMIT = 100
+ORDER_DETAIL = SqlSpec('orders', ORDER_COLUMNS, always=('id', 'created_at'))
+ORDER_LIST = SqlSpec('orders o', [f'o.{column}' for column in ORDER_COLUMNS] + [
+    Field('customer', 'c.first_name', 'c.last_name', 'c.company_name', convert=nested_customer,
+          join=JOIN_CUSTOMER.format('o'))
+], always=('o.id', 'o.created_at'), views={
+    'picker': ('id', 'order_number', 'title', 'customer_id'),
+    # What Orders.jsx shows per row, without the long free-text columns
+    'list': ('id', 'order_number', 'customer_id', 'title', 'service_type', 'service_street', 'service_house_number',
+             'service_postal_code', 'service_city', 'scheduled_date', 'scheduled_time', 'estimated_duration',
+             'estimated_price', 'priority', 'status', 'created_at', 'customer')
+})
+QUOTE_LIST = SqlSpec('quotes q', [f'q.{column}' for column in QUOTE_COLUMNS] + [
+    Field('customer', 'c.first_name', 'c.last_name', 'c.company_name', convert=nested_customer,
+          join=JOIN_CUSTOMER.format('q'))
+], always=('q.id', 'q.created_at'), views={
+    'picker': ('id', 'quote_number', 'title', 'customer_id', 'status')
+})
+COMMUNICATION_LIST = SqlSpec('communications comm', [f'comm.{column}' for column in (
+    'id', 'customer_id', 'order_id', 'type', 'direction', 'subject', 'content', 'contact_person', 'contact_method',
+    'status', 'communication_date', 'follow_up_date', 'follow_up_completed', 'tags', 'is_important')] + [
+    Field('customer', 'c.first_name', 'c.last_name', 'c.company_name', convert=nested_customer,
+          join=JOIN_CUSTOMER.format('comm')),
+    Field('order', 'o.order_number', 'o.title', convert=nested_order, join=JOIN_ORDER.format('comm'))
+], always=('comm.id', 'comm.communication_date'))
+TIME_ENTRY_LIST = SqlSpec('time_entries te', [f'te.{column}' for column in (
+    'id', 'user_id', 'user_name', 'customer_id', 'order_id', 'start_time', 'end_time', 'duration', 'description',
+    'activity_type', 'status', 'notes', 'created_at')] + [
+    Field('customer_name', "c.first_name || ' ' || c.last_name", convert=or_default('Kein Kunde'),
+          join=JOIN_CUSTOMER.format('te')),
+    Field('order_title', 'o.title', convert=or_default('Kein Auftrag'), join=JOIN_ORDER.format('te'))
+], always=('te.id', 'te.created_at'))
+QUALITY_CHECK_LIST = SqlSpec('quality_checks qc', [f'qc.{column}' for column in (
+    'id', 'order_id', 'customer_id', 'inspector_name', 'check_date', 'check_type', 'overall_score', 'status',
+    'notes', 'check_details', 'recommendations', 'created_at')] + [
+    Field('customer_name', "c.first_name || ' ' || c.last_name", convert=or_default('Kein Kunde'),
+          join=JOIN_CUSTOMER.format('qc')),
+    Field('order_title', 'o.title', convert=or_default('Kein Auftrag'), join=JOIN_ORDER.format('qc'))
+], always=('qc.id', 'qc.created_at'))
+QUOTE_DETAIL = SqlSpec('quotes', QUOTE_COLUMNS, always=('id',))
+QUOTE_ITEMS = SqlSpec('quote_items', ['description', 'quantity', 'unit', 'unit_price', 'notes', 'total_price'],
+                      always=('id',))
+INVENTORY_LIST = SqlSpec('inventory_items', [
+    'id', 'name', 'description', 'category', 'sku', 'quantity', 'unit', 'unit_price', 'reorder_point', 'supplier',
+    'location', 'status', 'created_at'
+], always=('id', 'name'), views={
+    'picker': ('id', 'name', 'sku', 'unit', 'quantity')
+})
+INVOICE_LIST = SqlSpec('invoices i', [f'i.{column}' for column in (
+    'id', 'invoice_number', 'customer_id', 'order_id', 'invoice_date', 'due_date', 'tax_rate', 'payment_method',
+    'status', 'notes', 'created_at')] + [
+    Field('customer_name', "c.first_name || ' ' || c.last_name", convert=or_default('Unbekannter Kunde'),
+          join=JOIN_CUSTOMER.format('i')),
+    'i.subtotal', 'i.tax_amount', 'i.total_amount'
+], always=('i.id', 'i.created_at'), views={
+    'picker': ('id', 'invoice_number', 'customer_name', 'total_amount', 'status')
+})
+
+def list_fields(spec):
+    """?fields= or ?view= of a list request; unknown fields and views answer 400"""
+    try:
+        return spec.requested(request.args)
+    except ValueError as e:
+        abort(make_response(jsonify({'error': str(e)}), 400))
+
+def fetch_one(spec, where, params):
+    conn = get_db()
+    c = conn.cursor()
+    c.execute(f'{spec.select()} WHERE {where}', params)
+    row = c.fetchone()
+    return spec.dicts([row])[0] if row else None
+
 # Helper function to get customer data
 def get_customer_data(customer_id):
-    conn = sqlite3.connect('database/app.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM customers WHERE id = ?', (customer_id,))
-    customer = c.fetchone()
-    conn.close()
-    
-    if customer:
-        return {
-            'id': customer[0],
-            'customer_number': customer[1],
-            'first_name': customer[2],
-            'last_name': customer[3],
-            'email': customer[4],
-            'phone': customer[5],
-            'mobile': customer[6],
-            'company_name': customer[7],
-            'street': customer[8],
-            'house_number': customer[9],
-            'postal_code': customer[10],
-            'city': customer[11],
-            'customer_type': customer[12],
-            'preferred_contact_method': customer[13],
-            'is_active': customer[14],
-            'created_at': customer[15],
-            'updated_at': customer[16]
-        }
-    return None
+    return fetch_one(CUSTOMER_LIST, 'id = ?', (customer_id,))
 
 # Helper function to get order data
 def get_order_data(order_id):
-    conn = sqlite3.connect('database/app.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM orders WHERE id = ?', (order_id,))
-    order = c.fetchone()
-    conn.close()
-    
-    if order:
-        return {
-            'id': order[0],
-            'order_number': order[1],
-            'customer_id': order[2],
-            'title': order[3],
-            'description': order[4],
-            'service_type': order[5],
-            'service_street': order[6],
-            'service_house_number': order[7],
-            'service_postal_code': order[8],
-            'service_city': order[9],
-            'scheduled_date': order[10],
-            'scheduled_time': order[11],
-            'estimated_duration': order[12],
-            'estimated_price': order[13],
-            'final_price': order[14],
-            'priority': order[15],
-            'status': order[16],
-            'special_instructions': order[17],
-            'access_instructions': order[18],
-            'created_at': order[19],
-            'completed_at': order[20]
-        }
-    return None
+    return fetch_one(ORDER_DETAIL, 'id = ?', (order_id,))
 
 # API Routes
 
 @app.route('/api/customers', methods=['GET'])
 def get_customers():
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
     search = request.args.get('search', '')
     customer_type = request.args.get('customer_type', '')
     
-    query = 'SELECT * FROM customers WHERE 1=1'
+    fields = list_fields(CUSTOMER_LIST)
+    query = CUSTOMER_LIST.select(fields) + ' WHERE 1=1'
     params = []
     
-    if search:
-        query += ' AND (first_name LIKE ? OR last_name LIKE ? OR email LIKE ? OR company_name LIKE ?)'
-        search_term = f'%{search}%'
-        params.extend([search_term, search_term, search_term, search_term])
+    match = fts_query(search)
+    if match:
+        query += ' AND id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?)'
+        params.append(match)
     
     if customer_type:
         query += ' AND customer_type = ?'
         params.append(customer_type)
     
-    query += ' ORDER BY created_at DESC'
+    query, params, limit = paginate_sql(query, params, 'created_at', 'id')
     
     c.execute(query, params)
-    customers = c.fetchall()
-    conn.close()
+    customers, page_meta = trim_page(c.fetchall(), limit, 1)
+    
+    return json_response({'customers': CUSTOMER_LIST.dicts(customers, fields), **page_meta})
+
+@app.route('/api/customers/lookup', methods=['GET'])
+def lookup_customers():
+    conn = get_db()
+    c = conn.cursor()
+    
+    limit = min(max(request.args.get('limit', LOOKUP_LIMIT, type=int) or LOOKUP_LIMIT, 1), MAX_LOOKUP_LIMIT)
+    match = fts_query(request.args.get('q', ''))
     
-    customer_list = []
-    for customer in customers:
-        customer_data = {
-            'id': customer[0],
-            'customer_number': customer[1],
-            'first_name': customer[2],
-            'last_name': customer[3],
-            'email': customer[4],
-            'phone': customer[5],
-            'mobile': customer[6],
-            'company_name': customer[7],
-            'street': customer[8],
-            'house_number': customer[9],
-            'postal_code': customer[10],
-            'city': customer[11],
-            'customer_type': customer[12],
-            'preferred_contact_method': customer[13],
-            'is_active': customer[14],
-            'created_at': customer[15],
-            'updated_at': customer[16]
-        }
-        customer_list.append(customer_data)
-    
-    return jsonify({'customers': customer_list})
+    # Best matches first; without a search term the newest customers
+    if match:
+        c.execute(f'''{CUSTOMER_LOOKUP.select()}
+                      JOIN customers_fts ON customers_fts.rowid = customers.id
+                      WHERE customers_fts MATCH ? AND customers.is_active = 1
+                      ORDER BY customers_fts.rank LIMIT ?''', (match, limit))
+    else:
+        c.execute(f'''{CUSTOMER_LOOKUP.select()} WHERE customers.is_active = 1
+                      ORDER BY customers.created_at DESC LIMIT ?''', (limit,))
+    
+    return json_response({'customers': CUSTOMER_LOOKUP.dicts(c.fetchall())})
 
 @app.route('/api/customers', methods=['POST'])
 def create_customer():
     data = request.json
     
-    # Generate customer number
-    customer_number = f"CUST-{datetime.now().strftime('%Y%m%d')}-{random.randint(1000, 9999)}"
-    
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
+    customer_number = next_number(c, 'customer')
+    
     c.execute('''INSERT INTO customers 
                  (customer_number, first_name, last_name, email, phone, mobile, company_name, street, house_number, postal_code, city, customer_type, preferred_contact_method)
                  VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
@@ -327,9 +533,9 @@ def create_customer():
                data.get('street'), data.get('house_number'), data.get('postal_code'), 
                data.get('city'), data.get('customer_type', 'private'), 
                data.get('preferred_contact_method', 'email')))
+    bump_counters(c, ['customers.active'])
     
     conn.commit()
-    conn.close()
     
     return jsonify({'message': 'Customer created successfully', 'customer_number': customer_number}), 201
 
@@ -342,16 +548,14 @@ def get_customer(customer_id):
 
 @app.route('/api/orders', methods=['GET'])
 def get_orders():
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
     status_filter = request.args.get('status', '')
     service_type_filter = request.args.get('service_type', '')
     
-    query = '''SELECT o.*, c.first_name, c.last_name, c.company_name 
-               FROM orders o 
-               LEFT JOIN customers c ON o.customer_id = c.id 
-               WHERE 1=1'''
+    fields = list_fields(ORDER_LIST)
+    query = ORDER_LIST.select(fields) + ' WHERE 1=1'
     params = []
     
     if status_filter:
@@ -362,56 +566,22 @@ def get_orders():
         query += ' AND o.service_type = ?'
         params.append(service_type_filter)
     
-    query += ' ORDER BY o.created_at DESC'
+    query, params, limit = paginate_sql(query, params, 'o.created_at', 'o.id')
     
     c.execute(query, params)
-    orders = c.fetchall()
-    conn.close()
+    orders, page_meta = trim_page(c.fetchall(), limit, 1)
     
-    order_list = []
-    for order in orders:
-        order_data = {
-            'id': order[0],
-            'order_number': order[1],
-            'customer_id': order[2],
-            'title': order[3],
-            'description': order[4],
-            'service_type': order[5],
-            'service_street': order[6],
-            'service_house_number': order[7],
-            'service_postal_code': order[8],
-            'service_city': order[9],
-            'scheduled_date': order[10],
-            'scheduled_time': order[11],
-            'estimated_duration': order[12],
-            'estimated_price': order[13],
-            'final_price': order[14],
-            'priority': order[15],
-            'status': order[16],
-            'special_instructions': order[17],
-            'access_instructions': order[18],
-            'created_at': order[19],
-            'completed_at': order[20],
-            'customer': {
-                'first_name': order[21],
-                'last_name': order[22],
-                'company_name': order[23]
-            } if order[21] else None
-        }
-        order_list.append(order_data)
-    
-    return jsonify({'orders': order_list})
+    return json_response({'orders': ORDER_LIST.dicts(orders, fields), **page_meta})
 
 @app.route('/api/orders', methods=['POST'])
 def create_order():
     data = request.json
     
-    # Generate order number
-    order_number = f"ORD-{datetime.now().strftime('%Y%m%d')}-{random.randint(1000, 9999)}"
-    
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
+    order_number = next_number(c, 'order')
+    
     c.execute('''INSERT INTO orders 
                  (order_number, customer_id, title, description, service_type, service_street, service_house_number, service_postal_code, service_city, scheduled_date, scheduled_time, estimated_duration, estimated_price, priority, special_instructions, access_instructions)
                  VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
@@ -420,9 +590,12 @@ def create_order():
                data.get('service_postal_code'), data.get('service_city'), data.get('scheduled_date'), 
                data.get('scheduled_time'), data.get('estimated_duration'), data.get('estimated_price'), 
                data.get('priority', 'normal'), data.get('special_instructions'), data.get('access_instructions')))
+    counter_names = ['orders.status.pending']
+    if data.get('scheduled_date'):
+        counter_names.append(f"orders.scheduled.{data['scheduled_date']}")
+    bump_counters(c, counter_names)
     
     conn.commit()
-    conn.close()
     
     return jsonify({'message': 'Order created successfully', 'order_number': order_number}), 201
 
@@ -439,53 +612,36 @@ def get_order(order_id):
 
 @app.route('/api/orders/dashboard', methods=['GET'])
 def get_orders_dashboard():
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
-    # Get order counts by status
-    c.execute('SELECT status, COUNT(*) FROM orders GROUP BY status')
-    status_counts = dict(c.fetchall())
-    
-    # Get today's orders
+    # Everything comes from the materialized counters in one primary-key lookup
     today = datetime.now().date()
-    c.execute('SELECT COUNT(*) FROM orders WHERE DATE(scheduled_date) = ?', (today,))
-    todays_orders = c.fetchone()[0]
-    
-    # Get this week's orders
     week_start = today - timedelta(days=today.weekday())
-    c.execute('SELECT COUNT(*) FROM orders WHERE DATE(scheduled_date) >= ?', (week_start,))
-    this_week_orders = c.fetchone()[0]
+    week_days = [f'orders.scheduled.{week_start + timedelta(days=i)}' for i in range(7)]
+    statuses = ['pending', 'confirmed', 'in_progress', 'completed']
+    names = [f'orders.status.{status}' for status in statuses] + week_days + [f'orders.scheduled.{today}', 'customers.active']
     
-    # Get total customers
-    c.execute('SELECT COUNT(*) FROM customers')
-    total_customers = c.fetchone()[0]
-    
-    conn.close()
+    c.execute(f"SELECT name, value FROM dashboard_counters WHERE name IN ({', '.join('?' * len(names))})", names)
+    counters = dict(c.fetchall())
     
     return jsonify({
-        'order_counts': {
-            'pending': status_counts.get('pending', 0),
-            'confirmed': status_counts.get('confirmed', 0),
-            'in_progress': status_counts.get('in_progress', 0),
-            'completed': status_counts.get('completed', 0)
-        },
-        'todays_orders': todays_orders,
-        'this_week_orders': this_week_orders,
-        'total_customers': total_customers
+        'order_counts': {status: counters.get(f'orders.status.{status}', 0) for status in statuses},
+        'todays_orders': counters.get(f'orders.scheduled.{today}', 0),
+        'this_week_orders': sum(counters.get(name, 0) for name in week_days),
+        'total_customers': counters.get('customers.active', 0)
     })
 
 @app.route('/api/quotes', methods=['GET'])
 def get_quotes():
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
     status_filter = request.args.get('status', '')
     service_type_filter = request.args.get('service_type', '')
     
-    query = '''SELECT q.*, c.first_name, c.last_name, c.company_name 
-               FROM quotes q 
-               LEFT JOIN customers c ON q.customer_id = c.id 
-               WHERE 1=1'''
+    fields = list_fields(QUOTE_LIST)
+    query = QUOTE_LIST.select(fields) + ' WHERE 1=1'
     params = []
     
     if status_filter:
@@ -496,54 +652,22 @@ def get_quotes():
         query += ' AND q.service_type = ?'
         params.append(service_type_filter)
     
-    query += ' ORDER BY q.created_at DESC'
+    query, params, limit = paginate_sql(query, params, 'q.created_at', 'q.id')
     
     c.execute(query, params)
-    quotes = c.fetchall()
-    conn.close()
+    quotes, page_meta = trim_page(c.fetchall(), limit, 1)
     
-    quote_list = []
-    for quote in quotes:
-        # Calculate totals (simplified)
-        total_amount = 100.0  # Placeholder
-        quote_data = {
-            'id': quote[0],
-            'quote_number': quote[1],
-            'customer_id': quote[2],
-            'title': quote[3],
-            'description': quote[4],
-            'service_type': quote[5],
-            'service_street': quote[6],
-            'service_house_number': quote[7],
-            'service_postal_code': quote[8],
-            'service_city': quote[9],
-            'valid_until': quote[10],
-            'tax_rate': quote[11],
-            'status': quote[12],
-            'notes': quote[13],
-            'terms_conditions': quote[14],
-            'created_at': quote[15],
-            'total_amount': total_amount,
-            'customer': {
-                'first_name': quote[16],
-                'last_name': quote[17],
-                'company_name': quote[18]
-            } if quote[16] else None
-        }
-        quote_list.append(quote_data)
-    
-    return jsonify({'quotes': quote_list})
+    return json_response({'quotes': QUOTE_LIST.dicts(quotes, fields), **page_meta})
 
 @app.route('/api/quotes', methods=['POST'])
 def create_quote():
     data = request.json
     
-    # Generate quote number
-    quote_number = f"QUOTE-{datetime.now().strftime('%Y%m%d')}-{random.randint(1000, 9999)}"
-    
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
+    quote_number = next_number(c, 'quote')
+    
     c.execute('''INSERT INTO quotes 
                  (quote_number, customer_id, title, description, service_type, service_street, service_house_number, service_postal_code, service_city, valid_until, tax_rate, notes, terms_conditions)
                  VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
@@ -551,76 +675,36 @@ def create_quote():
                data['service_type'], data.get('service_street'), data.get('service_house_number'), 
                data.get('service_postal_code'), data.get('service_city'), data.get('valid_until'), 
                data.get('tax_rate', 19.0), data.get('notes'), data.get('terms_conditions')))
+    insert_items(c, 'quote_items', 'quote_id', c.lastrowid, data.get('quote_items'))
     
     conn.commit()
-    conn.close()
     
     return jsonify({'message': 'Quote created successfully', 'quote_number': quote_number}), 201
 
 @app.route('/api/quotes/<int:quote_id>', methods=['GET'])
 def get_quote(quote_id):
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
-    c.execute('SELECT * FROM quotes WHERE id = ?', (quote_id,))
-    quote = c.fetchone()
+    quote = fetch_one(QUOTE_DETAIL, 'id = ?', (quote_id,))
     
     if quote:
-        # Get quote items
-        c.execute('SELECT * FROM quote_items WHERE quote_id = ?', (quote_id,))
-        items = c.fetchall()
-        
-        quote_data = {
-            'id': quote[0],
-            'quote_number': quote[1],
-            'customer_id': quote[2],
-            'title': quote[3],
-            'description': quote[4],
-            'service_type': quote[5],
-            'service_street': quote[6],
-            'service_house_number': quote[7],
-            'service_postal_code': quote[8],
-            'service_city': quote[9],
-            'valid_until': quote[10],
-            'tax_rate': quote[11],
-            'status': quote[12],
-            'notes': quote[13],
-            'terms_conditions': quote[14],
-            'created_at': quote[15],
-            'quote_items': [
-                {
-                    'description': item[2],
-                    'quantity': item[3],
-                    'unit': item[4],
-                    'unit_price': item[5],
-                    'notes': item[6],
-                    'total_price': item[3] * item[5]
-                } for item in items
-            ],
-            'subtotal': sum(item[3] * item[5] for item in items),
-            'tax_amount': sum(item[3] * item[5] for item in items) * quote[11] / 100,
-            'total_amount': sum(item[3] * item[5] for item in items) * (1 + quote[11] / 100)
-        }
-        
-        conn.close()
-        return jsonify(quote_data)
+        c.execute(f'{QUOTE_ITEMS.select()} WHERE quote_id = ?', (quote_id,))
+        quote['quote_items'] = QUOTE_ITEMS.dicts(c.fetchall())
+        return json_response(quote)
     
-    conn.close()
     return jsonify({'error': 'Quote not found'}), 404
 
 @app.route('/api/communications', methods=['GET'])
 def get_communications():
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
     type_filter = request.args.get('type', '')
     status_filter = request.args.get('status', '')
     
-    query = '''SELECT comm.*, c.first_name, c.last_name, c.company_name, o.order_number, o.title as order_title
-               FROM communications comm 
-               LEFT JOIN customers c ON comm.customer_id = c.id 
-               LEFT JOIN orders o ON comm.order_id = o.id 
-               WHERE 1=1'''
+    fields = list_fields(COMMUNICATION_LIST)
+    query = COMMUNICATION_LIST.select(fields) + ' WHERE 1=1'
     params = []
     
     if type_filter:
@@ -631,49 +715,18 @@ def get_communications():
         query += ' AND comm.status = ?'
         params.append(status_filter)
     
-    query += ' ORDER BY comm.communication_date DESC'
+    query, params, limit = paginate_sql(query, params, 'comm.communication_date', 'comm.id')
     
     c.execute(query, params)
-    communications = c.fetchall()
-    conn.close()
+    communications, page_meta = trim_page(c.fetchall(), limit, 1)
     
-    comm_list = []
-    for comm in communications:
-        comm_data = {
-            'id': comm[0],
-            'customer_id': comm[1],
-            'order_id': comm[2],
-            'type': comm[3],
-            'direction': comm[4],
-            'subject': comm[5],
-            'content': comm[6],
-            'contact_person': comm[7],
-            'contact_method': comm[8],
-            'status': comm[9],
-            'communication_date': comm[10],
-            'follow_up_date': comm[11],
-            'follow_up_completed': comm[12],
-            'tags': comm[13],
-            'is_important': comm[14],
-            'customer': {
-                'first_name': comm[15],
-                'last_name': comm[16],
-                'company_name': comm[17]
-            } if comm[15] else None,
-            'order': {
-                'order_number': comm[18],
-                'title': comm[19]
-            } if comm[18] else None
-        }
-        comm_list.append(comm_data)
-    
-    return jsonify({'communications': comm_list})
+    return json_response({'communications': COMMUNICATION_LIST.dicts(communications, fields), **page_meta})
 
 @app.route('/api/communications', methods=['POST'])
 def create_communication():
     data = request.json
     
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
     c.execute('''INSERT INTO communications 
@@ -684,23 +737,19 @@ def create_communication():
                data.get('status', 'completed'), data.get('follow_up_date'), data.get('tags'), data.get('is_important', False)))
     
     conn.commit()
-    conn.close()
     
     return jsonify({'message': 'Communication created successfully'}), 201
 
 @app.route('/api/time-entries', methods=['GET'])
 def get_time_entries():
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
     status_filter = request.args.get('status', '')
     user_filter = request.args.get('user_id', '')
     
-    query = '''SELECT te.*, c.first_name || ' ' || c.last_name as customer_name, o.title as order_title
-               FROM time_entries te 
-               LEFT JOIN customers c ON te.customer_id = c.id 
-               LEFT JOIN orders o ON te.order_id = o.id 
-               WHERE 1=1'''
+    fields = list_fields(TIME_ENTRY_LIST)
+    query = TIME_ENTRY_LIST.select(fields) + ' WHERE 1=1'
     params = []
     
     if status_filter:
@@ -711,40 +760,18 @@ def get_time_entries():
         query += ' AND te.user_id = ?'
         params.append(user_filter)
     
-    query += ' ORDER BY te.created_at DESC'
+    query, params, limit = paginate_sql(query, params, 'te.created_at', 'te.id')
     
     c.execute(query, params)
-    entries = c.fetchall()
-    conn.close()
+    entries, page_meta = trim_page(c.fetchall(), limit, 1)
     
-    entry_list = []
-    for entry in entries:
-        entry_data = {
-            'id': entry[0],
-            'user_id': entry[1],
-            'user_name': entry[2],
-            'customer_id': entry[3],
-            'order_id': entry[4],
-            'start_time': entry[5],
-            'end_time': entry[6],
-            'duration': entry[7],
-            'description': entry[8],
-            'activity_type': entry[9],
-            'status': entry[10],
-            'notes': entry[11],
-            'created_at': entry[12],
-            'customer_name': entry[13] if entry[13] else 'Kein Kunde',
-            'order_title': entry[14] if entry[14] else 'Kein Auftrag'
-        }
-        entry_list.append(entry_data)
-    
-    return jsonify({'time_entries': entry_list})
+    return json_response({'time_entries': TIME_ENTRY_LIST.dicts(entries, fields), **page_meta})
 
 @app.route('/api/time-entries', methods=['POST'])
 def create_time_entry():
     data = request.json
     
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
     c.execute('''INSERT INTO time_entries 
@@ -755,7 +782,6 @@ def create_time_entry():
                data.get('activity_type', 'work'), data.get('status', 'completed'), data.get('notes')))
     
     conn.commit()
-    conn.close()
     
     return jsonify({'message': 'Time entry created successfully'}), 201
 
@@ -763,7 +789,7 @@ def create_time_entry():
 def start_time_entry():
     data = request.json
     
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
     c.execute('''INSERT INTO time_entries 
@@ -774,23 +800,19 @@ def start_time_entry():
                'active', data.get('notes')))
     
     conn.commit()
-    conn.close()
     
     return jsonify({'message': 'Time entry started successfully'}), 201
 
 @app.route('/api/quality-checks', methods=['GET'])
 def get_quality_checks():
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
     status_filter = request.args.get('status', '')
     type_filter = request.args.get('check_type', '')
     
-    query = '''SELECT qc.*, c.first_name || ' ' || c.last_name as customer_name, o.title as order_title
-               FROM quality_checks qc 
-               LEFT JOIN customers c ON qc.customer_id = c.id 
-               LEFT JOIN orders o ON qc.order_id = o.id 
-               WHERE 1=1'''
+    fields = list_fields(QUALITY_CHECK_LIST)
+    query = QUALITY_CHECK_LIST.select(fields) + ' WHERE 1=1'
     params = []
     
     if status_filter:
@@ -801,39 +823,18 @@ def get_quality_checks():
         query += ' AND qc.check_type = ?'
         params.append(type_filter)
     
-    query += ' ORDER BY qc.created_at DESC'
+    query, params, limit = paginate_sql(query, params, 'qc.created_at', 'qc.id')
     
     c.execute(query, params)
-    checks = c.fetchall()
-    conn.close()
+    checks, page_meta = trim_page(c.fetchall(), limit, 1)
     
-    check_list = []
-    for check in checks:
-        check_data = {
-            'id': check[0],
-            'order_id': check[1],
-            'customer_id': check[2],
-            'inspector_name': check[3],
-            'check_date': check[4],
-            'check_type': check[5],
-            'overall_score': check[6],
-            'status': check[7],
-            'notes': check[8],
-            'check_details': check[9],
-            'recommendations': check[10],
-            'created_at': check[11],
-            'customer_name': check[12] if check[12] else 'Kein Kunde',
-            'order_title': check[13] if check[13] else 'Kein Auftrag'
-        }
-        check_list.append(check_data)
-    
-    return jsonify({'quality_checks': check_list})
+    return json_response({'quality_checks': QUALITY_CHECK_LIST.dicts(checks, fields), **page_meta})
 
 @app.route('/api/quality-checks', methods=['POST'])
 def create_quality_check():
     data = request.json
     
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
     c.execute('''INSERT INTO quality_checks 
@@ -844,20 +845,20 @@ def create_quality_check():
                data.get('check_details'), data.get('recommendations')))
     
     conn.commit()
-    conn.close()
     
     return jsonify({'message': 'Quality check created successfully'}), 201
 
 @app.route('/api/inventory', methods=['GET'])
 def get_inventory():
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
     category_filter = request.args.get('category', '')
     status_filter = request.args.get('status', '')
     low_stock_filter = request.args.get('low_stock', '')
     
-    query = 'SELECT * FROM inventory_items WHERE 1=1'
+    fields = list_fields(INVENTORY_LIST)
+    query = INVENTORY_LIST.select(fields) + ' WHERE 1=1'
     params = []
     
     if category_filter:
@@ -871,38 +872,18 @@ def get_inventory():
     if low_stock_filter == 'true':
         query += ' AND quantity <= reorder_point'
     
-    query += ' ORDER BY name'
+    query, params, limit = paginate_sql(query, params, 'name', 'id', descending=False)
     
     c.execute(query, params)
-    items = c.fetchall()
-    conn.close()
+    items, page_meta = trim_page(c.fetchall(), limit, 1)
     
-    item_list = []
-    for item in items:
-        item_data = {
-            'id': item[0],
-            'name': item[1],
-            'description': item[2],
-            'category': item[3],
-            'sku': item[4],
-            'quantity': item[5],
-            'unit': item[6],
-            'unit_price': item[7],
-            'reorder_point': item[8],
-            'supplier': item[9],
-            'location': item[10],
-            'status': item[11],
-            'created_at': item[12]
-        }
-        item_list.append(item_data)
-    
-    return jsonify({'inventory_items': item_list})
+    return json_response({'inventory_items': INVENTORY_LIST.dicts(items, fields), **page_meta})
 
 @app.route('/api/inventory', methods=['POST'])
 def create_inventory_item():
     data = request.json
     
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
     c.execute('''INSERT INTO inventory_items 
@@ -913,73 +894,51 @@ def create_inventory_item():
                data.get('supplier'), data.get('location'), data.get('status', 'active')))
     
     conn.commit()
-    conn.close()
     
     return jsonify({'message': 'Inventory item created successfully'}), 201
 
 @app.route('/api/invoices', methods=['GET'])
 def get_invoices():
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
     status_filter = request.args.get('status', '')
     
-    query = '''SELECT i.*, c.first_name || ' ' || c.last_name as customer_name
-               FROM invoices i 
-               LEFT JOIN customers c ON i.customer_id = c.id 
-               WHERE 1=1'''
+    fields = list_fields(INVOICE_LIST)
+    query = INVOICE_LIST.select(fields) + ' WHERE 1=1'
     params = []
     
     if status_filter:
         query += ' AND i.status = ?'
         params.append(status_filter)
     
-    query += ' ORDER BY i.created_at DESC'
+    query, params, limit = paginate_sql(query, params, 'i.created_at', 'i.id')
     
     c.execute(query, params)
-    invoices = c.fetchall()
-    conn.close()
+    invoices, page_meta = trim_page(c.fetchall(), limit, 1)
     
-    invoice_list = []
-    for invoice in invoices:
-        invoice_data = {
-            'id': invoice[0],
-            'invoice_number': invoice[1],
-            'customer_id': invoice[2],
-            'order_id': invoice[3],
-            'invoice_date': invoice[4],
-            'due_date': invoice[5],
-            'tax_rate': invoice[6],
-            'payment_method': invoice[7],
-            'status': invoice[8],
-            'notes': invoice[9],
-            'created_at': invoice[10],
-            'customer_name': invoice[11] if invoice[11] else 'Unbekannter Kunde',
-            'total_amount': 150.0  # Placeholder
-        }
-        invoice_list.append(invoice_data)
-    
-    return jsonify({'invoices': invoice_list})
+    return json_response({'invoices': INVOICE_LIST.dicts(invoices, fields), **page_meta})
 
 @app.route('/api/invoices', methods=['POST'])
 def create_invoice():
     data = request.json
     
-    # Generate invoice number
-    invoice_number = f"INV-{datetime.now().strftime('%Y%m%d')}-{random.randint(1000, 9999)}"
-    
-    conn = sqlite3.connect('database/app.db')
+    conn = get_db()
     c = conn.cursor()
     
+    # Invoice numbers run per year of the invoice date
+    invoice_year = int(data['invoice_date'][:4]) if data.get('invoice_date') else None
+    invoice_number = next_number(c, 'invoice', invoice_year)
+    
     c.execute('''INSERT INTO invoices 
                  (invoice_number, customer_id, order_id, invoice_date, due_date, tax_rate, payment_method, notes)
                  VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
               (invoice_number, data['customer_id'], data.get('order_id'), data.get('invoice_date'),
                data.get('due_date'), data.get('tax_rate', 19.0), data.get('payment_method', 'bank_transfer'),
                data.get('notes')))
+    insert_items(c, 'invoice_items', 'invoice_id', c.lastrowid, data.get('invoice_items'))
     
     conn.commit()
-    conn.close()
     
     return jsonify({'message': 'Invoice created successfully', 'invoice_number': invoice_number}), 201
 
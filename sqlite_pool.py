@@ -0,0 +1,91 @@
+"""
+SQLite connection pool for the simple backend
+"""
+
+import queue
+import sqlite3
+import threading
+
+from flask import g
+
+
+class ConnectionPool:
+    """Bounded pool of pre-opened, tuned SQLite connections"""
+
+    def __init__(self, database, size=8, timeout=30.0, cache_size=-32000,
+                 mmap_size=268435456, cached_statements=256, factory=sqlite3.Connection):
+        self.database = database
+        self.factory = factory  # sqlite3.Connection subclass, e.g. profiling.ProfiledConnection
+        self.size = size
+        self.timeout = timeout
+        self.cache_size = cache_size  # negative = KiB, i.e. ~32 MB page cache
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+
+        # LIFO so the most recently used (warmest) connection is handed out first
+        self._pool = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+        for _ in range(size):
+            self._pool.put(self._connect())
+
+    def _connect(self):
+        """Open a connection and apply the performance pragmas"""
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            factory=self.factory
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size={int(self.cache_size)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def acquire(self):
+        """Check a connection out of the pool, waiting up to `timeout` seconds"""
+        if self._closed:
+            raise RuntimeError('Connection pool is closed')
+        try:
+            return self._pool.get(timeout=self.timeout)
+        except queue.Empty:
+            raise RuntimeError('Timed out waiting for a database connection')
+
+    def release(self, conn):
+        """Return a connection to the pool, discarding any open transaction"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if self._closed:
+                conn.close()
+                return
+        self._pool.put(conn)
+
+    def close(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def get_connection(self):
+        """Return the connection bound to the current request, checking one out if needed"""
+        if 'db_conn' not in g:
+            g.db_conn = self.acquire()
+        return g.db_conn
+
+    def teardown(self, exception=None):
+        """Return the request's connection to the pool"""
+        conn = g.pop('db_conn', None)
+        if conn is not None:
+            self.release(conn)
+
+    def init_app(self, app):
+        app.teardown_appcontext(self.teardown)
@@ -17,7 +17,7 @@ const Customers = () => {
 
   const fetchCustomers = async () => {
     try {
-      const data = await customerAPI.getAll()
+      const data = await customerAPI.getAll('list')
       setCustomers(data || [])
     } catch (error) {
       console.error('Error fetching customers:', error)
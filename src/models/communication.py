@@ -4,6 +4,14 @@ from src.models.user import db
 
 class Communication(db.Model):
     __tablename__ = 'communications'
+    __table_args__ = (
+        db.Index('ix_communications_customer_id_created_at', 'customer_id', db.desc('created_at')),
+        db.Index('ix_communications_order_id_created_at', 'order_id', db.desc('created_at')),
+        db.Index('ix_communications_status_created_at', 'status', db.desc('created_at')),
+        db.Index('ix_communications_type_created_at', 'type', db.desc('created_at')),
+        db.Index('ix_communications_communication_date', db.desc('communication_date')),
+        db.Index('ix_communications_created_at', db.desc('created_at')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
@@ -4,6 +4,9 @@ from .user import db
 
 class Customer(db.Model):
     __tablename__ = 'customers'
+    __table_args__ = (
+        db.Index('ix_customers_is_active_created_at', 'is_active', db.desc('created_at')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     customer_number = db.Column(db.String(20), unique=True, nullable=False)
@@ -58,3 +61,38 @@ class Customer(db.Model):
     
     def __repr__(self):
         return f'<Customer {self.customer_number}: {self.first_name} {self.last_name}>'
+
+
+class CustomerSummary(db.Model):
+    """Per-customer portal figures kept current by SQLite triggers (see src/services/portal.py)"""
+    __tablename__ = 'customer_summaries'
+    # Clustered on customer_id: every portal request starts with a primary-key seek
+    __table_args__ = {'sqlite_with_rowid': False}
+    
+    customer_id = db.Column(db.Integer, primary_key=True)
+    # Bumped by every write to the customer or their orders, invoices and messages
+    version = db.Column(db.Integer, nullable=False, default=1)
+    
+    open_orders = db.Column(db.Integer, nullable=False, default=0)
+    unpaid_invoices = db.Column(db.Integer, nullable=False, default=0)
+    unpaid_amount = db.Column(db.Float, nullable=False, default=0)
+    message_count = db.Column(db.Integer, nullable=False, default=0)
+    last_message_at = db.Column(db.DateTime)
+    
+    # Earliest open order from today on (as of the last write)
+    next_appointment = db.Column(db.Date)
+    next_order_id = db.Column(db.Integer)
+    
+    def to_dict(self):
+        return {
+            'customer_id': self.customer_id,
+            'version': self.version,
+            'open_orders': self.open_orders,
+            'unpaid_invoices': self.unpaid_invoices,
+            'unpaid_amount': round(self.unpaid_amount, 2),
+            'message_count': self.message_count,
+            'last_message_at': self.last_message_at.isoformat() if self.last_message_at else None
+        }
+    
+    def __repr__(self):
+        return f'<CustomerSummary {self.customer_id}: v{self.version}>'
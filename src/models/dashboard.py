@@ -0,0 +1,20 @@
+from src.models.user import db
+
+class DashboardCounter(db.Model):
+    """Materialized count kept current by session events (see src/services/counters.py)"""
+    __tablename__ = 'dashboard_counters'
+    # Clustered on name: each dashboard read is a primary-key seek
+    __table_args__ = {'sqlite_with_rowid': False}
+    
+    # e.g. 'orders.status.pending', 'orders.scheduled.2024-03-01', 'customers.active'
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'value': self.value
+        }
+    
+    def __repr__(self):
+        return f'<DashboardCounter {self.name}: {self.value}>'
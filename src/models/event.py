@@ -0,0 +1,37 @@
+from datetime import datetime
+import json
+from src.models.user import db
+
+class OutboxEvent(db.Model):
+    """Committed change of a CRM row, written in the same transaction (see src/services/events.py)"""
+    __tablename__ = 'outbox_events'
+    __table_args__ = (
+        # Replays of one customer's or one entity's events, in id order
+        db.Index('ix_outbox_events_customer_id_id', 'customer_id', 'id'),
+        db.Index('ix_outbox_events_entity_id', 'entity', 'id'),
+        db.Index('ix_outbox_events_created_at', 'created_at'),
+        # Ids are never reused after pruning, so a Last-Event-ID stays unambiguous
+        {'sqlite_autoincrement': True},
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)  # the SSE event id
+    entity = db.Column(db.String(30), nullable=False)  # 'order', 'invoice', 'communication', ...
+    entity_id = db.Column(db.Integer, nullable=False)
+    customer_id = db.Column(db.Integer)
+    action = db.Column(db.String(10), nullable=False)  # 'created', 'updated', 'deleted'
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON: the row's columns and what changed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'entity': self.entity,
+            'entity_id': self.entity_id,
+            'customer_id': self.customer_id,
+            'action': self.action,
+            **json.loads(self.payload or '{}'),
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+    
+    def __repr__(self):
+        return f'<OutboxEvent {self.id}: {self.entity} {self.entity_id} {self.action}>'
@@ -4,6 +4,11 @@ from src.models.user import db
 
 class InventoryItem(db.Model):
     __tablename__ = 'inventory_items'
+    __table_args__ = (
+        db.Index('ix_inventory_items_name', 'name'),
+        db.Index('ix_inventory_items_category_name', 'category', 'name'),
+        db.Index('ix_inventory_items_status_name', 'status', 'name'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -59,6 +64,11 @@ class InventoryItem(db.Model):
 
 class InventoryTransaction(db.Model):
     __tablename__ = 'inventory_transactions'
+    __table_args__ = (
+        db.Index('ix_inventory_transactions_item_id_transaction_date', 'item_id', db.desc('transaction_date')),
+        db.Index('ix_inventory_transactions_type_transaction_date', 'transaction_type', db.desc('transaction_date')),
+        db.Index('ix_inventory_transactions_transaction_date', db.desc('transaction_date')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     item_id = db.Column(db.Integer, db.ForeignKey('inventory_items.id'), nullable=False)
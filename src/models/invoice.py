@@ -4,6 +4,14 @@ from src.models.user import db
 
 class Invoice(db.Model):
     __tablename__ = 'invoices'
+    __table_args__ = (
+        db.Index('ix_invoices_customer_id_created_at', 'customer_id', db.desc('created_at')),
+        db.Index('ix_invoices_order_id', 'order_id'),
+        db.Index('ix_invoices_status_created_at', 'status', db.desc('created_at')),
+        db.Index('ix_invoices_status_due_date', 'status', 'due_date'),
+        db.Index('ix_invoices_invoice_date', 'invoice_date'),
+        db.Index('ix_invoices_created_at', db.desc('created_at')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     invoice_number = db.Column(db.String(20), unique=True, nullable=False)
@@ -14,7 +22,7 @@ class Invoice(db.Model):
     invoice_date = db.Column(db.Date, nullable=False)
     due_date = db.Column(db.Date)
     
-    # Pricing
+    # Pricing - maintained from the items by triggers, see src/services/totals.py
     subtotal = db.Column(db.Float, nullable=False, default=0.0)
     tax_rate = db.Column(db.Float, default=19.0)  # 19% MwSt
     tax_amount = db.Column(db.Float, default=0.0)
@@ -35,12 +43,8 @@ class Invoice(db.Model):
     
     # Relationships
     items = db.relationship('InvoiceItem', backref='invoice', lazy=True, cascade='all, delete-orphan')
-    
-    def calculate_totals(self):
-        """Calculate subtotal, tax, and total amounts based on invoice items"""
-        self.subtotal = sum(item.total_price for item in self.items)
-        self.tax_amount = self.subtotal * (self.tax_rate / 100)
-        self.total_amount = self.subtotal + self.tax_amount
+    customer = db.relationship('Customer', lazy=True)
+    order = db.relationship('Order', lazy=True)
     
     def to_dict(self):
         return {
@@ -70,6 +74,9 @@ class Invoice(db.Model):
 
 class InvoiceItem(db.Model):
     __tablename__ = 'invoice_items'
+    __table_args__ = (
+        db.Index('ix_invoice_items_invoice_id', 'invoice_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     invoice_id = db.Column(db.Integer, db.ForeignKey('invoices.id'), nullable=False)
@@ -79,16 +86,12 @@ class InvoiceItem(db.Model):
     quantity = db.Column(db.Float, nullable=False, default=1.0)
     unit = db.Column(db.String(20), default='Stück')
     unit_price = db.Column(db.Float, nullable=False)
-    total_price = db.Column(db.Float, nullable=False)
+    total_price = db.Column(db.Float, nullable=False, default=0.0)  # quantity x unit_price, set by trigger
     
     # Additional details
     notes = db.Column(db.Text)
     sort_order = db.Column(db.Integer, default=0)
     
-    def calculate_total(self):
-        """Calculate total price for this item"""
-        self.total_price = self.quantity * self.unit_price
-    
     def to_dict(self):
         return {
             'id': self.id,
@@ -0,0 +1,61 @@
+from datetime import datetime
+import json
+from src.models.user import db
+
+# Priority lanes, highest first; jobs.priority is the index into this tuple
+LANES = ('high', 'default', 'low')
+
+class Job(db.Model):
+    """Durable background job, run by the worker (see src/services/jobs.py)"""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # The worker's claim: next due queued job of the highest lane
+        db.Index('ix_jobs_status_priority_run_at', 'status', 'priority', 'run_at'),
+        db.Index('ix_jobs_status_locked_at', 'status', 'locked_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    task = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    priority = db.Column(db.Integer, nullable=False, default=1)
+    
+    # Same key, same job: repeated requests never enqueue the work twice
+    idempotency_key = db.Column(db.String(200), unique=True)
+    
+    # Status and retries
+    status = db.Column(db.String(20), nullable=False, default='queued')  # 'queued', 'running', 'succeeded', 'failed'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    
+    # Outcome
+    result = db.Column(db.Text)  # JSON
+    last_error = db.Column(db.Text)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'task': self.task,
+            'payload': json.loads(self.payload or '{}'),
+            'lane': LANES[self.priority],
+            'idempotency_key': self.idempotency_key,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'result': json.loads(self.result) if self.result else None,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.task}: {self.status}>'
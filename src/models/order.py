@@ -4,6 +4,15 @@ from .user import db
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # Serves customer_id lookups alone as well as a customer's orders by date
+        db.Index('ix_orders_customer_id_scheduled_date', 'customer_id', 'scheduled_date'),
+        db.Index('ix_orders_status_created_at', 'status', db.desc('created_at')),
+        db.Index('ix_orders_scheduled_date', 'scheduled_date'),
+        db.Index('ix_orders_created_at', db.desc('created_at')),
+        # Partial: the recurring templates are a handful of rows in a large table
+        db.Index('ix_orders_recurring_scheduled_date', 'scheduled_date', sqlite_where=db.text('is_recurring = 1')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(20), unique=True, nullable=False)
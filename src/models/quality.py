@@ -4,6 +4,14 @@ from src.models.user import db
 
 class QualityCheck(db.Model):
     __tablename__ = 'quality_checks'
+    __table_args__ = (
+        db.Index('ix_quality_checks_order_id_created_at', 'order_id', db.desc('created_at')),
+        db.Index('ix_quality_checks_customer_id', 'customer_id'),
+        db.Index('ix_quality_checks_inspector_id_created_at', 'inspector_id', db.desc('created_at')),
+        db.Index('ix_quality_checks_status_created_at', 'status', db.desc('created_at')),
+        db.Index('ix_quality_checks_check_date', 'check_date'),
+        db.Index('ix_quality_checks_created_at', db.desc('created_at')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=True)
@@ -30,6 +38,10 @@ class QualityCheck(db.Model):
     # Inspector information
     inspector_name = db.Column(db.String(100))
     
+    # Relationships
+    customer = db.relationship('Customer', lazy=True)
+    order = db.relationship('Order', lazy=True)
+    
     def to_dict(self):
         return {
             'id': self.id,
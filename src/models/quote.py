@@ -4,6 +4,11 @@ from src.models.user import db
 
 class Quote(db.Model):
     __tablename__ = 'quotes'
+    __table_args__ = (
+        db.Index('ix_quotes_customer_id_created_at', 'customer_id', db.desc('created_at')),
+        db.Index('ix_quotes_status_created_at', 'status', db.desc('created_at')),
+        db.Index('ix_quotes_created_at', db.desc('created_at')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     quote_number = db.Column(db.String(20), unique=True, nullable=False)
@@ -20,7 +25,7 @@ class Quote(db.Model):
     service_postal_code = db.Column(db.String(10))
     service_city = db.Column(db.String(100))
     
-    # Pricing
+    # Pricing - maintained from the items by triggers, see src/services/totals.py
     subtotal = db.Column(db.Float, nullable=False, default=0.0)
     tax_rate = db.Column(db.Float, default=19.0)  # 19% MwSt
     tax_amount = db.Column(db.Float, default=0.0)
@@ -42,12 +47,7 @@ class Quote(db.Model):
     
     # Relationships
     items = db.relationship('QuoteItem', backref='quote', lazy=True, cascade='all, delete-orphan')
-    
-    def calculate_totals(self):
-        """Calculate subtotal, tax, and total amounts based on quote items"""
-        self.subtotal = sum(item.total_price for item in self.items)
-        self.tax_amount = self.subtotal * (self.tax_rate / 100)
-        self.total_amount = self.subtotal + self.tax_amount
+    customer = db.relationship('Customer', lazy=True)
     
     def to_dict(self):
         return {
@@ -82,6 +82,9 @@ class Quote(db.Model):
 
 class QuoteItem(db.Model):
     __tablename__ = 'quote_items'
+    __table_args__ = (
+        db.Index('ix_quote_items_quote_id', 'quote_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     quote_id = db.Column(db.Integer, db.ForeignKey('quotes.id'), nullable=False)
@@ -91,16 +94,12 @@ class QuoteItem(db.Model):
     quantity = db.Column(db.Float, nullable=False, default=1.0)
     unit = db.Column(db.String(20), default='Stück')  # 'Stück', 'Stunden', 'm²', etc.
     unit_price = db.Column(db.Float, nullable=False)
-    total_price = db.Column(db.Float, nullable=False)
+    total_price = db.Column(db.Float, nullable=False, default=0.0)  # quantity x unit_price, set by trigger
     
     # Additional details
     notes = db.Column(db.Text)
     sort_order = db.Column(db.Integer, default=0)
     
-    def calculate_total(self):
-        """Calculate total price for this item"""
-        self.total_price = self.quantity * self.unit_price
-    
     def to_dict(self):
         return {
             'id': self.id,
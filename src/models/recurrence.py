@@ -0,0 +1,78 @@
+from datetime import datetime
+from src.models.user import db
+
+# Frequencies of a recurrence rule; recurring_interval values map onto them
+FREQUENCIES = ('daily', 'weekly', 'monthly', 'yearly')
+EXCEPTION_ACTIONS = ('skip', 'move', 'materialized')
+
+class RecurrenceRule(db.Model):
+    """RRULE-like repetition of a recurring order (see src/services/recurrence.py)
+    
+    The order itself is the first occurrence; its scheduled_date is DTSTART.
+    """
+    __tablename__ = 'recurrence_rules'
+    
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), primary_key=True)
+    freq = db.Column(db.String(10), nullable=False)  # 'daily', 'weekly', 'monthly', 'yearly'
+    interval = db.Column(db.Integer, nullable=False, default=1)
+    by_weekday = db.Column(db.String(20))  # weekly: '0,3' = Monday and Thursday
+    by_month_day = db.Column(db.Integer)  # monthly: 1..31, -1 = last day of the month
+    until = db.Column(db.Date)
+    count = db.Column(db.Integer)  # occurrences including the order itself
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'order_id': self.order_id,
+            'freq': self.freq,
+            'interval': self.interval,
+            'by_weekday': [int(day) for day in self.by_weekday.split(',')] if self.by_weekday else None,
+            'by_month_day': self.by_month_day,
+            'until': self.until.isoformat() if self.until else None,
+            'count': self.count
+        }
+    
+    def __repr__(self):
+        return f'<RecurrenceRule order {self.order_id}: {self.freq}/{self.interval}>'
+
+
+class RecurrenceException(db.Model):
+    """One occurrence of a recurring order that is skipped, moved or turned into a real order"""
+    __tablename__ = 'recurrence_exceptions'
+    __table_args__ = (
+        db.UniqueConstraint('order_id', 'occurrence_date', name='uq_recurrence_exceptions_order_id_occurrence_date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    occurrence_date = db.Column(db.Date, nullable=False)  # the date the rule produces
+    action = db.Column(db.String(20), nullable=False)  # 'skip', 'move', 'materialized'
+    
+    # Moved occurrences
+    moved_date = db.Column(db.Date)
+    moved_time = db.Column(db.Time)
+    
+    # Materialized occurrences: the order created for it
+    materialized_order_id = db.Column(db.Integer, db.ForeignKey('orders.id'))
+    
+    note = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'occurrence_date': self.occurrence_date.isoformat(),
+            'action': self.action,
+            'moved_date': self.moved_date.isoformat() if self.moved_date else None,
+            'moved_time': self.moved_time.isoformat() if self.moved_time else None,
+            'materialized_order_id': self.materialized_order_id,
+            'note': self.note,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+    
+    def __repr__(self):
+        return f'<RecurrenceException order {self.order_id} {self.occurrence_date}: {self.action}>'
@@ -0,0 +1,23 @@
+from src.models.user import db
+
+class NumberSequence(db.Model):
+    """Last document number handed out per (document type, year); see src/services/numbering.py"""
+    __tablename__ = 'number_sequences'
+    # Clustered on the key: every allocation is a single primary-key upsert
+    __table_args__ = {'sqlite_with_rowid': False}
+    
+    # 'invoice', 'quote', 'order', 'customer'
+    document_type = db.Column(db.String(20), primary_key=True)
+    # 0 for sequences that do not restart every year
+    year = db.Column(db.Integer, primary_key=True)
+    last_value = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'document_type': self.document_type,
+            'year': self.year,
+            'last_value': self.last_value
+        }
+    
+    def __repr__(self):
+        return f'<NumberSequence {self.document_type}/{self.year}: {self.last_value}>'
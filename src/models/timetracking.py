@@ -4,6 +4,15 @@ from src.models.user import db
 
 class TimeEntry(db.Model):
     __tablename__ = 'time_entries'
+    __table_args__ = (
+        db.Index('ix_time_entries_user_id_status', 'user_id', 'status'),
+        db.Index('ix_time_entries_user_id_start_time', 'user_id', db.desc('start_time')),
+        db.Index('ix_time_entries_order_id_start_time', 'order_id', db.desc('start_time')),
+        db.Index('ix_time_entries_customer_id', 'customer_id'),
+        db.Index('ix_time_entries_status_start_time', 'status', 'start_time'),
+        db.Index('ix_time_entries_start_time', db.desc('start_time')),
+        db.Index('ix_time_entries_created_at', db.desc('created_at')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -29,6 +38,10 @@ class TimeEntry(db.Model):
     # User information
     user_name = db.Column(db.String(100))
     
+    # Relationships
+    customer = db.relationship('Customer', lazy=True)
+    order = db.relationship('Order', lazy=True)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -48,3 +61,39 @@ class TimeEntry(db.Model):
     
     def __repr__(self):
         return f'<TimeEntry {self.user_name}: {self.start_time} - {self.end_time}>'
+
+
+class TimeRollup(db.Model):
+    """Completed time per day, user, activity and order, kept by triggers (see src/services/rollups.py)"""
+    __tablename__ = 'time_rollups'
+    # Clustered on the key: reports read contiguous day ranges
+    __table_args__ = (
+        db.Index('ix_time_rollups_user_id_day', 'user_id', 'day'),
+        {'sqlite_with_rowid': False},
+    )
+    
+    day = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)
+    activity_type = db.Column(db.String(50), primary_key=True)
+    # 0 for time not booked on an order
+    order_id = db.Column(db.Integer, primary_key=True)
+    
+    # Name on the user's most recently counted entry
+    user_name = db.Column(db.String(100))
+    seconds = db.Column(db.Integer, nullable=False, default=0)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'user_id': self.user_id,
+            'user_name': self.user_name,
+            'activity_type': self.activity_type,
+            'order_id': self.order_id or None,
+            'seconds': self.seconds,
+            'hours': round(self.seconds / 3600, 2),
+            'entry_count': self.entry_count
+        }
+    
+    def __repr__(self):
+        return f'<TimeRollup {self.day} {self.user_id}/{self.activity_type}/{self.order_id}: {self.seconds}s>'
@@ -34,11 +34,16 @@ class User(db.Model):
         return f'<User {self.username}>'
 
 # Import all models to ensure they are registered with SQLAlchemy
-from .customer import Customer
+from .customer import Customer, CustomerSummary
 from .order import Order
 from .quote import Quote, QuoteItem
 from .communication import Communication
 from .invoice import Invoice, InvoiceItem
 from .quality import QualityCheck
 from .inventory import InventoryItem, InventoryTransaction
-from .timetracking import TimeEntry
+from .timetracking import TimeEntry, TimeRollup
+from .dashboard import DashboardCounter
+from .sequence import NumberSequence
+from .job import Job
+from .recurrence import RecurrenceRule, RecurrenceException
+from .event import OutboxEvent
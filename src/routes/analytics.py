@@ -0,0 +1,76 @@
+from flask import Blueprint, request, jsonify
+from src.services.analytics import (HOURS_PER_DAY, analytics_summary, quality_report, revenue_report,
+                                    utilization_report)
+from src.services.cache import cached
+from datetime import date
+
+analytics_bp = Blueprint('analytics', __name__)
+
+def report_period(args):
+    """date_from/date_to from the query string; by default the twelve months up to today"""
+    date_to = date.fromisoformat(args['date_to']) if args.get('date_to') else date.today()
+    if args.get('date_from'):
+        date_from = date.fromisoformat(args['date_from'])
+    else:
+        first_month = date_to.year * 12 + date_to.month - 12
+        date_from = date(first_month // 12, first_month % 12 + 1, 1)
+    if date_from > date_to:
+        raise ValueError('date_from must not be after date_to')
+    return date_from, date_to
+
+def rolling_window(args):
+    window = args.get('window', 3, type=int)
+    if window < 1:
+        raise ValueError('window must be at least 1 month')
+    return window
+
+def capacity_per_day(args):
+    hours_per_day = args.get('hours_per_day', HOURS_PER_DAY, type=float)
+    if hours_per_day <= 0:
+        raise ValueError('hours_per_day must be positive')
+    return hours_per_day
+
+@analytics_bp.route('/analytics/revenue', methods=['GET'])
+@cached(tags=('invoices',))
+def get_revenue_analytics():
+    """Get monthly revenue, totals per status and invoice size percentiles"""
+    try:
+        return jsonify(revenue_report(*report_period(request.args)))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/analytics/quality', methods=['GET'])
+@cached(tags=('quality_checks',))
+def get_quality_analytics():
+    """Get monthly and rolling quality scores, percentiles and averages per check type"""
+    try:
+        return jsonify(quality_report(*report_period(request.args), rolling_window(request.args)))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/analytics/utilization', methods=['GET'])
+@cached(tags=('time_entries', 'time_rollups'))
+def get_utilization_analytics():
+    """Get booked hours and utilization per employee"""
+    try:
+        return jsonify(utilization_report(*report_period(request.args), capacity_per_day(request.args)))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/analytics/summary', methods=['GET'])
+@cached(tags=('invoices', 'quality_checks', 'time_entries', 'time_rollups'))
+def get_analytics_summary():
+    """Get the revenue, quality and utilization reports in one response"""
+    try:
+        return jsonify(analytics_summary(*report_period(request.args), rolling_window(request.args),
+                                         capacity_per_day(request.args)))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -3,72 +3,86 @@ from src.models.customer import Customer
 from src.models.order import Order
 from src.models.communication import Communication
 from src.models.user import db
+from src.services.queries import customer_name_field, order_title_field, with_related
+from src.services.pagination import paginate_request
+from src.services.serialization import Spec, json_response
+from src.services.export import export_response
+from src.services.search import matching_ids
+from src.services.cache import cached
+from src.services.events import record_updated_rows
 from datetime import datetime
+from sqlalchemy import update
 import json
 
 communication_bp = Blueprint('communication', __name__)
 
+COMMUNICATION_LIST = Spec(Communication, [
+    Communication.id,
+    Communication.customer_id,
+    customer_name_field(Communication),
+    Communication.order_id,
+    order_title_field(Communication),
+    Communication.type,
+    Communication.direction,
+    Communication.subject,
+    Communication.content,
+    Communication.contact_person,
+    Communication.contact_method,
+    Communication.status,
+    Communication.follow_up_date,
+    Communication.tags,
+    Communication.is_important,
+    Communication.created_at,
+    Communication.updated_at
+], always=(Communication.id, Communication.created_at))
+
+def filter_communications(query, args):
+    """Apply the list filters shared by the communication list and export endpoints"""
+    type_filter = args.get('type', '')
+    status_filter = args.get('status', '')
+    customer_id = args.get('customer_id', type=int)
+    order_id = args.get('order_id', type=int)
+    
+    if type_filter:
+        query = query.filter(Communication.type == type_filter)
+    if status_filter:
+        query = query.filter(Communication.status == status_filter)
+    if customer_id:
+        query = query.filter(Communication.customer_id == customer_id)
+    if order_id:
+        query = query.filter(Communication.order_id == order_id)
+    
+    # ?search= goes through the full-text index (subject, content, tags)
+    matches = matching_ids('communications', args.get('search', ''))
+    if matches is not None:
+        query = query.filter(Communication.id.in_(matches))
+    return query
+
 @communication_bp.route('/communications', methods=['GET'])
 def get_communications():
     """Get all communications with optional filtering"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        type_filter = request.args.get('type', '')
-        status_filter = request.args.get('status', '')
-        customer_id = request.args.get('customer_id', type=int)
-        order_id = request.args.get('order_id', type=int)
-        
-        query = Communication.query
-        
-        if type_filter:
-            query = query.filter(Communication.type == type_filter)
-        if status_filter:
-            query = query.filter(Communication.status == status_filter)
-        if customer_id:
-            query = query.filter(Communication.customer_id == customer_id)
-        if order_id:
-            query = query.filter(Communication.order_id == order_id)
-            
+        fields = COMMUNICATION_LIST.requested(request.args)
+        query = filter_communications(COMMUNICATION_LIST.query(fields), request.args)
         query = query.order_by(Communication.created_at.desc())
         
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        rows, page_meta = paginate_request(query, Communication.created_at, Communication.id)
         
-        communications = []
-        for comm in pagination.items:
-            customer = Customer.query.get(comm.customer_id)
-            order = Order.query.get(comm.order_id) if comm.order_id else None
-            
-            comm_data = {
-                'id': comm.id,
-                'customer_id': comm.customer_id,
-                'customer_name': f"{customer.first_name} {customer.last_name}" if customer else "Unbekannt",
-                'order_id': comm.order_id,
-                'order_title': order.title if order else None,
-                'type': comm.type,
-                'direction': comm.direction,
-                'subject': comm.subject,
-                'content': comm.content,
-                'contact_person': comm.contact_person,
-                'contact_method': comm.contact_method,
-                'status': comm.status,
-                'follow_up_date': comm.follow_up_date.isoformat() if comm.follow_up_date else None,
-                'tags': comm.tags,
-                'is_important': comm.is_important,
-                'created_at': comm.created_at.isoformat(),
-                'updated_at': comm.updated_at.isoformat()
-            }
-            communications.append(comm_data)
-        
-        return jsonify({
-            'communications': communications,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
+        return json_response({
+            'communications': COMMUNICATION_LIST.dicts(rows, fields),
+            **page_meta
         })
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@communication_bp.route('/communications/export', methods=['GET'])
+def export_communications():
+    """Stream all (filtered) communications as NDJSON or CSV"""
+    try:
+        return export_response(filter_communications(Communication.query, request.args), Communication, 'communications')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -221,6 +235,11 @@ def update_communication_status(communication_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+# Columns a bulk update may touch
+BULK_UPDATABLE_FIELDS = {
+    column.name for column in Communication.__table__.columns
+} - {'id', 'created_at', 'updated_at'}
+
 @communication_bp.route('/communications/bulk', methods=['POST'])
 def bulk_update_communications():
     """Bulk update communications (e.g., mark multiple as read)"""
@@ -232,25 +251,37 @@ def bulk_update_communications():
         if not communication_ids:
             return jsonify({'error': 'No communication IDs provided'}), 400
         
-        communications = Communication.query.filter(Communication.id.in_(communication_ids)).all()
-        
-        for communication in communications:
-            for field, value in updates.items():
-                if hasattr(communication, field):
-                    if field == 'follow_up_date' and value:
-                        try:
-                            setattr(communication, field, datetime.fromisoformat(value))
-                        except ValueError:
-                            pass
-                    else:
-                        setattr(communication, field, value)
-            
-            communication.updated_at = datetime.utcnow()
+        unknown = sorted(set(updates) - BULK_UPDATABLE_FIELDS)
+        if unknown:
+            return jsonify({'error': f"Unknown field(s): {', '.join(unknown)}"}), 400
         
+        values = dict(updates)
+        if values.get('follow_up_date'):
+            try:
+                values['follow_up_date'] = datetime.fromisoformat(values['follow_up_date'])
+            except ValueError:
+                return jsonify({'error': 'Invalid follow_up_date'}), 400
+        values['updated_at'] = datetime.utcnow()
+        
+        # One SELECT for the per-id result and one UPDATE for the whole set
+        customer_ids = dict(db.session.query(Communication.id, Communication.customer_id)
+                            .filter(Communication.id.in_(communication_ids)))
+        found_ids = list(customer_ids)
+        if found_ids:
+            db.session.execute(
+                update(Communication).where(Communication.id.in_(found_ids)).values(**values)
+            )
+            record_updated_rows(db.session, Communication, customer_ids, values)
         db.session.commit()
         
+        found = set(found_ids)
         return jsonify({
-            'message': f'Updated {len(communications)} communications successfully'
+            'message': f'Updated {len(found_ids)} communications successfully',
+            'updated': len(found_ids),
+            'results': [
+                {'id': communication_id, 'status': 'updated' if communication_id in found else 'not_found'}
+                for communication_id in communication_ids
+            ]
         })
         
     except Exception as e:
@@ -258,6 +289,7 @@ def bulk_update_communications():
         return jsonify({'error': str(e)}), 500
 
 @communication_bp.route('/communications/statistics', methods=['GET'])
+@cached(tags=('communications', 'customers', 'orders'))
 def get_communication_statistics():
     """Get communication statistics"""
     try:
@@ -280,13 +312,13 @@ def get_communication_statistics():
         ).group_by(Communication.direction).all()
         
         # Recent communications
-        recent_communications = Communication.query.order_by(
+        recent_communications = with_related(Communication.query, Communication).order_by(
             Communication.created_at.desc()
         ).limit(5).all()
         
         recent_data = []
         for comm in recent_communications:
-            customer = Customer.query.get(comm.customer_id)
+            customer = comm.customer
             recent_data.append({
                 'id': comm.id,
                 'type': comm.type,
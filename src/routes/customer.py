@@ -1,15 +1,91 @@
 from flask import Blueprint, request, jsonify
 from ..models.customer import Customer
 from ..models.user import db
-import uuid
+from ..services.pagination import keyset_requested, paginate_request
+from ..services.export import export_response
+from ..services.bulk import bulk_create, bulk_records, require
+from ..services.numbering import next_number
+from ..services.search import matching_ids, rank_by_match
+from ..services.queries import display_name
+from ..services.serialization import Field, Spec, json_response
 
 customer_bp = Blueprint('customer', __name__)
 
+# The keys of Customer.to_dict(), read straight from the rows
+CUSTOMER_LIST = Spec(Customer, [
+    Customer.id,
+    Customer.customer_number,
+    Customer.company_name,
+    Customer.first_name,
+    Customer.last_name,
+    Customer.email,
+    Customer.phone,
+    Customer.mobile,
+    Customer.street,
+    Customer.house_number,
+    Customer.postal_code,
+    Customer.city,
+    Customer.customer_type,
+    Customer.preferred_contact_method,
+    Customer.created_at,
+    Customer.updated_at,
+    Customer.is_active
+], always=(Customer.id, Customer.created_at), views={
+    'picker': ('id', 'customer_number', 'first_name', 'last_name', 'company_name'),
+    'list': ('id', 'customer_number', 'first_name', 'last_name', 'company_name', 'customer_type', 'email',
+             'phone', 'street', 'house_number', 'postal_code', 'city')
+})
+
+# Type-ahead pickers only need to tell customers apart
+CUSTOMER_LOOKUP = Spec(Customer, [
+    Customer.id,
+    Customer.customer_number,
+    Field('display_name', Customer.first_name, Customer.last_name, Customer.company_name, convert=display_name)
+])
+LOOKUP_LIMIT = 20
+MAX_LOOKUP_LIMIT = 100
+
+def filter_customers(query, args):
+    query = query.filter_by(is_active=True)
+    # ?search= goes through the full-text index (names, company, email, city)
+    matches = matching_ids('customers', args.get('search', ''))
+    if matches is not None:
+        query = query.filter(Customer.id.in_(matches))
+    return query
+
 @customer_bp.route('/customers', methods=['GET'])
 def get_customers():
     try:
-        customers = Customer.query.filter_by(is_active=True).all()
-        return jsonify([customer.to_dict() for customer in customers]), 200
+        fields = CUSTOMER_LIST.requested(request.args)
+        query = filter_customers(CUSTOMER_LIST.query(fields), request.args)
+        
+        # Opt-in cursor mode (?after=&limit=) returns a page envelope instead of the full list
+        if keyset_requested():
+            rows, page_meta = paginate_request(query, Customer.created_at, Customer.id)
+            return json_response({'customers': CUSTOMER_LIST.dicts(rows, fields), **page_meta})
+        
+        return json_response(CUSTOMER_LIST.dicts(query.all(), fields))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@customer_bp.route('/customers/lookup', methods=['GET'])
+def lookup_customers():
+    """Best matches for ?q= as id, number and display name (newest customers without ?q=)"""
+    try:
+        limit = min(max(request.args.get('limit', LOOKUP_LIMIT, type=int) or LOOKUP_LIMIT, 1), MAX_LOOKUP_LIMIT)
+        query = CUSTOMER_LOOKUP.query().filter_by(is_active=True)
+        ranked = rank_by_match(query, 'customers', Customer.id, request.args.get('q', ''))
+        query = ranked if ranked is not None else query.order_by(Customer.created_at.desc())
+        return json_response({'customers': CUSTOMER_LOOKUP.dicts(query.limit(limit).all())})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@customer_bp.route('/customers/export', methods=['GET'])
+def export_customers():
+    try:
+        return export_response(filter_customers(Customer.query, request.args), Customer, 'customers')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -26,8 +102,8 @@ def create_customer():
     try:
         data = request.get_json()
         
-        # Generate unique customer number
-        customer_number = f"K-{uuid.uuid4().hex[:8].upper()}"
+        # Allocate the next customer number
+        customer_number = next_number('customer')
         
         customer = Customer(
             customer_number=customer_number,
@@ -53,6 +129,38 @@ def create_customer():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def customer_row(data):
+    require(data, 'first_name', 'last_name', 'email')
+    return {
+        'company_name': data.get('company_name'),
+        'first_name': data['first_name'],
+        'last_name': data['last_name'],
+        'email': data['email'],
+        'phone': data.get('phone'),
+        'mobile': data.get('mobile'),
+        'street': data.get('street'),
+        'house_number': data.get('house_number'),
+        'postal_code': data.get('postal_code'),
+        'city': data.get('city'),
+        'customer_type': data.get('customer_type', 'private'),
+        'preferred_contact_method': data.get('preferred_contact_method', 'email'),
+        'is_active': True
+    }
+
+@customer_bp.route('/customers/bulk', methods=['POST'])
+def bulk_create_customers():
+    try:
+        records = bulk_records(request.get_json())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        body, status = bulk_create(Customer, records, customer_row,
+                                   numbered=('customer_number', 'customer'))
+        return jsonify(body), status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @customer_bp.route('/customers/<int:customer_id>', methods=['PUT'])
 def update_customer(customer_id):
     try:
@@ -0,0 +1,49 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from src.services.events import ENTITY_NAMES, broker, id_range, stream_events
+
+events_bp = Blueprint('events', __name__)
+
+def event_filters(args, headers):
+    """Entities, customer and resume position of an /api/events request"""
+    entities = [name.strip() for name in args.get('entity', '').split(',') if name.strip()]
+    unknown = sorted(set(entities) - ENTITY_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown entity: {', '.join(unknown)} (expected {', '.join(sorted(ENTITY_NAMES))})")
+
+    customer_id = args.get('customer_id')
+    if customer_id is not None and not customer_id.isdigit():
+        raise ValueError('customer_id must be a number')
+
+    # Browsers send the header when they reconnect; the parameter serves the first connect
+    last_event_id = headers.get('Last-Event-ID') or args.get('last_event_id')
+    if last_event_id is not None and not last_event_id.isdigit():
+        raise ValueError('Last-Event-ID must be a number')
+
+    return (entities or None,
+            int(customer_id) if customer_id is not None else None,
+            int(last_event_id) if last_event_id is not None else None)
+
+@events_bp.route('/events', methods=['GET'])
+def get_events():
+    """Server-Sent Events stream of committed changes (?entity=order,invoice&customer_id=3)"""
+    try:
+        try:
+            entities, customer_id, last_event_id = event_filters(request.args, request.headers)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        oldest = id_range()[0]
+        reset = last_event_id is not None and oldest is not None and last_event_id < oldest - 1
+        try:
+            subscription = broker.subscribe(None if reset else last_event_id, entities, customer_id)
+        except OverflowError as e:
+            return jsonify({'error': str(e)}), 503
+
+        return Response(
+            stream_with_context(stream_events(subscription, reset)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
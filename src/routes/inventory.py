@@ -1,64 +1,93 @@
 from flask import Blueprint, request, jsonify
 from src.models.inventory import InventoryItem, InventoryTransaction
 from src.models.user import db
+from src.services.queries import with_related
+from src.services.pagination import paginate_request
+from src.services.serialization import Field, Spec, json_response
+from src.services.export import export_response
+from src.services.bulk import bulk_create, bulk_records, require
+from src.services.cache import cached
+from sqlalchemy import select
 from datetime import datetime
 import json
 
 inventory_bp = Blueprint('inventory', __name__)
 
+INVENTORY_LIST = Spec(InventoryItem, [
+    InventoryItem.id,
+    InventoryItem.name,
+    InventoryItem.description,
+    InventoryItem.category,
+    InventoryItem.sku,
+    InventoryItem.quantity,
+    InventoryItem.unit,
+    InventoryItem.unit_price,
+    InventoryItem.reorder_point,
+    InventoryItem.supplier,
+    InventoryItem.location,
+    InventoryItem.status,
+    InventoryItem.last_updated,
+    InventoryItem.created_at,
+    InventoryItem.updated_at
+], always=(InventoryItem.id, InventoryItem.name), views={
+    'picker': ('id', 'name', 'sku', 'unit', 'quantity')
+})
+
+def item_name(name):
+    return name if name is not None else 'Unbekannt'
+
+ITEM_NAME = select(InventoryItem.name).where(InventoryItem.id == InventoryTransaction.item_id).scalar_subquery()
+
+TRANSACTION_LIST = Spec(InventoryTransaction, [
+    InventoryTransaction.id,
+    InventoryTransaction.item_id,
+    Field('item_name', ITEM_NAME.label('item_name'), convert=item_name),
+    InventoryTransaction.transaction_type,
+    InventoryTransaction.quantity,
+    InventoryTransaction.transaction_date,
+    InventoryTransaction.notes,
+    InventoryTransaction.user_id
+], always=(InventoryTransaction.id, InventoryTransaction.transaction_date))
+
+def filter_inventory(query, args):
+    """Apply the list filters shared by the inventory list and export endpoints"""
+    category = args.get('category', '')
+    status = args.get('status', '')
+    low_stock = args.get('low_stock', type=bool)
+    
+    if category:
+        query = query.filter(InventoryItem.category == category)
+    if status:
+        query = query.filter(InventoryItem.status == status)
+    if low_stock:
+        query = query.filter(InventoryItem.quantity <= InventoryItem.reorder_point)
+    return query
+
 @inventory_bp.route('/inventory', methods=['GET'])
 def get_inventory():
     """Get all inventory items with optional filtering"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        category = request.args.get('category', '')
-        status = request.args.get('status', '')
-        low_stock = request.args.get('low_stock', type=bool)
-        
-        query = InventoryItem.query
-        
-        if category:
-            query = query.filter(InventoryItem.category == category)
-        if status:
-            query = query.filter(InventoryItem.status == status)
-        if low_stock:
-            query = query.filter(InventoryItem.quantity <= InventoryItem.reorder_point)
-            
+        fields = INVENTORY_LIST.requested(request.args)
+        query = filter_inventory(INVENTORY_LIST.query(fields), request.args)
         query = query.order_by(InventoryItem.name.asc())
         
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        inventory_items = []
-        for item in pagination.items:
-            item_data = {
-                'id': item.id,
-                'name': item.name,
-                'description': item.description,
-                'category': item.category,
-                'sku': item.sku,
-                'quantity': item.quantity,
-                'unit': item.unit,
-                'unit_price': item.unit_price,
-                'reorder_point': item.reorder_point,
-                'supplier': item.supplier,
-                'location': item.location,
-                'status': item.status,
-                'last_updated': item.last_updated.isoformat() if item.last_updated else None,
-                'created_at': item.created_at.isoformat(),
-                'updated_at': item.updated_at.isoformat()
-            }
-            inventory_items.append(item_data)
+        rows, page_meta = paginate_request(query, InventoryItem.name, InventoryItem.id, descending=False)
         
-        return jsonify({
-            'inventory_items': inventory_items,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
+        return json_response({
+            'inventory_items': INVENTORY_LIST.dicts(rows, fields),
+            **page_meta
         })
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@inventory_bp.route('/inventory/export', methods=['GET'])
+def export_inventory():
+    """Stream all (filtered) inventory items as NDJSON or CSV"""
+    try:
+        return export_response(filter_inventory(InventoryItem.query, request.args), InventoryItem, 'inventory')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -142,6 +171,54 @@ def create_inventory_item():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def inventory_item_row(data):
+    """Column values for a new inventory item"""
+    require(data, 'name', 'category')
+    return {
+        'name': data['name'],
+        'description': data.get('description', ''),
+        'category': data['category'],
+        'sku': data.get('sku') or None,
+        'quantity': int(data.get('quantity', 0)),
+        'unit': data.get('unit', 'Stück'),
+        'unit_price': float(data.get('unit_price', 0.0)),
+        'reorder_point': int(data.get('reorder_point', 0)),
+        'supplier': data.get('supplier', ''),
+        'location': data.get('location', ''),
+        'status': data.get('status', 'active')
+    }
+
+def check_inventory_skus(rows):
+    """SKUs must be unique within the batch and against existing items"""
+    skus = [row['sku'] for row in rows if row and row['sku']]
+    existing = {sku for (sku,) in
+                db.session.query(InventoryItem.sku).filter(InventoryItem.sku.in_(set(skus)))}
+    errors = {}
+    seen = set()
+    for index, row in enumerate(rows):
+        if not row or not row['sku']:
+            continue
+        if row['sku'] in existing:
+            errors[index] = f"SKU {row['sku']} already exists"
+        elif row['sku'] in seen:
+            errors[index] = f"SKU {row['sku']} is used more than once in this batch"
+        seen.add(row['sku'])
+    return errors
+
+@inventory_bp.route('/inventory/bulk', methods=['POST'])
+def bulk_create_inventory_items():
+    """Create many inventory items in one transaction"""
+    try:
+        records = bulk_records(request.get_json())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        body, status = bulk_create(InventoryItem, records, inventory_item_row, check_inventory_skus)
+        return jsonify(body), status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @inventory_bp.route('/inventory/<int:item_id>', methods=['PUT'])
 def update_inventory_item(item_id):
     """Update an existing inventory item"""
@@ -249,12 +326,11 @@ def adjust_inventory_quantity(item_id):
 def get_inventory_transactions():
     """Get inventory transactions"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         item_id = request.args.get('item_id', type=int)
         transaction_type = request.args.get('transaction_type', '')
         
-        query = InventoryTransaction.query
+        fields = TRANSACTION_LIST.requested(request.args)
+        query = TRANSACTION_LIST.query(fields)
         
         if item_id:
             query = query.filter(InventoryTransaction.item_id == item_id)
@@ -263,36 +339,20 @@ def get_inventory_transactions():
             
         query = query.order_by(InventoryTransaction.transaction_date.desc())
         
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        rows, page_meta = paginate_request(query, InventoryTransaction.transaction_date, InventoryTransaction.id)
         
-        transactions = []
-        for trans in pagination.items:
-            item = InventoryItem.query.get(trans.item_id)
-            trans_data = {
-                'id': trans.id,
-                'item_id': trans.item_id,
-                'item_name': item.name if item else 'Unbekannt',
-                'transaction_type': trans.transaction_type,
-                'quantity': trans.quantity,
-                'transaction_date': trans.transaction_date.isoformat(),
-                'notes': trans.notes,
-                'user_id': trans.user_id
-            }
-            transactions.append(trans_data)
-        
-        return jsonify({
-            'transactions': transactions,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
+        return json_response({
+            'transactions': TRANSACTION_LIST.dicts(rows, fields),
+            **page_meta
         })
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @inventory_bp.route('/inventory/statistics', methods=['GET'])
+@cached(tags=('inventory_items', 'inventory_transactions'))
 def get_inventory_statistics():
     """Get inventory statistics"""
     try:
@@ -316,13 +376,13 @@ def get_inventory_statistics():
         ).scalar() or 0
         
         # Recent transactions
-        recent_transactions = InventoryTransaction.query.order_by(
+        recent_transactions = with_related(InventoryTransaction.query, InventoryTransaction).order_by(
             InventoryTransaction.transaction_date.desc()
         ).limit(5).all()
         
         recent_data = []
         for trans in recent_transactions:
-            item = InventoryItem.query.get(trans.item_id)
+            item = trans.item
             recent_data.append({
                 'id': trans.id,
                 'item_name': item.name if item else 'Unbekannt',
@@ -343,6 +403,7 @@ def get_inventory_statistics():
         return jsonify({'error': str(e)}), 500
 
 @inventory_bp.route('/inventory/categories', methods=['GET'])
+@cached(ttl=3600)
 def get_inventory_categories():
     """Get available inventory categories"""
     try:
@@ -3,63 +3,77 @@ from src.models.customer import Customer
 from src.models.order import Order
 from src.models.invoice import Invoice, InvoiceItem
 from src.models.user import db
+from src.services.queries import customer_name_field
+from src.services.pagination import paginate_request
+from src.services.serialization import Spec, json_response
+from src.services.export import export_response
+from src.services.numbering import next_number
+from src.services.cache import cached
+from src.services.pdf import invoice_document, pdf_response
+from src.services.jobs import enqueue
+from src.routes.jobs import accepted
 from datetime import datetime
 import json
 
 invoice_bp = Blueprint('invoice', __name__)
 
+INVOICE_LIST = Spec(Invoice, [
+    Invoice.id,
+    Invoice.invoice_number,
+    Invoice.customer_id,
+    customer_name_field(Invoice),
+    Invoice.order_id,
+    Invoice.invoice_date,
+    Invoice.due_date,
+    Invoice.subtotal,
+    Invoice.tax_rate,
+    Invoice.tax_amount,
+    Invoice.total_amount,
+    Invoice.status,
+    Invoice.payment_method,
+    Invoice.notes,
+    Invoice.created_at,
+    Invoice.updated_at
+], always=(Invoice.id, Invoice.created_at), views={
+    'picker': ('id', 'invoice_number', 'customer_name', 'total_amount', 'status')
+})
+
+def filter_invoices(query, args):
+    """Apply the list filters shared by the invoice list and export endpoints"""
+    status = args.get('status', '')
+    customer_id = args.get('customer_id', type=int)
+    
+    if status:
+        query = query.filter(Invoice.status == status)
+    if customer_id:
+        query = query.filter(Invoice.customer_id == customer_id)
+    return query
+
 @invoice_bp.route('/invoices', methods=['GET'])
 def get_invoices():
     """Get all invoices with optional filtering"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        status = request.args.get('status', '')
-        customer_id = request.args.get('customer_id', type=int)
-        
-        query = Invoice.query
-        
-        if status:
-            query = query.filter(Invoice.status == status)
-        if customer_id:
-            query = query.filter(Invoice.customer_id == customer_id)
-            
+        fields = INVOICE_LIST.requested(request.args)
+        query = filter_invoices(INVOICE_LIST.query(fields), request.args)
         query = query.order_by(Invoice.created_at.desc())
         
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        rows, page_meta = paginate_request(query, Invoice.created_at, Invoice.id)
         
-        invoices = []
-        for invoice in pagination.items:
-            customer = Customer.query.get(invoice.customer_id)
-            invoice_data = {
-                'id': invoice.id,
-                'invoice_number': invoice.invoice_number,
-                'customer_id': invoice.customer_id,
-                'customer_name': f"{customer.first_name} {customer.last_name}" if customer else "Unbekannt",
-                'order_id': invoice.order_id,
-                'invoice_date': invoice.invoice_date.isoformat() if invoice.invoice_date else None,
-                'due_date': invoice.due_date.isoformat() if invoice.due_date else None,
-                'subtotal': invoice.subtotal,
-                'tax_rate': invoice.tax_rate,
-                'tax_amount': invoice.tax_amount,
-                'total_amount': invoice.total_amount,
-                'status': invoice.status,
-                'payment_method': invoice.payment_method,
-                'notes': invoice.notes,
-                'created_at': invoice.created_at.isoformat(),
-                'updated_at': invoice.updated_at.isoformat()
-            }
-            invoices.append(invoice_data)
-        
-        return jsonify({
-            'invoices': invoices,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
+        return json_response({
+            'invoices': INVOICE_LIST.dicts(rows, fields),
+            **page_meta
         })
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@invoice_bp.route('/invoices/export', methods=['GET'])
+def export_invoices():
+    """Stream all (filtered) invoices as NDJSON or CSV"""
+    try:
+        return export_response(filter_invoices(Invoice.query, request.args), Invoice, 'invoices')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -111,21 +125,33 @@ def get_invoice(invoice_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@invoice_bp.route('/invoices/<int:invoice_id>/pdf', methods=['GET'])
+def get_invoice_pdf(invoice_id):
+    """Download an invoice as PDF"""
+    try:
+        invoice = Invoice.query.get_or_404(invoice_id)
+        return pdf_response(invoice_document(invoice), as_attachment=request.args.get('download') == '1')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @invoice_bp.route('/invoices', methods=['POST'])
 def create_invoice():
     """Create a new invoice"""
     try:
         data = request.get_json()
         
-        # Generate invoice number
-        invoice_number = f"INV-{datetime.now().strftime('%Y%m%d')}-{Invoice.query.count() + 1:04d}"
+        invoice_date = datetime.fromisoformat(data['invoice_date']) if data.get('invoice_date') else datetime.now()
+        
+        # Allocate the next gap-free invoice number of the invoice year; a rollback returns it
+        invoice_number = next_number('invoice', invoice_date)
         
         # Create invoice
         invoice = Invoice(
             invoice_number=invoice_number,
             customer_id=data['customer_id'],
             order_id=data.get('order_id'),
-            invoice_date=datetime.fromisoformat(data['invoice_date']) if data.get('invoice_date') else datetime.now(),
+            invoice_date=invoice_date,
             due_date=datetime.fromisoformat(data['due_date']) if data.get('due_date') else None,
             tax_rate=data.get('tax_rate', 19.0),
             payment_method=data.get('payment_method', 'bank_transfer'),
@@ -147,10 +173,7 @@ def create_invoice():
                 )
                 db.session.add(item)
         
-        db.session.commit()
-        
-        # Calculate totals
-        invoice.calculate_totals()
+        # Totals are maintained by the invoice_items triggers
         db.session.commit()
         
         return jsonify({
@@ -203,10 +226,6 @@ def update_invoice(invoice_id):
         
         db.session.commit()
         
-        # Recalculate totals
-        invoice.calculate_totals()
-        db.session.commit()
-        
         return jsonify({'message': 'Invoice updated successfully'})
         
     except Exception as e:
@@ -265,12 +284,12 @@ def send_invoice(invoice_id):
             invoice.status = 'sent'
             invoice.sent_at = datetime.utcnow()
             invoice.updated_at = datetime.utcnow()
+            # Rendering and emailing the PDF happen in the job worker; one job per send
+            job_id = enqueue('send_invoice', {'invoice_id': invoice.id},
+                             idempotency_key=f'send_invoice:{invoice.id}:{invoice.sent_at.isoformat()}')
             db.session.commit()
             
-            # Here you would typically send the invoice via email
-            # For now, we just update the status
-            
-            return jsonify({'message': 'Invoice sent successfully'})
+            return accepted(job_id, message='Invoice sent successfully')
         else:
             return jsonify({'error': 'Invoice is not in draft status'}), 400
         
@@ -279,6 +298,7 @@ def send_invoice(invoice_id):
         return jsonify({'error': str(e)}), 500
 
 @invoice_bp.route('/invoices/statistics', methods=['GET'])
+@cached(tags=('invoices', 'invoice_items'))
 def get_invoice_statistics():
     """Get invoice statistics"""
     try:
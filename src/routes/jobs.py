@@ -0,0 +1,46 @@
+from flask import Blueprint, request, jsonify, url_for
+from src.models.job import Job
+from src.models.user import db
+from src.services.jobs import TASKS, enqueue
+
+jobs_bp = Blueprint('jobs', __name__)
+
+def accepted(job_id, **fields):
+    """202 response pointing at the status endpoint of a queued job"""
+    return jsonify({
+        **fields,
+        'job_id': job_id,
+        'status_url': url_for('jobs.get_job', job_id=job_id)
+    }), 202
+
+@jobs_bp.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue a background job; an Idempotency-Key header makes retries safe"""
+    try:
+        data = request.get_json() or {}
+        
+        if data.get('task') not in TASKS:
+            return jsonify({'error': f"Unknown task, expected one of: {', '.join(sorted(TASKS))}"}), 400
+        
+        job_id = enqueue(data['task'], data.get('payload'),
+                         idempotency_key=request.headers.get('Idempotency-Key') or data.get('idempotency_key'),
+                         lane=data.get('lane'))
+        db.session.commit()
+        return accepted(job_id)
+        
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@jobs_bp.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status (and, once finished, the result) of a background job"""
+    try:
+        job = Job.query.get_or_404(job_id)
+        return jsonify(job.to_dict())
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,16 +1,84 @@
 from flask import Blueprint, request, jsonify
 from ..models.order import Order, Service
 from ..models.user import db
-from datetime import datetime
-import uuid
+from ..services.pagination import keyset_requested, paginate_request
+from ..services.counters import read_dashboard_counts
+from ..models.customer import Customer
+from ..services.export import export_response
+from ..services.bulk import bulk_create, bulk_records, require
+from ..services.numbering import next_number
+from ..services.search import matching_ids
+from ..services.serialization import Spec, json_response
+from ..services.cache import cached
+from ..models.recurrence import RecurrenceRule, RecurrenceException
+from ..services.recurrence import INTERVAL_RULES, Recurrence, calendar, check_occurrence, materialize, rule_for
+from datetime import date, datetime
 
 order_bp = Blueprint('order', __name__)
 
+# The keys of Order.to_dict(), read straight from the rows
+ORDER_LIST = Spec(Order, [
+    Order.id,
+    Order.order_number,
+    Order.customer_id,
+    Order.title,
+    Order.description,
+    Order.service_type,
+    Order.service_street,
+    Order.service_house_number,
+    Order.service_postal_code,
+    Order.service_city,
+    Order.scheduled_date,
+    Order.scheduled_time,
+    Order.estimated_duration,
+    Order.status,
+    Order.priority,
+    Order.estimated_price,
+    Order.final_price,
+    Order.is_recurring,
+    Order.recurring_interval,
+    Order.created_at,
+    Order.updated_at,
+    Order.completed_at,
+    Order.special_instructions,
+    Order.access_instructions
+], always=(Order.id, Order.created_at), views={
+    'picker': ('id', 'order_number', 'title', 'customer_id'),
+    # The order table, without the long free-text columns
+    'list': ('id', 'order_number', 'customer_id', 'title', 'service_type', 'service_street',
+             'service_house_number', 'service_postal_code', 'service_city', 'scheduled_date', 'scheduled_time',
+             'estimated_duration', 'status', 'priority', 'estimated_price', 'final_price', 'is_recurring',
+             'created_at')
+})
+
+def filter_orders(query, args):
+    # ?search= goes through the full-text index (title, description, instructions)
+    matches = matching_ids('orders', args.get('search', ''))
+    if matches is not None:
+        query = query.filter(Order.id.in_(matches))
+    return query
+
 @order_bp.route('/orders', methods=['GET'])
 def get_orders():
     try:
-        orders = Order.query.all()
-        return jsonify([order.to_dict() for order in orders]), 200
+        fields = ORDER_LIST.requested(request.args)
+        query = filter_orders(ORDER_LIST.query(fields), request.args)
+        
+        # Opt-in cursor mode (?after=&limit=) returns a page envelope instead of the full list
+        if keyset_requested():
+            rows, page_meta = paginate_request(query, Order.created_at, Order.id)
+            return json_response({'orders': ORDER_LIST.dicts(rows, fields), **page_meta})
+        
+        return json_response(ORDER_LIST.dicts(query.all(), fields))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@order_bp.route('/orders/export', methods=['GET'])
+def export_orders():
+    try:
+        return export_response(filter_orders(Order.query, request.args), Order, 'orders')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -27,8 +95,8 @@ def create_order():
     try:
         data = request.get_json()
         
-        # Generate unique order number
-        order_number = f"AU-{datetime.now().strftime('%Y-%m')}-{uuid.uuid4().hex[:4].upper()}"
+        # Allocate the next order number
+        order_number = next_number('order')
         
         order = Order(
             order_number=order_number,
@@ -61,6 +129,55 @@ def create_order():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def order_row(data):
+    require(data, 'customer_id', 'title', 'service_type')
+    return {
+        'customer_id': int(data['customer_id']),
+        'title': data['title'],
+        'description': data.get('description'),
+        'service_type': data['service_type'],
+        'service_street': data.get('service_street'),
+        'service_house_number': data.get('service_house_number'),
+        'service_postal_code': data.get('service_postal_code'),
+        'service_city': data.get('service_city'),
+        'scheduled_date': datetime.strptime(data.get('scheduled_date'), '%Y-%m-%d').date() if data.get('scheduled_date') else None,
+        'scheduled_time': datetime.strptime(data.get('scheduled_time'), '%H:%M').time() if data.get('scheduled_time') else None,
+        'estimated_duration': data.get('estimated_duration'),
+        'status': data.get('status', 'pending'),
+        'priority': data.get('priority', 'normal'),
+        'estimated_price': data.get('estimated_price'),
+        'final_price': data.get('final_price'),
+        'is_recurring': data.get('is_recurring', False),
+        'recurring_interval': data.get('recurring_interval'),
+        'special_instructions': data.get('special_instructions'),
+        'access_instructions': data.get('access_instructions')
+    }
+
+def check_order_customers(rows):
+    # One IN query for the whole batch instead of a lookup per order
+    customer_ids = {row['customer_id'] for row in rows if row}
+    existing = {customer_id for (customer_id,) in
+                db.session.query(Customer.id).filter(Customer.id.in_(customer_ids))}
+    return {
+        index: f"Customer {row['customer_id']} not found"
+        for index, row in enumerate(rows)
+        if row and row['customer_id'] not in existing
+    }
+
+@order_bp.route('/orders/bulk', methods=['POST'])
+def bulk_create_orders():
+    try:
+        records = bulk_records(request.get_json())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        body, status = bulk_create(Order, records, order_row, check_order_customers,
+                                   numbered=('order_number', 'order'))
+        return jsonify(body), status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @order_bp.route('/orders/<int:order_id>', methods=['PUT'])
 def update_order(order_id):
     try:
@@ -94,41 +211,179 @@ def delete_order(order_id):
         return jsonify({'error': str(e)}), 500
 
 @order_bp.route('/orders/dashboard', methods=['GET'])
+# Short TTL: the payload also depends on today's date
+@cached(tags=('dashboard_counters',), ttl=60)
 def get_dashboard_data():
     try:
-        from ..models.customer import Customer
+        # Served from the materialized counters instead of seven COUNT queries
+        return jsonify(read_dashboard_counts(datetime.now().date())), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@order_bp.route('/orders/calendar', methods=['GET'])
+def get_order_calendar():
+    try:
+        # Real orders of the window plus the not yet materialized occurrences of recurring ones
+        date_from = date.fromisoformat(request.args['date_from'])
+        date_to = date.fromisoformat(request.args['date_to'])
+        customer_id = request.args.get('customer_id', type=int)
+        entries = calendar(date_from, date_to, customer_id)
+        return jsonify({
+            'orders': entries,
+            'period': {'from': date_from.isoformat(), 'to': date_to.isoformat()}
+        }), 200
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': f'date_from and date_to (YYYY-MM-DD) are required: {e}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def recurrence_from(data, start):
+    """Validated Recurrence for a rule payload; raises ValueError"""
+    return Recurrence(
+        start,
+        data.get('freq'),
+        data.get('interval', 1),
+        data.get('by_weekday'),
+        data.get('by_month_day'),
+        date.fromisoformat(data['until']) if data.get('until') else None,
+        data.get('count')
+    )
+
+@order_bp.route('/orders/<int:order_id>/recurrence', methods=['GET'])
+def get_order_recurrence(order_id):
+    try:
+        order = Order.query.get_or_404(order_id)
+        rule = db.session.get(RecurrenceRule, order_id)
+        recurrence = rule_for(order, rule)
+        if recurrence is None:
+            return jsonify({'error': 'Order does not recur'}), 404
         
-        # Get order counts by status
-        order_counts = {
-            'pending': Order.query.filter_by(status='pending').count(),
-            'confirmed': Order.query.filter_by(status='confirmed').count(),
-            'in_progress': Order.query.filter_by(status='in_progress').count(),
-            'completed': Order.query.filter_by(status='completed').count()
-        }
+        after = date.fromisoformat(request.args['after']) if request.args.get('after') else date.today()
+        limit = min(request.args.get('limit', 10, type=int), 100)
+        upcoming = []
+        for day in recurrence.between(after, date.max):
+            if len(upcoming) == limit:
+                break
+            upcoming.append(day.isoformat())
         
-        # Get today's orders
-        today = datetime.now().date()
-        todays_orders = Order.query.filter(
-            Order.scheduled_date == today
-        ).count()
+        exceptions = RecurrenceException.query.filter_by(order_id=order_id).order_by(
+            RecurrenceException.occurrence_date
+        ).all()
+        return jsonify({
+            'rule': rule.to_dict() if rule else {'order_id': order_id, 'recurring_interval': order.recurring_interval},
+            'upcoming': upcoming,
+            'exceptions': [exception.to_dict() for exception in exceptions]
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@order_bp.route('/orders/<int:order_id>/recurrence', methods=['PUT'])
+def update_order_recurrence(order_id):
+    try:
+        order = Order.query.get_or_404(order_id)
+        data = request.get_json()
+        if order.scheduled_date is None:
+            return jsonify({'error': 'A recurring order needs a scheduled_date'}), 400
+        try:
+            recurrence_from(data, order.scheduled_date)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Get this week's orders
-        from datetime import timedelta
-        week_start = today - timedelta(days=today.weekday())
-        week_end = week_start + timedelta(days=6)
-        this_week_orders = Order.query.filter(
-            Order.scheduled_date >= week_start,
-            Order.scheduled_date <= week_end
-        ).count()
+        rule = db.session.get(RecurrenceRule, order_id) or RecurrenceRule(order_id=order_id)
+        rule.freq = data['freq']
+        rule.interval = data.get('interval', 1)
+        rule.by_weekday = ','.join(str(day) for day in sorted(set(data['by_weekday']))) if data.get('by_weekday') else None
+        rule.by_month_day = data.get('by_month_day')
+        rule.until = date.fromisoformat(data['until']) if data.get('until') else None
+        rule.count = data.get('count')
+        db.session.add(rule)
+        order.is_recurring = True
+        intervals = {value: name for name, value in INTERVAL_RULES.items()}
+        order.recurring_interval = intervals.get((rule.freq, rule.interval), f'{rule.freq}/{rule.interval}')
+        db.session.commit()
         
-        # Get total customers
-        total_customers = Customer.query.filter_by(is_active=True).count()
+        return jsonify(rule.to_dict()), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@order_bp.route('/orders/<int:order_id>/recurrence', methods=['DELETE'])
+def delete_order_recurrence(order_id):
+    try:
+        # Ends the series; materialized occurrences stay as ordinary orders
+        order = Order.query.get_or_404(order_id)
+        RecurrenceRule.query.filter_by(order_id=order_id).delete()
+        RecurrenceException.query.filter(RecurrenceException.order_id == order_id,
+                                         RecurrenceException.action != 'materialized').delete()
+        order.is_recurring = False
+        db.session.commit()
+        return jsonify({'message': 'Recurrence ended'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@order_bp.route('/orders/<int:order_id>/occurrences/<occurrence_date>', methods=['POST'])
+def update_occurrence(order_id, occurrence_date):
+    try:
+        # Skip or move one occurrence: {"action": "move", "moved_date": "...", "moved_time": "HH:MM"}
+        data = request.get_json() or {}
+        try:
+            occurrence_date = date.fromisoformat(occurrence_date)
+            check_occurrence(order_id, occurrence_date)
+            if data.get('action') not in ('skip', 'move'):
+                raise ValueError("action must be 'skip' or 'move'")
+            moved_date = date.fromisoformat(data['moved_date']) if data.get('action') == 'move' else None
+            moved_time = datetime.strptime(data['moved_time'], '%H:%M').time() if data.get('moved_time') else None
+        except (KeyError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify({
-            'order_counts': order_counts,
-            'todays_orders': todays_orders,
-            'this_week_orders': this_week_orders,
-            'total_customers': total_customers
-        }), 200
+        exception = RecurrenceException.query.filter_by(order_id=order_id, occurrence_date=occurrence_date).first()
+        if exception is not None and exception.action == 'materialized':
+            return jsonify({'error': 'Occurrence is already an order',
+                            'order_id': exception.materialized_order_id}), 409
+        if exception is None:
+            exception = RecurrenceException(order_id=order_id, occurrence_date=occurrence_date)
+            db.session.add(exception)
+        exception.action = data['action']
+        exception.moved_date = moved_date
+        exception.moved_time = moved_time
+        exception.note = data.get('note')
+        db.session.commit()
+        
+        return jsonify(exception.to_dict()), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@order_bp.route('/orders/<int:order_id>/occurrences/<occurrence_date>', methods=['DELETE'])
+def restore_occurrence(order_id, occurrence_date):
+    try:
+        deleted = RecurrenceException.query.filter(
+            RecurrenceException.order_id == order_id,
+            RecurrenceException.occurrence_date == date.fromisoformat(occurrence_date),
+            RecurrenceException.action != 'materialized'
+        ).delete()
+        db.session.commit()
+        if not deleted:
+            return jsonify({'error': 'No skipped or moved occurrence on that date'}), 404
+        return jsonify({'message': 'Occurrence restored'}), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@order_bp.route('/orders/<int:order_id>/occurrences/<occurrence_date>/materialize', methods=['POST'])
+def materialize_occurrence(order_id, occurrence_date):
+    try:
+        try:
+            order = materialize(order_id, date.fromisoformat(occurrence_date))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        db.session.commit()
+        return jsonify(order.to_dict()), 201
+    except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,158 @@
+from flask import Blueprint, request, jsonify
+from src.models.communication import Communication
+from src.models.customer import Customer
+from src.models.user import db
+from src.services.cache import versioned
+from src.services.portal import (MAX_MESSAGE_LIMIT, MESSAGE_LIMIT, customer_invoices, customer_messages,
+                                 customer_orders, load_summary, summary_dict, summary_version)
+
+portal_bp = Blueprint('portal', __name__)
+
+# Fields customers may change themselves in the portal
+PROFILE_FIELDS = ('company_name', 'first_name', 'last_name', 'email', 'phone', 'mobile',
+                  'street', 'house_number', 'postal_code', 'city', 'preferred_contact_method')
+REQUIRED_PROFILE_FIELDS = ('first_name', 'last_name', 'email')
+
+def not_found():
+    return jsonify({'error': 'Customer not found'}), 404
+
+@portal_bp.route('/customer/<int:customer_id>/summary', methods=['GET'])
+@versioned(summary_version)
+def get_portal_summary(customer_id):
+    """Open orders, unpaid invoices, messages and next appointment of a customer"""
+    try:
+        summary = load_summary(customer_id)
+        if summary is None:
+            return not_found()
+        return jsonify(summary_dict(summary))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@portal_bp.route('/customer/<int:customer_id>/orders', methods=['GET'])
+@versioned(summary_version)
+def get_portal_orders(customer_id):
+    """A customer's orders, latest appointment first"""
+    try:
+        summary = load_summary(customer_id)
+        if summary is None:
+            return not_found()
+        summary = summary_dict(summary)
+        return jsonify({
+            'customer_id': customer_id,
+            'open_orders': summary['open_orders'],
+            'next_appointment': summary['next_appointment'],
+            'orders': customer_orders(customer_id)
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@portal_bp.route('/customer/<int:customer_id>/invoices', methods=['GET'])
+@versioned(summary_version)
+def get_portal_invoices(customer_id):
+    """A customer's invoices (drafts excluded) with the unpaid total"""
+    try:
+        summary = load_summary(customer_id)
+        if summary is None:
+            return not_found()
+        return jsonify({
+            'customer_id': customer_id,
+            'unpaid_invoices': summary.unpaid_invoices,
+            'unpaid_amount': round(summary.unpaid_amount, 2),
+            'invoices': customer_invoices(customer_id)
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@portal_bp.route('/customer/<int:customer_id>/profile', methods=['GET'])
+@versioned(summary_version)
+def get_portal_profile(customer_id):
+    """A customer's master data with their summary"""
+    try:
+        summary = load_summary(customer_id)
+        if summary is None:
+            return not_found()
+        customer = db.session.get(Customer, customer_id)
+        return jsonify({**customer.to_dict(), 'summary': summary_dict(summary)})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@portal_bp.route('/customer/<int:customer_id>/profile', methods=['PUT'])
+def update_portal_profile(customer_id):
+    """Update the contact details a customer may change themselves"""
+    try:
+        customer = db.session.get(Customer, customer_id)
+        if customer is None:
+            return not_found()
+        data = request.get_json() or {}
+
+        readonly = sorted(key for key in data if key not in PROFILE_FIELDS)
+        if readonly:
+            return jsonify({'error': f"Fields cannot be changed in the portal: {', '.join(readonly)}"}), 400
+        empty = [key for key in REQUIRED_PROFILE_FIELDS if key in data and not str(data[key] or '').strip()]
+        if empty:
+            return jsonify({'error': f"Fields must not be empty: {', '.join(empty)}"}), 400
+
+        for key, value in data.items():
+            setattr(customer, key, value)
+
+        db.session.commit()
+        return jsonify(customer.to_dict())
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@portal_bp.route('/customer/<int:customer_id>/messages', methods=['GET'])
+@versioned(summary_version)
+def get_portal_messages(customer_id):
+    """The latest messages of a customer (?limit=, default 20)"""
+    try:
+        summary = load_summary(customer_id)
+        if summary is None:
+            return not_found()
+        limit = min(max(request.args.get('limit', MESSAGE_LIMIT, type=int), 1), MAX_MESSAGE_LIMIT)
+        return jsonify({
+            'customer_id': customer_id,
+            'message_count': summary.message_count,
+            'last_message_at': summary.last_message_at.isoformat() if summary.last_message_at else None,
+            'messages': customer_messages(customer_id, limit)
+        })
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@portal_bp.route('/customer/<int:customer_id>/messages', methods=['POST'])
+def create_portal_message(customer_id):
+    """Send a message from the customer to the office"""
+    try:
+        if db.session.get(Customer, customer_id) is None:
+            return not_found()
+        data = request.get_json() or {}
+        if not str(data.get('content') or '').strip():
+            return jsonify({'error': 'content is required'}), 400
+
+        message = Communication(
+            customer_id=customer_id,
+            order_id=data.get('order_id'),
+            type='portal',
+            direction='inbound',
+            subject=data.get('subject', ''),
+            content=data['content'],
+            contact_method='Kundenportal',
+            status='pending'
+        )
+        db.session.add(message)
+        db.session.commit()
+
+        return jsonify({
+            'message': 'Message sent successfully',
+            'message_id': message.id
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -3,22 +3,42 @@ from src.models.customer import Customer
 from src.models.order import Order
 from src.models.quality import QualityCheck
 from src.models.user import db
+from src.services.queries import customer_name_field, order_title_field, with_related
+from src.services.pagination import paginate_request
+from src.services.serialization import Spec, json_response
+from src.services.cache import cached
 from datetime import datetime
 import json
 
 quality_bp = Blueprint('quality', __name__)
 
+QUALITY_CHECK_LIST = Spec(QualityCheck, [
+    QualityCheck.id,
+    QualityCheck.order_id,
+    order_title_field(QualityCheck),
+    QualityCheck.customer_id,
+    customer_name_field(QualityCheck),
+    QualityCheck.inspector_id,
+    QualityCheck.inspector_name,
+    QualityCheck.check_date,
+    QualityCheck.check_type,
+    QualityCheck.overall_score,
+    QualityCheck.status,
+    QualityCheck.notes,
+    QualityCheck.created_at,
+    QualityCheck.updated_at
+], always=(QualityCheck.id, QualityCheck.created_at))
+
 @quality_bp.route('/quality-checks', methods=['GET'])
 def get_quality_checks():
     """Get all quality checks with optional filtering"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
         status = request.args.get('status', '')
         order_id = request.args.get('order_id', type=int)
         inspector_id = request.args.get('inspector_id', type=int)
         
-        query = QualityCheck.query
+        fields = QUALITY_CHECK_LIST.requested(request.args)
+        query = QUALITY_CHECK_LIST.query(fields)
         
         if status:
             query = query.filter(QualityCheck.status == status)
@@ -29,40 +49,15 @@ def get_quality_checks():
             
         query = query.order_by(QualityCheck.created_at.desc())
         
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        rows, page_meta = paginate_request(query, QualityCheck.created_at, QualityCheck.id)
         
-        quality_checks = []
-        for check in pagination.items:
-            customer = Customer.query.get(check.customer_id) if check.customer_id else None
-            order = Order.query.get(check.order_id) if check.order_id else None
-            
-            check_data = {
-                'id': check.id,
-                'order_id': check.order_id,
-                'order_title': order.title if order else None,
-                'customer_id': check.customer_id,
-                'customer_name': f"{customer.first_name} {customer.last_name}" if customer else "Unbekannt",
-                'inspector_id': check.inspector_id,
-                'inspector_name': check.inspector_name,
-                'check_date': check.check_date.isoformat() if check.check_date else None,
-                'check_type': check.check_type,
-                'overall_score': check.overall_score,
-                'status': check.status,
-                'notes': check.notes,
-                'created_at': check.created_at.isoformat(),
-                'updated_at': check.updated_at.isoformat()
-            }
-            quality_checks.append(check_data)
-        
-        return jsonify({
-            'quality_checks': quality_checks,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
+        return json_response({
+            'quality_checks': QUALITY_CHECK_LIST.dicts(rows, fields),
+            **page_meta
         })
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -199,6 +194,7 @@ def update_quality_check_status(check_id):
         return jsonify({'error': str(e)}), 500
 
 @quality_bp.route('/quality-checks/statistics', methods=['GET'])
+@cached(tags=('quality_checks', 'customers', 'orders'))
 def get_quality_statistics():
     """Get quality check statistics"""
     try:
@@ -226,13 +222,13 @@ def get_quality_statistics():
         ).all()
         
         # Recent quality checks
-        recent_checks = QualityCheck.query.order_by(
+        recent_checks = with_related(QualityCheck.query, QualityCheck).order_by(
             QualityCheck.created_at.desc()
         ).limit(5).all()
         
         recent_data = []
         for check in recent_checks:
-            customer = Customer.query.get(check.customer_id) if check.customer_id else None
+            customer = check.customer
             recent_data.append({
                 'id': check.id,
                 'check_type': check.check_type,
@@ -253,6 +249,7 @@ def get_quality_statistics():
         return jsonify({'error': str(e)}), 500
 
 @quality_bp.route('/quality-checks/standards', methods=['GET'])
+@cached(ttl=3600)
 def get_quality_standards():
     """Get quality standards and criteria"""
     try:
@@ -3,67 +3,107 @@ from src.models.customer import Customer
 from src.models.order import Order
 from src.models.quote import Quote, QuoteItem
 from src.models.user import db
+from src.services.queries import customer_name_field
+from src.services.pagination import paginate_request
+from src.services.serialization import Field, Spec, json_response
+from src.services.export import export_response
+from src.services.numbering import next_number
+from src.services.cache import cached
+from src.services.pdf import pdf_response, quote_document, template_document
+from src.services.jobs import enqueue
+from src.routes.jobs import accepted
 from datetime import datetime, timedelta
 import json
 
 quote_bp = Blueprint('quote', __name__)
 
+# For now, the templates are fixed; in the future they could be stored in the database
+QUOTE_TEMPLATES = [
+    {
+        'id': 1,
+        'name': 'Standard Reinigung',
+        'description': 'Grundreinigung für Privatkunden',
+        'items': [
+            {'description': 'Grundreinigung', 'quantity': 1, 'unit_price': 50.00},
+            {'description': 'Fensterreinigung', 'quantity': 1, 'unit_price': 25.00}
+        ]
+    },
+    {
+        'id': 2,
+        'name': 'Gewerbereinigung',
+        'description': 'Reinigung für Gewerbekunden',
+        'items': [
+            {'description': 'Büroreinigung', 'quantity': 1, 'unit_price': 80.00},
+            {'description': 'Teppichreinigung', 'quantity': 1, 'unit_price': 45.00}
+        ]
+    }
+]
+
+def service_address(street, house_number, postal_code, city):
+    return f"{street} {house_number}, {postal_code} {city}"
+
+QUOTE_LIST = Spec(Quote, [
+    Quote.id,
+    Quote.customer_id,
+    customer_name_field(Quote),
+    Quote.title,
+    Quote.description,
+    Quote.service_type,
+    Field('service_address', Quote.service_street, Quote.service_house_number,
+          Quote.service_postal_code, Quote.service_city, convert=service_address),
+    Quote.valid_until,
+    Quote.tax_rate,
+    Quote.subtotal,
+    Quote.tax_amount,
+    Quote.total_amount,
+    Quote.status,
+    Quote.notes,
+    Quote.terms_conditions,
+    Quote.created_at,
+    Quote.updated_at
+], always=(Quote.id, Quote.created_at), views={
+    'picker': ('id', 'title', 'customer_id', 'customer_name', 'status')
+})
+
+def filter_quotes(query, args):
+    """Apply the list filters shared by the quote list and export endpoints"""
+    status = args.get('status', '')
+    service_type = args.get('service_type', '')
+    customer_id = args.get('customer_id', type=int)
+    
+    if status:
+        query = query.filter(Quote.status == status)
+    if service_type:
+        query = query.filter(Quote.service_type == service_type)
+    if customer_id:
+        query = query.filter(Quote.customer_id == customer_id)
+    return query
+
 @quote_bp.route('/quotes', methods=['GET'])
 def get_quotes():
     """Get all quotes with optional filtering"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        status = request.args.get('status', '')
-        service_type = request.args.get('service_type', '')
-        customer_id = request.args.get('customer_id', type=int)
-        
-        query = Quote.query
-        
-        if status:
-            query = query.filter(Quote.status == status)
-        if service_type:
-            query = query.filter(Quote.service_type == service_type)
-        if customer_id:
-            query = query.filter(Quote.customer_id == customer_id)
-            
+        fields = QUOTE_LIST.requested(request.args)
+        query = filter_quotes(QUOTE_LIST.query(fields), request.args)
         query = query.order_by(Quote.created_at.desc())
         
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        quotes = []
-        for quote in pagination.items:
-            customer = Customer.query.get(quote.customer_id)
-            quote_data = {
-                'id': quote.id,
-                'customer_id': quote.customer_id,
-                'customer_name': f"{customer.first_name} {customer.last_name}" if customer else "Unbekannt",
-                'title': quote.title,
-                'description': quote.description,
-                'service_type': quote.service_type,
-                'service_address': f"{quote.service_street} {quote.service_house_number}, {quote.service_postal_code} {quote.service_city}",
-                'valid_until': quote.valid_until.isoformat() if quote.valid_until else None,
-                'tax_rate': quote.tax_rate,
-                'subtotal': quote.subtotal,
-                'tax_amount': quote.tax_amount,
-                'total_amount': quote.total_amount,
-                'status': quote.status,
-                'notes': quote.notes,
-                'terms_conditions': quote.terms_conditions,
-                'created_at': quote.created_at.isoformat(),
-                'updated_at': quote.updated_at.isoformat()
-            }
-            quotes.append(quote_data)
+        rows, page_meta = paginate_request(query, Quote.created_at, Quote.id)
         
-        return jsonify({
-            'quotes': quotes,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
+        return json_response({
+            'quotes': QUOTE_LIST.dicts(rows, fields),
+            **page_meta
         })
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@quote_bp.route('/quotes/export', methods=['GET'])
+def export_quotes():
+    """Stream all (filtered) quotes as NDJSON or CSV"""
+    try:
+        return export_response(filter_quotes(Quote.query, request.args), Quote, 'quotes')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -117,6 +157,16 @@ def get_quote(quote_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@quote_bp.route('/quotes/<int:quote_id>/pdf', methods=['GET'])
+def get_quote_pdf(quote_id):
+    """Download a quote as PDF"""
+    try:
+        quote = Quote.query.get_or_404(quote_id)
+        return pdf_response(quote_document(quote), as_attachment=request.args.get('download') == '1')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @quote_bp.route('/quotes', methods=['POST'])
 def create_quote():
     """Create a new quote"""
@@ -125,6 +175,7 @@ def create_quote():
         
         # Create quote
         quote = Quote(
+            quote_number=next_number('quote'),
             customer_id=data['customer_id'],
             title=data['title'],
             description=data.get('description', ''),
@@ -154,10 +205,7 @@ def create_quote():
                 )
                 db.session.add(item)
         
-        db.session.commit()
-        
-        # Calculate totals
-        quote.calculate_totals()
+        # Totals are maintained by the quote_items triggers
         db.session.commit()
         
         return jsonify({
@@ -221,10 +269,6 @@ def update_quote(quote_id):
         
         db.session.commit()
         
-        # Recalculate totals
-        quote.calculate_totals()
-        db.session.commit()
-        
         return jsonify({'message': 'Quote updated successfully'})
         
     except Exception as e:
@@ -260,12 +304,21 @@ def update_quote_status(quote_id):
             quote.status = data['status']
             quote.updated_at = datetime.utcnow()
             
-            # If converting to order, create order
-            if data['status'] == 'accepted':
-                # Create order logic here if needed
-                pass
+            # Follow-up work runs in the job worker
+            job_id = None
+            if data['status'] == 'sent':
+                quote.sent_at = datetime.utcnow()
+                job_id = enqueue('send_quote', {'quote_id': quote.id},
+                                 idempotency_key=f'send_quote:{quote.id}:{quote.sent_at.isoformat()}')
+            elif data['status'] == 'accepted':
+                # If converting to order, create order (once per quote)
+                quote.accepted_at = datetime.utcnow()
+                job_id = enqueue('quote_accepted', {'quote_id': quote.id},
+                                 idempotency_key=f'quote_accepted:{quote.id}')
             
             db.session.commit()
+            if job_id:
+                return accepted(job_id, message='Quote status updated successfully')
             return jsonify({'message': 'Quote status updated successfully'})
         
         return jsonify({'error': 'Status field required'}), 400
@@ -275,33 +328,24 @@ def update_quote_status(quote_id):
         return jsonify({'error': str(e)}), 500
 
 @quote_bp.route('/quote-templates', methods=['GET'])
+@cached(ttl=3600)
 def get_quote_templates():
     """Get quote templates"""
     try:
-        # For now, return basic templates
-        # In the future, this could be stored in the database
-        templates = [
-            {
-                'id': 1,
-                'name': 'Standard Reinigung',
-                'description': 'Grundreinigung für Privatkunden',
-                'items': [
-                    {'description': 'Grundreinigung', 'quantity': 1, 'unit_price': 50.00},
-                    {'description': 'Fensterreinigung', 'quantity': 1, 'unit_price': 25.00}
-                ]
-            },
-            {
-                'id': 2,
-                'name': 'Gewerbereinigung',
-                'description': 'Reinigung für Gewerbekunden',
-                'items': [
-                    {'description': 'Büroreinigung', 'quantity': 1, 'unit_price': 80.00},
-                    {'description': 'Teppichreinigung', 'quantity': 1, 'unit_price': 45.00}
-                ]
-            }
-        ]
+        return jsonify({'templates': QUOTE_TEMPLATES})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@quote_bp.route('/quote-templates/<int:template_id>/pdf', methods=['GET'])
+def get_quote_template_pdf(template_id):
+    """Download a sample quote for a template as PDF"""
+    try:
+        template = next((template for template in QUOTE_TEMPLATES if template['id'] == template_id), None)
+        if template is None:
+            return jsonify({'error': 'Template not found'}), 404
         
-        return jsonify({'templates': templates})
+        return pdf_response(template_document(template), as_attachment=request.args.get('download') == '1')
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
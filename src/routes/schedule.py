@@ -0,0 +1,68 @@
+from flask import Blueprint, request, jsonify
+from src.models.customer import Customer
+from src.models.order import Order
+from src.models.user import db
+from src.services.cache import cached
+from src.services.scheduling import (DEPOT_POSTAL_CODE, SHIFT_END, SHIFT_START, Crew, locate, parse_clock,
+                                     plan_day)
+from datetime import date
+
+schedule_bp = Blueprint('schedule', __name__)
+
+DEFAULT_CREWS = 2
+MAX_CREWS = 50
+
+def requested_crews(args):
+    """Crews from ?crews=3 or ?crews=Team Nord,Team Süd plus shared start/end/depot"""
+    value = args.get('crews', str(DEFAULT_CREWS))
+    names = [f'Team {i + 1}' for i in range(int(value))] if value.isdigit() else \
+        [name.strip() for name in value.split(',') if name.strip()]
+    if not 0 < len(names) <= MAX_CREWS:
+        raise ValueError(f'Between 1 and {MAX_CREWS} crews can be planned')
+
+    start = parse_clock(args['start']) if args.get('start') else SHIFT_START
+    end = parse_clock(args['end']) if args.get('end') else SHIFT_END
+    if end <= start:
+        raise ValueError('end must be after start')
+    depot = locate(args.get('depot', DEPOT_POSTAL_CODE))
+    if depot is None:
+        raise ValueError(f"Unknown depot postal code: {args.get('depot')}")
+    return [Crew(name, start, end, depot) for name in names]
+
+@schedule_bp.route('/schedule/<day>', methods=['GET'])
+@cached(tags=('orders', 'customers'))
+def get_schedule(day):
+    """Plan crews and visiting order for all open orders scheduled on a day"""
+    try:
+        try:
+            day = date.fromisoformat(day)
+            crews = requested_crews(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        rows = db.session.query(Order, Customer.postal_code, Customer.city).outerjoin(
+            Customer, Order.customer_id == Customer.id
+        ).filter(
+            Order.scheduled_date == day,
+            Order.status.notin_(['cancelled', 'completed'])
+        ).order_by(Order.id).all()
+
+        orders = [{
+            'id': order.id,
+            'order_number': order.order_number,
+            'title': order.title,
+            'postal_code': order.service_postal_code or postal_code,
+            'city': order.service_city or city,
+            'estimated_duration': order.estimated_duration,
+            'priority': order.priority,
+            'scheduled_time': order.scheduled_time.hour * 60 + order.scheduled_time.minute
+                              if order.scheduled_time else None
+        } for order, postal_code, city in rows]
+
+        plan = plan_day(orders, crews)
+        plan['date'] = day.isoformat()
+        plan['orders'] = len(orders)
+        return jsonify(plan)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
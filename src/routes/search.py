@@ -0,0 +1,75 @@
+from flask import Blueprint, request, jsonify
+from src.models.customer import Customer
+from src.models.order import Order
+from src.models.communication import Communication
+from src.models.user import db
+from src.services.search import SEARCH_INDEXES, ranked_matches
+
+search_bp = Blueprint('search', __name__)
+
+MAX_SEARCH_RESULTS = 100
+
+def customer_hit(customer):
+    name = f"{customer.first_name} {customer.last_name}"
+    return {
+        'title': customer.company_name or name,
+        'subtitle': ', '.join(filter(None, [name if customer.company_name else None,
+                                            customer.email, customer.city])),
+        'customer_number': customer.customer_number
+    }
+
+def communication_hit(communication):
+    return {
+        'title': communication.subject or communication.content[:80],
+        'subtitle': communication.type,
+        'customer_id': communication.customer_id,
+        'communication_date': communication.communication_date.isoformat() if communication.communication_date else None
+    }
+
+def order_hit(order):
+    return {
+        'title': order.title,
+        'subtitle': order.order_number,
+        'customer_id': order.customer_id,
+        'status': order.status
+    }
+
+# table -> (model, result type, summary builder)
+SEARCH_RESULTS = {
+    'customers': (Customer, 'customer', customer_hit),
+    'communications': (Communication, 'communication', communication_hit),
+    'orders': (Order, 'order', order_hit),
+}
+
+@search_bp.route('/search', methods=['GET'])
+def search():
+    """Ranked full-text search across customers, communications and orders"""
+    try:
+        search_text = request.args.get('q', '')
+        types = [name.strip() for name in request.args.get('types', '').split(',') if name.strip()]
+        unknown = [name for name in types if name not in SEARCH_INDEXES]
+        if unknown:
+            return jsonify({'error': f"Unknown search type(s): {', '.join(unknown)}"}), 400
+        limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_SEARCH_RESULTS)
+        
+        matches = ranked_matches(db.session.connection(), search_text, types or None, limit)
+        
+        # One IN query per entity type for the rows behind the matches
+        rows = {}
+        for table, (model, _, _) in SEARCH_RESULTS.items():
+            ids = [row_id for entity, row_id, _ in matches if entity == table]
+            if ids:
+                rows[table] = {row.id: row for row in model.query.filter(model.id.in_(ids))}
+        
+        results = []
+        for table, row_id, rank in matches:
+            row = rows.get(table, {}).get(row_id)
+            if row is None:
+                continue
+            _, result_type, summary = SEARCH_RESULTS[table]
+            results.append({'type': result_type, 'id': row_id, 'rank': rank, **summary(row)})
+        
+        return jsonify({'query': search_text, 'results': results, 'total': len(results)})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
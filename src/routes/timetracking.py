@@ -1,85 +1,98 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from src.models.customer import Customer
 from src.models.order import Order
 from src.models.timetracking import TimeEntry
 from src.models.user import db
-from datetime import datetime, timedelta
+from src.services.queries import customer_name_field, order_title_field, with_related
+from src.services.pagination import paginate_request
+from src.services.serialization import Field, Spec, json_response
+from src.services.export import export_response
+from src.services.bulk import bulk_create, bulk_records, require
+from src.services.cache import cached
+from src.services.reports import timetracking_report
+from src.services.rollups import summarize
+from src.services.jobs import enqueue
+from src.routes.jobs import accepted
+from datetime import date, datetime, timedelta
+import csv
+import io
 import json
 
 timetracking_bp = Blueprint('timetracking', __name__)
 
+def duration_hours(start_time, end_time):
+    if start_time and end_time:
+        return (end_time - start_time).total_seconds() / 3600
+    return None
+
+TIME_ENTRY_LIST = Spec(TimeEntry, [
+    TimeEntry.id,
+    TimeEntry.user_id,
+    TimeEntry.user_name,
+    TimeEntry.customer_id,
+    customer_name_field(TimeEntry),
+    TimeEntry.order_id,
+    order_title_field(TimeEntry),
+    TimeEntry.start_time,
+    TimeEntry.end_time,
+    Field('duration', TimeEntry.start_time, TimeEntry.end_time, convert=duration_hours),
+    TimeEntry.description,
+    TimeEntry.activity_type,
+    TimeEntry.status,
+    TimeEntry.created_at,
+    TimeEntry.updated_at
+], always=(TimeEntry.id, TimeEntry.start_time))
+
+def filter_time_entries(query, args):
+    """Apply the list filters shared by the time entry list and export endpoints"""
+    user_id = args.get('user_id', type=int)
+    order_id = args.get('order_id', type=int)
+    date_from = args.get('date_from', '')
+    date_to = args.get('date_to', '')
+    
+    if user_id:
+        query = query.filter(TimeEntry.user_id == user_id)
+    if order_id:
+        query = query.filter(TimeEntry.order_id == order_id)
+    if date_from:
+        try:
+            date_from_obj = datetime.fromisoformat(date_from)
+            query = query.filter(TimeEntry.start_time >= date_from_obj)
+        except ValueError:
+            pass
+    if date_to:
+        try:
+            date_to_obj = datetime.fromisoformat(date_to)
+            query = query.filter(TimeEntry.end_time <= date_to_obj)
+        except ValueError:
+            pass
+    return query
+
 @timetracking_bp.route('/time-entries', methods=['GET'])
 def get_time_entries():
     """Get all time entries with optional filtering"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        user_id = request.args.get('user_id', type=int)
-        order_id = request.args.get('order_id', type=int)
-        date_from = request.args.get('date_from', '')
-        date_to = request.args.get('date_to', '')
-        
-        query = TimeEntry.query
-        
-        if user_id:
-            query = query.filter(TimeEntry.user_id == user_id)
-        if order_id:
-            query = query.filter(TimeEntry.order_id == order_id)
-        if date_from:
-            try:
-                date_from_obj = datetime.fromisoformat(date_from)
-                query = query.filter(TimeEntry.start_time >= date_from_obj)
-            except ValueError:
-                pass
-        if date_to:
-            try:
-                date_to_obj = datetime.fromisoformat(date_to)
-                query = query.filter(TimeEntry.end_time <= date_to_obj)
-            except ValueError:
-                pass
-            
+        fields = TIME_ENTRY_LIST.requested(request.args)
+        query = filter_time_entries(TIME_ENTRY_LIST.query(fields), request.args)
         query = query.order_by(TimeEntry.start_time.desc())
         
-        pagination = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        time_entries = []
-        for entry in pagination.items:
-            customer = Customer.query.get(entry.customer_id) if entry.customer_id else None
-            order = Order.query.get(entry.order_id) if entry.order_id else None
-            
-            # Calculate duration
-            duration = None
-            if entry.start_time and entry.end_time:
-                duration = (entry.end_time - entry.start_time).total_seconds() / 3600  # hours
-            
-            entry_data = {
-                'id': entry.id,
-                'user_id': entry.user_id,
-                'user_name': entry.user_name,
-                'customer_id': entry.customer_id,
-                'customer_name': f"{customer.first_name} {customer.last_name}" if customer else "Unbekannt",
-                'order_id': entry.order_id,
-                'order_title': order.title if order else None,
-                'start_time': entry.start_time.isoformat() if entry.start_time else None,
-                'end_time': entry.end_time.isoformat() if entry.end_time else None,
-                'duration': duration,
-                'description': entry.description,
-                'activity_type': entry.activity_type,
-                'status': entry.status,
-                'created_at': entry.created_at.isoformat(),
-                'updated_at': entry.updated_at.isoformat()
-            }
-            time_entries.append(entry_data)
+        rows, page_meta = paginate_request(query, TimeEntry.start_time, TimeEntry.id)
         
-        return jsonify({
-            'time_entries': time_entries,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page
+        return json_response({
+            'time_entries': TIME_ENTRY_LIST.dicts(rows, fields),
+            **page_meta
         })
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@timetracking_bp.route('/time-entries/export', methods=['GET'])
+def export_time_entries():
+    """Stream all (filtered) time entries as NDJSON or CSV"""
+    try:
+        return export_response(filter_time_entries(TimeEntry.query, request.args), TimeEntry, 'time_entries')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -168,6 +181,36 @@ def create_time_entry():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def time_entry_row(data):
+    """Column values for a new time entry; malformed timestamps are rejected, not replaced"""
+    require(data, 'user_id', 'start_time')
+    return {
+        'user_id': int(data['user_id']),
+        'user_name': data.get('user_name', ''),
+        'customer_id': data.get('customer_id'),
+        'order_id': data.get('order_id'),
+        'start_time': datetime.fromisoformat(data['start_time']),
+        'end_time': datetime.fromisoformat(data['end_time']) if data.get('end_time') else None,
+        'description': data.get('description', ''),
+        'activity_type': data.get('activity_type', 'work'),
+        'status': data.get('status', 'active'),
+        'notes': data.get('notes', '')
+    }
+
+@timetracking_bp.route('/time-entries/bulk', methods=['POST'])
+def bulk_create_time_entries():
+    """Create many time entries in one transaction"""
+    try:
+        records = bulk_records(request.get_json())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        body, status = bulk_create(TimeEntry, records, time_entry_row)
+        return jsonify(body), status
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @timetracking_bp.route('/time-entries/<int:entry_id>', methods=['PUT'])
 def update_time_entry(entry_id):
     """Update an existing time entry"""
@@ -285,6 +328,7 @@ def start_time_entry():
         return jsonify({'error': str(e)}), 500
 
 @timetracking_bp.route('/time-entries/statistics', methods=['GET'])
+@cached(tags=('time_entries', 'time_rollups', 'customers', 'orders'))
 def get_timetracking_statistics():
     """Get time tracking statistics"""
     try:
@@ -292,39 +336,22 @@ def get_timetracking_statistics():
         current_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
         next_month = (current_month + timedelta(days=32)).replace(day=1)
         
-        user_hours = db.session.query(
-            TimeEntry.user_id,
-            TimeEntry.user_name,
-            db.func.sum(
-                db.func.extract('epoch', TimeEntry.end_time - TimeEntry.start_time) / 3600
-            ).label('total_hours')
-        ).filter(
-            TimeEntry.start_time >= current_month,
-            TimeEntry.start_time < next_month,
-            TimeEntry.status == 'completed'
-        ).group_by(TimeEntry.user_id, TimeEntry.user_name).all()
+        user_hours = summarize(('user',), current_month.date(), (next_month - timedelta(days=1)).date())
         
         # Total hours by activity type
-        activity_hours = db.session.query(
-            TimeEntry.activity_type,
-            db.func.sum(
-                db.func.extract('epoch', TimeEntry.end_time - TimeEntry.start_time) / 3600
-            ).label('total_hours')
-        ).filter(
-            TimeEntry.status == 'completed'
-        ).group_by(TimeEntry.activity_type).all()
+        activity_hours = summarize(('activity',))
         
         # Active time entries
         active_entries = TimeEntry.query.filter_by(status='active').count()
         
         # Recent time entries
-        recent_entries = TimeEntry.query.order_by(
+        recent_entries = with_related(TimeEntry.query, TimeEntry).order_by(
             TimeEntry.created_at.desc()
         ).limit(5).all()
         
         recent_data = []
         for entry in recent_entries:
-            customer = Customer.query.get(entry.customer_id) if entry.customer_id else None
+            customer = entry.customer
             recent_data.append({
                 'id': entry.id,
                 'user_name': entry.user_name,
@@ -335,8 +362,8 @@ def get_timetracking_statistics():
             })
         
         return jsonify({
-            'user_hours': {f"{item.user_name}": float(item.total_hours) for item in user_hours},
-            'activity_hours': {item.activity_type: float(item.total_hours) for item in activity_hours},
+            'user_hours': {f"{item['user_name']}": item['seconds'] / 3600 for item in user_hours},
+            'activity_hours': {item['activity_type']: item['seconds'] / 3600 for item in activity_hours},
             'active_entries': active_entries,
             'recent_entries': recent_data
         })
@@ -344,6 +371,46 @@ def get_timetracking_statistics():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@timetracking_bp.route('/time-entries/summary', methods=['GET'])
+def get_timetracking_summary():
+    """Get pre-aggregated hours for a period, e.g. ?group_by=user,day&format=csv for payroll"""
+    try:
+        group_by = [name for name in request.args.get('group_by', 'user').split(',') if name]
+        user_id = request.args.get('user_id', type=int)
+        
+        try:
+            date_from = date.fromisoformat(request.args['date_from']) if request.args.get('date_from') else None
+            date_to = date.fromisoformat(request.args['date_to']) if request.args.get('date_to') else None
+        except ValueError:
+            return jsonify({'error': 'Invalid date format'}), 400
+        
+        try:
+            summary = summarize(group_by, date_from, date_to, user_id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if request.args.get('format') == 'csv':
+            output = io.StringIO()
+            columns = list(summary[0]) if summary else ['seconds', 'entry_count', 'hours']
+            writer = csv.DictWriter(output, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(summary)
+            filename = f"zeiten_{date_from or 'alle'}_{date_to or 'alle'}.csv"
+            return Response(output.getvalue(), mimetype='text/csv',
+                            headers={'Content-Disposition': f'attachment; filename={filename}'})
+        
+        return jsonify({
+            'summary': summary,
+            'total_hours': round(sum(item['seconds'] for item in summary) / 3600, 2),
+            'period': {
+                'from': date_from.isoformat() if date_from else None,
+                'to': date_to.isoformat() if date_to else None
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @timetracking_bp.route('/time-entries/report', methods=['GET'])
 def get_timetracking_report():
     """Get time tracking report for a specific period"""
@@ -361,43 +428,11 @@ def get_timetracking_report():
         except ValueError:
             return jsonify({'error': 'Invalid date format'}), 400
         
-        query = TimeEntry.query.filter(
-            TimeEntry.start_time >= start_date,
-            TimeEntry.start_time <= end_date,
-            TimeEntry.status == 'completed'
-        )
-        
-        if user_id:
-            query = query.filter(TimeEntry.user_id == user_id)
-        
-        entries = query.all()
-        
-        report_data = []
-        total_hours = 0
-        
-        for entry in entries:
-            customer = Customer.query.get(entry.customer_id) if entry.customer_id else None
-            order = Order.query.get(entry.order_id) if entry.order_id else None
-            
-            duration = (entry.end_time - entry.start_time).total_seconds() / 3600
-            total_hours += duration
-            
-            entry_data = {
-                'date': entry.start_time.date().isoformat(),
-                'user_name': entry.user_name,
-                'customer_name': f"{customer.first_name} {customer.last_name}" if customer else "Unbekannt",
-                'order_title': order.title if order else None,
-                'activity_type': entry.activity_type,
-                'start_time': entry.start_time.strftime('%H:%M'),
-                'end_time': entry.end_time.strftime('%H:%M'),
-                'duration': round(duration, 2),
-                'description': entry.description
-            }
-            report_data.append(entry_data)
+        report = timetracking_report(start_date, end_date, user_id)
         
         return jsonify({
-            'report_data': report_data,
-            'total_hours': round(total_hours, 2),
+            'report_data': report['report_data'],
+            'total_hours': report['total_hours'],
             'period': {
                 'from': date_from,
                 'to': date_to
@@ -406,3 +441,30 @@ def get_timetracking_report():
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+@timetracking_bp.route('/time-entries/report', methods=['POST'])
+def queue_timetracking_report():
+    """Build a time tracking report in the background; the result is on the job"""
+    try:
+        data = request.get_json() or {}
+        date_from = data.get('date_from', '')
+        date_to = data.get('date_to', '')
+        
+        if not date_from or not date_to:
+            return jsonify({'error': 'Date range required'}), 400
+        
+        try:
+            datetime.fromisoformat(date_from)
+            datetime.fromisoformat(date_to)
+        except ValueError:
+            return jsonify({'error': 'Invalid date format'}), 400
+        
+        payload = {'date_from': date_from, 'date_to': date_to, 'user_id': data.get('user_id')}
+        job_id = enqueue('timetracking_report', payload,
+                         idempotency_key=request.headers.get('Idempotency-Key'))
+        db.session.commit()
+        return accepted(job_id)
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
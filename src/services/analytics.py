@@ -0,0 +1,284 @@
+"""
+Columnar analytics for revenue, quality and utilization reports
+
+Each report reads the handful of columns it needs for the whole period in
+a single range query on an indexed date column, with the month (and day)
+of every row computed by SQLite as a bucket number. All figures - monthly
+series, rolling averages, percentiles, per-employee totals - are then
+computed from those columns, so a multi-year range costs one scan instead
+of a GROUP BY per month and statistic.
+
+NumPy is optional: when it is installed the columns become arrays and the
+bucketing runs in bincount/cumsum/percentile; without it the same figures
+are computed in plain Python. Percentiles use linear interpolation (NumPy's
+default) in both cases.
+"""
+
+from datetime import timedelta
+
+from sqlalchemy import text
+
+from src.models.user import db
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when NumPy is not installed
+    np = None
+
+# Invoice statuses that count as invoiced revenue (drafts and cancellations do not)
+REVENUE_STATUSES = ('sent', 'paid', 'overdue')
+
+HOURS_PER_DAY = 8.0
+PERCENTILES = (50, 90, 95, 99)
+
+
+def _month_number(column):
+    return (f"CAST(strftime('%Y', {column}) AS INTEGER) * 12 + "
+            f"CAST(strftime('%m', {column}) AS INTEGER) - 1 - :first_month")
+
+
+REVENUE_COLUMNS = text(
+    f"SELECT {_month_number('invoice_date')}, total_amount, status FROM invoices "
+    f"WHERE invoice_date >= :date_from AND invoice_date < :date_until"
+)
+
+QUALITY_COLUMNS = text(
+    f"SELECT {_month_number('check_date')}, overall_score, check_type FROM quality_checks "
+    f"WHERE check_date >= :date_from AND check_date < :date_until AND overall_score IS NOT NULL"
+)
+
+UTILIZATION_COLUMNS = text(
+    f"SELECT {_month_number('day')}, CAST(julianday(day) - julianday(:date_from) AS INTEGER), "
+    f"user_id, user_name, seconds FROM time_rollups "
+    f"WHERE day >= :date_from AND day < :date_until"
+)
+
+
+def month_labels(date_from, date_to):
+    """First month number (year * 12 + month - 1) and 'YYYY-MM' labels covering the period"""
+    first = date_from.year * 12 + date_from.month - 1
+    last = date_to.year * 12 + date_to.month - 1
+    return first, [f'{month // 12:04d}-{month % 12 + 1:02d}' for month in range(first, last + 1)]
+
+
+def weekdays(date_from, date_to):
+    """Monday to Friday days in date_from..date_to (both inclusive)"""
+    days = (date_to - date_from).days + 1
+    if days <= 0:
+        return 0
+    weeks, rest = divmod(days, 7)
+    return weeks * 5 + sum(1 for offset in range(rest) if (date_from.weekday() + offset) % 7 < 5)
+
+
+# Column primitives: NumPy when available, plain Python otherwise
+
+def _load(statement, params, dtypes):
+    """Run the query and return one column per dtype (object columns stay lists)"""
+    rows = db.session.execute(statement, params).all()
+    columns = list(zip(*rows)) or [()] * len(dtypes)
+    if np is None:
+        return [list(column) for column in columns]
+    return [list(column) if dtype is object else np.asarray(column, dtype=dtype)
+            for column, dtype in zip(columns, dtypes)]
+
+
+def _codes(values):
+    """Category labels in order of appearance and each value's label index"""
+    labels = {}
+    index = [labels.setdefault(value, len(labels)) for value in values]
+    return list(labels), (np.asarray(index, dtype=np.int64) if np is not None else index)
+
+
+def _flat(outer, inner, width):
+    """Bucket numbers of a (outer, inner) grid with `width` inner buckets"""
+    if np is not None:
+        return outer * width + inner
+    return [o * width + i for o, i in zip(outer, inner)]
+
+
+def _select(values, index, codes):
+    """The values whose category index is one of codes"""
+    if np is not None:
+        return values[np.isin(index, codes)]
+    codes = set(codes)
+    return [value for value, code in zip(values, index) if code in codes]
+
+
+def _bincount(index, size, weights=None):
+    """Sum of the weights (or number of rows) per bucket 0..size-1"""
+    if np is not None:
+        return np.bincount(index, weights=weights, minlength=size).tolist()
+    totals = [0] * size if weights is None else [0.0] * size
+    if weights is None:
+        for bucket in index:
+            totals[bucket] += 1
+    else:
+        for bucket, weight in zip(index, weights):
+            totals[bucket] += weight
+    return totals
+
+
+def _rolling_sum(values, window):
+    """Sum of each value and the window - 1 values before it"""
+    if np is not None:
+        cumulative = np.cumsum(np.asarray(values, dtype=float))
+        rolled = cumulative.copy()
+        rolled[window:] -= cumulative[:-window]
+        return rolled.tolist()
+    rolled, running = [], 0.0
+    for position, value in enumerate(values):
+        running += value
+        if position >= window:
+            running -= values[position - window]
+        rolled.append(running)
+    return rolled
+
+
+def _percentiles(values, quantiles=PERCENTILES):
+    if len(values) == 0:
+        return {f'p{q}': None for q in quantiles}
+    if np is not None:
+        results = np.percentile(values, quantiles).tolist()
+    else:
+        ordered = sorted(values)
+        results = []
+        for q in quantiles:
+            position = (len(ordered) - 1) * q / 100
+            lower = int(position)
+            upper = min(lower + 1, len(ordered) - 1)
+            results.append(ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower))
+    return {f'p{q}': round(value, 2) for q, value in zip(quantiles, results)}
+
+
+def _rows(flat, width):
+    return [flat[start:start + width] for start in range(0, len(flat), width)]
+
+
+def _params(date_from, date_to):
+    first, labels = month_labels(date_from, date_to)
+    return labels, {
+        'first_month': first,
+        'date_from': date_from.isoformat(),
+        'date_until': (date_to + timedelta(days=1)).isoformat()
+    }
+
+
+# Reports
+
+def revenue_report(date_from, date_to):
+    """Monthly invoiced/paid/open revenue, totals per status and invoice size percentiles"""
+    labels, params = _params(date_from, date_to)
+    months, amounts, statuses = _load(REVENUE_COLUMNS, params, ('int64', 'float64', object))
+    status_labels, status_index = _codes(statuses)
+    width = len(labels)
+
+    # One pass: amount and number of invoices per (status, month)
+    cells = _flat(status_index, months, width)
+    amount_rows = _rows(_bincount(cells, len(status_labels) * width, amounts), width)
+    count_rows = _rows(_bincount(cells, len(status_labels) * width), width)
+
+    def monthly_total(rows, statuses):
+        selected = [row for label, row in zip(status_labels, rows) if label in statuses]
+        return [sum(column) for column in zip(*selected)] if selected else [0] * width
+
+    invoiced = monthly_total(amount_rows, REVENUE_STATUSES)
+    paid = monthly_total(amount_rows, ('paid',))
+    invoice_counts = monthly_total(count_rows, REVENUE_STATUSES)
+    revenue_amounts = _select(amounts, status_index,
+                              [i for i, label in enumerate(status_labels) if label in REVENUE_STATUSES])
+
+    return {
+        'period': {'from': date_from.isoformat(), 'to': date_to.isoformat()},
+        'monthly': [{
+            'month': label,
+            'invoiced': round(invoiced[i], 2),
+            'paid': round(paid[i], 2),
+            'open': round(invoiced[i] - paid[i], 2),
+            'invoices': invoice_counts[i]
+        } for i, label in enumerate(labels)],
+        'total_invoiced': round(sum(invoiced), 2),
+        'total_paid': round(sum(paid), 2),
+        'by_status': {status: {'count': sum(counts), 'amount': round(sum(totals), 2)}
+                      for status, totals, counts in zip(status_labels, amount_rows, count_rows)},
+        'average_invoice': round(sum(invoiced) / len(revenue_amounts), 2) if len(revenue_amounts) else None,
+        'invoice_percentiles': _percentiles(revenue_amounts)
+    }
+
+
+def quality_report(date_from, date_to, window=3):
+    """Monthly and rolling average scores, score percentiles and averages per check type"""
+    labels, params = _params(date_from, date_to)
+    months, scores, check_types = _load(QUALITY_COLUMNS, params, ('int64', 'float64', object))
+    width = len(labels)
+
+    score_sums = _bincount(months, width, scores)
+    counts = _bincount(months, width)
+    rolling_sums = _rolling_sum(score_sums, window)
+    rolling_counts = _rolling_sum(counts, window)
+
+    type_labels, type_index = _codes(check_types)
+    type_sums = _bincount(type_index, len(type_labels), scores)
+    type_counts = _bincount(type_index, len(type_labels))
+
+    return {
+        'period': {'from': date_from.isoformat(), 'to': date_to.isoformat()},
+        'window': window,
+        'monthly': [{
+            'month': label,
+            'checks': counts[i],
+            'average': round(score_sums[i] / counts[i], 2) if counts[i] else None,
+            'rolling_average': round(rolling_sums[i] / rolling_counts[i], 2) if rolling_counts[i] else None
+        } for i, label in enumerate(labels)],
+        'checks': len(scores),
+        'average': round(sum(score_sums) / len(scores), 2) if len(scores) else None,
+        'score_percentiles': _percentiles(scores, (10, 25, 50, 75, 90)),
+        'by_check_type': {check_type: {'checks': type_counts[i], 'average': round(type_sums[i] / type_counts[i], 2)}
+                          for i, check_type in enumerate(type_labels)}
+    }
+
+
+def utilization_report(date_from, date_to, hours_per_day=HOURS_PER_DAY):
+    """Booked hours per employee and month, daily hour percentiles and utilization of a weekday capacity"""
+    labels, params = _params(date_from, date_to)
+    months, days, user_ids, user_names, seconds = _load(
+        UTILIZATION_COLUMNS, params, ('int64', 'int64', object, object, 'float64'))
+    user_labels, user_index = _codes(user_ids)
+    names = dict(zip(user_ids, user_names))
+    width, day_count = len(labels), (date_to - date_from).days + 1
+
+    monthly = _rows(_bincount(_flat(user_index, months, width), len(user_labels) * width, seconds), width)
+    daily = _rows(_bincount(_flat(user_index, days, day_count), len(user_labels) * day_count, seconds), day_count)
+
+    capacity = weekdays(date_from, date_to) * hours_per_day
+    employees = []
+    for position, user_id in enumerate(user_labels):
+        worked = [total / 3600 for total in daily[position] if total]
+        hours = sum(monthly[position]) / 3600
+        employees.append({
+            'user_id': user_id,
+            'user_name': names[user_id],
+            'hours': round(hours, 2),
+            'days_worked': len(worked),
+            'average_hours_per_day': round(hours / len(worked), 2) if worked else None,
+            'daily_hours_percentiles': _percentiles(worked, (50, 90)),
+            'utilization': round(hours / capacity, 4) if capacity else None,
+            'monthly_hours': [round(total / 3600, 2) for total in monthly[position]]
+        })
+    employees.sort(key=lambda employee: -employee['hours'])
+
+    return {
+        'period': {'from': date_from.isoformat(), 'to': date_to.isoformat()},
+        'months': labels,
+        'hours_per_day': hours_per_day,
+        'capacity_hours': capacity,
+        'total_hours': round(sum(employee['hours'] for employee in employees), 2),
+        'employees': employees
+    }
+
+
+def analytics_summary(date_from, date_to, window=3, hours_per_day=HOURS_PER_DAY):
+    return {
+        'revenue': revenue_report(date_from, date_to),
+        'quality': quality_report(date_from, date_to, window),
+        'utilization': utilization_report(date_from, date_to, hours_per_day)
+    }
@@ -0,0 +1,486 @@
+"""
+ASGI adapter for the Flask apps
+
+AsgiAdapter(wsgi_app) serves a WSGI app (main.app, simple_backend.app)
+to an ASGI server. The event loop does all the socket work: it reads the
+whole request body before the app runs and writes the response after it
+returned, so a client on a slow mobile connection costs a coroutine and
+a socket, not a thread. Only the app itself - routing, the blocking
+SQLAlchemy / sqlite3 queries, serialization - runs on a bounded pool of
+`threads` worker threads. Keep that at or below the database connection
+pool (SQLAlchemy: 5 + 10 overflow, simple backend: DB_POOL_SIZE), then a
+worker never waits for a connection.
+
+Streamed responses (exports, /api/events) are pulled chunk by chunk on
+threads of their own, so an idle event stream never holds a worker. Each
+request runs in a fresh contextvars context, wherever its chunks run:
+Flask's stream_with_context() and the request profile live in context
+variables.
+
+serve() is a small HTTP/1.1 server for the adapter when no ASGI server
+(uvicorn, hypercorn) is installed: keep-alive, Content-Length request
+bodies and chunked streamed responses, nothing more. A request whose
+Content-Length exceeds max_body_bytes is answered 413 before any of its
+body is read. asgi.py in the
+project root wires both up.
+"""
+
+import asyncio
+import contextvars
+import io
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import unquote
+
+WORKER_THREADS = 8
+STREAM_THREADS = 100  # events.MAX_SUBSCRIBERS plus a few exports
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+# serve(): a client has this long to send a request's headers (and its body)
+HEADER_TIMEOUT = 60
+BODY_TIMEOUT = 120
+KEEP_ALIVE_TIMEOUT = 75
+MAX_HEADER_BYTES = 64 * 1024
+LINGER_SECONDS = 2
+
+
+def _latin1(text):
+    # WSGI strings carry the raw bytes as latin-1
+    return text.encode('utf-8').decode('latin-1')
+
+
+def wsgi_environ(scope, body):
+    """WSGI environ of an ASGI http scope and its complete body"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': _latin1(root_path),
+        'PATH_INFO': _latin1(path),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': str(client[0]),
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'asgi.scope': scope,
+    }
+    for name, value in scope.get('headers', ()):
+        key = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if key == 'CONTENT_LENGTH':
+            continue
+        if key != 'CONTENT_TYPE':
+            key = f'HTTP_{key}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class _Response:
+    """Status, headers and body of one WSGI call; iterable is kept for streamed bodies"""
+
+    __slots__ = ('status', 'headers', 'chunks', 'iterable')
+
+    def __init__(self):
+        self.status = None
+        self.headers = []
+        self.chunks = []
+        self.iterable = None
+
+    def start_response(self, status, headers, exc_info=None):
+        if exc_info is not None and self.chunks:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.status = int(status.split(' ', 1)[0])
+        self.headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        # The legacy write() callable; Flask never uses it
+        return self.chunks.append
+
+    @property
+    def streamed(self):
+        return not any(name == b'content-length' for name, _ in self.headers)
+
+
+def _close(iterable):
+    close = getattr(iterable, 'close', None)
+    if close is not None:
+        close()
+
+
+def _next_chunk(iterator):
+    return next(iterator, None)
+
+
+class AsgiAdapter:
+    """ASGI 3 application running a WSGI app on a bounded pool of worker threads"""
+
+    def __init__(self, wsgi_app, threads=WORKER_THREADS, stream_threads=STREAM_THREADS,
+                 max_body_bytes=MAX_BODY_BYTES):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self.max_body_bytes = max_body_bytes
+        self.workers = ThreadPoolExecutor(threads, thread_name_prefix='asgi-worker')
+        self.streams = ThreadPoolExecutor(stream_threads, thread_name_prefix='asgi-stream')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def close(self):
+        """Stop the worker threads once the running requests are done"""
+        self.workers.shutdown(wait=False, cancel_futures=True)
+        self.streams.shutdown(wait=False, cancel_futures=True)
+
+    async def _read_body(self, receive):
+        """Request body (cut off past max_body_bytes), None when the client went away"""
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            body += message.get('body', b'')
+            if not message.get('more_body', False) or len(body) > self.max_body_bytes:
+                return bytes(body)
+
+    async def _http(self, scope, receive, send):
+        body = await self._read_body(receive)
+        if body is None:
+            return
+        if len(body) > self.max_body_bytes:
+            status = HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+            await send({'type': 'http.response.start', 'status': status,
+                        'headers': [(b'content-type', b'text/plain; charset=utf-8'),
+                                    (b'content-length', str(len(status.phrase)).encode())]})
+            await send({'type': 'http.response.body', 'body': status.phrase.encode()})
+            return
+
+        loop = asyncio.get_running_loop()
+        context = contextvars.Context()
+        response = await loop.run_in_executor(self.workers, context.run, self._call, wsgi_environ(scope, body))
+
+        await send({'type': 'http.response.start', 'status': response.status, 'headers': response.headers})
+        if response.iterable is None:
+            await send({'type': 'http.response.body', 'body': b''.join(response.chunks)})
+            return
+        await self._stream(loop, context, response.iterable, receive, send)
+
+    def _call(self, environ):
+        """The WSGI call on a worker thread; collects the body unless it is streamed"""
+        response = _Response()
+        iterable = self.wsgi_app(environ, response.start_response)
+        if not response.streamed:
+            try:
+                response.chunks.extend(iterable)
+            finally:
+                _close(iterable)
+            return response
+        response.iterable = iterable
+        return response
+
+    async def _stream(self, loop, context, iterable, receive, send):
+        # close() of the iterable, not of its iterator, ends the request
+        iterator = iter(iterable)
+        disconnected = asyncio.ensure_future(self._disconnect(receive))
+        try:
+            while not disconnected.done():
+                chunk = await loop.run_in_executor(self.streams, context.run, _next_chunk, iterator)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not disconnected.done():
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnected.cancel()
+            await loop.run_in_executor(self.streams, context.run, _close, iterable)
+
+    @staticmethod
+    async def _disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+
+# A minimal HTTP/1.1 server for ASGI apps
+
+class _BadRequest(Exception):
+    pass
+
+
+def _parse_head(head):
+    """(method, target, version, [(name, value)]) of a request head, names lower-cased"""
+    try:
+        request_line, *lines = head.decode('latin-1').split('\r\n')
+        method, target, version = request_line.split(' ')
+    except ValueError:
+        raise _BadRequest('Malformed request line')
+    if not version.startswith('HTTP/1.'):
+        raise _BadRequest(f'Unsupported protocol {version}')
+    headers = []
+    for line in lines:
+        name, colon, value = line.partition(':')
+        if not colon or not name or name != name.strip():
+            raise _BadRequest('Malformed header')
+        headers.append((name.lower(), value.strip()))
+    return method, target, version, headers
+
+
+def _content_length(headers):
+    values = {value for name, value in headers if name == 'content-length'}
+    if any(name == 'transfer-encoding' for name, _ in headers):
+        raise _BadRequest('Chunked request bodies are not supported')
+    if len(values) > 1 or not all(value.isdigit() for value in values):
+        raise _BadRequest('Invalid Content-Length')
+    return int(values.pop()) if values else 0
+
+
+def _keep_alive(version, headers):
+    connection = ','.join(value for name, value in headers if name == 'connection').lower()
+    if version == 'HTTP/1.0':
+        return 'keep-alive' in connection
+    return 'close' not in connection
+
+
+class _Exchange:
+    """receive()/send() of one request on a connection"""
+
+    def __init__(self, writer, body, keep_alive):
+        self.writer = writer
+        self.body = body
+        self.keep_alive = keep_alive
+        self.body_sent = False
+        self.started = False
+        self.finished = False
+        self.chunked = False
+        self.disconnected = asyncio.Event()
+
+    async def receive(self):
+        if not self.body_sent:
+            self.body_sent = True
+            return {'type': 'http.request', 'body': self.body, 'more_body': False}
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if self.disconnected.is_set():
+            raise ConnectionResetError('Client disconnected')
+        try:
+            if message['type'] == 'http.response.start':
+                self._start(message)
+            elif message['type'] == 'http.response.body':
+                self._body(message.get('body', b''), message.get('more_body', False))
+            await self.writer.drain()
+        except ConnectionError:
+            self.disconnected.set()
+            raise
+
+    def _start(self, message):
+        status = HTTPStatus(message['status'])
+        headers = [(name.lower(), value) for name, value in message.get('headers', ())]
+        self.chunked = not any(name == b'content-length' for name, _ in headers)
+        if self.chunked:
+            headers.append((b'transfer-encoding', b'chunked'))
+        headers.append((b'connection', b'keep-alive' if self.keep_alive else b'close'))
+        lines = [f'HTTP/1.1 {status.value} {status.phrase}'.encode()]
+        lines += [name + b': ' + value for name, value in headers]
+        self.writer.write(b'\r\n'.join(lines) + b'\r\n\r\n')
+        self.started = True
+
+    def _body(self, body, more_body):
+        if self.chunked:
+            if body:
+                self.writer.write(b'%x\r\n%s\r\n' % (len(body), body))
+            if not more_body:
+                self.writer.write(b'0\r\n\r\n')
+        elif body:
+            self.writer.write(body)
+        self.finished = not more_body
+
+
+async def _reply(writer, status, text):
+    status = HTTPStatus(status)
+    body = text.encode()
+    writer.write(f'HTTP/1.1 {status.value} {status.phrase}\r\ncontent-type: text/plain; charset=utf-8\r\n'
+                 f'content-length: {len(body)}\r\nconnection: close\r\n\r\n'.encode() + body)
+    await writer.drain()
+
+
+async def _discard(reader):
+    while await reader.read(65536):
+        pass
+
+
+async def _linger(reader, writer):
+    """Stop writing and drop what the client still sends for a moment
+
+    Closing with unread data resets the connection, and the client may
+    lose the reply that was just written.
+    """
+    if writer.can_write_eof():
+        writer.write_eof()
+    try:
+        await asyncio.wait_for(_discard(reader), LINGER_SECONDS)
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+
+
+async def _read_head(reader, idle):
+    """Request head without the blank line; a keep-alive connection waits up to KEEP_ALIVE_TIMEOUT first"""
+    first = b''
+    if idle:
+        first = await asyncio.wait_for(reader.readexactly(1), KEEP_ALIVE_TIMEOUT)
+    return first + (await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), HEADER_TIMEOUT))[:-4]
+
+
+async def _handle(app, reader, writer, max_body_bytes=MAX_BODY_BYTES, scheme='http'):
+    server = writer.get_extra_info('sockname')[:2]
+    client = writer.get_extra_info('peername')[:2]
+    idle = False
+    try:
+        while True:
+            try:
+                head = await _read_head(reader, idle)
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                return
+            except asyncio.LimitOverrunError:
+                await _reply(writer, 431, 'Request header fields too large')
+                return
+            try:
+                method, target, version, headers = _parse_head(head)
+                length = _content_length(headers)
+            except _BadRequest as e:
+                await _reply(writer, 400, str(e))
+                return
+            if length > max_body_bytes:
+                # Never buffer what the app would refuse anyway
+                await _reply(writer, 413, f'Request body larger than {max_body_bytes} bytes')
+                await _linger(reader, writer)
+                return
+            try:
+                body = await asyncio.wait_for(reader.readexactly(length), BODY_TIMEOUT) if length else b''
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                return
+
+            path, _, query = target.partition('?')
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0', 'spec_version': '2.3'},
+                'http_version': version[5:],
+                'method': method,
+                'scheme': scheme,
+                'path': unquote(path),
+                'raw_path': path.encode('latin-1'),
+                'query_string': query.encode('latin-1'),
+                'root_path': '',
+                'headers': [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+                'client': client,
+                'server': server,
+            }
+            exchange = _Exchange(writer, body, _keep_alive(version, headers))
+            try:
+                await app(scope, exchange.receive, exchange.send)
+            except ConnectionError:
+                return
+            except Exception:
+                traceback.print_exc()
+                if not exchange.started:
+                    await _reply(writer, 500, 'Internal Server Error')
+                return
+            if not exchange.finished or not exchange.keep_alive:
+                return
+            idle = True
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+class _Lifespan:
+    """Startup and shutdown events of an app that supports them"""
+
+    def __init__(self, app):
+        self.messages = asyncio.Queue()
+        self.replies = asyncio.Queue()
+        self.task = asyncio.ensure_future(
+            app({'type': 'lifespan', 'asgi': {'version': '3.0'}}, self.messages.get, self.replies.put))
+
+    async def send(self, phase):
+        await self.messages.put({'type': f'lifespan.{phase}'})
+        reply = asyncio.ensure_future(self.replies.get())
+        await asyncio.wait({reply, self.task}, return_when=asyncio.FIRST_COMPLETED)
+        if not reply.done():
+            # The app ended the lifespan scope (or raised): it does not use the events
+            reply.cancel()
+            return
+        if reply.result()['type'] == f'lifespan.{phase}.failed':
+            raise RuntimeError(reply.result().get('message') or f'{phase} failed')
+
+
+async def start_server(app, host='127.0.0.1', port=5000, backlog=2048, max_body_bytes=MAX_BODY_BYTES):
+    """Listening asyncio server of app; port 0 picks a free port (see server.sockets)
+
+    server.close() stops listening; server.close_connections() ends the
+    open connections as well (asyncio only has that from Python 3.13 on).
+    """
+    writers = set()
+
+    async def connected(reader, writer):
+        writers.add(writer)
+        try:
+            await _handle(app, reader, writer, max_body_bytes)
+        finally:
+            writers.discard(writer)
+
+    def close_connections():
+        for writer in list(writers):
+            writer.close()
+
+    server = await asyncio.start_server(connected, host, port, backlog=backlog, limit=MAX_HEADER_BYTES)
+    server.close_connections = close_connections
+    return server
+
+
+def serve(app, host='127.0.0.1', port=5000, max_body_bytes=MAX_BODY_BYTES):
+    """Serve app until interrupted"""
+    async def main():
+        lifespan = _Lifespan(app)
+        await lifespan.send('startup')
+        server = await start_server(app, host, port, max_body_bytes=max_body_bytes)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            server.close_connections()
+            await lifespan.send('shutdown')
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,86 @@
+"""
+Batched bulk inserts for the /api/<entity>/bulk endpoints
+
+Every record is validated before anything is written. Only when the whole
+batch is valid are the rows inserted, as one multi-row INSERT ... RETURNING
+per few hundred rows, inside a single transaction.
+"""
+
+from sqlalchemy import insert
+
+from src.models.user import db
+from src.services.counters import count_inserted_rows
+from src.services.events import record_inserted_rows
+from src.services.numbering import allocate_numbers
+
+MAX_BULK_ROWS = 5000
+
+
+def require(data, *fields):
+    """Raise ValueError naming every required field that is missing or empty"""
+    missing = [field for field in fields if data.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"Missing required field(s): {', '.join(missing)}")
+
+
+def bulk_records(data):
+    """Records of a bulk request body: either a bare array or {"records": [...]}"""
+    records = data.get('records') if isinstance(data, dict) else data
+    if not isinstance(records, list) or not records:
+        raise ValueError('Expected a non-empty list of records')
+    if len(records) > MAX_BULK_ROWS:
+        raise ValueError(f'At most {MAX_BULK_ROWS} records per request')
+    return records
+
+
+def bulk_create(model, records, build_row, check_rows=None, numbered=None):
+    """Validate and insert a batch of records; returns (response body, status code)
+
+    build_row(record) turns one record into a column mapping or raises
+    ValueError/KeyError/TypeError. check_rows(rows), if given, runs the
+    set-based checks (foreign keys, uniqueness) for all valid rows at once
+    and returns {index: error message}. numbered=(field, document type) fills
+    that field from one block of consecutive document numbers. Every row
+    mapping must have the same keys so the INSERT can be executed as one batch.
+    """
+    rows = []
+    errors = {}
+    for index, record in enumerate(records):
+        try:
+            if not isinstance(record, dict):
+                raise TypeError('Record must be an object')
+            rows.append(build_row(record))
+        except KeyError as e:
+            rows.append(None)
+            errors[index] = f'Missing required field(s): {e.args[0]}'
+        except (ValueError, TypeError) as e:
+            rows.append(None)
+            errors[index] = str(e)
+
+    if check_rows:
+        errors.update(check_rows(rows))
+
+    if errors:
+        results = [
+            {'index': index, 'status': 'invalid', 'error': errors[index]} if index in errors
+            else {'index': index, 'status': 'valid'}
+            for index in range(len(rows))
+        ]
+        return {'created': 0, 'errors': len(errors), 'results': results}, 400
+
+    if numbered:
+        field, document_type = numbered
+        for row, number in zip(rows, allocate_numbers(document_type, len(rows))):
+            row[field] = number
+    
+    # SQLite does not promise RETURNING order, but it hands out rowids in VALUES
+    # order (max(rowid) + 1 while we hold the write lock), so sorted ids line up
+    # with the input; asking SQLAlchemy to sort would fall back to one INSERT per row
+    statement = insert(model).returning(model.id)
+    ids = sorted(db.session.execute(statement, rows).scalars().all())
+    count_inserted_rows(db.session, model, rows)
+    record_inserted_rows(db.session, model, ids, rows)
+    db.session.commit()
+
+    results = [{'index': index, 'status': 'created', 'id': row_id} for index, row_id in enumerate(ids)]
+    return {'created': len(ids), 'errors': 0, 'results': results}, 201
@@ -0,0 +1,165 @@
+"""
+Read-through response cache for GET endpoints
+
+@cached(tags=(...), ttl=...) stores a view's 200 response under its path
+plus the normalized query string, tagged with the tables the payload is
+built from. Every INSERT/UPDATE/DELETE is noted per connection, and once
+the transaction commits the entries tagged with the written tables are
+dropped, so a cached statistic is never older than the last commit that
+touched its tables. Responses carry a strong ETag; a matching
+If-None-Match is answered with 304 and no body.
+
+Entries are stored as bytes (etag, mimetype and body) so any backend can
+hold them, including the ones shared between worker processes.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from functools import wraps
+
+from flask import Response, make_response, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.models.user import db
+from src.services.cache_backends import DEFAULT_TTL, make_cache
+
+# RESPONSE_CACHE_URL picks the backend (see cache_backends); use a shared one
+# (sqlite:// or redis://) when running several worker processes
+response_cache = make_cache(os.environ.get('RESPONSE_CACHE_URL'),
+                            max_entries=int(os.environ.get('RESPONSE_CACHE_SIZE', 512)))
+
+
+# In-process caches of derived data that are invalidated by the same
+# table tags as the responses (see register_tagged_cache)
+_tagged_caches = []
+
+
+def register_tagged_cache(cache):
+    """Drop entries of another cache by table tag on the same commits as the response cache"""
+    _tagged_caches.append(cache)
+    return cache
+
+
+def cache_key():
+    """Path plus the query arguments in a canonical order"""
+    args = sorted(request.args.items(multi=True))
+    return request.path + ('?' + '&'.join(f'{name}={value}' for name, value in args) if args else '')
+
+
+def _pack(etag, mimetype, body):
+    return b'\n'.join([etag.encode(), mimetype.encode(), body])
+
+
+def _serve(entry):
+    etag, mimetype, body = entry.split(b'\n', 2)
+    etag = etag.decode()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=mimetype.decode())
+    response.set_etag(etag)
+    # Browsers may keep the body but must revalidate, which costs a 304 at most
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def cached(tags=(), ttl=DEFAULT_TTL):
+    """Cache a GET view's successful responses; tags name the tables the payload reads"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = cache_key()
+            entry = response_cache.get(key)
+            if entry is not None:
+                return _serve(entry)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            body = response.get_data()
+            entry = _pack(hashlib.blake2b(body, digest_size=16).hexdigest(), response.mimetype, body)
+            response_cache.set(key, entry, tags=tags, ttl=ttl)
+            return _serve(entry)
+        return wrapper
+    return decorator
+
+
+def versioned(version_of, ttl=DEFAULT_TTL):
+    """Cache a GET view under a version the caller can read cheaply, instead of table tags
+
+    version_of(**view_args) returns a string that changes whenever the
+    payload may (e.g. a per-row counter kept by triggers), or None to run
+    the view uncached. The ETag derives from the version alone, so a
+    matching If-None-Match is answered before the payload is built; entries
+    of older versions are never looked up again and age out of the cache.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = version_of(*args, **kwargs)
+            if version is None:
+                return view(*args, **kwargs)
+
+            key = f'{cache_key()}@{version}'
+            etag = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+            if request.if_none_match.contains(etag):
+                return _serve(_pack(etag, '', b''))
+
+            entry = response_cache.get(key)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                entry = _pack(etag, response.mimetype, response.get_data())
+                response_cache.set(key, entry, ttl=ttl)
+            return _serve(entry)
+        return wrapper
+    return decorator
+
+
+# Invalidation: remember which tables each connection wrote to, act on commit
+
+WRITE_STATEMENT = re.compile(r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|UPDATE|DELETE\s+FROM)\s+["`]?(\w+)', re.IGNORECASE)
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _note_written_table(conn, cursor, statement, parameters, context, executemany):
+    match = WRITE_STATEMENT.match(statement)
+    if match:
+        conn.info.setdefault('cache_tags', set()).add(match.group(1))
+
+
+@event.listens_for(Engine, 'rollback')
+def _forget_written_tables(conn):
+    conn.info.pop('cache_tags', None)
+
+
+def _invalidate(tags):
+    response_cache.invalidate(tags)
+    for cache in _tagged_caches:
+        cache.invalidate(tags)
+
+
+# Tags of the last commit on this thread, for the post-commit pass
+_committed = threading.local()
+
+
+@event.listens_for(Engine, 'commit')
+def _invalidate_on_commit(conn):
+    tags = conn.info.pop('cache_tags', None)
+    if tags:
+        _invalidate(tags)
+        _committed.tags = tags
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(session):
+    # The engine event fires just before the COMMIT reaches SQLite; a request
+    # racing with it could re-cache the old state, so invalidate once more
+    tags = getattr(_committed, 'tags', None)
+    if tags:
+        _committed.tags = None
+        _invalidate(tags)
@@ -0,0 +1,392 @@
+"""
+Storage backends for the response cache
+
+All backends share one interface - get(key), set(key, value, tags, ttl),
+invalidate(tags), clear() and len() - and make_cache() picks one from a URL:
+
+    memory://                      per-process LRU (default, single worker)
+    sqlite:///database/cache.db    one SQLite file shared by every worker on the host
+    redis://[:password@]host:6379/0  any server speaking the Redis protocol
+    none://                        no caching, every request runs its view (benchmarks)
+
+The shared backends keep entries and their tags in the shared store, so an
+invalidation issued by one worker removes the entries for all of them; no
+worker keeps a private copy that could go stale. Cache failures never
+propagate: an unreachable store is a cache miss and a no-op write.
+Values stored by the shared backends must be bytes.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote, urlsplit
+
+DEFAULT_TTL = 300
+
+
+class MemoryCache:
+    """Thread-safe LRU cache with per-entry TTL and tag-based invalidation"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}  # tag -> set of keys
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, _ = entry
+            if expires_at < time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, tags=(), ttl=DEFAULT_TTL):
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        """Drop every entry carrying any of the tags; returns how many were dropped"""
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.get(tag, set())
+            for key in keys:
+                self._discard(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class NullCache:
+    """Backend that stores nothing: every get() is a miss"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, tags=(), ttl=DEFAULT_TTL):
+        pass
+
+    def invalidate(self, tags):
+        return 0
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class _PerProcessConnections:
+    """One connection per thread, reopened after a fork (gunicorn --preload)"""
+
+    def __init__(self, connect):
+        self._connect = connect
+        self._local = threading.local()
+
+    def get(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = self._connect()
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def reset(self):
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection is not None and self._local.pid == os.getpid():
+            try:
+                connection.close()
+            except OSError:
+                pass
+
+
+class SQLiteCache:
+    """Cache in a SQLite file (WAL, memory-mapped) that all workers on the host open
+
+    Entries beyond max_entries are trimmed soonest-expiring first on write.
+    """
+
+    SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS cache_entries ('
+        'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID',
+        'CREATE TABLE IF NOT EXISTS cache_tags ('
+        'tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key)) WITHOUT ROWID',
+        'CREATE INDEX IF NOT EXISTS ix_cache_tags_key ON cache_tags (key)',
+        'CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_at ON cache_entries (expires_at)',
+        'CREATE TRIGGER IF NOT EXISTS trg_cache_entries_delete AFTER DELETE ON cache_entries BEGIN '
+        'DELETE FROM cache_tags WHERE key = OLD.key; END',
+    ]
+
+    def __init__(self, path, max_entries=512, mmap_size=64 * 1024 * 1024, timeout=2.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.mmap_size = mmap_size
+        self.timeout = timeout
+        self._connections = _PerProcessConnections(self._connect)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                     check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        for statement in self.SCHEMA:
+            connection.execute(statement)
+        return connection
+
+    def _run(self, work, default):
+        try:
+            return work(self._connections.get())
+        except sqlite3.Error:
+            self._connections.reset()
+            return default
+
+    def get(self, key):
+        def work(connection):
+            row = connection.execute(
+                'SELECT value FROM cache_entries WHERE key = ? AND expires_at >= ?', (key, time.time())
+            ).fetchone()
+            return bytes(row[0]) if row else None
+        return self._run(work, None)
+
+    def set(self, key, value, tags=(), ttl=DEFAULT_TTL):
+        def work(connection):
+            now = time.time()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute('DELETE FROM cache_entries WHERE key = ? OR expires_at < ?', (key, now))
+                connection.execute('INSERT INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)',
+                                   (key, value, now + ttl))
+                connection.executemany('INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)',
+                                       [(tag, key) for tag in tags])
+                connection.execute(
+                    'DELETE FROM cache_entries WHERE key IN ('
+                    'SELECT key FROM cache_entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+                    (self.max_entries,)
+                )
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        self._run(work, None)
+
+    def invalidate(self, tags):
+        """Drop every entry carrying any of the tags; returns how many were dropped"""
+        tags = list(tags)
+        if not tags:
+            return 0
+
+        def work(connection):
+            placeholders = ', '.join('?' * len(tags))
+            return connection.execute(
+                f'DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_tags WHERE tag IN ({placeholders}))',
+                tags
+            ).rowcount
+        return self._run(work, 0)
+
+    def clear(self):
+        def work(connection):
+            connection.execute('DELETE FROM cache_entries')
+            connection.execute('DELETE FROM cache_tags')
+        self._run(work, None)
+
+    def __len__(self):
+        return self._run(lambda connection: connection.execute(
+            'SELECT COUNT(*) FROM cache_entries WHERE expires_at >= ?', (time.time(),)
+        ).fetchone()[0], 0)
+
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+
+class RespConnection:
+    """Minimal blocking client for the Redis serialization protocol (RESP2)"""
+
+    def __init__(self, host, port, db=0, password=None, timeout=1.0):
+        self._socket = socket.create_connection((host, port), timeout=timeout)
+        self._reader = self._socket.makefile('rb')
+        if password:
+            self.command('AUTH', password)
+        if db:
+            self.command('SELECT', db)
+
+    def command(self, *args):
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands):
+        """Send all commands in one write and return their replies in order"""
+        self._socket.sendall(b''.join(self._encode(args) for args in commands))
+        replies = [self._read() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def close(self):
+        self._reader.close()
+        self._socket.close()
+
+    @staticmethod
+    def _encode(args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _read(self):
+        line = self._reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError('Connection closed by server')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            return RedisError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            return None if length < 0 else [self._read() for _ in range(length)]
+        raise ConnectionError(f'Unexpected reply type {kind!r}')
+
+
+class RedisCache:
+    """Cache in a Redis-protocol server; tags are sets of entry keys
+
+    Size is bounded by the server's maxmemory policy rather than max_entries.
+    """
+
+    # Tag sets outlive every entry they point to and are refreshed on each write
+    TAG_TTL = 24 * 3600
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, prefix='crm:cache:', timeout=1.0):
+        self.host, self.port, self.db, self.password = host, port, db, password
+        self.timeout = timeout
+        self.prefix = prefix
+        self._connections = _PerProcessConnections(
+            lambda: RespConnection(self.host, self.port, self.db, self.password, self.timeout)
+        )
+
+    @classmethod
+    def from_url(cls, url, **options):
+        parts = urlsplit(url)
+        db = parts.path.strip('/')
+        return cls(host=parts.hostname or 'localhost', port=parts.port or 6379, db=int(db or 0),
+                   password=unquote(parts.password) if parts.password else None, **options)
+
+    def _entry(self, key):
+        return f'{self.prefix}entry:{key}'
+
+    def _tag(self, tag):
+        return f'{self.prefix}tag:{tag}'
+
+    def _run(self, work, default):
+        try:
+            return work(self._connections.get())
+        except (OSError, RedisError):
+            self._connections.reset()
+            return default
+
+    def get(self, key):
+        return self._run(lambda connection: connection.command('GET', self._entry(key)), None)
+
+    def set(self, key, value, tags=(), ttl=DEFAULT_TTL):
+        entry = self._entry(key)
+        commands = [('SET', entry, value, 'PX', int(ttl * 1000))]
+        for tag in tags:
+            commands.append(('SADD', self._tag(tag), entry))
+            commands.append(('PEXPIRE', self._tag(tag), max(int(ttl), self.TAG_TTL) * 1000))
+        self._run(lambda connection: connection.pipeline(commands), None)
+
+    def invalidate(self, tags):
+        """Drop every entry carrying any of the tags; returns how many were dropped"""
+        tag_keys = [self._tag(tag) for tag in tags]
+        if not tag_keys:
+            return 0
+
+        def work(connection):
+            members = connection.pipeline([('SMEMBERS', tag_key) for tag_key in tag_keys])
+            entries = sorted({entry for keys in members for entry in keys})
+            if not entries:
+                return 0
+            # SREM rather than DEL keeps keys another worker tagged in the meantime
+            replies = connection.pipeline(
+                [('DEL', *entries)] + [('SREM', tag_key, *keys) for tag_key, keys in zip(tag_keys, members) if keys]
+            )
+            return replies[0]
+        return self._run(work, 0)
+
+    def _scan(self, connection, pattern):
+        cursor = b'0'
+        while True:
+            cursor, keys = connection.command('SCAN', cursor, 'MATCH', pattern, 'COUNT', 500)
+            yield from keys
+            if cursor in (b'0', 0):
+                return
+
+    def clear(self):
+        def work(connection):
+            keys = list(self._scan(connection, f'{self.prefix}*'))
+            for start in range(0, len(keys), 500):
+                connection.command('DEL', *keys[start:start + 500])
+        self._run(work, None)
+
+    def __len__(self):
+        return self._run(lambda connection: sum(1 for _ in self._scan(connection, f'{self.prefix}entry:*')), 0)
+
+
+def make_cache(url=None, max_entries=512):
+    """Cache backend for a RESPONSE_CACHE_URL; memory:// when no URL is given"""
+    url = url or 'memory://'
+    scheme = urlsplit(url).scheme
+    if scheme == 'memory':
+        return MemoryCache(max_entries=max_entries)
+    if scheme == 'none':
+        return NullCache()
+    if scheme == 'sqlite':
+        # sqlite:///relative/path and sqlite:////absolute/path, as in SQLAlchemy URLs
+        return SQLiteCache(url[len('sqlite:///'):], max_entries=max_entries)
+    if scheme == 'redis':
+        return RedisCache.from_url(url)
+    raise ValueError(f'Unsupported cache URL: {url}')
@@ -0,0 +1,176 @@
+"""
+Materialized dashboard counters
+
+Order status counts, orders per scheduled day and the number of active
+customers live in the dashboard_counters table. Session events adjust them
+in the same transaction as every ORM insert/update/delete of an Order or
+Customer, so the dashboard reads a handful of primary keys instead of
+running COUNT queries. Core bulk inserts report their rows through
+count_inserted_rows(). Bulk Query.update()/delete() bypass the events;
+rebuild_counters() recomputes everything and reports drift.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from sqlalchemy import event, inspect, text
+
+from src.models.user import db
+from src.models.customer import Customer
+from src.models.order import Order
+from src.models.dashboard import DashboardCounter
+
+DASHBOARD_STATUSES = ('pending', 'confirmed', 'in_progress', 'completed')
+
+UPSERT_COUNTER = text(
+    'INSERT INTO dashboard_counters (name, value) VALUES (:name, :delta) '
+    'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value'
+)
+
+# Every counter, recomputed from the source tables
+ACTUAL_COUNTS = text(
+    "SELECT 'orders.status.' || status, COUNT(*) FROM orders "
+    "WHERE status IS NOT NULL GROUP BY status "
+    "UNION ALL "
+    "SELECT 'orders.scheduled.' || scheduled_date, COUNT(*) FROM orders "
+    "WHERE scheduled_date IS NOT NULL GROUP BY scheduled_date "
+    "UNION ALL "
+    "SELECT 'customers.active', COUNT(*) FROM customers WHERE is_active = 1"
+)
+
+
+def order_counter_names(status, scheduled_date):
+    names = []
+    if status:
+        names.append(f'orders.status.{status}')
+    if scheduled_date:
+        names.append(f'orders.scheduled.{scheduled_date.isoformat()}')
+    return names
+
+
+def customer_counter_names(is_active):
+    return ['customers.active'] if is_active else []
+
+
+COUNTED_ATTRIBUTES = {
+    Order: (('status', 'scheduled_date'), order_counter_names),
+    Customer: (('is_active',), customer_counter_names),
+}
+
+
+def _values(obj, attributes, before):
+    """Attribute values as persisted before (or after) the pending flush"""
+    values = []
+    for attribute in attributes:
+        history = inspect(obj).attrs[attribute].history
+        if before:
+            current = history.deleted or history.unchanged
+        else:
+            current = history.added or history.unchanged
+        values.append(current[0] if current else None)
+    return values
+
+
+def _counted(objects):
+    for obj in objects:
+        spec = COUNTED_ATTRIBUTES.get(type(obj))
+        if spec:
+            yield obj, spec
+
+
+# Make attribute sets load the previous value, so history always knows what to decrement
+for model, (attributes, _) in COUNTED_ATTRIBUTES.items():
+    for attribute in attributes:
+        event.listen(getattr(model, attribute), 'set', lambda *args: None, active_history=True)
+
+
+@event.listens_for(db.session, 'before_flush')
+def _load_deleted(session, flush_context, instances):
+    # Deleted rows must have their counted attributes loaded before the DELETE runs
+    for obj, (attributes, _) in _counted(session.deleted):
+        for attribute in attributes:
+            getattr(obj, attribute)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _update_counters(session, flush_context):
+    deltas = Counter()
+    for obj, (attributes, names) in _counted(session.new):
+        deltas.update(names(*_values(obj, attributes, before=False)))
+    for obj, (attributes, names) in _counted(session.deleted):
+        deltas.subtract(names(*_values(obj, attributes, before=True)))
+    for obj, (attributes, names) in _counted(session.dirty):
+        if not session.is_modified(obj):
+            continue
+        deltas.update(names(*_values(obj, attributes, before=False)))
+        deltas.subtract(names(*_values(obj, attributes, before=True)))
+
+    _apply_deltas(session, deltas)
+
+
+def _apply_deltas(session, deltas):
+    params = [{'name': name, 'delta': delta} for name, delta in deltas.items() if delta]
+    if params:
+        session.connection().execute(UPSERT_COUNTER, params)
+
+
+def count_inserted_rows(session, model, rows):
+    """Counter updates for rows inserted with a Core INSERT, which skips the flush events
+
+    Each row mapping must carry every counted attribute explicitly, because
+    column defaults are applied by the INSERT and are not visible here.
+    """
+    spec = COUNTED_ATTRIBUTES.get(model)
+    if not spec:
+        return
+    attributes, names = spec
+    deltas = Counter()
+    for row in rows:
+        deltas.update(names(*(row.get(attribute) for attribute in attributes)))
+    _apply_deltas(session, deltas)
+
+
+def read_dashboard_counts(today):
+    """Everything /api/orders/dashboard needs, in one primary-key lookup"""
+    week_start = today - timedelta(days=today.weekday())
+    week_days = [f'orders.scheduled.{(week_start + timedelta(days=i)).isoformat()}' for i in range(7)]
+    status_names = [f'orders.status.{status}' for status in DASHBOARD_STATUSES]
+    names = status_names + week_days + [f'orders.scheduled.{today.isoformat()}', 'customers.active']
+
+    counters = dict(
+        db.session.query(DashboardCounter.name, DashboardCounter.value)
+        .filter(DashboardCounter.name.in_(names))
+        .all()
+    )
+
+    return {
+        'order_counts': {status: counters.get(f'orders.status.{status}', 0) for status in DASHBOARD_STATUSES},
+        'todays_orders': counters.get(f'orders.scheduled.{today.isoformat()}', 0),
+        'this_week_orders': sum(counters.get(name, 0) for name in week_days),
+        'total_customers': counters.get('customers.active', 0)
+    }
+
+
+def rebuild_counters(connection, dry_run=False):
+    """Recompute every counter from scratch; returns {name: (stored, actual)} for drifted counters
+
+    With dry_run=True the table is only compared, not rewritten.
+    """
+    stored = dict(connection.execute(text('SELECT name, value FROM dashboard_counters')).fetchall())
+    actual = dict(connection.execute(ACTUAL_COUNTS).fetchall())
+
+    drift = {}
+    for name in set(stored) | set(actual):
+        if stored.get(name, 0) != actual.get(name, 0):
+            drift[name] = (stored.get(name, 0), actual.get(name, 0))
+
+    if dry_run:
+        return drift
+
+    connection.execute(text('DELETE FROM dashboard_counters'))
+    if actual:
+        connection.execute(
+            text('INSERT INTO dashboard_counters (name, value) VALUES (:name, :value)'),
+            [{'name': name, 'value': value} for name, value in actual.items()]
+        )
+    return drift
@@ -0,0 +1,333 @@
+"""
+Change feed: a transactional outbox fanned out to /api/events subscribers
+
+Session events write one outbox_events row per inserted, updated or
+deleted CRM row, in the same transaction as the change, so an event
+exists exactly when its change was committed. After each commit the
+broker reads the new rows once and offers them to every subscriber.
+
+Each subscriber buffers at most BUFFER_SIZE undelivered events. One that
+falls behind (a slow client) drops its buffer and catches up from the
+table, as does a client resuming with Last-Event-ID. SQLite has a single
+writer, so committed ids are always a gap-free prefix and reading "id >
+last seen" never skips an event. Subscribers also read the table between
+heartbeats, which is how they see commits of other worker processes.
+"""
+
+import json
+import threading
+from collections import deque
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import event, func, inspect, insert, select
+
+from src.models.communication import Communication
+from src.models.customer import Customer
+from src.models.event import OutboxEvent
+from src.models.inventory import InventoryItem
+from src.models.invoice import Invoice
+from src.models.order import Order
+from src.models.quality import QualityCheck
+from src.models.quote import Quote
+from src.models.timetracking import TimeEntry
+from src.models.user import db
+
+# Models whose changes are published, by entity name
+EVENT_ENTITIES = {
+    Customer: 'customer',
+    Order: 'order',
+    Quote: 'quote',
+    Invoice: 'invoice',
+    Communication: 'communication',
+    QualityCheck: 'quality_check',
+    TimeEntry: 'time_entry',
+    InventoryItem: 'inventory_item',
+}
+ENTITY_NAMES = frozenset(EVENT_ENTITIES.values())
+
+BUFFER_SIZE = 256
+REPLAY_LIMIT = 500
+HEARTBEAT_SECONDS = 15
+RETRY_MILLISECONDS = 3000
+MAX_SUBSCRIBERS = 100
+RETENTION_DAYS = 7
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _customer_id(obj):
+    return obj.id if isinstance(obj, Customer) else getattr(obj, 'customer_id', None)
+
+
+def _row(obj, action, changed=None):
+    state = inspect(obj)
+    # Loaded column values only: reading expired ones would query in the middle of the flush
+    data = {attr.key: state.dict[attr.key] for attr in state.mapper.column_attrs if attr.key in state.dict}
+    payload = {'data': data} if action != 'deleted' else {}
+    if changed is not None:
+        payload['changed'] = changed
+    return {
+        'entity': EVENT_ENTITIES[type(obj)],
+        'entity_id': obj.id,
+        'customer_id': _customer_id(obj),
+        'action': action,
+        'payload': json.dumps(payload, default=_json_default),
+        'created_at': datetime.utcnow()
+    }
+
+
+def _published(objects):
+    return [obj for obj in objects if type(obj) in EVENT_ENTITIES]
+
+
+@event.listens_for(db.session, 'before_flush')
+def _load_deleted(session, flush_context, instances):
+    # Deleted rows must have their customer_id loaded before the DELETE runs
+    for obj in _published(session.deleted):
+        _customer_id(obj)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _write_outbox(session, flush_context):
+    rows = [_row(obj, 'created') for obj in _published(session.new)]
+    for obj in _published(session.dirty):
+        if not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        changed = [attr.key for attr in state.mapper.column_attrs if state.attrs[attr.key].history.has_changes()]
+        if changed:
+            rows.append(_row(obj, 'updated', changed))
+    rows.extend(_row(obj, 'deleted') for obj in _published(session.deleted))
+    _write(session, rows)
+
+
+def _write(session, rows):
+    if rows:
+        session.connection().execute(insert(OutboxEvent.__table__), rows)
+        session.info['outbox_written'] = True
+
+
+def _core_row(model, row_id, customer_id, action, payload):
+    return {
+        'entity': EVENT_ENTITIES[model],
+        'entity_id': row_id,
+        'customer_id': row_id if model is Customer else customer_id,
+        'action': action,
+        'payload': json.dumps(payload, default=_json_default),
+        'created_at': datetime.utcnow()
+    }
+
+
+def record_inserted_rows(session, model, ids, rows):
+    """Outbox rows for a Core INSERT, which skips the flush events; ids line up with rows"""
+    if model in EVENT_ENTITIES:
+        _write(session, [_core_row(model, row_id, row.get('customer_id'), 'created',
+                                   {'data': {**row, 'id': row_id}})
+                         for row_id, row in zip(ids, rows)])
+
+
+def record_updated_rows(session, model, customer_ids, values):
+    """Outbox rows for a Core UPDATE of the rows {id: customer_id} with the same values"""
+    if model in EVENT_ENTITIES:
+        _write(session, [_core_row(model, row_id, customer_id, 'updated',
+                                   {'data': {**values, 'id': row_id}, 'changed': sorted(values)})
+                         for row_id, customer_id in customer_ids.items()])
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_after_commit(session):
+    if session.info.pop('outbox_written', False):
+        broker.publish()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_outbox(session):
+    session.info.pop('outbox_written', None)
+
+
+# Reading the outbox
+
+OUTBOX = OutboxEvent.__table__
+
+
+def _event(row):
+    return {
+        'id': row.id,
+        'entity': row.entity,
+        'entity_id': row.entity_id,
+        'customer_id': row.customer_id,
+        'action': row.action,
+        **json.loads(row.payload),
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    }
+
+
+def read_events(after_id, entities=None, customer_id=None, limit=REPLAY_LIMIT):
+    """Committed events with an id above after_id, oldest first"""
+    query = select(OUTBOX).where(OUTBOX.c.id > after_id)
+    if entities:
+        query = query.where(OUTBOX.c.entity.in_(sorted(entities)))
+    if customer_id is not None:
+        query = query.where(OUTBOX.c.customer_id == customer_id)
+    # Its own connection: this also runs after a commit, when the session must not query
+    with db.engine.connect() as connection:
+        rows = connection.execute(query.order_by(OUTBOX.c.id).limit(limit)).fetchall()
+    return [_event(row) for row in rows]
+
+
+def id_range():
+    """(oldest, latest) event id still in the outbox, (None, None) when it is empty"""
+    with db.engine.connect() as connection:
+        return tuple(connection.execute(select(func.min(OUTBOX.c.id), func.max(OUTBOX.c.id))).one())
+
+
+def prune_events(days=RETENTION_DAYS, now=None):
+    """Delete events older than the retention period; returns how many were deleted"""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=days)
+    return OutboxEvent.query.filter(OutboxEvent.created_at < cutoff).delete(synchronize_session=False)
+
+
+# Fan-out
+
+class Subscription:
+    """One /api/events client: its filters, position and bounded buffer"""
+
+    def __init__(self, broker, last_id, entities=None, customer_id=None, size=BUFFER_SIZE):
+        self.broker = broker
+        self.last_id = last_id
+        self.entities = frozenset(entities) if entities else None
+        self.customer_id = customer_id
+        self.size = size
+        self.buffer = deque()
+        self.lagged = False
+        self._ready = threading.Event()
+
+    def matches(self, item):
+        return ((self.entities is None or item['entity'] in self.entities)
+                and (self.customer_id is None or item['customer_id'] == self.customer_id))
+
+    def offer(self, events):
+        # Called with the broker lock held
+        for item in events:
+            if self.lagged:
+                break
+            if item['id'] <= self.last_id or not self.matches(item):
+                continue
+            if len(self.buffer) >= self.size:
+                # Too far behind: forget the buffer and read from the outbox instead
+                self.buffer.clear()
+                self.lagged = True
+            else:
+                self.buffer.append(item)
+        self._ready.set()
+
+    def catch_up(self):
+        with self.broker.lock:
+            self.buffer.clear()
+            self.lagged = True
+            self._ready.set()
+
+    def next_batch(self, timeout):
+        """Events after last_id, waiting up to timeout for new ones; [] on a quiet timeout"""
+        if not self._ready.wait(timeout):
+            # Nothing committed here; look for commits of other processes
+            self.broker.publish()
+
+        with self.broker.lock:
+            self._ready.clear()
+            events = [item for item in self.buffer if item['id'] > self.last_id]
+            self.buffer.clear()
+            lagged, self.lagged = self.lagged, False
+
+        if lagged:
+            events = read_events(self.last_id, self.entities, self.customer_id)
+            if len(events) == REPLAY_LIMIT:
+                self.catch_up()
+        if events:
+            self.last_id = events[-1]['id']
+        return events
+
+
+class EventBroker:
+    """Reads each commit's events once and offers them to every subscriber"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._publishing = threading.Lock()
+        self.subscribers = set()
+        self.last_id = None
+
+    def subscribe(self, last_event_id=None, entities=None, customer_id=None):
+        """New subscription; resumes after last_event_id, or starts with the next commit"""
+        latest = id_range()[1] or 0
+        with self.lock:
+            if len(self.subscribers) >= MAX_SUBSCRIBERS:
+                raise OverflowError('Too many event subscribers')
+            if not self.subscribers:
+                # Nothing was published while nobody listened
+                self.last_id = latest
+            subscription = Subscription(self, latest if last_event_id is None else last_event_id,
+                                        entities, customer_id)
+            self.subscribers.add(subscription)
+
+        if last_event_id is not None:
+            subscription.catch_up()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def publish(self):
+        """Offer the events committed since the last call to every subscriber"""
+        if not self.subscribers:
+            return
+        with self._publishing:
+            events = read_events(self.last_id or 0, limit=BUFFER_SIZE + 1)
+            with self.lock:
+                if len(events) > BUFFER_SIZE:
+                    # More than any buffer holds: everyone reads from the outbox
+                    for subscription in self.subscribers:
+                        subscription.buffer.clear()
+                        subscription.lagged = True
+                        subscription._ready.set()
+                    self.last_id = id_range()[1]
+                elif events:
+                    for subscription in self.subscribers:
+                        subscription.offer(events)
+                    self.last_id = events[-1]['id']
+
+
+broker = EventBroker()
+
+
+def format_event(item=None, event_name=None, event_id=None):
+    """One text/event-stream message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event_name:
+        lines.append(f'event: {event_name}')
+    lines.append('data: ' + json.dumps(item if item is not None else {}, default=_json_default))
+    return '\n'.join(lines) + '\n\n'
+
+
+def stream_events(subscription, reset=False):
+    """The text/event-stream body of one subscription; unsubscribes when the client goes away"""
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'
+        if reset:
+            # The events after the client's Last-Event-ID were pruned: reload the lists
+            yield format_event({'reason': 'events_pruned'}, 'reset', subscription.last_id)
+        while True:
+            events = subscription.next_batch(HEARTBEAT_SECONDS)
+            if not events:
+                yield ': keep-alive\n\n'
+            for item in events:
+                yield format_event(item, event_id=item['id'])
+    finally:
+        subscription.broker.unsubscribe(subscription)
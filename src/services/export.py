@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+from datetime import date, datetime, time
+
+from flask import Response, jsonify, request, stream_with_context
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+# Rows fetched from the cursor and written to the response per chunk
+BATCH_SIZE = 1000
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def _ndjson_chunks(names, rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(names, map(_plain, row))), ensure_ascii=False))
+        if len(lines) == BATCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def _csv_chunks(names, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    pending = 0
+    for row in rows:
+        writer.writerow([_plain(value) for value in row])
+        pending += 1
+        if pending == BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def export_response(query, model, filename):
+    """Stream every row of a (filtered) list query as NDJSON or CSV
+
+    Only the table's columns are selected (no ORM objects are built) and
+    rows are pulled from the cursor in batches of BATCH_SIZE while the
+    response is being written, so memory use does not grow with the table.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format '{export_format}', use ndjson or csv"}), 400
+
+    columns = list(model.__table__.columns)
+    names = [column.name for column in columns]
+    rows = (
+        query.order_by(None)
+        .order_by(model.id)
+        .with_entities(*columns)
+        .yield_per(BATCH_SIZE)
+    )
+
+    chunks = _csv_chunks(names, rows) if export_format == 'csv' else _ndjson_chunks(names, rows)
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}.{export_format}'}
+    )
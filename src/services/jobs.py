@@ -0,0 +1,248 @@
+"""
+Durable background jobs in the jobs table
+
+Request handlers call enqueue() and return; the job row is written in the
+request's own transaction, so work is queued exactly when the change that
+caused it commits. A worker process (run_job_worker.py) claims due jobs
+with a single UPDATE ... RETURNING, runs the task handler and marks the
+job succeeded in the same transaction as the handler's own writes.
+
+- Lanes: 'high' jobs (sending) are always claimed before 'default' and
+  'low' ones (dunning, reports), and a worker can be limited to some lanes
+  so slow reports never delay sending.
+- Retries: a failing job is retried after BACKOFF_BASE * 2**(attempt - 1)
+  seconds (at most BACKOFF_MAX) until max_attempts, then marked failed.
+- Idempotency: a job enqueued with a key that already exists is not added
+  again; enqueue() returns the existing job's id instead.
+- Leases: while a handler runs, the worker renews the job's lease every
+  HEARTBEAT_SECONDS from a heartbeat thread. A job whose worker died stops
+  being renewed and is handed out again once its lease (LEASE_SECONDS)
+  has expired; one that is merely slow keeps its lease, so it never runs
+  twice at the same time.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, select, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects.sqlite import insert
+
+from src.models.job import Job, LANES
+from src.models.user import db
+
+BACKOFF_BASE = 30
+BACKOFF_MAX = 3600
+LEASE_SECONDS = 600
+HEARTBEAT_SECONDS = 60
+
+Task = namedtuple('Task', 'handler lane max_attempts')
+
+# task name -> Task; filled by the @task decorators in src/services/tasks.py
+TASKS = {}
+
+# Recurring tasks: (task name, idempotency key format); the key is formatted
+# with the current time, so each task is enqueued once per day
+PERIODIC = [
+    ('dunning', 'dunning:{now:%Y-%m-%d}'),
+    ('follow_up_reminders', 'follow_up_reminders:{now:%Y-%m-%d}'),
+    ('materialize_recurring', 'materialize_recurring:{now:%Y-%m-%d}'),
+    ('prune_events', 'prune_events:{now:%Y-%m-%d}'),
+    ('prune_pdf_cache', 'prune_pdf_cache:{now:%Y-%m-%d}'),
+]
+
+CLAIM = text(
+    "UPDATE jobs SET status = 'running', locked_by = :worker, locked_at = :now, "
+    "attempts = attempts + 1, updated_at = :now "
+    "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' AND priority IN :priorities AND run_at <= :now "
+    "ORDER BY priority, run_at, id LIMIT 1) "
+    "RETURNING id, task, payload, attempts, max_attempts"
+).bindparams(bindparam('priorities', expanding=True))
+
+RENEW = text(
+    "UPDATE jobs SET locked_at = :now "
+    "WHERE id = :id AND status = 'running' AND locked_by = :worker AND attempts = :attempts"
+)
+
+
+def task(name, lane='default', max_attempts=5):
+    """Register a handler(payload) -> JSON-serializable result as a job task"""
+    def decorator(handler):
+        TASKS[name] = Task(handler, lane, max_attempts)
+        return handler
+    return decorator
+
+
+def enqueue(task_name, payload=None, idempotency_key=None, lane=None, delay=0, session=None):
+    """Queue a job in the session's transaction; returns the job id
+
+    With an idempotency key that is already queued (or done), nothing is
+    added and the existing job's id is returned.
+    """
+    if task_name not in TASKS:
+        raise ValueError(f'Unknown task: {task_name}')
+    registered = TASKS[task_name]
+    lane = lane or registered.lane
+    if lane not in LANES:
+        raise ValueError(f"Unknown lane: {lane} (expected one of {', '.join(LANES)})")
+    session = session or db.session
+
+    now = datetime.utcnow()
+    statement = insert(Job).values(
+        task=task_name,
+        payload=json.dumps(payload or {}),
+        priority=LANES.index(lane),
+        idempotency_key=idempotency_key,
+        status='queued',
+        attempts=0,
+        max_attempts=registered.max_attempts,
+        run_at=now + timedelta(seconds=delay),
+        created_at=now,
+        updated_at=now
+    )
+    if idempotency_key:
+        statement = statement.on_conflict_do_nothing(index_elements=['idempotency_key'])
+    job_id = session.execute(statement.returning(Job.id)).scalar()
+    if job_id is None:
+        job_id = session.execute(select(Job.id).where(Job.idempotency_key == idempotency_key)).scalar_one()
+    return job_id
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the next try after `attempts` failed ones"""
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+def requeue_stale(session=None, now=None):
+    """Hand out again the jobs whose worker stopped renewing its lease; returns how many"""
+    session = session or db.session
+    now = now or datetime.utcnow()
+    return session.execute(text(
+        "UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+        "finished_at = CASE WHEN attempts >= max_attempts THEN :now END, "
+        "last_error = coalesce(last_error, 'Worker lease expired'), locked_by = NULL, updated_at = :now "
+        "WHERE status = 'running' AND locked_at < :stale"
+    ), {'now': now, 'stale': now - timedelta(seconds=LEASE_SECONDS)}).rowcount
+
+
+def enqueue_periodic(now=None, session=None):
+    """Queue today's run of every recurring task (a no-op once it is queued)"""
+    now = now or datetime.utcnow()
+    return [enqueue(name, idempotency_key=key.format(now=now), session=session) for name, key in PERIODIC]
+
+
+class Heartbeat:
+    """Renews a claimed job's lease from a background thread while its handler runs
+
+    The renewal uses a connection of its own, outside the handler's
+    transaction. While the handler holds SQLite's write lock a renewal
+    waits or fails, but so would any requeue_stale() of another worker;
+    the next beat catches up.
+    """
+
+    def __init__(self, engine, job, worker_name, interval=None):
+        self.engine = engine
+        self.params = {'id': job.id, 'worker': worker_name, 'attempts': job.attempts}
+        self.interval = HEARTBEAT_SECONDS if interval is None else interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'job-{job.id}-heartbeat', daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(RENEW, {**self.params, 'now': datetime.utcnow()})
+            except OperationalError:
+                continue
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+
+class Worker:
+    """Claims and runs jobs, one at a time, in the given lanes (all by default)"""
+
+    def __init__(self, app, lanes=None, name=None, poll_interval=1.0):
+        self.app = app
+        self.lanes = list(lanes or LANES)
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.poll_interval = poll_interval
+        self._last_maintenance = None
+
+    def claim(self):
+        row = db.session.execute(CLAIM, {
+            'worker': self.name,
+            'now': datetime.utcnow(),
+            'priorities': [LANES.index(lane) for lane in self.lanes]
+        }).first()
+        db.session.commit()
+        return row
+
+    def run_once(self):
+        """Run the next due job; returns its id, or None when nothing was due"""
+        with self.app.app_context():
+            try:
+                job = self.claim()
+                if job is None:
+                    return None
+
+                mine = (Job.id == job.id) & (Job.locked_by == self.name) & (Job.attempts == job.attempts)
+                try:
+                    with Heartbeat(db.engine, job, self.name):
+                        result = TASKS[job.task].handler(json.loads(job.payload))
+                    # Handler writes and the job's completion commit together
+                    db.session.execute(update(Job).where(mine).values(
+                        status='succeeded', result=json.dumps(result), last_error=None,
+                        locked_by=None, finished_at=datetime.utcnow(), updated_at=datetime.utcnow()
+                    ))
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    now = datetime.utcnow()
+                    error = f'{type(e).__name__}: {e}'
+                    if job.attempts < job.max_attempts:
+                        values = {'status': 'queued', 'run_at': now + timedelta(seconds=retry_delay(job.attempts))}
+                    else:
+                        values = {'status': 'failed', 'finished_at': now}
+                    db.session.execute(update(Job).where(mine).values(
+                        last_error=error, locked_by=None, updated_at=now, **values
+                    ))
+                    db.session.commit()
+                return job.id
+            finally:
+                db.session.remove()
+
+    def maintain(self):
+        """Periodic housekeeping: queue recurring tasks and reclaim stale jobs"""
+        with self.app.app_context():
+            try:
+                enqueue_periodic()
+                requeue_stale()
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    def run(self, once=False):
+        """Work until interrupted; with once=True stop as soon as no job is due"""
+        while True:
+            if self._last_maintenance is None or time.monotonic() - self._last_maintenance > 60:
+                self.maintain()
+                self._last_maintenance = time.monotonic()
+            if self.run_once() is None:
+                if once:
+                    return
+                time.sleep(self.poll_interval)
+
+
+# Register the task handlers
+import src.services.tasks  # noqa: E402,F401
@@ -0,0 +1,340 @@
+"""
+Load test of every GET /api route, compared against a stored baseline
+
+benchmark_targets() lists every GET route of the app with a handful of
+concrete URLs: path parameters are filled with ids sampled from the
+database, and routes that need query parameters get the ones from
+route_queries(). run_benchmark() sends each route's URLs from several
+threads at once and reports throughput and latency percentiles per
+route; compare() lists what got slower than the baseline.
+
+The benchmark runs in-process through the test client (client_sender) or
+against a real server over HTTP (http_sender). wsgi_server() and
+asgi_server() start one in a background thread - a WSGI server with a
+fixed pool of threads, as gunicorn's threaded workers run, and the ASGI
+adapter - and slow_clients() keeps connections busy the way clients on
+a bad mobile network do, so the two can be compared under that load.
+
+A baseline is only meaningful on the machine and data set it was
+recorded with (benchmark_api.py stores both next to the numbers), so
+compare() allows TOLERANCE of noise and ignores differences below
+NOISE_FLOOR_MS (per request, also for the throughput).
+"""
+
+import asyncio
+import http.client
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from src.services.asgi import start_server
+from src.services.profiling import PERF_ENDPOINT, percentile
+
+# Streams that never end on their own
+SKIPPED_ROUTES = {'/api/events', PERF_ENDPOINT}
+
+# path parameter -> query for the ids it is sampled from; None: a fixed value
+PATH_IDS = {
+    'customer_id': 'SELECT id FROM customers',
+    'order_id': 'SELECT id FROM orders',
+    'quote_id': 'SELECT id FROM quotes',
+    'invoice_id': 'SELECT id FROM invoices',
+    'communication_id': 'SELECT id FROM communications',
+    'check_id': 'SELECT id FROM quality_checks',
+    'entry_id': 'SELECT id FROM time_entries',
+    'item_id': 'SELECT id FROM inventory_items',
+    'job_id': 'SELECT id FROM jobs',
+    'template_id': None,
+    'day': None,
+}
+# Routes that only answer for some of the rows
+ROUTE_IDS = {
+    '/api/orders/<int:order_id>/recurrence': {'order_id': 'SELECT id FROM orders WHERE is_recurring = 1'},
+}
+
+TOLERANCE = 0.5
+NOISE_FLOOR_MS = 5.0
+SAMPLE_IDS = 20
+# http_sender(): status of a request that timed out or lost its connection
+NETWORK_ERROR = 599
+
+
+def route_queries(today):
+    """Query strings for routes that answer 400 without them"""
+    month_ago = (today - timedelta(days=30)).isoformat()
+    return {
+        '/api/search': 'q=Müller',
+        '/api/orders/calendar': f'date_from={month_ago}&date_to={today.isoformat()}',
+        '/api/time-entries/report': f'date_from={month_ago}&date_to={today.isoformat()}',
+    }
+
+
+def _path_values(connection, route, name, today, rng):
+    if name == 'day':
+        return [today.isoformat()]
+    if name == 'template_id':
+        return ['1']
+    query = ROUTE_IDS.get(route, {}).get(name, PATH_IDS[name])
+    ids = connection.execute(text(query)).scalars().all()
+    return [str(row_id) for row_id in rng.sample(ids, min(len(ids), SAMPLE_IDS))]
+
+
+def benchmark_targets(app, connection, today=None, seed=0):
+    """{route rule: [URLs]} of every GET /api route; routes without a usable id are left out"""
+    today = today or date.today()
+    rng = random.Random(seed)
+    queries = route_queries(today)
+    targets = {}
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        if 'GET' not in rule.methods or not rule.rule.startswith('/api') or rule.rule in SKIPPED_ROUTES:
+            continue
+        values = {name: _path_values(connection, rule.rule, name, today, rng) for name in rule.arguments}
+        if not all(values.values()):
+            continue
+        count = max([len(choices) for choices in values.values()], default=1)
+        urls = []
+        for index in range(count):
+            _, path = rule.build({name: choices[index % len(choices)] for name, choices in values.items()},
+                                 append_unknown=False)
+            query = queries.get(rule.rule)
+            urls.append(f'{path}?{query}' if query else path)
+        targets[rule.rule] = urls
+    return targets
+
+
+def client_sender(app):
+    """send(url) -> (status, body bytes) through the app's test client, one client per thread"""
+    local = threading.local()
+
+    def send(url):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        response = local.client.get(url)
+        return response.status_code, len(response.get_data())
+    return send
+
+
+def http_sender(host, port, timeout=10):
+    """send(url) -> (status, body bytes) over HTTP, one keep-alive connection per thread"""
+    local = threading.local()
+
+    def send(url):
+        while True:
+            reused = getattr(local, 'connection', None) is not None
+            if not reused:
+                local.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+            try:
+                local.connection.request('GET', url)
+                response = local.connection.getresponse()
+                return response.status, len(response.read())
+            except (OSError, http.client.HTTPException) as e:
+                local.connection.close()
+                local.connection = None
+                # A keep-alive connection the server has closed meanwhile gets one retry
+                if not reused or isinstance(e, TimeoutError):
+                    return NETWORK_ERROR, 0
+    return send
+
+
+class _QuietHandler(WSGIRequestHandler):
+
+    def log(self, type, message, *args):
+        pass
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug's server with a fixed pool of threads, each serving one connection at a time"""
+
+    multithread = True  # wsgi.multithread, and HTTP/1.1 like any threaded server
+
+    def __init__(self, host, port, app, threads):
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix='wsgi-worker')
+        super().__init__(host, port, app, handler=_QuietHandler)
+        self.request_queue_size = 2048
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+@contextmanager
+def wsgi_server(app, threads, host='127.0.0.1'):
+    """(host, port) of a PooledWSGIServer running app in a background thread"""
+    server = PooledWSGIServer(host, 0, app, threads)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.1}, daemon=True)
+    thread.start()
+    try:
+        yield host, server.server_port
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def asgi_server(asgi_app, host='127.0.0.1'):
+    """(host, port) of the built-in ASGI server running asgi_app in a background thread"""
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(start_server(asgi_app, host, 0, max_body_bytes=asgi_app.max_body_bytes))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    async def stop():
+        server.close()
+        server.close_connections()
+        # Requests still running in the app finish first
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        if tasks:
+            await asyncio.wait(tasks)
+
+    try:
+        yield host, server.sockets[0].getsockname()[1]
+    finally:
+        asyncio.run_coroutine_threadsafe(stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+@contextmanager
+def slow_clients(host, port, url, count, seconds=5.0, ramp_seconds=2.0):
+    """count connections that each take `seconds` to send a request, read the answer and start over
+
+    Yields a dict that counts the completed and failed requests; the
+    clients stop when the block ends. All of them run on one event loop
+    in a background thread.
+    """
+    stats = {'completed': 0, 'failed': 0}
+    request = f'GET {url} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: slow-client\r\n\r\n'.encode()
+    # The request goes out in pieces, the last one after `seconds`
+    pieces = [request[index:index + 8] for index in range(0, len(request), 8)]
+    pause = seconds / len(pieces)
+    stopping = threading.Event()
+
+    async def client(delay):
+        await asyncio.sleep(delay)
+        reader = writer = None
+        while not stopping.is_set():
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                for piece in pieces:
+                    await asyncio.sleep(pause)
+                    writer.write(piece)
+                    await writer.drain()
+                head = await reader.readuntil(b'\r\n\r\n')
+                headers = dict(line.lower().split(b':', 1) for line in head.split(b'\r\n')[1:] if b':' in line)
+                if b'content-length' not in headers:
+                    raise ConnectionError('Response without Content-Length')
+                await reader.readexactly(int(headers[b'content-length']))
+                stats['completed'] += 1
+                if headers.get(b'connection', b'').strip() == b'close':
+                    writer.close()
+                    reader = writer = None
+            except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                stats['failed'] += 1
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+                await asyncio.sleep(pause)
+        if writer is not None:
+            writer.close()
+
+    async def run():
+        tasks = [asyncio.ensure_future(client(ramp_seconds * index / count)) for index in range(count)]
+        while not stopping.is_set():
+            await asyncio.sleep(0.05)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    thread = threading.Thread(target=asyncio.run, args=(run(),), daemon=True)
+    thread.start()
+    time.sleep(ramp_seconds)
+    try:
+        yield stats
+    finally:
+        stopping.set()
+        thread.join()
+
+
+def _latencies(send, urls, requests, concurrency):
+    def worker(offset):
+        timings = []
+        errors = 0
+        for index in range(offset, requests, concurrency):
+            started = time.perf_counter()
+            status, _ = send(urls[index % len(urls)])
+            timings.append(time.perf_counter() - started)
+            errors += status >= 400
+        return timings, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return sorted(timing for timings, _ in results for timing in timings), sum(errors for _, errors in results), elapsed
+
+
+def run_benchmark(send, targets, requests=50, concurrency=4, rounds=3, warmup=1):
+    """{route: {requests, errors, rps, p50_ms, p95_ms, p99_ms, max_ms}}
+
+    Every route gets `requests` requests spread over `concurrency` threads,
+    after `warmup` unmeasured rounds over its URLs. Of `rounds` measurements
+    the one with the lowest median is kept, as timeit does: the slower ones
+    mostly measure whatever else ran on the machine.
+    """
+    results = {}
+    for route, urls in targets.items():
+        for _ in range(warmup):
+            for url in urls:
+                send(url)
+        measured = []
+        for _ in range(rounds):
+            timings, errors, elapsed = _latencies(send, urls, requests, concurrency)
+            measured.append({
+                'requests': len(timings),
+                'errors': errors,
+                'rps': round(len(timings) / elapsed, 1),
+                **{f'p{q}_ms': round(percentile(timings, q) * 1000, 2) for q in (50, 95, 99)},
+                'max_ms': round(timings[-1] * 1000, 2)
+            })
+        results[route] = min(measured, key=lambda result: result['p50_ms'])
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE, noise_floor_ms=NOISE_FLOOR_MS):
+    """Regressions of results against baseline results, as readable lines
+
+    Only the median and the throughput are compared: with a few dozen
+    requests per route the tail percentiles mostly show thread scheduling.
+    """
+    regressions = []
+    for route, current in sorted(results.items()):
+        previous = baseline.get(route)
+        if previous is None:
+            continue
+        if current['errors'] > previous['errors']:
+            regressions.append(f"{route}: {current['errors']} errors (baseline {previous['errors']})")
+        if (current['p50_ms'] > previous['p50_ms'] * (1 + tolerance)
+                and current['p50_ms'] - previous['p50_ms'] > noise_floor_ms):
+            regressions.append(f"{route}: p50_ms {current['p50_ms']} (baseline {previous['p50_ms']})")
+        if (current['rps'] * (1 + tolerance) < previous['rps']
+                and 1000 / current['rps'] - 1000 / previous['rps'] > noise_floor_ms):
+            regressions.append(f"{route}: {current['rps']} requests/s (baseline {previous['rps']})")
+    return regressions
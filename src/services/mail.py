@@ -0,0 +1,42 @@
+"""
+Outgoing email over SMTP
+
+Configured through MAIL_SERVER, MAIL_PORT, MAIL_USERNAME, MAIL_PASSWORD,
+MAIL_SENDER and MAIL_USE_TLS. Without MAIL_SERVER nothing is delivered and
+send_email() returns False, so development setups run the same code paths.
+Delivery errors are raised; the job queue retries them with backoff.
+"""
+
+import os
+import smtplib
+from email.message import EmailMessage
+
+
+def mail_configured():
+    return bool(os.environ.get('MAIL_SERVER'))
+
+
+def send_email(to, subject, body, attachments=()):
+    """Send a plain-text message; attachments are (filename, bytes, mimetype) tuples
+
+    Returns True once delivered, False when no mail server is configured.
+    """
+    if not mail_configured() or not to:
+        return False
+
+    message = EmailMessage()
+    message['From'] = os.environ.get('MAIL_SENDER', 'buero@goclean-harz.de')
+    message['To'] = to
+    message['Subject'] = subject
+    message.set_content(body)
+    for filename, data, mimetype in attachments:
+        maintype, _, subtype = mimetype.partition('/')
+        message.add_attachment(data, maintype=maintype, subtype=subtype, filename=filename)
+
+    with smtplib.SMTP(os.environ['MAIL_SERVER'], int(os.environ.get('MAIL_PORT', 587)), timeout=30) as smtp:
+        if os.environ.get('MAIL_USE_TLS', 'true').lower() == 'true':
+            smtp.starttls()
+        if os.environ.get('MAIL_USERNAME'):
+            smtp.login(os.environ['MAIL_USERNAME'], os.environ.get('MAIL_PASSWORD', ''))
+        smtp.send_message(message)
+    return True
@@ -0,0 +1,139 @@
+"""
+Versioned schema migrations
+
+db.create_all() only creates missing tables, so changes to existing tables
+(indexes, new columns, triggers) are shipped as numbered migrations here.
+Each migration runs once, inside a transaction, and is recorded in the
+schema_migrations table.
+"""
+
+from datetime import datetime
+
+from src.services.counters import rebuild_counters
+from src.services.totals import install_total_triggers, reinstall_total_triggers, verify_totals
+from src.services.search import install_search_indexes
+from src.services.rollups import install_rollup_triggers, rebuild_rollups
+from src.services.portal import install_summary_triggers, rebuild_summaries
+
+MIGRATIONS = [
+    (1, 'list_view_indexes', [
+        # Foreign keys and the filter/sort columns used by the list routes
+        'CREATE INDEX IF NOT EXISTS ix_customers_is_active_created_at ON customers (is_active, created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_orders_customer_id ON orders (customer_id)',
+        'CREATE INDEX IF NOT EXISTS ix_orders_status_created_at ON orders (status, created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_orders_scheduled_date ON orders (scheduled_date)',
+        'CREATE INDEX IF NOT EXISTS ix_orders_created_at ON orders (created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_quotes_customer_id_created_at ON quotes (customer_id, created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_quotes_status_created_at ON quotes (status, created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_quotes_created_at ON quotes (created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_invoices_customer_id_created_at ON invoices (customer_id, created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_invoices_order_id ON invoices (order_id)',
+        'CREATE INDEX IF NOT EXISTS ix_invoices_status_created_at ON invoices (status, created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_invoices_status_due_date ON invoices (status, due_date)',
+        'CREATE INDEX IF NOT EXISTS ix_invoices_invoice_date ON invoices (invoice_date)',
+        'CREATE INDEX IF NOT EXISTS ix_invoices_created_at ON invoices (created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_communications_customer_id_created_at ON communications (customer_id, created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_communications_order_id_created_at ON communications (order_id, created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_communications_status_created_at ON communications (status, created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_communications_type_created_at ON communications (type, created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_communications_communication_date ON communications (communication_date DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_communications_created_at ON communications (created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_quality_checks_order_id_created_at ON quality_checks (order_id, created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_quality_checks_customer_id ON quality_checks (customer_id)',
+        'CREATE INDEX IF NOT EXISTS ix_quality_checks_inspector_id_created_at ON quality_checks (inspector_id, created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_quality_checks_status_created_at ON quality_checks (status, created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_quality_checks_check_date ON quality_checks (check_date)',
+        'CREATE INDEX IF NOT EXISTS ix_quality_checks_created_at ON quality_checks (created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_time_entries_user_id_status ON time_entries (user_id, status)',
+        'CREATE INDEX IF NOT EXISTS ix_time_entries_user_id_start_time ON time_entries (user_id, start_time DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_time_entries_order_id_start_time ON time_entries (order_id, start_time DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_time_entries_customer_id ON time_entries (customer_id)',
+        'CREATE INDEX IF NOT EXISTS ix_time_entries_status_start_time ON time_entries (status, start_time)',
+        'CREATE INDEX IF NOT EXISTS ix_time_entries_start_time ON time_entries (start_time DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_time_entries_created_at ON time_entries (created_at DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_quote_items_quote_id ON quote_items (quote_id)',
+        'CREATE INDEX IF NOT EXISTS ix_invoice_items_invoice_id ON invoice_items (invoice_id)',
+        'CREATE INDEX IF NOT EXISTS ix_inventory_items_name ON inventory_items (name)',
+        'CREATE INDEX IF NOT EXISTS ix_inventory_items_category_name ON inventory_items (category, name)',
+        'CREATE INDEX IF NOT EXISTS ix_inventory_items_status_name ON inventory_items (status, name)',
+        'CREATE INDEX IF NOT EXISTS ix_inventory_transactions_item_id_transaction_date ON inventory_transactions (item_id, transaction_date DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_inventory_transactions_type_transaction_date ON inventory_transactions (transaction_type, transaction_date DESC)',
+        'CREATE INDEX IF NOT EXISTS ix_inventory_transactions_transaction_date ON inventory_transactions (transaction_date DESC)',
+    ]),
+    (2, 'dashboard_counters', [
+        # Table comes from create_all(); seed it from the existing rows
+        rebuild_counters,
+    ]),
+    (3, 'document_totals', [
+        install_total_triggers,
+        # Bring existing rows in line with the trigger arithmetic
+        lambda connection: verify_totals(connection, repair=True),
+    ]),
+    (4, 'full_text_search', [
+        # FTS5 tables are virtual, so create_all() never creates them
+        install_search_indexes,
+    ]),
+    (5, 'time_rollups', [
+        # Table comes from create_all(); triggers keep it current from now on
+        install_rollup_triggers,
+        rebuild_rollups,
+    ]),
+    (6, 'customer_summaries', [
+        # Table comes from create_all(); triggers keep it current from now on
+        install_summary_triggers,
+        rebuild_summaries,
+    ]),
+    (7, 'order_schedule_indexes', [
+        # A customer's next and latest orders are looked up by (customer_id,
+        # scheduled_date); the composite index also serves plain customer_id
+        # lookups, so it replaces ix_orders_customer_id from migration 1
+        'CREATE INDEX IF NOT EXISTS ix_orders_customer_id_scheduled_date ON orders (customer_id, scheduled_date)',
+        'DROP INDEX IF EXISTS ix_orders_customer_id',
+        # Partial index over the few recurring orders, so load_series() finds
+        # the series templates without scanning the one-off orders
+        'CREATE INDEX IF NOT EXISTS ix_orders_recurring_scheduled_date ON orders (scheduled_date) WHERE is_recurring = 1',
+    ]),
+    (8, 'total_rounding', [
+        # Triggers from migration 3 rounded half cents like 1.005 down; fix the amounts they stored
+        reinstall_total_triggers,
+        lambda connection: verify_totals(connection, repair=True),
+    ]),
+]
+
+
+def applied_versions(connection):
+    """Return the set of migration versions already applied to this database"""
+    connection.exec_driver_sql(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version INTEGER PRIMARY KEY, '
+        'name VARCHAR(100) NOT NULL, '
+        'applied_at DATETIME NOT NULL)'
+    )
+    rows = connection.exec_driver_sql('SELECT version FROM schema_migrations').fetchall()
+    return {row[0] for row in rows}
+
+
+def run_migrations(engine):
+    """Apply every pending migration in version order; returns the versions applied"""
+    applied = []
+    with engine.begin() as connection:
+        done = applied_versions(connection)
+        for version, name, steps in MIGRATIONS:
+            if version in done:
+                continue
+            for step in steps:
+                if callable(step):
+                    step(connection)
+                else:
+                    connection.exec_driver_sql(step)
+            connection.exec_driver_sql(
+                'INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)',
+                (version, name, datetime.utcnow())
+            )
+            applied.append(version)
+
+    if applied:
+        # Refresh planner statistics so the new indexes are actually chosen
+        with engine.begin() as connection:
+            connection.exec_driver_sql('ANALYZE')
+    return applied
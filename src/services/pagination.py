@@ -0,0 +1,110 @@
+import base64
+import json
+from datetime import date, datetime
+
+from flask import request
+from sqlalchemy import or_
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 500
+
+
+def encode_cursor(sort_value, row_id):
+    """Opaque cursor for the position just after (sort_value, row_id)"""
+    if isinstance(sort_value, (datetime, date)):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_column):
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+    python_type = sort_column.type.python_type
+    if python_type is datetime:
+        sort_value = datetime.fromisoformat(sort_value)
+    elif python_type is date:
+        sort_value = date.fromisoformat(sort_value)
+    return sort_value, int(row_id)
+
+
+def count_rows(query, id_column):
+    """Row count of a list query
+
+    Counts the ids rather than wrapping the full SELECT, so nothing the
+    payload needs (related names, derived columns) is computed for the
+    count and SQLite can count along the smallest index.
+    """
+    return query.order_by(None).with_entities(id_column).count()
+
+
+def keyset_requested():
+    """Cursor mode is opt-in: it is used as soon as ?after= or ?limit= is present"""
+    return 'after' in request.args or 'limit' in request.args
+
+
+def keyset_paginate(query, sort_column, id_column, descending=True, after=None,
+                    limit=DEFAULT_LIMIT, with_total=False):
+    """Seek to the cursor instead of OFFSET, so deep pages cost the same as page 1
+
+    Rows are ordered by sort_column (desc or asc) with id ascending as the
+    tie-breaker, which is the order the single-column and (filter, sort)
+    indexes already store rows in. sort_column must be NOT NULL in practice.
+    """
+    total = count_rows(query, id_column) if with_total else None
+
+    if after:
+        sort_value, last_id = decode_cursor(after, sort_column)
+        # Written as a range plus a residual filter so SQLite can seek on the index
+        if descending:
+            query = query.filter(sort_column <= sort_value,
+                                 or_(sort_column < sort_value, id_column > last_id))
+        else:
+            query = query.filter(sort_column >= sort_value,
+                                 or_(sort_column > sort_value, id_column > last_id))
+
+    order = sort_column.desc() if descending else sort_column.asc()
+    rows = query.order_by(None).order_by(order, id_column.asc()).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+    meta = {'next_cursor': next_cursor, 'has_more': has_more, 'limit': limit}
+    if with_total:
+        meta['total'] = total
+    return rows, meta
+
+
+def paginate_request(query, sort_column, id_column, descending=True):
+    """Page a list query the way the request asks for
+
+    Default is the classic ?page=&per_page= pagination (with total/pages);
+    ?after=<cursor>&limit= switches to keyset pagination, where the total
+    count is only computed when ?with_total=true is passed.
+    Returns (items, metadata for the response body).
+    """
+    if keyset_requested():
+        limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int) or DEFAULT_LIMIT, 1), MAX_LIMIT)
+        with_total = request.args.get('with_total', '').lower() in ('1', 'true', 'yes')
+        return keyset_paginate(query, sort_column, id_column, descending=descending,
+                               after=request.args.get('after') or None, limit=limit,
+                               with_total=with_total)
+
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False, count=False)
+    total = count_rows(query, id_column)
+    return pagination.items, {
+        'total': total,
+        'pages': -(-total // pagination.per_page),
+        'current_page': page
+    }
@@ -0,0 +1,635 @@
+"""
+PDF rendering for invoices, quotes and quote templates
+
+Documents are rendered from plain dicts of preformatted strings (built by
+invoice_document(), quote_document() and template_document()), so rendering
+never touches the database and can run in worker processes.
+
+- Layouts are compiled once at import: letterhead, footer and table header
+  become finished PDF operators, and the '{field}' texts are parsed into
+  segments that only need the values filled in.
+- Text is set in the PDF standard fonts Helvetica and Helvetica-Bold with
+  WinAnsi encoding (umlauts, ß and € included). Nothing has to be embedded;
+  the glyph widths used for alignment and line wrapping are built once per
+  process.
+- A rendered file is stored on disk under the hash of its layout and its
+  data. An unchanged document is served from that file without rendering,
+  and any change to it (or to the layouts) yields a new key, so the cache
+  never needs invalidating. Deleting the directory is always safe; the
+  daily prune_pdf_cache job drops the least recently used files once it
+  grows past PDF_CACHE_MAX_BYTES.
+- render_batch() renders many documents in a process pool, e.g. for the
+  month-end invoice run (render_invoice_pdfs.py).
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from string import Formatter
+
+from flask import send_file
+
+from src.services.totals import from_cents, line_total_cents, tax_cents
+
+# Bump when the renderer output changes without a change to the layout specs
+RENDERER_VERSION = 1
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+# Files used this recently are never pruned: a request may be about to send them
+CACHE_MIN_AGE_SECONDS = 3600
+
+PAGE_WIDTH, PAGE_HEIGHT = 595.28, 841.89  # A4 in points
+LEFT, RIGHT = 62.0, 547.0
+CONTENT_TOP, CONTENT_BOTTOM = 760.0, 90.0
+
+COMPANY_LINE = os.environ.get('PDF_COMPANY_LINE', 'GoClean Harz')
+FOOTER_LINE = os.environ.get('PDF_FOOTER_LINE',
+                             'GoClean Harz - Ihr Partner für professionelle Reinigungsdienstleistungen')
+
+# Fewer documents than this are rendered in-process; a pool costs more to start
+MIN_POOL_BATCH = 32
+
+
+# Fonts
+
+FONTS = {'regular': ('F1', 'Helvetica'), 'bold': ('F2', 'Helvetica-Bold')}
+
+# Widths in 1/1000 em of the characters 32-126
+_ASCII_WIDTHS = {
+    'Helvetica': (
+        278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+        1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+        333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+        556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+    ),
+    'Helvetica-Bold': (
+        278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+        556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+        975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+        667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+        333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+        611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+    ),
+}
+
+# WinAnsi code -> (regular, bold) width for the non-ASCII characters we use
+_EXTRA_WIDTHS = {
+    0x80: (556, 556),  # €
+    0x84: (333, 500),  # „
+    0x93: (333, 500),  # “
+    0x94: (333, 500),  # ”
+    0x95: (350, 350),  # •
+    0x96: (556, 556),  # –
+    0x97: (1000, 1000),  # —
+    0xA0: (278, 278),
+    0xA7: (556, 556),  # §
+    0xB0: (400, 400),  # °
+    0xB2: (333, 333),  # ²
+    0xB3: (333, 333),  # ³
+    0xB7: (278, 278),  # ·
+    0xC4: (667, 722),  # Ä
+    0xD6: (778, 778),  # Ö
+    0xDC: (722, 722),  # Ü
+    0xDF: (611, 611),  # ß
+    0xE4: (556, 556),  # ä
+    0xE8: (556, 556),  # è
+    0xE9: (556, 556),  # é
+    0xF6: (556, 611),  # ö
+    0xFC: (556, 611),  # ü
+}
+
+
+@lru_cache(maxsize=None)
+def font_widths(style):
+    """Widths of all 256 WinAnsi codes for a font style, built once per process"""
+    _, base_font = FONTS[style]
+    bold = base_font.endswith('Bold')
+    widths = [556] * 256
+    widths[32:127] = _ASCII_WIDTHS[base_font]
+    for code, pair in _EXTRA_WIDTHS.items():
+        widths[code] = pair[bold]
+    return tuple(widths)
+
+
+def load_fonts():
+    """Build every font's metrics up front (process pool initializer)"""
+    for style in FONTS:
+        font_widths(style)
+
+
+def encode(text):
+    return str(text).replace('\t', ' ').encode('cp1252', 'replace')
+
+
+def text_width(text, style='regular', size=10):
+    widths = font_widths(style)
+    return sum(widths[code] for code in encode(text)) * size / 1000
+
+
+def wrap(text, width, style='regular', size=10):
+    """Lines of at most `width` points; newlines in the text start new lines"""
+    lines = []
+    space = text_width(' ', style, size)
+    for paragraph in str(text or '').split('\n'):
+        line, line_width = [], 0.0
+        for word in paragraph.split():
+            word_width = text_width(word, style, size)
+            while word_width > width:
+                # A single word wider than the column is broken by characters
+                cut = len(word)
+                while cut > 1 and text_width(word[:cut], style, size) > width:
+                    cut -= 1
+                if line:
+                    lines.append(' '.join(line))
+                    line, line_width = [], 0.0
+                lines.append(word[:cut])
+                word = word[cut:]
+                word_width = text_width(word, style, size)
+            if line and line_width + space + word_width > width:
+                lines.append(' '.join(line))
+                line, line_width = [], 0.0
+            line_width += (space if line else 0) + word_width
+            line.append(word)
+        lines.append(' '.join(line))
+    return lines
+
+
+# PDF operators
+
+def _literal(data):
+    return b'(' + data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)').replace(b'\r', b'') + b')'
+
+
+def text_op(x, y, text, style='regular', size=10, align='left'):
+    if align == 'right':
+        x -= text_width(text, style, size)
+    elif align == 'center':
+        x -= text_width(text, style, size) / 2
+    font, _ = FONTS[style]
+    return f'BT /{font} {size:g} Tf {x:.2f} {y:.2f} Td '.encode() + _literal(encode(text)) + b' Tj ET\n'
+
+
+def line_op(x1, y1, x2, y2, width=0.5):
+    return f'{width:g} w {x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S\n'.encode()
+
+
+# Layouts
+
+class TextTemplate:
+    """A '{field}' text parsed once; fields missing from the values render empty"""
+
+    def __init__(self, source):
+        self.source = source
+        self.segments = [(literal, field) for literal, field, _, _ in Formatter().parse(source)]
+
+    def __call__(self, values):
+        return ''.join(literal + (str(values.get(field) or '') if field is not None else '')
+                       for literal, field in self.segments)
+
+
+# (heading, x, alignment)
+TABLE_COLUMNS = [
+    ('Pos.', LEFT, 'left'),
+    ('Beschreibung', LEFT + 28, 'left'),
+    ('Menge', 345.0, 'right'),
+    ('Einheit', 352.0, 'left'),
+    ('Einzelpreis', 470.0, 'right'),
+    ('Gesamt', RIGHT, 'right'),
+]
+DESCRIPTION_WIDTH = 345.0 - 40 - (LEFT + 28)
+ROW_LEADING = 12.0
+
+_LETTERHEAD = b''.join([
+    text_op(LEFT, 800, COMPANY_LINE, 'bold', 16),
+    line_op(LEFT, 790, RIGHT, 790),
+    line_op(LEFT, 62, RIGHT, 62),
+    text_op(LEFT, 50, FOOTER_LINE, 'regular', 8),
+])
+
+_TABLE_HEADER = b''.join(
+    [text_op(x, 0, heading, 'bold', 9, align) for heading, x, align in TABLE_COLUMNS]
+)
+
+
+class Layout:
+    """A document type's texts, compiled once"""
+
+    def __init__(self, title, fields, intro='', closing=''):
+        self.spec = {'title': title, 'fields': fields, 'intro': intro, 'closing': closing}
+        self.title = TextTemplate(title)
+        # Labels are static and pre-rendered; only the values are set per document
+        self.fields = [
+            (text_op(360, CONTENT_TOP - 14 * row, label, 'regular', 9), TextTemplate(value))
+            for row, (label, value) in enumerate(fields)
+        ]
+        self.intro = TextTemplate(intro)
+        self.closing = TextTemplate(closing)
+
+
+LAYOUTS = {
+    'invoice': Layout(
+        title='Rechnung {invoice_number}',
+        fields=[('Rechnungsnummer', '{invoice_number}'), ('Rechnungsdatum', '{invoice_date}'),
+                ('Fällig am', '{due_date}'), ('Kundennummer', '{customer_number}')],
+        intro='Vielen Dank für Ihren Auftrag. Wir berechnen Ihnen die folgenden Leistungen:',
+        closing='Bitte überweisen Sie den Gesamtbetrag bis zum {payment_due} unter Angabe der '
+                'Rechnungsnummer {invoice_number}.\n{notes}',
+    ),
+    'quote': Layout(
+        title='Angebot {quote_number}',
+        fields=[('Angebotsnummer', '{quote_number}'), ('Datum', '{quote_date}'),
+                ('Gültig bis', '{valid_until}'), ('Kundennummer', '{customer_number}')],
+        intro='{title}\n{description}',
+        closing='{terms_conditions}',
+    ),
+    'quote_template': Layout(
+        title='{name}',
+        fields=[('Vorlage', '{template_id}')],
+        intro='{description}',
+        closing='Musterangebot - alle Mengen und Preise sind Standardwerte der Vorlage.',
+    ),
+}
+
+# Part of every cache key, so changed layouts never serve old files
+LAYOUT_DIGEST = hashlib.blake2b(json.dumps(
+    [RENDERER_VERSION, COMPANY_LINE, FOOTER_LINE, {name: layout.spec for name, layout in LAYOUTS.items()}],
+    sort_keys=True
+).encode(), digest_size=16).digest()
+
+
+# Rendering
+
+class _Pages:
+    """Content streams of the pages being laid out, top to bottom"""
+
+    def __init__(self):
+        self.pages = []
+        self.new_page()
+
+    def new_page(self):
+        self.ops = [_LETTERHEAD]
+        self.pages.append(self.ops)
+        self.y = CONTENT_TOP
+
+    def ensure(self, height, table_header=False):
+        if self.y - height < CONTENT_BOTTOM:
+            self.new_page()
+            if table_header:
+                self.table_header()
+
+    def text(self, x, text, style='regular', size=10, align='left'):
+        self.ops.append(text_op(x, self.y, text, style, size, align))
+
+    def paragraph(self, text, style='regular', size=10, leading=14.0):
+        for line in wrap(text, RIGHT - LEFT, style, size):
+            self.ensure(leading)
+            if line:
+                self.text(LEFT, line, style, size)
+            self.y -= leading
+
+    def table_header(self):
+        # The header is compiled at y=0 and moved into place with a translation
+        self.ops.append(f'q 1 0 0 1 0 {self.y:.2f} cm\n'.encode() + _TABLE_HEADER + b'Q\n')
+        self.ops.append(line_op(LEFT, self.y - 4, RIGHT, self.y - 4))
+        self.y -= 18
+
+
+def render(document):
+    """PDF bytes of a document dict"""
+    layout = LAYOUTS[document['layout']]
+    values = document['values']
+    pages = _Pages()
+
+    # Address block left, document fields right
+    recipient_y = CONTENT_TOP
+    pages.ops.append(text_op(LEFT, recipient_y + 14, COMPANY_LINE, 'regular', 7))
+    for line in document.get('recipient', []):
+        pages.ops.append(text_op(LEFT, recipient_y, line, 'regular', 10))
+        recipient_y -= 13
+    for row, (label, value) in enumerate(layout.fields):
+        pages.ops.append(label)
+        pages.ops.append(text_op(RIGHT, CONTENT_TOP - 14 * row, value(values), 'regular', 9, 'right'))
+
+    pages.y = min(recipient_y, CONTENT_TOP - 14 * len(layout.fields)) - 40
+    pages.text(LEFT, layout.title(values), 'bold', 14)
+    pages.y -= 24
+    pages.paragraph(layout.intro(values))
+    pages.y -= 10
+
+    pages.ensure(40)
+    pages.table_header()
+    for position, item in enumerate(document['items'], 1):
+        lines = wrap(item['description'], DESCRIPTION_WIDTH)
+        notes = wrap(item.get('notes') or '', DESCRIPTION_WIDTH, size=8) if item.get('notes') else []
+        pages.ensure(ROW_LEADING * (len(lines) + len(notes)) + 4, table_header=True)
+        pages.text(LEFT, str(position))
+        pages.text(345.0, item['quantity'], align='right')
+        pages.text(352.0, item['unit'])
+        pages.text(470.0, item['unit_price'], align='right')
+        pages.text(RIGHT, item['total_price'], align='right')
+        for line in lines:
+            pages.text(LEFT + 28, line)
+            pages.y -= ROW_LEADING
+        for line in notes:
+            pages.text(LEFT + 28, line, size=8)
+            pages.y -= ROW_LEADING
+        pages.y -= 4
+
+    totals = document['totals']
+    pages.ensure(64)
+    pages.ops.append(line_op(352.0, pages.y + 6, RIGHT, pages.y + 6))
+    pages.y -= 8
+    for label, amount, style in [('Zwischensumme', totals['subtotal'], 'regular'),
+                                 (f"MwSt. {totals['tax_rate']} %", totals['tax_amount'], 'regular'),
+                                 ('Gesamtbetrag', totals['total_amount'], 'bold')]:
+        pages.text(352.0, label, style)
+        pages.text(RIGHT, amount, style, align='right')
+        pages.y -= 14
+    pages.y -= 16
+
+    closing = layout.closing(values).strip()
+    if closing:
+        pages.paragraph(closing, size=9, leading=12.0)
+
+    return _serialize(pages.pages)
+
+
+def _serialize(pages):
+    count = len(pages)
+    objects = [None, None] + [
+        f'<< /Type /Font /Subtype /Type1 /BaseFont /{base_font} /Encoding /WinAnsiEncoding >>'.encode()
+        for _, base_font in FONTS.values()
+    ]
+    kids = []
+    for number, ops in enumerate(pages, 1):
+        page_number = text_op(RIGHT, 50, f'Seite {number} von {count}', 'regular', 8, 'right')
+        stream = zlib.compress(b''.join(ops) + page_number)
+        objects.append(b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        objects.append(b'<< /Type /Page /Parent 2 0 R /Contents %d 0 R >>' % len(objects))
+        kids.append(b'%d 0 R' % len(objects))
+
+    fonts = b' '.join(f'/{font} {index} 0 R'.encode() for index, (font, _) in enumerate(FONTS.values(), 3))
+    objects[0] = b'<< /Type /Catalog /Pages 2 0 R >>'
+    objects[1] = (b'<< /Type /Pages /Kids [' + b' '.join(kids) + b'] /Count %d ' % count +
+                  f'/MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] '.encode() +
+                  b'/Resources << /Font << ' + fonts + b' >> >> >>')
+
+    output = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(output)
+    output += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    output += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    output += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(output)
+
+
+# Documents
+
+def format_amount(value):
+    """1234.5 -> '1.234,50 €'"""
+    number = f'{value or 0:,.2f}'.replace(',', ' ').replace('.', ',').replace(' ', '.')
+    return f'{number} €'
+
+
+def format_quantity(value):
+    """2.0 -> '2', 1.25 -> '1,25'"""
+    return f'{value or 0:.3f}'.rstrip('0').rstrip('.').replace('.', ',')
+
+
+def format_rate(value):
+    return format_quantity(value if value is not None else 19.0)
+
+
+def format_date(value):
+    return value.strftime('%d.%m.%Y') if value else ''
+
+
+def _recipient(customer):
+    if customer is None:
+        return []
+    lines = [customer.company_name, f'{customer.first_name} {customer.last_name}',
+             ' '.join(filter(None, [customer.street, customer.house_number])),
+             ' '.join(filter(None, [customer.postal_code, customer.city]))]
+    return [line for line in lines if line]
+
+
+def _items(items):
+    return [{
+        'description': item.description,
+        'quantity': format_quantity(item.quantity),
+        'unit': item.unit or '',
+        'unit_price': format_amount(item.unit_price),
+        'total_price': format_amount(item.total_price),
+        'notes': item.notes or '',
+    } for item in sorted(items, key=lambda item: (item.sort_order or 0, item.id or 0))]
+
+
+def _totals(document):
+    return {
+        'subtotal': format_amount(document.subtotal),
+        'tax_rate': format_rate(document.tax_rate),
+        'tax_amount': format_amount(document.tax_amount),
+        'total_amount': format_amount(document.total_amount),
+    }
+
+
+def invoice_document(invoice):
+    customer = invoice.customer
+    return {
+        'layout': 'invoice',
+        'filename': f'{invoice.invoice_number}.pdf',
+        'recipient': _recipient(customer),
+        'values': {
+            'invoice_number': invoice.invoice_number,
+            'invoice_date': format_date(invoice.invoice_date),
+            'due_date': format_date(invoice.due_date),
+            'payment_due': format_date(invoice.due_date) or 'Erhalt der Rechnung',
+            'customer_number': customer.customer_number if customer else '',
+            'notes': invoice.notes or '',
+        },
+        'items': _items(invoice.items),
+        'totals': _totals(invoice),
+    }
+
+
+def quote_document(quote):
+    customer = quote.customer
+    return {
+        'layout': 'quote',
+        'filename': f'{quote.quote_number}.pdf',
+        'recipient': _recipient(customer),
+        'values': {
+            'quote_number': quote.quote_number,
+            'quote_date': format_date(quote.created_at),
+            'valid_until': format_date(quote.valid_until),
+            'customer_number': customer.customer_number if customer else '',
+            'title': quote.title,
+            'description': quote.description or '',
+            'terms_conditions': quote.terms_conditions or '',
+        },
+        'items': _items(quote.items),
+        'totals': _totals(quote),
+    }
+
+
+def template_document(template, tax_rate=19.0):
+    """Sample quote for one of the /api/quote-templates entries, at the template's default prices"""
+    items = []
+    subtotal = 0
+    for item in template['items']:
+        total = line_total_cents(item.get('quantity', 1), item['unit_price'])
+        subtotal += total
+        items.append({
+            'description': item['description'],
+            'quantity': format_quantity(item.get('quantity', 1)),
+            'unit': item.get('unit', 'Stück'),
+            'unit_price': format_amount(item['unit_price']),
+            'total_price': format_amount(from_cents(total)),
+            'notes': item.get('notes', ''),
+        })
+    tax = tax_cents(subtotal, tax_rate)
+    return {
+        'layout': 'quote_template',
+        'filename': f"Vorlage-{template['id']}.pdf",
+        'recipient': [],
+        'values': {
+            'template_id': str(template['id']),
+            'name': template['name'],
+            'description': template.get('description', ''),
+        },
+        'items': items,
+        'totals': {
+            'subtotal': format_amount(from_cents(subtotal)),
+            'tax_rate': format_rate(tax_rate),
+            'tax_amount': format_amount(from_cents(tax)),
+            'total_amount': format_amount(from_cents(subtotal + tax)),
+        },
+    }
+
+
+# Content-addressed file cache
+
+def document_key(document):
+    """Hash of the layouts and the document data; equal keys render to identical files"""
+    payload = json.dumps(document, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
+    return hashlib.blake2b(LAYOUT_DIGEST + payload, digest_size=20).hexdigest()
+
+
+class PdfCache:
+    """Rendered files as <directory>/<key[:2]>/<key>.pdf"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f'{key}.pdf')
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            # The modification time doubles as the last use, for prune()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, data):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so concurrent readers never see a partial file
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(descriptor, 'wb') as handle:
+            handle.write(data)
+        os.replace(temporary, path)
+        return path
+
+    def prune(self, max_bytes=CACHE_MAX_BYTES, min_age=CACHE_MIN_AGE_SECONDS, now=None):
+        """Delete the least recently used files until the cache fits max_bytes; returns how many"""
+        now = time.time() if now is None else now
+        files = []
+        total = 0
+        for directory, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if name.endswith('.tmp'):
+                    # Left behind by a writer that died before the rename
+                    if now - stat.st_mtime > min_age:
+                        os.remove(path)
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        deleted = 0
+        for mtime, size, path in sorted(files):
+            if total <= max_bytes or now - mtime < min_age:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            deleted += 1
+        return deleted
+
+
+pdf_cache = PdfCache(os.path.abspath(os.environ.get('PDF_CACHE_DIR', os.path.join(ROOT, 'database', 'pdf_cache'))))
+
+
+def cached_pdf(document):
+    """(key, path) of the document's PDF, rendering it only if this content is new"""
+    key = document_key(document)
+    path = pdf_cache.get(key) or pdf_cache.put(key, render(document))
+    return key, path
+
+
+def pdf_response(document, as_attachment=False):
+    """The document's PDF with its cache key as ETag (If-None-Match answers 304)"""
+    key, path = cached_pdf(document)
+    return send_file(path, mimetype='application/pdf', as_attachment=as_attachment,
+                     download_name=document['filename'], etag=key, conditional=True, max_age=0)
+
+
+def _render_into_cache(job):
+    directory, key, document = job
+    PdfCache(directory).put(key, render(document))
+    return key
+
+
+def render_batch(documents, processes=None, chunksize=8):
+    """Render every document that is not cached yet; returns (rendered, already cached)
+
+    Batches of MIN_POOL_BATCH or more are spread over a process pool
+    (processes=None uses one per CPU); workers write straight into the cache.
+    """
+    pending = {}
+    total = 0
+    for document in documents:
+        total += 1
+        key = document_key(document)
+        if key not in pending and pdf_cache.get(key) is None:
+            pending[key] = document
+    jobs = [(pdf_cache.directory, key, document) for key, document in pending.items()]
+
+    if processes == 1 or len(jobs) < MIN_POOL_BATCH:
+        for job in jobs:
+            _render_into_cache(job)
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=load_fonts) as pool:
+            for _ in pool.map(_render_into_cache, jobs, chunksize=chunksize):
+                pass
+    return len(jobs), total - len(jobs)
@@ -0,0 +1,299 @@
+"""
+Customer portal summaries
+
+customer_summaries holds one row per customer with the figures the portal
+shows on every page: open orders, unpaid invoices and their amount, the
+message count and the next appointment. SQLite triggers (migration 6) on
+customers, orders, invoices, communications and the recurrence tables
+adjust a customer's row in the same statement as every write, and bump
+its version. Counts and amounts move by deltas; the next appointment and
+the last message are re-read for the one customer through their
+customer_id indexes.
+
+The version is what portal responses are cached and validated against
+(see cache.versioned): a conditional request costs one primary-key seek,
+and writes for one customer leave every other customer's entries alone.
+"""
+
+from datetime import date, timedelta
+
+from src.models.communication import Communication
+from src.models.customer import CustomerSummary
+from src.models.invoice import Invoice
+from src.models.order import Order
+from src.models.user import db
+from src.services.recurrence import virtual_occurrences
+
+OPEN_ORDER_STATUSES = ('pending', 'confirmed', 'in_progress')
+UNPAID_INVOICE_STATUSES = ('sent', 'overdue')
+
+# Recurring orders are looked ahead this far for the next appointment
+NEXT_APPOINTMENT_DAYS = 180
+MESSAGE_LIMIT = 20
+MAX_MESSAGE_LIMIT = 100
+ORDER_LIMIT = 200
+
+COUNTERS = ('open_orders', 'unpaid_invoices', 'unpaid_amount', 'message_count')
+
+
+def _sql_list(values):
+    return '(' + ', '.join(f"'{value}'" for value in values) + ')'
+
+
+OPEN = _sql_list(OPEN_ORDER_STATUSES)
+UNPAID = _sql_list(UNPAID_INVOICE_STATUSES)
+
+
+def _open(row):
+    return f'({row}.status IN {OPEN})'
+
+
+def _unpaid(row):
+    return f'({row}.status IN {UNPAID})'
+
+
+def _unpaid_amount(row):
+    return f'(CASE WHEN {row}.status IN {UNPAID} THEN coalesce({row}.total_amount, 0) ELSE 0 END)'
+
+
+def _adjust(customer, **deltas):
+    """Add the deltas to a customer's row and bump its version, creating the row on first use"""
+    values = ', '.join(str(deltas.get(column, 0)) for column in COUNTERS)
+    updates = ''.join(f', {column} = {column} + excluded.{column}' for column in deltas)
+    return (
+        f'INSERT INTO customer_summaries (customer_id, version, {", ".join(COUNTERS)}) '
+        f'SELECT {customer}, 1, {values} WHERE EXISTS (SELECT 1 FROM customers WHERE id = {customer}) '
+        f'ON CONFLICT(customer_id) DO UPDATE SET version = version + 1{updates};'
+    )
+
+
+def _refresh_next_appointment(*customers):
+    return (
+        f'UPDATE customer_summaries SET (next_appointment, next_order_id) = ('
+        f'SELECT scheduled_date, id FROM orders WHERE orders.customer_id = customer_summaries.customer_id '
+        f"AND status IN {OPEN} AND scheduled_date >= date('now', 'localtime') "
+        f'ORDER BY scheduled_date, id LIMIT 1) '
+        f'WHERE customer_id IN ({", ".join(customers)});'
+    )
+
+
+def _refresh_last_message(*customers):
+    return (
+        f'UPDATE customer_summaries SET last_message_at = ('
+        f'SELECT max(created_at) FROM communications '
+        f'WHERE communications.customer_id = customer_summaries.customer_id) '
+        f'WHERE customer_id IN ({", ".join(customers)});'
+    )
+
+
+def _series_customer(row):
+    return f'(SELECT customer_id FROM orders WHERE id = {row}.order_id)'
+
+
+def _negate(delta):
+    return f'-{delta}'
+
+
+SUMMARY_TRIGGERS = [
+    'CREATE TRIGGER IF NOT EXISTS trg_customers_summary_insert AFTER INSERT ON customers BEGIN '
+    f'{_adjust("NEW.id")} END',
+
+    'CREATE TRIGGER IF NOT EXISTS trg_customers_summary_update AFTER UPDATE ON customers BEGIN '
+    f'{_adjust("NEW.id")} END',
+
+    'CREATE TRIGGER IF NOT EXISTS trg_customers_summary_delete AFTER DELETE ON customers BEGIN '
+    'DELETE FROM customer_summaries WHERE customer_id = OLD.id; END',
+
+    'CREATE TRIGGER IF NOT EXISTS trg_orders_summary_insert AFTER INSERT ON orders BEGIN '
+    f'{_adjust("NEW.customer_id", open_orders=_open("NEW"))} '
+    f'{_refresh_next_appointment("NEW.customer_id")} END',
+
+    'CREATE TRIGGER IF NOT EXISTS trg_orders_summary_update AFTER UPDATE ON orders BEGIN '
+    f'{_adjust("OLD.customer_id", open_orders=_negate(_open("OLD")))} '
+    f'{_adjust("NEW.customer_id", open_orders=_open("NEW"))} '
+    f'{_refresh_next_appointment("OLD.customer_id", "NEW.customer_id")} END',
+
+    'CREATE TRIGGER IF NOT EXISTS trg_orders_summary_delete AFTER DELETE ON orders BEGIN '
+    f'{_adjust("OLD.customer_id", open_orders=_negate(_open("OLD")))} '
+    f'{_refresh_next_appointment("OLD.customer_id")} END',
+
+    'CREATE TRIGGER IF NOT EXISTS trg_invoices_summary_insert AFTER INSERT ON invoices BEGIN '
+    f'{_adjust("NEW.customer_id", unpaid_invoices=_unpaid("NEW"), unpaid_amount=_unpaid_amount("NEW"))} END',
+
+    # Also fires for the total_amount updates of the document_totals triggers
+    'CREATE TRIGGER IF NOT EXISTS trg_invoices_summary_update AFTER UPDATE ON invoices BEGIN '
+    f'{_adjust("OLD.customer_id", unpaid_invoices=_negate(_unpaid("OLD")), unpaid_amount=_negate(_unpaid_amount("OLD")))} '
+    f'{_adjust("NEW.customer_id", unpaid_invoices=_unpaid("NEW"), unpaid_amount=_unpaid_amount("NEW"))} END',
+
+    'CREATE TRIGGER IF NOT EXISTS trg_invoices_summary_delete AFTER DELETE ON invoices BEGIN '
+    f'{_adjust("OLD.customer_id", unpaid_invoices=_negate(_unpaid("OLD")), unpaid_amount=_negate(_unpaid_amount("OLD")))} END',
+
+    'CREATE TRIGGER IF NOT EXISTS trg_communications_summary_insert AFTER INSERT ON communications BEGIN '
+    f'{_adjust("NEW.customer_id", message_count=1)} '
+    f'{_refresh_last_message("NEW.customer_id")} END',
+
+    'CREATE TRIGGER IF NOT EXISTS trg_communications_summary_update AFTER UPDATE ON communications BEGIN '
+    f'{_adjust("OLD.customer_id", message_count=-1)} '
+    f'{_adjust("NEW.customer_id", message_count=1)} '
+    f'{_refresh_last_message("OLD.customer_id", "NEW.customer_id")} END',
+
+    'CREATE TRIGGER IF NOT EXISTS trg_communications_summary_delete AFTER DELETE ON communications BEGIN '
+    f'{_adjust("OLD.customer_id", message_count=-1)} '
+    f'{_refresh_last_message("OLD.customer_id")} END',
+]
+
+# Rules and exceptions change the customer's virtual appointments: only the version moves
+for _table in ('recurrence_rules', 'recurrence_exceptions'):
+    for _event, _row in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD')):
+        SUMMARY_TRIGGERS.append(
+            f'CREATE TRIGGER IF NOT EXISTS trg_{_table}_summary_{_event} AFTER {_event.upper()} ON {_table} '
+            f'BEGIN {_adjust(_series_customer(_row))} END'
+        )
+
+REBUILD = (
+    f'INSERT INTO customer_summaries (customer_id, version, {", ".join(COUNTERS)}) '
+    f'SELECT customers.id, 1, '
+    f'(SELECT count(*) FROM orders WHERE customer_id = customers.id AND status IN {OPEN}), '
+    f'(SELECT count(*) FROM invoices WHERE customer_id = customers.id AND status IN {UNPAID}), '
+    f'(SELECT coalesce(sum(total_amount), 0) FROM invoices WHERE customer_id = customers.id AND status IN {UNPAID}), '
+    f'(SELECT count(*) FROM communications WHERE customer_id = customers.id) '
+    f'FROM customers WHERE true '
+    f'ON CONFLICT(customer_id) DO UPDATE SET version = version + 1, '
+    + ', '.join(f'{column} = excluded.{column}' for column in COUNTERS)
+)
+
+
+def install_summary_triggers(connection):
+    for statement in SUMMARY_TRIGGERS:
+        connection.exec_driver_sql(statement)
+
+
+def rebuild_summaries(connection):
+    """Recompute every customer's row (migration 6, or after a bulk repair); versions keep counting up"""
+    connection.exec_driver_sql(REBUILD)
+    connection.exec_driver_sql('DELETE FROM customer_summaries WHERE customer_id NOT IN (SELECT id FROM customers)')
+    connection.exec_driver_sql(_refresh_next_appointment('SELECT id FROM customers'))
+    connection.exec_driver_sql(_refresh_last_message('SELECT id FROM customers'))
+
+
+def summary_version(customer_id):
+    """Validator for a customer's portal responses: summary version and day, or None for unknown customers"""
+    version = db.session.query(CustomerSummary.version).filter_by(customer_id=customer_id).scalar()
+    # The day is part of it because the next appointment moves on at midnight
+    return None if version is None else f'{version}.{date.today().isoformat()}'
+
+
+def load_summary(customer_id):
+    return db.session.get(CustomerSummary, customer_id, populate_existing=True)
+
+
+def next_appointment(summary, today=None):
+    """The customer's next open order or recurring occurrence from today on, or None"""
+    today = today or date.today()
+    order = None
+    if summary.next_appointment is not None and summary.next_appointment >= today:
+        order = db.session.get(Order, summary.next_order_id)
+    elif summary.next_appointment is not None:
+        # Stored before the day passed; look again from today
+        order = Order.query.filter(
+            Order.customer_id == summary.customer_id,
+            Order.status.in_(OPEN_ORDER_STATUSES),
+            Order.scheduled_date >= today
+        ).order_by(Order.scheduled_date, Order.id).first()
+
+    upcoming = virtual_occurrences(today, today + timedelta(days=NEXT_APPOINTMENT_DAYS), summary.customer_id)
+    virtual = min(upcoming, key=lambda entry: entry['scheduled_date'], default=None)
+
+    if virtual is not None and (order is None or virtual['scheduled_date'] < order.scheduled_date.isoformat()):
+        return {
+            'date': virtual['scheduled_date'],
+            'time': virtual['scheduled_time'],
+            'order_id': None,
+            'series_id': virtual['series_id'],
+            'title': virtual['title'],
+            'service_type': virtual['service_type'],
+            'virtual': True
+        }
+    if order is not None:
+        return {
+            'date': order.scheduled_date.isoformat(),
+            'time': order.scheduled_time.isoformat() if order.scheduled_time else None,
+            'order_id': order.id,
+            'series_id': None,
+            'title': order.title,
+            'service_type': order.service_type,
+            'virtual': False
+        }
+    return None
+
+
+def summary_dict(summary):
+    return {**summary.to_dict(), 'next_appointment': next_appointment(summary)}
+
+
+# The lists below read only the customer's rows through their customer_id indexes
+
+def customer_orders(customer_id, limit=ORDER_LIMIT):
+    rows = db.session.query(
+        Order.id, Order.order_number, Order.title, Order.service_type, Order.status,
+        Order.scheduled_date, Order.scheduled_time, Order.estimated_duration,
+        Order.estimated_price, Order.final_price, Order.is_recurring, Order.special_instructions
+    ).filter(
+        Order.customer_id == customer_id
+    ).order_by(Order.scheduled_date.desc(), Order.id.desc()).limit(limit).all()
+
+    return [{
+        'id': row.id,
+        'order_number': row.order_number,
+        'title': row.title,
+        'service_type': row.service_type,
+        'status': row.status,
+        'scheduled_date': row.scheduled_date.isoformat() if row.scheduled_date else None,
+        'scheduled_time': row.scheduled_time.isoformat() if row.scheduled_time else None,
+        'estimated_duration': row.estimated_duration,
+        'price': row.final_price if row.final_price is not None else row.estimated_price,
+        'is_recurring': row.is_recurring,
+        'notes': row.special_instructions
+    } for row in rows]
+
+
+def customer_invoices(customer_id):
+    rows = db.session.query(
+        Invoice.id, Invoice.invoice_number, Invoice.order_id, Invoice.invoice_date, Invoice.due_date,
+        Invoice.total_amount, Invoice.status, Invoice.payment_date, Invoice.created_at
+    ).filter(
+        Invoice.customer_id == customer_id,
+        Invoice.status != 'draft'
+    ).order_by(Invoice.created_at.desc()).all()
+
+    return [{
+        'id': row.id,
+        'invoice_number': row.invoice_number,
+        'order_id': row.order_id,
+        'invoice_date': row.invoice_date.isoformat() if row.invoice_date else None,
+        'due_date': row.due_date.isoformat() if row.due_date else None,
+        'total_amount': row.total_amount,
+        'status': row.status,
+        'payment_date': row.payment_date.isoformat() if row.payment_date else None,
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    } for row in rows]
+
+
+def customer_messages(customer_id, limit=MESSAGE_LIMIT):
+    rows = db.session.query(
+        Communication.id, Communication.order_id, Communication.type, Communication.direction,
+        Communication.subject, Communication.content, Communication.status, Communication.created_at
+    ).filter(
+        Communication.customer_id == customer_id
+    ).order_by(Communication.created_at.desc()).limit(limit).all()
+
+    return [{
+        'id': row.id,
+        'order_id': row.order_id,
+        'type': row.type,
+        'direction': row.direction,
+        'subject': row.subject,
+        'content': row.content,
+        'status': row.status,
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    } for row in rows]
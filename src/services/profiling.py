@@ -0,0 +1,346 @@
+"""
+Per-request performance profiles
+
+init_profiling(app) times every request of a Flask app: the number of SQL
+statements and the time spent in them, the slowest statement, the time
+spent building (to_dict) and encoding (JSON) the payload, and the
+response size. Each request adds one sample to a fixed-size ring buffer
+and answers with a Server-Timing header, which browser dev tools show
+next to the request. GET /api/_debug/perf summarizes the buffer per route
+with p50/p95/p99; DELETE empties it.
+
+SQL is timed through the SQLAlchemy cursor events for the main app and
+through ProfiledConnection (pass it as the sqlite3 connection factory)
+for the simple backend, where fetching the rows is counted as well.
+Only statement text is kept, never the parameters. Since the summary shows
+that text without authentication, main.py and simple_backend.py only
+profile when PERF_PROFILING=1 is set, and nothing is hooked before then.
+"""
+
+import os
+import sqlite3
+import threading
+from collections import deque, namedtuple
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+
+from flask import jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PERF_BUFFER_SIZE = int(os.environ.get('PERF_BUFFER_SIZE', 2000))
+PERF_ENDPOINT = '/api/_debug/perf'
+PERCENTILES = (50, 95, 99)
+MAX_STATEMENT_LENGTH = 500
+
+Sample = namedtuple('Sample', 'route status total_seconds db_seconds sql_count slowest_sql slowest_seconds '
+                              'to_dict_seconds json_seconds response_bytes')
+
+_current = ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    """Counters of the request running in this context"""
+
+    __slots__ = ('started', 'sql_count', 'db_seconds', 'slowest_sql', 'slowest_seconds',
+                 'to_dict_seconds', 'to_dict_depth', 'json_seconds')
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.sql_count = 0
+        self.db_seconds = 0.0
+        self.slowest_sql = None
+        self.slowest_seconds = 0.0
+        self.to_dict_seconds = 0.0
+        self.to_dict_depth = 0
+        self.json_seconds = 0.0
+
+    def statement(self, sql, seconds):
+        self.sql_count += 1
+        self.fetched(sql, seconds, seconds)
+
+    def fetched(self, sql, seconds, statement_seconds):
+        """More time on a statement, e.g. stepping through its rows; statement_seconds is its total"""
+        self.db_seconds += seconds
+        if statement_seconds > self.slowest_seconds:
+            self.slowest_seconds = statement_seconds
+            self.slowest_sql = ' '.join(sql.split())[:MAX_STATEMENT_LENGTH]
+
+    def server_timing(self, total_seconds):
+        return ', '.join([
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.sql_count} queries"',
+            f'to_dict;dur={self.to_dict_seconds * 1000:.2f}',
+            f'json;dur={self.json_seconds * 1000:.2f}',
+            f'total;dur={total_seconds * 1000:.2f}',
+        ])
+
+
+class PerfLog:
+    """Ring buffer of the latest request samples"""
+
+    def __init__(self, size=PERF_BUFFER_SIZE):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        return self._samples.maxlen
+
+    def record(self, sample):
+        with self._lock:
+            self._samples.append(sample)
+
+    def samples(self):
+        with self._lock:
+            return list(self._samples)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self, route=None):
+        """Percentiles per route, slowest p95 first"""
+        by_route = {}
+        for sample in self.samples():
+            if route is None or sample.route == route:
+                by_route.setdefault(sample.route, []).append(sample)
+
+        routes = []
+        for name, samples in by_route.items():
+            slowest = max(samples, key=lambda sample: sample.slowest_seconds)
+            routes.append({
+                'route': name,
+                'count': len(samples),
+                'errors': sum(1 for sample in samples if sample.status >= 500),
+                'total_ms': _distribution([sample.total_seconds * 1000 for sample in samples]),
+                'db_ms': _distribution([sample.db_seconds * 1000 for sample in samples]),
+                'sql_count': _distribution([sample.sql_count for sample in samples]),
+                'to_dict_ms': _distribution([sample.to_dict_seconds * 1000 for sample in samples]),
+                'json_ms': _distribution([sample.json_seconds * 1000 for sample in samples]),
+                'response_bytes': _distribution([sample.response_bytes for sample in samples
+                                                 if sample.response_bytes is not None]),
+                'slowest_statement': {
+                    'sql': slowest.slowest_sql,
+                    'ms': round(slowest.slowest_seconds * 1000, 2)
+                } if slowest.slowest_sql else None
+            })
+        routes.sort(key=lambda item: item['total_ms']['p95'], reverse=True)
+        return routes
+
+
+def percentile(ordered, q):
+    """Linear interpolation between the closest ranks of a sorted list"""
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _distribution(values):
+    if not values:
+        return {**{f'p{q}': None for q in PERCENTILES}, 'max': None}
+    ordered = sorted(values)
+    return {**{f'p{q}': round(percentile(ordered, q), 2) for q in PERCENTILES}, 'max': round(ordered[-1], 2)}
+
+
+perf_log = PerfLog()
+
+
+# SQLAlchemy statements
+
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault('profile_started', []).append(perf_counter())
+
+
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    started = conn.info.get('profile_started')
+    if profile is not None and started:
+        profile.statement(statement, perf_counter() - started.pop())
+
+
+def _listen_to_statements():
+    # Engine-wide, so only once and only when profiling is actually turned on
+    if not event.contains(Engine, 'before_cursor_execute', _start_statement):
+        event.listen(Engine, 'before_cursor_execute', _start_statement)
+        event.listen(Engine, 'after_cursor_execute', _end_statement)
+
+
+# sqlite3 statements (simple backend)
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor that reports its statements, including the time spent fetching rows"""
+
+    _sql = None
+    _elapsed = 0.0
+
+    def execute(self, sql, parameters=()):
+        started = perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._report(sql, perf_counter() - started, new=True)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._report(sql, perf_counter() - started, new=True)
+
+    def fetchone(self):
+        started = perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._report(self._sql, perf_counter() - started)
+
+    def fetchmany(self, size=None):
+        started = perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._report(self._sql, perf_counter() - started)
+
+    def fetchall(self):
+        started = perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._report(self._sql, perf_counter() - started)
+
+    def _report(self, sql, seconds, new=False):
+        profile = _current.get()
+        if profile is None or sql is None:
+            return
+        if new:
+            self._sql, self._elapsed = sql, seconds
+            profile.statement(sql, seconds)
+        else:
+            self._elapsed += seconds
+            profile.fetched(sql, seconds, self._elapsed)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """sqlite3 connection factory whose cursors report to the request profile"""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    # The C shortcuts would bypass the cursor subclass
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# Serialization
+
+class ProfiledJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, timing every encode of the request"""
+
+    def dumps(self, obj, **kwargs):
+        started = perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            profile = _current.get()
+            if profile is not None:
+                profile.json_seconds += perf_counter() - started
+
+
+def add_time(phase, seconds):
+    """Count seconds of 'to_dict' or 'json' work done outside models and Flask's JSON provider"""
+    profile = _current.get()
+    if profile is not None:
+        setattr(profile, f'{phase}_seconds', getattr(profile, f'{phase}_seconds') + seconds)
+
+
+def _timed_to_dict(to_dict):
+    @wraps(to_dict)
+    def wrapper(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return to_dict(self, *args, **kwargs)
+        # Nested calls (an invoice's items) are part of the outermost one
+        profile.to_dict_depth += 1
+        started = perf_counter()
+        try:
+            return to_dict(self, *args, **kwargs)
+        finally:
+            profile.to_dict_depth -= 1
+            if profile.to_dict_depth == 0:
+                profile.to_dict_seconds += perf_counter() - started
+    wrapper.profiled = True
+    return wrapper
+
+
+def instrument_to_dict(model_base):
+    """Time the to_dict() of every model mapped on model_base"""
+    for mapper in model_base.registry.mappers:
+        to_dict = mapper.class_.__dict__.get('to_dict')
+        if to_dict is not None and not getattr(to_dict, 'profiled', False):
+            mapper.class_.to_dict = _timed_to_dict(to_dict)
+
+
+# The Flask side
+
+def _start_request():
+    if request.path != PERF_ENDPOINT:
+        request.environ['perf.token'] = _current.set(RequestProfile())
+
+
+def _finish_request(response):
+    profile = _current.get()
+    if profile is None or 'perf.token' not in request.environ:
+        return response
+    total = perf_counter() - profile.started
+    response.headers['Server-Timing'] = profile.server_timing(total)
+    perf_log.record(Sample(
+        route=f'{request.method} {request.url_rule.rule if request.url_rule else "<unmatched>"}',
+        status=response.status_code,
+        total_seconds=total,
+        db_seconds=profile.db_seconds,
+        sql_count=profile.sql_count,
+        slowest_sql=profile.slowest_sql,
+        slowest_seconds=profile.slowest_seconds,
+        to_dict_seconds=profile.to_dict_seconds,
+        json_seconds=profile.json_seconds,
+        # Streams (exports, /api/events) have no length up front
+        response_bytes=None if response.is_streamed else response.calculate_content_length()
+    ))
+    return response
+
+
+def _end_request(exception=None):
+    token = request.environ.pop('perf.token', None)
+    if token is not None:
+        _current.reset(token)
+
+
+def perf_summary():
+    """Per-route p50/p95/p99 of the buffered request samples (?route=GET /api/orders)"""
+    if request.method == 'DELETE':
+        perf_log.clear()
+        return jsonify({'message': 'Performance samples cleared'})
+    return jsonify({
+        'buffer_size': perf_log.size,
+        'samples': len(perf_log.samples()),
+        'routes': perf_log.summary(request.args.get('route'))
+    })
+
+
+def init_profiling(app, model_base=None):
+    """Profile every request of app; model_base: declarative base whose to_dict() is timed"""
+    _listen_to_statements()
+    app.json = ProfiledJSONProvider(app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_end_request)
+    if model_base is not None:
+        instrument_to_dict(model_base)
+    app.add_url_rule(PERF_ENDPOINT, 'perf_summary', perf_summary, methods=['GET', 'DELETE'])
@@ -0,0 +1,326 @@
+"""
+Recurring orders
+
+A recurring order is the first occurrence of its series: its scheduled_date
+is the start and its recurrence_rules row (or, without one, a rule derived
+from recurring_interval) produces the later dates. Occurrences are never
+stored in advance. Recurrence.between() computes the dates of a window
+arithmetically, jumping straight to the first period inside it, so a
+calendar month costs the same for a series started last week or ten years
+ago, and open-ended series never fill the orders table.
+
+Exceptions change single occurrences: 'skip' drops one, 'move' shows it on
+another date and time, and 'materialized' means a real order was created
+for it (materialize()), which from then on shows up like any other order.
+
+calendar() merges both: the real orders of a window come from one range
+scan on ix_orders_scheduled_date, the virtual ones from the series. The
+series (template orders, rules and exceptions) and each series' expanded
+months are kept in occurrence_cache, which is dropped on every commit that
+writes orders, recurrence_rules or recurrence_exceptions.
+"""
+
+import calendar as month_calendar
+from collections import namedtuple
+from datetime import date, timedelta
+
+from src.models.order import Order
+from src.models.recurrence import FREQUENCIES, RecurrenceException, RecurrenceRule
+from src.models.user import db
+from src.services.cache import register_tagged_cache
+from src.services.cache_backends import MemoryCache
+from src.services.numbering import next_number
+
+# recurring_interval values of orders without a recurrence_rules row -> (freq, interval)
+INTERVAL_RULES = {
+    'daily': ('daily', 1),
+    'weekly': ('weekly', 1),
+    'biweekly': ('weekly', 2),
+    'monthly': ('monthly', 1),
+    'quarterly': ('monthly', 3),
+    'yearly': ('yearly', 1),
+}
+
+# Occurrences this many days ahead are turned into real orders by the daily job
+MATERIALIZE_DAYS = 14
+
+# Longest window calendar() expands
+MAX_CALENDAR_DAYS = 400
+
+CACHE_TAGS = ('orders', 'recurrence_rules', 'recurrence_exceptions')
+occurrence_cache = register_tagged_cache(MemoryCache(max_entries=4096))
+
+
+class Recurrence:
+    """The dates of one rule, starting at (and including) start
+
+    weekly rules repeat on by_weekday (0 = Monday; default: start's weekday);
+    monthly rules on by_month_day (-1 = last day; default: start's day),
+    moved to the month's last day when the month is shorter. until and
+    count (which includes start) end the series.
+    """
+
+    def __init__(self, start, freq, interval=1, by_weekday=None, by_month_day=None, until=None, count=None):
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency: {freq} (expected one of {', '.join(FREQUENCIES)})")
+        if not isinstance(interval, int) or interval < 1:
+            raise ValueError('interval must be a positive whole number')
+        if by_weekday is not None and (freq != 'weekly' or not by_weekday or
+                                       any(day not in range(7) for day in by_weekday)):
+            raise ValueError('by_weekday needs a weekly rule and weekdays 0 (Monday) to 6 (Sunday)')
+        if by_month_day is not None and (freq != 'monthly' or by_month_day not in [*range(1, 32), -1]):
+            raise ValueError('by_month_day needs a monthly rule and a day from 1 to 31 or -1')
+        if count is not None and count < 1:
+            raise ValueError('count must be at least 1')
+
+        self.start = start
+        self.freq = freq
+        self.interval = interval
+        self.by_weekday = sorted(set(by_weekday or [start.weekday()]))
+        self.by_month_day = by_month_day or start.day
+        self.until = until
+        self.count = count
+
+        self._week0 = start - timedelta(days=start.weekday())
+        self._month0 = start.year * 12 + start.month - 1
+        # Dates of the first period that fall before start (they do not occur)
+        self._skipped = sum(1 for day in self._period_dates(0) if day < start)
+
+    @classmethod
+    def from_rule(cls, start, rule):
+        return cls(start, rule.freq, rule.interval,
+                   [int(day) for day in rule.by_weekday.split(',')] if rule.by_weekday else None,
+                   rule.by_month_day, rule.until, rule.count)
+
+    def _month_day(self, month):
+        year, month = divmod(month, 12)
+        last = month_calendar.monthrange(year, month + 1)[1]
+        day = last if self.by_month_day == -1 else min(self.by_month_day, last)
+        return date(year, month + 1, day)
+
+    def _period_dates(self, k):
+        """Dates of the k-th period (every interval-th day, week, month or year)"""
+        if self.freq == 'daily':
+            return [self.start + timedelta(days=k * self.interval)]
+        if self.freq == 'weekly':
+            monday = self._week0 + timedelta(weeks=k * self.interval)
+            return [monday + timedelta(days=day) for day in self.by_weekday]
+        if self.freq == 'monthly':
+            return [self._month_day(self._month0 + k * self.interval)]
+        year = self.start.year + k * self.interval
+        return [date(year, self.start.month, min(self.start.day, month_calendar.monthrange(year, self.start.month)[1]))]
+
+    def _period_of(self, day):
+        """Index of the period containing day (0 before the start)"""
+        if day <= self.start:
+            return 0
+        if self.freq == 'daily':
+            return (day - self.start).days // self.interval
+        if self.freq == 'weekly':
+            return (day - self._week0).days // 7 // self.interval
+        if self.freq == 'monthly':
+            return (day.year * 12 + day.month - 1 - self._month0) // self.interval
+        return (day.year - self.start.year) // self.interval
+
+    def between(self, date_from, date_to):
+        """Occurrences in date_from..date_to (both inclusive), generated lazily"""
+        last = min(date_to, self.until) if self.until else date_to
+        per_period = len(self.by_weekday) if self.freq == 'weekly' else 1
+        k = self._period_of(date_from)
+        while True:
+            dates = self._period_dates(k)
+            if dates[0] > last:
+                return
+            for offset, day in enumerate(dates):
+                if day < self.start:
+                    continue
+                if self.count is not None and k * per_period - self._skipped + offset >= self.count:
+                    return
+                if date_from <= day <= last:
+                    yield day
+            k += 1
+
+    def includes(self, day):
+        return next(self.between(day, day), None) is not None
+
+
+def rule_for(order, rule=None):
+    """The Recurrence of a recurring order, or None when it does not repeat"""
+    if not order.is_recurring or order.scheduled_date is None or order.status == 'cancelled':
+        return None
+    if rule is not None:
+        return Recurrence.from_rule(order.scheduled_date, rule)
+    if order.recurring_interval in INTERVAL_RULES:
+        freq, interval = INTERVAL_RULES[order.recurring_interval]
+        return Recurrence(order.scheduled_date, freq, interval)
+    return None
+
+
+Series = namedtuple('Series', 'order recurrence exceptions')
+
+
+def load_series():
+    """Every active recurring order with its rule and exceptions (cached until the next write)"""
+    series = occurrence_cache.get('series')
+    if series is not None:
+        return series
+
+    # "= 1" rather than "IS 1", so the partial index ix_orders_recurring_scheduled_date applies
+    templates = Order.query.filter(Order.is_recurring == True, Order.scheduled_date.isnot(None)).all()
+    ids = [order.id for order in templates]
+    rules = {rule.order_id: rule for rule in RecurrenceRule.query.filter(RecurrenceRule.order_id.in_(ids))}
+    exceptions = {}
+    for exception in RecurrenceException.query.filter(RecurrenceException.order_id.in_(ids)):
+        exceptions.setdefault(exception.order_id, {})[exception.occurrence_date] = exception.to_dict()
+
+    series = []
+    for order in templates:
+        recurrence = rule_for(order, rules.get(order.id))
+        if recurrence is not None:
+            series.append(Series(order.to_dict(), recurrence, exceptions.get(order.id, {})))
+    occurrence_cache.set('series', series, tags=CACHE_TAGS)
+    return series
+
+
+def _month_occurrences(series, month):
+    """A series' dates in one month number (year * 12 + month - 1), cached per series and month"""
+    key = f"occurrences:{series.order['id']}:{month}"
+    dates = occurrence_cache.get(key)
+    if dates is None:
+        first = date(month // 12, month % 12 + 1, 1)
+        last = date(month // 12, month % 12 + 1, month_calendar.monthrange(month // 12, month % 12 + 1)[1])
+        dates = list(series.recurrence.between(first, last))
+        occurrence_cache.set(key, dates, tags=CACHE_TAGS)
+    return dates
+
+
+def _virtual(series, occurrence_date, day, time=None):
+    entry = dict(series.order)
+    entry.update({
+        'id': None,
+        'order_number': None,
+        'status': 'planned',
+        'scheduled_date': day.isoformat(),
+        'scheduled_time': time or series.order['scheduled_time'],
+        'is_recurring': False,
+        'series_id': series.order['id'],
+        'occurrence_date': occurrence_date.isoformat(),
+        'virtual': True
+    })
+    return entry
+
+
+def virtual_occurrences(date_from, date_to, customer_id=None):
+    """Occurrences in the window that have no real order yet, with skips and moves applied"""
+    entries = []
+    first_month = date_from.year * 12 + date_from.month - 1
+    last_month = date_to.year * 12 + date_to.month - 1
+    for series in load_series():
+        if customer_id is not None and series.order['customer_id'] != customer_id:
+            continue
+        start = series.recurrence.start
+        for month in range(max(first_month, start.year * 12 + start.month - 1), last_month + 1):
+            for day in _month_occurrences(series, month):
+                # The first occurrence is the recurring order itself
+                if date_from <= day <= date_to and day != start and day not in series.exceptions:
+                    entries.append(_virtual(series, day, day))
+        for occurrence_date, exception in series.exceptions.items():
+            moved_to = exception['moved_date'] and date.fromisoformat(exception['moved_date'])
+            if (exception['action'] == 'move' and date_from <= moved_to <= date_to
+                    and series.recurrence.includes(occurrence_date)):
+                entries.append(_virtual(series, occurrence_date, moved_to, exception['moved_time']))
+    return entries
+
+
+def calendar(date_from, date_to, customer_id=None):
+    """Real and virtual orders scheduled in date_from..date_to, by date and time"""
+    if date_from > date_to:
+        raise ValueError('date_from must not be after date_to')
+    if (date_to - date_from).days >= MAX_CALENDAR_DAYS:
+        raise ValueError(f'Calendar windows are limited to {MAX_CALENDAR_DAYS} days')
+
+    query = Order.query.filter(Order.scheduled_date >= date_from, Order.scheduled_date <= date_to)
+    if customer_id is not None:
+        query = query.filter(Order.customer_id == customer_id)
+
+    # Real orders that belong to a series: the templates and materialized occurrences
+    series_of = {}
+    for series in load_series():
+        series_of[series.order['id']] = (series.order['id'], series.recurrence.start.isoformat())
+        for occurrence_date, exception in series.exceptions.items():
+            if exception['materialized_order_id']:
+                series_of[exception['materialized_order_id']] = (series.order['id'], occurrence_date.isoformat())
+
+    entries = []
+    for order in query.all():
+        series_id, occurrence_date = series_of.get(order.id, (None, None))
+        entries.append({**order.to_dict(), 'series_id': series_id, 'occurrence_date': occurrence_date,
+                        'virtual': False})
+    entries.extend(virtual_occurrences(date_from, date_to, customer_id))
+    entries.sort(key=lambda entry: (entry['scheduled_date'], entry['scheduled_time'] or '', entry['id'] or 0))
+    return entries
+
+
+def _series(order_id):
+    for series in load_series():
+        if series.order['id'] == order_id:
+            return series
+    raise ValueError(f'Order {order_id} is not a recurring order')
+
+
+def check_occurrence(order_id, occurrence_date):
+    """The series of order_id, once occurrence_date is one of its later occurrences"""
+    series = _series(order_id)
+    if occurrence_date == series.recurrence.start or not series.recurrence.includes(occurrence_date):
+        raise ValueError(f'{occurrence_date.isoformat()} is not an occurrence of order {order_id}')
+    return series
+
+
+def materialize(order_id, occurrence_date):
+    """Create the real order for one occurrence (once); the caller commits"""
+    check_occurrence(order_id, occurrence_date)
+    exception = RecurrenceException.query.filter_by(order_id=order_id, occurrence_date=occurrence_date).first()
+    if exception is not None and exception.action == 'materialized':
+        return db.session.get(Order, exception.materialized_order_id)
+    if exception is not None and exception.action == 'skip':
+        raise ValueError(f'{occurrence_date.isoformat()} is skipped')
+
+    template = db.session.get(Order, order_id)
+    order = Order(
+        order_number=next_number('order'),
+        customer_id=template.customer_id,
+        title=template.title,
+        description=template.description,
+        service_type=template.service_type,
+        service_street=template.service_street,
+        service_house_number=template.service_house_number,
+        service_postal_code=template.service_postal_code,
+        service_city=template.service_city,
+        scheduled_date=exception.moved_date if exception else occurrence_date,
+        scheduled_time=(exception.moved_time if exception and exception.moved_time else template.scheduled_time),
+        estimated_duration=template.estimated_duration,
+        status='pending',
+        priority=template.priority,
+        estimated_price=template.estimated_price,
+        is_recurring=False,
+        special_instructions=template.special_instructions,
+        access_instructions=template.access_instructions
+    )
+    db.session.add(order)
+    db.session.flush()
+
+    if exception is None:
+        exception = RecurrenceException(order_id=order_id, occurrence_date=occurrence_date)
+        db.session.add(exception)
+    exception.action = 'materialized'
+    exception.materialized_order_id = order.id
+    db.session.flush()
+    return order
+
+
+def materialize_upcoming(days=MATERIALIZE_DAYS, today=None):
+    """Create real orders for the virtual occurrences of the next days; returns their ids"""
+    today = today or date.today()
+    upcoming = virtual_occurrences(today, today + timedelta(days=days))
+    return [materialize(entry['series_id'], date.fromisoformat(entry['occurrence_date'])).id
+            for entry in upcoming]
@@ -0,0 +1,42 @@
+"""
+Report payloads shared by the API endpoints and the background jobs
+"""
+
+from src.models.timetracking import TimeEntry
+from src.services.queries import with_related
+
+
+def timetracking_report(start_date, end_date, user_id=None):
+    """Completed time entries starting in [start_date, end_date]: rows and total hours"""
+    query = with_related(TimeEntry.query, TimeEntry).filter(
+        TimeEntry.start_time >= start_date,
+        TimeEntry.start_time <= end_date,
+        TimeEntry.status == 'completed'
+    )
+    
+    if user_id:
+        query = query.filter(TimeEntry.user_id == user_id)
+    
+    report_data = []
+    total_hours = 0
+    
+    for entry in query.all():
+        customer = entry.customer
+        order = entry.order
+        
+        duration = (entry.end_time - entry.start_time).total_seconds() / 3600
+        total_hours += duration
+        
+        report_data.append({
+            'date': entry.start_time.date().isoformat(),
+            'user_name': entry.user_name,
+            'customer_name': f"{customer.first_name} {customer.last_name}" if customer else "Unbekannt",
+            'order_title': order.title if order else None,
+            'activity_type': entry.activity_type,
+            'start_time': entry.start_time.strftime('%H:%M'),
+            'end_time': entry.end_time.strftime('%H:%M'),
+            'duration': round(duration, 2),
+            'description': entry.description
+        })
+    
+    return {'report_data': report_data, 'total_hours': round(total_hours, 2)}
@@ -0,0 +1,127 @@
+"""
+Time tracking rollups
+
+The time_rollups table holds the completed time per (day, user, activity,
+order) in whole seconds. SQLite triggers on time_entries (migration 5)
+adjust it in the same statement as every insert, stop, edit and delete of
+an entry, whether it comes from the ORM, a bulk insert or raw SQL. Weekly
+and monthly statistics, reports and payroll exports then sum a few
+pre-aggregated rows instead of scanning and timing individual entries.
+
+An entry counts once it is 'completed' and has an end time; it is booked
+on the day it started.
+"""
+
+from sqlalchemy import func, text
+
+from src.models.timetracking import TimeRollup
+from src.models.user import db
+
+KEY = ('day', 'user_id', 'activity_type', 'order_id')
+
+
+def _counted(row):
+    return f"{row}.status = 'completed' AND {row}.end_time IS NOT NULL"
+
+
+def _seconds(row):
+    return f'CAST(ROUND((julianday({row}.end_time) - julianday({row}.start_time)) * 86400) AS INTEGER)'
+
+
+def _key_values(row):
+    return f"date({row}.start_time), {row}.user_id, coalesce({row}.activity_type, 'work'), coalesce({row}.order_id, 0)"
+
+
+def _add(row):
+    return (
+        f'INSERT INTO time_rollups (day, user_id, activity_type, order_id, user_name, seconds, entry_count) '
+        f'SELECT {_key_values(row)}, {row}.user_name, {_seconds(row)}, 1 WHERE {_counted(row)} '
+        f'ON CONFLICT({", ".join(KEY)}) DO UPDATE SET seconds = seconds + excluded.seconds, '
+        f'entry_count = entry_count + 1, user_name = coalesce(excluded.user_name, user_name);'
+    )
+
+
+def _subtract(row):
+    match = (f"day = date({row}.start_time) AND user_id = {row}.user_id AND "
+             f"activity_type = coalesce({row}.activity_type, 'work') AND order_id = coalesce({row}.order_id, 0)")
+    return (
+        f'UPDATE time_rollups SET seconds = seconds - {_seconds(row)}, entry_count = entry_count - 1 '
+        f'WHERE {match} AND {_counted(row)}; '
+        f'DELETE FROM time_rollups WHERE {match} AND entry_count <= 0;'
+    )
+
+
+ROLLUP_TRIGGERS = [
+    f'CREATE TRIGGER IF NOT EXISTS trg_time_entries_rollup_insert AFTER INSERT ON time_entries BEGIN '
+    f'{_add("NEW")} END',
+
+    f'CREATE TRIGGER IF NOT EXISTS trg_time_entries_rollup_update AFTER UPDATE OF '
+    f'start_time, end_time, status, user_id, user_name, activity_type, order_id ON time_entries BEGIN '
+    f'{_subtract("OLD")} {_add("NEW")} END',
+
+    f'CREATE TRIGGER IF NOT EXISTS trg_time_entries_rollup_delete AFTER DELETE ON time_entries BEGIN '
+    f'{_subtract("OLD")} END',
+]
+
+REBUILD = text(
+    f"INSERT INTO time_rollups (day, user_id, activity_type, order_id, user_name, seconds, entry_count) "
+    f"SELECT {_key_values('time_entries')}, max(user_name), sum({_seconds('time_entries')}), count(*) "
+    f"FROM time_entries WHERE {_counted('time_entries')} GROUP BY 1, 2, 3, 4"
+)
+
+
+def install_rollup_triggers(connection):
+    for statement in ROLLUP_TRIGGERS:
+        connection.exec_driver_sql(statement)
+
+
+def rebuild_rollups(connection):
+    """Recompute every rollup row from time_entries (migration 5, or after a bulk repair)"""
+    connection.exec_driver_sql('DELETE FROM time_rollups')
+    connection.execute(REBUILD)
+
+
+# Dimensions summarize() can group by -> (output name, column expression)
+DIMENSIONS = {
+    'day': [('day', TimeRollup.day)],
+    'user': [('user_id', TimeRollup.user_id), ('user_name', func.max(TimeRollup.user_name))],
+    'activity': [('activity_type', TimeRollup.activity_type)],
+    'order': [('order_id', TimeRollup.order_id)],
+}
+
+
+def summarize(group_by=('user',), date_from=None, date_to=None, user_id=None):
+    """Summed time per group for the days date_from..date_to (both inclusive, either open)
+
+    Returns [{<dimension columns>, 'seconds', 'hours', 'entry_count'}, ...]
+    ordered by the grouping columns.
+    """
+    unknown = [name for name in group_by if name not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown grouping: {', '.join(unknown)} (expected day, user, activity or order)")
+
+    columns = [column.label(label) for name in group_by for label, column in DIMENSIONS[name]]
+    group_columns = [DIMENSIONS[name][0][1] for name in group_by]
+    query = db.session.query(
+        *columns,
+        func.sum(TimeRollup.seconds).label('seconds'),
+        func.sum(TimeRollup.entry_count).label('entry_count')
+    )
+    if date_from:
+        query = query.filter(TimeRollup.day >= date_from)
+    if date_to:
+        query = query.filter(TimeRollup.day <= date_to)
+    if user_id:
+        query = query.filter(TimeRollup.user_id == user_id)
+    rows = query.group_by(*group_columns).order_by(*group_columns).all()
+
+    summary = []
+    for row in rows:
+        item = dict(row._mapping)
+        if 'day' in item:
+            item['day'] = item['day'].isoformat()
+        if 'order_id' in item:
+            item['order_id'] = item['order_id'] or None
+        item['hours'] = round(item['seconds'] / 3600, 2)
+        summary.append(item)
+    return summary
@@ -0,0 +1,300 @@
+"""
+Daily crew scheduling
+
+plan_day() assigns a date's orders to the available crews and orders each
+crew's visits so that the total driving time is as small as possible:
+
+1. Travel times come from TRAVEL_MINUTES, a matrix between the postal codes
+   of the service area computed once at import (straight-line distance
+   times ROAD_FACTOR at AVERAGE_SPEED_KMH). Unknown postal codes are placed
+   at a known code with the same leading digits.
+2. Orders are inserted one by one - urgent first, then the farthest from
+   the depot - where they add the least driving, as long as the crew's
+   driving plus working time still fits its shift. Orders that fit nowhere
+   are reported as unassigned.
+3. Local search then moves single orders between and within crews and
+   applies 2-opt to each crew's sequence until nothing improves or
+   TIME_LIMIT has passed.
+
+An order's scheduled_time is treated as "not before": a crew arriving early
+waits, and one arriving later than that is reported as late.
+"""
+
+import math
+import os
+import time
+from collections import namedtuple
+
+# Postal code -> (latitude, longitude, place) for the service area around the Harz
+POSTAL_CODES = {
+    '06484': (51.789, 11.141, 'Quedlinburg'),
+    '06485': (51.722, 11.139, 'Gernrode'),
+    '06493': (51.642, 11.140, 'Harzgerode'),
+    '06502': (51.749, 11.040, 'Thale'),
+    '06526': (51.473, 11.299, 'Sangerhausen'),
+    '37412': (51.655, 10.340, 'Herzberg am Harz'),
+    '37431': (51.632, 10.470, 'Bad Lauterberg'),
+    '37444': (51.711, 10.519, 'St. Andreasberg'),
+    '37520': (51.727, 10.252, 'Osterode am Harz'),
+    '37539': (51.808, 10.244, 'Bad Grund'),
+    '37574': (51.818, 9.868, 'Einbeck'),
+    '38100': (52.264, 10.524, 'Braunschweig'),
+    '38226': (52.153, 10.331, 'Salzgitter'),
+    '38300': (52.162, 10.534, 'Wolfenbüttel'),
+    '38640': (51.906, 10.429, 'Goslar'),
+    '38642': (51.927, 10.441, 'Goslar'),
+    '38644': (51.903, 10.464, 'Goslar'),
+    '38667': (51.882, 10.562, 'Bad Harzburg'),
+    '38678': (51.806, 10.336, 'Clausthal-Zellerfeld'),
+    '38685': (51.937, 10.335, 'Langelsheim'),
+    '38690': (51.953, 10.563, 'Vienenburg'),
+    '38700': (51.726, 10.610, 'Braunlage'),
+    '38704': (52.021, 10.431, 'Liebenburg'),
+    '38707': (51.801, 10.446, 'Altenau'),
+    '38729': (51.987, 10.268, 'Lutter am Barenberge'),
+    '38820': (51.896, 11.047, 'Halberstadt'),
+    '38835': (51.971, 10.713, 'Osterwieck'),
+    '38855': (51.835, 10.785, 'Wernigerode'),
+    '38871': (51.864, 10.679, 'Ilsenburg'),
+    '38875': (51.771, 10.802, 'Elbingerode'),
+    '38879': (51.765, 10.665, 'Schierke'),
+    '38889': (51.790, 10.955, 'Blankenburg'),
+    '38895': (51.868, 10.909, 'Derenburg'),
+    '38899': (51.690, 10.855, 'Hasselfelde'),
+    '99734': (51.505, 10.791, 'Nordhausen'),
+    '99755': (51.585, 10.670, 'Ellrich'),
+}
+
+ROAD_FACTOR = 1.35
+AVERAGE_SPEED_KMH = 50
+LOCAL_MINUTES = 5  # between two addresses within the same postal code
+
+DEPOT_POSTAL_CODE = os.environ.get('DEPOT_POSTAL_CODE', '38640')
+SHIFT_START = 7 * 60
+SHIFT_END = 16 * 60
+DEFAULT_DURATION = 120  # minutes, for orders without an estimated_duration
+PRIORITY_RANK = {'urgent': 0, 'high': 1, 'normal': 2, 'low': 3}
+TIME_LIMIT = 0.5  # seconds of local search
+
+
+def _distance_km(a, b):
+    lat1, lon1 = map(math.radians, a[:2])
+    lat2, lon2 = map(math.radians, b[:2])
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(h))
+
+
+ZONES = sorted(POSTAL_CODES)
+ZONE_INDEX = {code: index for index, code in enumerate(ZONES)}
+TRAVEL_MINUTES = [
+    [max(LOCAL_MINUTES, round(_distance_km(POSTAL_CODES[a], POSTAL_CODES[b]) * ROAD_FACTOR / AVERAGE_SPEED_KMH * 60))
+     for b in ZONES]
+    for a in ZONES
+]
+
+
+def locate(postal_code):
+    """Zone index of a postal code, falling back to a known code with the same leading digits"""
+    code = (postal_code or '').strip()
+    if code in ZONE_INDEX:
+        return ZONE_INDEX[code]
+    if len(code) == 5 and code.isdigit():
+        for digits in (4, 3, 2):
+            for known in ZONES:
+                if known[:digits] == code[:digits]:
+                    return ZONE_INDEX[known]
+    return None
+
+
+Crew = namedtuple('Crew', 'name start end depot')
+Job = namedtuple('Job', 'id zone duration rank not_before')
+
+
+def parse_clock(value):
+    """'07:30' -> minutes after midnight"""
+    hours, _, minutes = value.partition(':')
+    result = int(hours) * 60 + int(minutes or 0)
+    if not 0 <= result <= 24 * 60:
+        raise ValueError(f'Invalid time: {value}')
+    return result
+
+
+def format_clock(minutes):
+    return f'{int(minutes) // 60:02d}:{int(minutes) % 60:02d}'
+
+
+class Planner:
+    """Cheapest insertion followed by relocate and 2-opt local search"""
+
+    def __init__(self, jobs, crews, time_limit=TIME_LIMIT):
+        self.jobs = jobs
+        self.crews = crews
+        self.deadline = time.perf_counter() + time_limit
+        self.routes = [[] for _ in crews]
+        self.load = [0] * len(crews)  # driving + working minutes per crew
+        self.unassigned = []
+
+    def _stops(self, crew):
+        """Zones along a crew's route, depot at both ends"""
+        depot = self.crews[crew].depot
+        return [depot] + [self.jobs[j].zone for j in self.routes[crew]] + [depot]
+
+    def travel(self, crew):
+        stops = self._stops(crew)
+        return sum(TRAVEL_MINUTES[a][b] for a, b in zip(stops, stops[1:]))
+
+    def _best_insertion(self, job_index):
+        """(added driving, crew, position) of the cheapest feasible insertion, or None"""
+        job = self.jobs[job_index]
+        best = None
+        for crew, shift in enumerate(self.crews):
+            stops = self._stops(crew)
+            capacity = shift.end - shift.start - self.load[crew] - job.duration
+            for position in range(len(stops) - 1):
+                a, b = stops[position], stops[position + 1]
+                added = TRAVEL_MINUTES[a][job.zone] + TRAVEL_MINUTES[job.zone][b] - TRAVEL_MINUTES[a][b]
+                if added <= capacity and (best is None or (added, self.load[crew]) < (best[0], self.load[best[1]])):
+                    best = (added, crew, position)
+        return best
+
+    def construct(self):
+        def far_first(j):
+            job = self.jobs[j]
+            return (job.rank, -TRAVEL_MINUTES[self.crews[0].depot][job.zone] if self.crews else 0, job.id)
+
+        for j in sorted(range(len(self.jobs)), key=far_first):
+            best = self._best_insertion(j)
+            if best is None:
+                self.unassigned.append(j)
+                continue
+            added, crew, position = best
+            self.routes[crew].insert(position, j)
+            self.load[crew] += added + self.jobs[j].duration
+
+    def relocate(self):
+        """Move single orders to the position (in any crew) where they cost the least driving"""
+        improved = False
+        for crew in range(len(self.crews)):
+            position = 0
+            while position < len(self.routes[crew]):
+                if time.perf_counter() > self.deadline:
+                    return improved
+                stops = self._stops(crew)
+                j = self.routes[crew][position]
+                a, x, b = stops[position], stops[position + 1], stops[position + 2]
+                saved = TRAVEL_MINUTES[a][x] + TRAVEL_MINUTES[x][b] - TRAVEL_MINUTES[a][b]
+
+                del self.routes[crew][position]
+                self.load[crew] -= saved + self.jobs[j].duration
+                best = self._best_insertion(j)
+                added, target, target_position = best if best else (None, crew, position)
+                if best is None or added >= saved:
+                    # No gain: put it back where it was
+                    added, target, target_position = saved, crew, position
+                else:
+                    improved = True
+                self.routes[target].insert(target_position, j)
+                self.load[target] += added + self.jobs[j].duration
+                if target != crew or target_position > position:
+                    continue
+                position += 1
+        return improved
+
+    def two_opt(self, crew):
+        """Reverse stretches of the sequence while that shortens the route"""
+        improved = False
+        route = self.routes[crew]
+        depot = self.crews[crew].depot
+        zones = [depot] + [self.jobs[j].zone for j in route] + [depot]
+        found = True
+        while found and time.perf_counter() <= self.deadline:
+            found = False
+            for i in range(1, len(zones) - 2):
+                a, b = zones[i - 1], zones[i]
+                for k in range(i + 1, len(zones) - 1):
+                    c, d = zones[k], zones[k + 1]
+                    delta = TRAVEL_MINUTES[a][c] + TRAVEL_MINUTES[b][d] - TRAVEL_MINUTES[a][b] - TRAVEL_MINUTES[c][d]
+                    if delta < 0:
+                        zones[i:k + 1] = zones[k:i - 1:-1]
+                        route[i - 1:k] = route[k - 1:i - 2 if i > 1 else None:-1]
+                        self.load[crew] += delta
+                        b = zones[i]
+                        found = improved = True
+        return improved
+
+    def solve(self):
+        self.construct()
+        improved = True
+        while improved and time.perf_counter() <= self.deadline:
+            improved = self.relocate()
+            for crew in range(len(self.crews)):
+                improved = self.two_opt(crew) or improved
+        return self.routes, self.unassigned
+
+
+def plan_day(orders, crews, time_limit=TIME_LIMIT):
+    """Assign and sequence orders for crews
+
+    orders: dicts with id, postal_code, estimated_duration, priority and
+    scheduled_time (minutes after midnight or None); crews: Crew tuples.
+    Returns the plan as JSON-ready dicts.
+    """
+    jobs, unlocated = [], []
+    for order in orders:
+        zone = locate(order.get('postal_code'))
+        if zone is None:
+            unlocated.append(order)
+            continue
+        jobs.append(Job(order['id'], zone, order.get('estimated_duration') or DEFAULT_DURATION,
+                        PRIORITY_RANK.get(order.get('priority'), PRIORITY_RANK['normal']),
+                        order.get('scheduled_time')))
+    by_id = {order['id']: order for order in orders}
+
+    planner = Planner(jobs, crews, time_limit)
+    routes, unassigned = planner.solve()
+
+    plan = []
+    for index, (crew, route) in enumerate(zip(crews, routes)):
+        clock, position, stops, late = crew.start, crew.depot, [], 0
+        for j in route:
+            job = jobs[j]
+            drive = TRAVEL_MINUTES[position][job.zone]
+            arrival = clock + drive
+            start = max(arrival, job.not_before) if job.not_before is not None else arrival
+            if job.not_before is not None and start > job.not_before:
+                late += 1
+            order = by_id[job.id]
+            stops.append({
+                'order_id': job.id,
+                'order_number': order.get('order_number'),
+                'title': order.get('title'),
+                'postal_code': order.get('postal_code'),
+                'city': order.get('city'),
+                'priority': order.get('priority'),
+                'drive_minutes': drive,
+                'arrival': format_clock(arrival),
+                'start': format_clock(start),
+                'end': format_clock(start + job.duration)
+            })
+            clock, position = start + job.duration, job.zone
+        drive_home = TRAVEL_MINUTES[position][crew.depot]
+        finish = clock + drive_home if route else crew.start
+        plan.append({
+            'crew': crew.name,
+            'depot': ZONES[crew.depot],
+            'shift': {'start': format_clock(crew.start), 'end': format_clock(crew.end)},
+            'stops': stops,
+            'drive_minutes': planner.travel(index),
+            'work_minutes': sum(jobs[j].duration for j in route),
+            'finish': format_clock(finish),
+            'overtime_minutes': max(0, finish - crew.end),
+            'late_stops': late
+        })
+
+    return {
+        'crews': plan,
+        'drive_minutes': sum(crew['drive_minutes'] for crew in plan),
+        'assigned': sum(len(route) for route in routes),
+        'unassigned': [{'order_id': jobs[j].id, 'reason': 'no_capacity'} for j in sorted(unassigned)]
+                      + [{'order_id': order['id'], 'reason': 'unknown_postal_code'} for order in unlocated]
+    }
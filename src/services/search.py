@@ -0,0 +1,136 @@
+"""
+Full-text search over customers, communications and orders (SQLite FTS5)
+
+Every searchable table has an FTS5 shadow table (<table>_fts, rowid = id)
+that triggers keep in step with inserts, updates and deletes. The text is
+folded before it is indexed (ä -> ae, ö -> oe, ü -> ue, ß -> ss) and the
+unicode61 tokenizer takes care of case and remaining accents, so "Müller",
+"mueller" and "MUELLER" all find the same customer. Queries are folded the
+same way and every term is a prefix match, which makes the index usable for
+type-ahead. Results are ranked with bm25 using per-column weights.
+"""
+
+import re
+
+from sqlalchemy import column, table as table_clause, text
+
+# table -> ((column, bm25 weight), ...)
+SEARCH_INDEXES = {
+    'customers': (('first_name', 5.0), ('last_name', 10.0), ('company_name', 8.0),
+                  ('email', 3.0), ('city', 1.0)),
+    'communications': (('subject', 5.0), ('content', 1.0), ('tags', 3.0)),
+    'orders': (('title', 5.0), ('description', 1.0), ('special_instructions', 1.0),
+               ('access_instructions', 1.0)),
+}
+
+FOLDS = [('ä', 'ae'), ('Ä', 'ae'), ('ö', 'oe'), ('Ö', 'oe'), ('ü', 'ue'), ('Ü', 'ue'),
+         ('ß', 'ss'), ('ẞ', 'ss')]
+
+TOKEN = re.compile(r'\w+')
+MAX_TERMS = 8
+
+
+def fold(value):
+    """German spelling folded to ASCII digraphs, exactly like the SQL used by the triggers"""
+    for umlaut, replacement in FOLDS:
+        value = value.replace(umlaut, replacement)
+    return value
+
+
+def _sql_fold(expression):
+    for umlaut, replacement in FOLDS:
+        expression = f"replace({expression}, '{umlaut}', '{replacement}')"
+    return f"coalesce({expression}, '')"
+
+
+def fts_query(search):
+    """FTS5 MATCH expression for free user input: every term must match as a prefix
+
+    Returns None when the input has no searchable terms.
+    """
+    terms = TOKEN.findall(fold(search or ''))[:MAX_TERMS]
+    if not terms:
+        return None
+    # Quoted so FTS5 operators and column filters in user input stay literal
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def index_statements(table):
+    """DDL for one table's FTS5 index, its rank function and its sync triggers"""
+    columns = [name for name, _ in SEARCH_INDEXES[table]]
+    weights = ', '.join(str(weight) for _, weight in SEARCH_INDEXES[table])
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    new_values = ', '.join(_sql_fold(f'NEW.{name}') for name in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, "
+        f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+        f"INSERT INTO {fts} ({fts}, rank) VALUES ('rank', 'bm25({weights})')",
+        f'CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {table} BEGIN '
+        f'INSERT INTO {fts} (rowid, {names}) VALUES (NEW.id, {new_values}); END',
+        f'CREATE TRIGGER IF NOT EXISTS trg_{fts}_update AFTER UPDATE OF {names} ON {table} BEGIN '
+        f'DELETE FROM {fts} WHERE rowid = OLD.id; '
+        f'INSERT INTO {fts} (rowid, {names}) VALUES (NEW.id, {new_values}); END',
+        f'CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {table} BEGIN '
+        f'DELETE FROM {fts} WHERE rowid = OLD.id; END',
+    ]
+
+
+def backfill_statement(table):
+    columns = [name for name, _ in SEARCH_INDEXES[table]]
+    values = ', '.join(_sql_fold(name) for name in columns)
+    return f"INSERT INTO {table}_fts (rowid, {', '.join(columns)}) SELECT id, {values} FROM {table}"
+
+
+def install_search_indexes(connection):
+    """Create and fill every FTS5 index (migration 4)"""
+    for table in SEARCH_INDEXES:
+        for statement in index_statements(table):
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql(f'DELETE FROM {table}_fts')
+        connection.exec_driver_sql(backfill_statement(table))
+
+
+def matching_ids(table, search):
+    """Subquery of the ids of `table` matching the search input, for Model.id.in_(...)
+
+    Returns None when the input has nothing to search for.
+    """
+    query = fts_query(search)
+    if query is None:
+        return None
+    return text(f'SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH :{table}_match') \
+        .bindparams(**{f'{table}_match': query}).columns(column('rowid'))
+
+
+def rank_by_match(query, table, id_column, search):
+    """query joined to the rows of `table` matching the search input, best match first
+
+    Returns None when the input has nothing to search for.
+    """
+    match = fts_query(search)
+    if match is None:
+        return None
+    index = table_clause(f'{table}_fts', column('rowid'), column('rank'))
+    return query.join(index, index.c.rowid == id_column) \
+        .filter(text(f'{table}_fts MATCH :{table}_match').bindparams(**{f'{table}_match': match})) \
+        .order_by(index.c.rank)
+
+
+def ranked_matches(connection, search, tables=None, limit=20):
+    """[(table, id, rank), ...] best first across the requested tables, in one query"""
+    query = fts_query(search)
+    if query is None:
+        return []
+    tables = [table for table in (tables or SEARCH_INDEXES) if table in SEARCH_INDEXES]
+    if not tables:
+        return []
+    # Each table contributes at most `limit` rows in FTS5's own rank order
+    union = ' UNION ALL '.join(
+        f"SELECT * FROM (SELECT '{table}' AS entity, rowid AS id, rank FROM {table}_fts "
+        f"WHERE {table}_fts MATCH :query ORDER BY rank LIMIT :limit)"
+        for table in tables
+    )
+    rows = connection.execute(text(f'SELECT entity, id, rank FROM ({union}) ORDER BY rank LIMIT :limit'),
+                              {'query': query, 'limit': limit})
+    return [tuple(row) for row in rows]
@@ -0,0 +1,231 @@
+"""
+Row-to-JSON serialization for the read-only list endpoints
+
+A spec names the keys of a list payload and the columns behind them; the
+route modules build theirs once at import. A list request then selects
+exactly the columns the requested keys need, turns
+every result row into a dict with one itemgetter call per row, and
+encodes the page in one go - no ORM objects are built and nothing calls
+isoformat() field by field.
+
+?fields=id,title,status narrows both the payload and the SELECT, and so
+does ?view=<name> for the field lists a spec names (view=picker for
+dropdowns, view=list for the table columns of a page). Views are compiled
+with the spec and every other field list on first use, so a request only
+pays for the query and the row loop.
+
+Spec works on SQLAlchemy columns (the blueprints); SqlSpec on SQL
+snippets and plain sqlite3 tuples (simple_backend.py).
+
+Payloads are encoded with orjson when it is installed (UTF-8, dates and
+times natively); without it the json module produces the same documents.
+"""
+
+import json
+from datetime import date, datetime, time
+from operator import itemgetter
+from time import perf_counter
+
+from flask import Response
+
+from src.models.user import db
+from src.services.profiling import add_time
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is not installed
+    orjson = None
+
+# Compiled plans kept per spec; ?fields= lists beyond that are compiled per request
+MAX_PLANS = 64
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(payload):
+    """JSON bytes of payload; dates, datetimes and times become ISO strings"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=_plain, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def json_response(payload, status=200):
+    """jsonify() for payloads built from spec rows"""
+    started = perf_counter()
+    body = dumps(payload)
+    add_time('json', perf_counter() - started)
+    return Response(body, status=status, mimetype='application/json')
+
+
+class Field:
+    """One payload key: a single column, or convert(*columns) for a derived value
+
+    Spec columns from related tables are correlated scalar subqueries
+    (labelled); a SqlSpec field names the JOIN clause its columns need.
+    """
+
+    __slots__ = ('key', 'columns', 'convert', 'join')
+
+    def __init__(self, key, *columns, convert=None, join=None):
+        if convert is None and len(columns) != 1:
+            raise ValueError(f'Field {key} needs convert= to combine {len(columns)} columns')
+        self.key = key
+        self.columns = columns
+        self.convert = convert
+        self.join = join
+
+
+class _Plan:
+    """Selected columns, joins and row-to-dict function of one field list"""
+
+    def __init__(self, always, fields):
+        self.columns = list(always)
+        self.joins = []
+        keys, positions, derived = [], [], []
+
+        for field in fields:
+            if field.join is not None and field.join not in self.joins:
+                self.joins.append(field.join)
+            indexes = [self._position(column) for column in field.columns]
+            if field.convert is None:
+                keys.append(field.key)
+                positions.extend(indexes)
+            else:
+                derived.append((field.key, indexes, field.convert))
+
+        self.to_dict = self._compile(keys, positions, derived)
+
+    def _position(self, column):
+        for index, selected in enumerate(self.columns):
+            if selected is column or (isinstance(column, str) and selected == column):
+                return index
+        self.columns.append(column)
+        return len(self.columns) - 1
+
+    @staticmethod
+    def _compile(keys, positions, derived):
+        if not positions:
+            values = lambda row: ()  # noqa: E731
+        elif len(positions) == 1:
+            # itemgetter() with one index returns the value, not a tuple
+            index = positions[0]
+            values = lambda row: (row[index],)  # noqa: E731
+        else:
+            values = itemgetter(*positions)
+
+        if not derived:
+            return lambda row: dict(zip(keys, values(row)))
+
+        def to_dict(row):
+            data = dict(zip(keys, values(row)))
+            for key, indexes, convert in derived:
+                data[key] = convert(*[row[index] for index in indexes])
+            return data
+        return to_dict
+
+
+class _BaseSpec:
+
+    def __init__(self, fields, always, views):
+        self.fields = {}
+        for field in fields:
+            if not isinstance(field, Field):
+                field = self.column_field(field)
+            self.fields[field.key] = field
+        self.keys = tuple(self.fields)
+        self.always = tuple(always)
+        self._plans = {None: _Plan(self.always, self.fields.values())}
+        self.views = {name: tuple(keys) for name, keys in (views or {}).items()}
+        for keys in self.views.values():
+            self.plan(keys)
+
+    def requested(self, args):
+        """Field list of a request (?fields=a,b or ?view=name), None for every field
+
+        Raises ValueError for unknown fields or views.
+        """
+        names = (name.strip() for name in args.get('fields', '').split(','))
+        fields = tuple(dict.fromkeys(name for name in names if name)) or None
+        view = args.get('view')
+        if not view:
+            if fields:
+                self.plan(fields)
+            return fields
+        if fields:
+            raise ValueError('Use either ?fields= or ?view=, not both')
+        if view not in self.views:
+            raise ValueError(f"Unknown view: {view} (available: {', '.join(self.views) or 'none'})")
+        return self.views[view]
+
+    def plan(self, fields=None):
+        """Compiled plan of a field list (None: every field); ValueError names unknown keys"""
+        plan = self._plans.get(fields)
+        if plan is None:
+            unknown = [key for key in fields if key not in self.fields]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)} (available: {', '.join(self.keys)})")
+            plan = _Plan(self.always, [self.fields[key] for key in fields])
+            if len(self._plans) < MAX_PLANS:
+                self._plans[fields] = plan
+        return plan
+
+    def dicts(self, rows, fields=None):
+        """Payload dicts of rows selected for the same field list"""
+        started = perf_counter()
+        to_dict = self.plan(fields).to_dict
+        data = [to_dict(row) for row in rows]
+        add_time('to_dict', perf_counter() - started)
+        return data
+
+
+class Spec(_BaseSpec):
+    """Payload keys of a model's list endpoint and the columns they are read from
+
+    fields are Field objects or plain column attributes (keyed by column
+    name). always lists columns every query selects, in the payload or not;
+    the default is the primary key. Put the pagination sort column there:
+    keyset pagination reads it off the last row by name. views maps view
+    names to field lists.
+    """
+
+    def __init__(self, model, fields, always=(), views=None):
+        self.model = model
+        super().__init__(fields, always or (model.id,), views)
+
+    @staticmethod
+    def column_field(column):
+        return Field(column.key, column)
+
+    def query(self, fields=None):
+        """Query of the plan's columns; filter, order and page it as usual"""
+        # Own columns are labelled with their name: keyset pagination reads the
+        # sort key off the last row
+        columns = [column.label(column.key) if getattr(column, 'class_', None) is self.model else column
+                   for column in self.plan(fields).columns]
+        return db.session.query(*columns).select_from(self.model)
+
+
+class SqlSpec(_BaseSpec):
+    """Spec over SQL snippets for code that runs plain sqlite3 queries
+
+    source is the FROM clause ('orders o'), fields are Field objects or
+    column expressions ('o.title', keyed by the name after the dot), and
+    a Field's join is the JOIN clause its columns need.
+    """
+
+    def __init__(self, source, fields, always, views=None):
+        self.source = source
+        super().__init__(fields, always, views)
+
+    @staticmethod
+    def column_field(column):
+        return Field(column.rsplit('.', 1)[-1], column)
+
+    def select(self, fields=None):
+        """'SELECT ... FROM ... [JOIN ...]' of the plan; add WHERE 1=1 and the filters"""
+        plan = self.plan(fields)
+        return ' '.join([f"SELECT {', '.join(plan.columns)} FROM {self.source}", *plan.joins])
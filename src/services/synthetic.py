@@ -0,0 +1,454 @@
+"""
+Synthetic CRM data at scale for load tests and benchmarks
+
+generate(connection, rows) fills an existing schema with realistic German
+customers from the Harz region and their orders, quotes with items,
+invoices with items, communications, time entries and quality checks,
+plus a small stock of cleaning supplies -
+about ROWS_PER_CUSTOMER rows per customer, so rows=10_000 gives roughly
+430 customers and rows=10_000_000 roughly 435,000. The same seed always
+produces the same data.
+
+Rows are written with multi-row Core INSERTs, CUSTOMERS_PER_BATCH
+customers at a time, so memory stays flat however large the run. The
+SQLite triggers keep the document totals, portal summaries, time rollups
+and search indexes up to date as usual; the dashboard counters are
+maintained by session events and are rebuilt once at the end. Document
+numbers are reserved from number_sequences, so the app numbers new
+documents after the generated ones. No outbox events are written.
+"""
+
+import json
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from src.models.communication import Communication
+from src.models.customer import Customer
+from src.models.inventory import InventoryItem
+from src.models.invoice import Invoice, InvoiceItem
+from src.models.order import Order
+from src.models.quality import QualityCheck
+from src.models.quote import Quote, QuoteItem
+from src.models.timetracking import TimeEntry
+from src.models.user import User
+from src.services.counters import rebuild_counters
+from src.services.numbering import format_number, reserve, sequence_year
+
+CUSTOMERS_PER_BATCH = 1000
+HISTORY_DAYS = 730
+CUSTOMERS_PER_EMPLOYEE = 400
+MAX_EMPLOYEES = 60
+
+# Average rows per customer, the customer row included (items counted with their documents)
+ROWS_PER_CUSTOMER = 23
+
+FIRST_NAMES = ['Anna', 'Andreas', 'Birgit', 'Bernd', 'Christina', 'Christian', 'Doris', 'Dieter', 'Elke',
+               'Frank', 'Gabriele', 'Günter', 'Heike', 'Holger', 'Ingrid', 'Jürgen', 'Karin', 'Klaus',
+               'Lena', 'Lukas', 'Monika', 'Matthias', 'Nicole', 'Norbert', 'Petra', 'Peter', 'Renate',
+               'Stefan', 'Sabine', 'Thomas', 'Ursula', 'Uwe', 'Waltraud', 'Wolfgang', 'Jörg', 'Sören']
+LAST_NAMES = ['Müller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer', 'Wagner', 'Becker', 'Schulz',
+              'Hoffmann', 'Schäfer', 'Koch', 'Bauer', 'Richter', 'Klein', 'Wolf', 'Schröder', 'Neumann',
+              'Schwarz', 'Zimmermann', 'Braun', 'Krüger', 'Hofmann', 'Hartmann', 'Lange', 'Schmitt',
+              'Werner', 'Krause', 'Meier', 'Lehmann', 'Köhler', 'Jäger', 'Böhm', 'Groß', 'Weiß', 'Brückner']
+COMPANY_FORMS = ['GmbH', 'GmbH & Co. KG', 'KG', 'e.K.', 'AG', 'GbR']
+COMPANY_KINDS = ['Hausverwaltung', 'Immobilien', 'Arztpraxis', 'Zahnarztpraxis', 'Bäckerei', 'Autohaus',
+                 'Steuerberatung', 'Hotel', 'Ferienwohnungen', 'Kanzlei', 'Physiotherapie', 'Metallbau']
+STREETS = ['Hauptstraße', 'Bahnhofstraße', 'Schulstraße', 'Gartenstraße', 'Breite Straße', 'Marktstraße',
+           'Kirchstraße', 'Lindenallee', 'Am Brocken', 'Harzstraße', 'Bergstraße', 'Mühlenweg',
+           'Rosenweg', 'Goethestraße', 'Schillerstraße', 'Forstweg', 'Am Kurpark', 'Talstraße']
+# (postal code, city) in the service area
+CITIES = [('38640', 'Goslar'), ('38855', 'Wernigerode'), ('38820', 'Halberstadt'), ('06484', 'Quedlinburg'),
+          ('38667', 'Bad Harzburg'), ('37520', 'Osterode am Harz'), ('38678', 'Clausthal-Zellerfeld'),
+          ('06502', 'Thale'), ('38889', 'Blankenburg (Harz)'), ('37444', 'Sankt Andreasberg'),
+          ('38700', 'Braunlage'), ('38690', 'Goslar-Vienenburg'), ('06493', 'Harzgerode'), ('38875', 'Oberharz')]
+AREA_CODES = {'Goslar': '05321', 'Wernigerode': '03943', 'Halberstadt': '03941', 'Quedlinburg': '03946',
+              'Bad Harzburg': '05322', 'Osterode am Harz': '05522', 'Clausthal-Zellerfeld': '05323',
+              'Thale': '03947', 'Blankenburg (Harz)': '03944', 'Sankt Andreasberg': '05582',
+              'Braunlage': '05520', 'Goslar-Vienenburg': '05324', 'Harzgerode': '039484', 'Oberharz': '039454'}
+MAIL_DOMAINS = ['web.de', 'gmx.de', 't-online.de', 'gmail.com', 'freenet.de', 'posteo.de']
+
+# service type -> (title, catalogue of (item description, unit, unit price))
+SERVICES = {
+    'building_cleaning': ('Unterhaltsreinigung', [('Unterhaltsreinigung Büroflächen', 'm²', 1.85),
+                                                  ('Treppenhausreinigung', 'Stunden', 32.0),
+                                                  ('Glasreinigung innen und außen', 'm²', 2.9),
+                                                  ('Grundreinigung Bodenbeläge', 'm²', 4.5),
+                                                  ('Sanitärreinigung', 'Stunden', 34.0)]),
+    'garden_maintenance': ('Gartenpflege', [('Rasenmähen inkl. Entsorgung', 'm²', 0.45),
+                                            ('Heckenschnitt', 'Stunden', 38.0),
+                                            ('Laubbeseitigung', 'Stunden', 35.0),
+                                            ('Grünschnitt-Entsorgung', 'Stück', 45.0)]),
+    'winter_service': ('Winterdienst', [('Räum- und Streudienst Gehweg', 'Stück', 18.5),
+                                        ('Streugut', 'Stück', 12.0),
+                                        ('Bereitschaftspauschale Saison', 'Stück', 240.0)]),
+}
+SERVICE_WEIGHTS = [6, 3, 1]
+RECURRING_INTERVALS = ['weekly', 'monthly', 'quarterly']
+ACTIVITY_TYPES = ['work', 'work', 'work', 'travel', 'meeting', 'break']
+MESSAGE_TOPICS = [
+    ('Terminbestätigung', 'Vielen Dank für Ihren Auftrag. Wir bestätigen den Termin am {day}.'),
+    ('Rückfrage Schlüsselübergabe', 'Bitte hinterlegen Sie den Schlüssel wie besprochen beim Hausmeister.'),
+    ('Angebot', 'Anbei erhalten Sie unser Angebot. Bei Fragen melden Sie sich gern.'),
+    ('Reklamation', 'Die Fenster im Erdgeschoss wurden leider nicht gereinigt. Bitte um Nachbesserung.'),
+    ('Zahlungserinnerung', 'Wir möchten Sie freundlich an die offene Rechnung erinnern.'),
+    ('Rückruf', 'Kunde bittet um Rückruf wegen eines zusätzlichen Termins.'),
+]
+QUALITY_CRITERIA = ['Sauberkeit', 'Vollständigkeit', 'Pünktlichkeit', 'Freundlichkeit']
+# (name, category, unit, unit price, supplier)
+PRODUCTS = [('Allzweckreiniger 10 l', 'Reinigungsmittel', 'Kanister', 24.9, 'Dr. Schnell'),
+            ('Glasreiniger 1 l', 'Reinigungsmittel', 'Flasche', 4.2, 'Dr. Schnell'),
+            ('Sanitärreiniger 1 l', 'Reinigungsmittel', 'Flasche', 5.1, 'Kiehl'),
+            ('Mikrofasertücher (10 Stück)', 'Verbrauchsmaterial', 'Packung', 12.5, 'Vermop'),
+            ('Müllbeutel 120 l (25 Stück)', 'Verbrauchsmaterial', 'Rolle', 6.8, 'Deiss'),
+            ('Einweghandschuhe Nitril (100 Stück)', 'Arbeitsschutz', 'Box', 9.9, 'Ampri'),
+            ('Wischmopp-Bezug 50 cm', 'Geräte', 'Stück', 8.4, 'Vermop'),
+            ('Streusalz 25 kg', 'Winterdienst', 'Sack', 11.0, 'Harzer Baustoffe'),
+            ('Splitt 25 kg', 'Winterdienst', 'Sack', 7.5, 'Harzer Baustoffe'),
+            ('Rasendünger 10 kg', 'Garten', 'Sack', 29.0, 'Baywa'),
+            ('Heckenscheren-Öl', 'Garten', 'Flasche', 6.5, 'Stihl'),
+            ('Kettensägen-Kette 35 cm', 'Garten', 'Stück', 24.0, 'Stihl')]
+
+
+class _Generator:
+    """One run: the random source, the clock and the next free id per table"""
+
+    def __init__(self, connection, seed, now):
+        self.connection = connection
+        self.random = random.Random(seed)
+        self.now = now
+        self.next_ids = {}
+        self.counts = Counter()
+
+    def ids(self, table, count):
+        """count fresh ids; the run holds the write lock, so nobody else takes them"""
+        if table not in self.next_ids:
+            self.next_ids[table] = self.connection.execute(
+                text(f'SELECT COALESCE(MAX(id), 0) + 1 FROM {table}')).scalar_one()
+        first = self.next_ids[table]
+        self.next_ids[table] += count
+        return range(first, first + count)
+
+    def numbers(self, document_type, rows, field):
+        """Fill rows[*][field] with consecutive numbers of the year each row was created in"""
+        by_year = {}
+        for row in rows:
+            by_year.setdefault(sequence_year(document_type, row['created_at']), []).append(row)
+        for year, year_rows in sorted(by_year.items()):
+            first = reserve(self.connection, document_type, year, len(year_rows))
+            for value, row in enumerate(year_rows, first):
+                row[field] = format_number(document_type, year, value)
+
+    def moment(self, start, days):
+        """A working-hours timestamp up to days after start, never in the future"""
+        when = start + timedelta(days=self.random.uniform(0, days))
+        when = when.replace(hour=self.random.randint(7, 17), minute=self.random.choice((0, 15, 30, 45)),
+                            second=0, microsecond=0)
+        return min(when, self.now)
+
+    def count(self, mean):
+        """Rows per customer: 0 .. 2 * mean, averaging mean"""
+        return self.random.randint(0, int(2 * mean))
+
+    def insert(self, model, rows):
+        if rows:
+            self.connection.execute(insert(model), rows)
+            self.counts[model.__tablename__] += len(rows)
+
+    # Tables
+
+    def employees(self, count):
+        existing = self.connection.execute(text('SELECT id, first_name, last_name FROM users')).fetchall()
+        rows = []
+        for user_id in self.ids('users', max(count - len(existing), 0)):
+            first, last = self.random.choice(FIRST_NAMES), self.random.choice(LAST_NAMES)
+            rows.append({'id': user_id, 'username': f'{first}.{last}.{user_id}'.lower(),
+                         'email': f'mitarbeiter{user_id}@goclean-harz.de', 'password_hash': '!',
+                         'first_name': first, 'last_name': last, 'role': 'user', 'is_active': True,
+                         'created_at': self.now - timedelta(days=HISTORY_DAYS), 'updated_at': self.now})
+        self.insert(User, rows)
+        return [(row.id, f'{row.first_name or ""} {row.last_name or ""}'.strip()) for row in existing] + [
+            (row['id'], f"{row['first_name']} {row['last_name']}") for row in rows]
+
+    def inventory(self):
+        rows = []
+        item_ids = self.ids('inventory_items', len(PRODUCTS))
+        for (name, category, unit, unit_price, supplier), item_id in zip(PRODUCTS, item_ids):
+            rows.append({'id': item_id, 'name': name, 'category': category, 'sku': f'SYN-{item_id:05d}',
+                         'quantity': self.random.randint(0, 200), 'unit': unit, 'unit_price': unit_price,
+                         'reorder_point': 20, 'supplier': supplier, 'location': 'Lager Goslar',
+                         'status': 'active', 'created_at': self.now, 'updated_at': self.now,
+                         'last_updated': self.now})
+        self.insert(InventoryItem, rows)
+
+    def customers(self, count):
+        rows = []
+        for customer_id in self.ids('customers', count):
+            first, last = self.random.choice(FIRST_NAMES), self.random.choice(LAST_NAMES)
+            postal_code, city = self.random.choice(CITIES)
+            business = self.random.random() < 0.3
+            created = self.moment(self.now - timedelta(days=HISTORY_DAYS), HISTORY_DAYS)
+            rows.append({
+                'id': customer_id,
+                'company_name': (f'{self.random.choice(COMPANY_KINDS)} {last} {self.random.choice(COMPANY_FORMS)}'
+                                 if business else None),
+                'first_name': first,
+                'last_name': last,
+                'email': (f'{first}.{last}{customer_id}@{self.random.choice(MAIL_DOMAINS)}'.lower()
+                          .replace('ä', 'ae').replace('ö', 'oe').replace('ü', 'ue').replace('ß', 'ss')),
+                'phone': f'{AREA_CODES[city]} {self.random.randint(10000, 999999)}',
+                'mobile': f'01{self.random.choice((51, 52, 57, 60, 70, 76))} {self.random.randint(1000000, 99999999)}',
+                'street': self.random.choice(STREETS),
+                'house_number': str(self.random.randint(1, 120)) + self.random.choice(('', '', '', 'a', 'b')),
+                'postal_code': postal_code,
+                'city': city,
+                'customer_type': 'business' if business else 'private',
+                'preferred_contact_method': self.random.choice(('email', 'email', 'phone', 'whatsapp')),
+                'created_at': created,
+                'updated_at': created,
+                'is_active': self.random.random() < 0.95
+            })
+        self.numbers('customer', rows, 'customer_number')
+        self.insert(Customer, rows)
+        return rows
+
+    def orders(self, customers):
+        rows = []
+        for customer in customers:
+            for _ in range(self.count(3)):
+                service_type = self.random.choices(list(SERVICES), SERVICE_WEIGHTS)[0]
+                created = self.moment(customer['created_at'], 60)
+                scheduled = (created + timedelta(days=self.random.randint(1, 45))).date()
+                if scheduled < self.now.date():
+                    status = 'completed' if self.random.random() < 0.9 else 'cancelled'
+                elif scheduled == self.now.date():
+                    status = 'in_progress'
+                else:
+                    status = self.random.choice(('pending', 'confirmed', 'confirmed'))
+                price = round(self.random.uniform(80, 1800), 2)
+                recurring = self.random.random() < 0.03
+                rows.append({
+                    'customer_id': customer['id'],
+                    'title': f"{SERVICES[service_type][0]} {customer['street']} {customer['house_number']}",
+                    'description': f"{SERVICES[service_type][0]} für {customer['company_name'] or customer['last_name']}",
+                    'service_type': service_type,
+                    'service_street': customer['street'],
+                    'service_house_number': customer['house_number'],
+                    'service_postal_code': customer['postal_code'],
+                    'service_city': customer['city'],
+                    'scheduled_date': scheduled,
+                    'scheduled_time': datetime.min.time().replace(hour=self.random.randint(7, 16)),
+                    'estimated_duration': self.random.choice((60, 90, 120, 180, 240)),
+                    'status': status,
+                    'priority': self.random.choices(('low', 'normal', 'high', 'urgent'), (2, 12, 3, 1))[0],
+                    'estimated_price': price,
+                    'final_price': round(price * self.random.uniform(0.9, 1.15), 2) if status == 'completed' else None,
+                    'is_recurring': recurring,
+                    'recurring_interval': self.random.choice(RECURRING_INTERVALS) if recurring else None,
+                    'created_at': created,
+                    'updated_at': created,
+                    'completed_at': (datetime.combine(scheduled, datetime.min.time()) + timedelta(hours=15)
+                                     if status == 'completed' else None),
+                    'special_instructions': 'Bitte Hintereingang benutzen' if self.random.random() < 0.2 else None,
+                    'access_instructions': 'Schlüssel beim Hausmeister' if self.random.random() < 0.2 else None
+                })
+        for row, order_id in zip(rows, self.ids('orders', len(rows))):
+            row['id'] = order_id
+        self.numbers('order', rows, 'order_number')
+        self.insert(Order, rows)
+        return rows
+
+    def _items(self, service_type, foreign_key, document_id, item_ids):
+        items = []
+        catalogue = SERVICES[service_type][1]
+        for sort_order in range(self.random.randint(1, min(4, len(catalogue)))):
+            description, unit, unit_price = catalogue[sort_order]
+            quantity = self.random.randint(20, 400) if unit == 'm²' else self.random.randint(1, 12)
+            items.append({'id': next(item_ids), foreign_key: document_id, 'description': description,
+                          'quantity': float(quantity), 'unit': unit, 'unit_price': unit_price,
+                          'total_price': 0.0, 'sort_order': sort_order})
+        return items
+
+    def quotes(self, customers):
+        rows = []
+        for customer in customers:
+            for _ in range(self.count(1.5)):
+                service_type = self.random.choices(list(SERVICES), SERVICE_WEIGHTS)[0]
+                created = self.moment(customer['created_at'], 90)
+                age = (self.now - created).days
+                status = (self.random.choice(('draft', 'sent')) if age < 14
+                          else self.random.choices(('accepted', 'rejected', 'expired'), (5, 2, 2))[0])
+                rows.append({
+                    'customer_id': customer['id'],
+                    'title': f'Angebot {SERVICES[service_type][0]}',
+                    'service_type': service_type,
+                    'service_street': customer['street'],
+                    'service_house_number': customer['house_number'],
+                    'service_postal_code': customer['postal_code'],
+                    'service_city': customer['city'],
+                    'subtotal': 0.0, 'tax_rate': 19.0, 'tax_amount': 0.0, 'total_amount': 0.0,
+                    'status': status,
+                    'valid_until': (created + timedelta(days=30)).date(),
+                    'created_at': created,
+                    'updated_at': created,
+                    'sent_at': created + timedelta(hours=2) if status != 'draft' else None,
+                    'accepted_at': created + timedelta(days=self.random.randint(1, 10)) if status == 'accepted' else None
+                })
+        for row, quote_id in zip(rows, self.ids('quotes', len(rows))):
+            row['id'] = quote_id
+        self.numbers('quote', rows, 'quote_number')
+        self.insert(Quote, rows)
+
+        item_ids = iter(self.ids('quote_items', 4 * len(rows)))
+        items = [item for row in rows for item in self._items(row['service_type'], 'quote_id', row['id'], item_ids)]
+        # The item triggers add up the quote totals
+        self.insert(QuoteItem, items)
+
+    def invoices(self, orders):
+        rows = []
+        for order in orders:
+            if order['status'] != 'completed' or self.random.random() < 0.3:
+                continue
+            created = min(order['completed_at'] + timedelta(days=self.random.randint(0, 5)), self.now)
+            age = (self.now - created).days
+            if age > 30:
+                status = 'paid' if self.random.random() < 0.92 else 'overdue'
+            else:
+                status = self.random.choice(('draft', 'sent', 'sent', 'paid'))
+            rows.append({
+                'customer_id': order['customer_id'],
+                'order_id': order['id'],
+                'service_type': order['service_type'],
+                'invoice_date': created.date(),
+                'due_date': (created + timedelta(days=14)).date(),
+                'subtotal': 0.0, 'tax_rate': 19.0, 'tax_amount': 0.0, 'total_amount': 0.0,
+                'status': status,
+                'payment_method': 'bank_transfer',
+                'payment_date': created + timedelta(days=self.random.randint(3, 20)) if status == 'paid' else None,
+                'created_at': created,
+                'updated_at': created,
+                'sent_at': created + timedelta(hours=1) if status != 'draft' else None
+            })
+        # Ids and numbers follow the invoice date, like the gap-free numbering in the app
+        rows.sort(key=lambda row: row['created_at'])
+        for row, invoice_id in zip(rows, self.ids('invoices', len(rows))):
+            row['id'] = invoice_id
+        self.numbers('invoice', rows, 'invoice_number')
+
+        item_ids = iter(self.ids('invoice_items', 4 * len(rows)))
+        items = [item for row in rows
+                 for item in self._items(row.pop('service_type'), 'invoice_id', row['id'], item_ids)]
+        self.insert(Invoice, rows)
+        self.insert(InvoiceItem, items)
+
+    def communications(self, customers):
+        rows = []
+        for customer in customers:
+            for _ in range(self.count(4)):
+                subject, content = self.random.choice(MESSAGE_TOPICS)
+                created = self.moment(customer['created_at'], (self.now - customer['created_at']).days)
+                message_type = self.random.choice(('email', 'email', 'phone', 'whatsapp', 'note', 'meeting'))
+                follow_up = self.random.random() < 0.08
+                rows.append({
+                    'customer_id': customer['id'],
+                    'type': message_type,
+                    'direction': self.random.choice(('inbound', 'outbound')),
+                    'subject': subject,
+                    'content': content.format(day=(created + timedelta(days=7)).strftime('%d.%m.%Y')),
+                    'contact_person': f"{customer['first_name']} {customer['last_name']}",
+                    'contact_method': customer['email'] if message_type == 'email' else customer['phone'],
+                    'status': 'follow_up_required' if follow_up else 'completed',
+                    'follow_up_date': created + timedelta(days=3) if follow_up else None,
+                    'follow_up_completed': False,
+                    'communication_date': created,
+                    'created_at': created,
+                    'updated_at': created,
+                    'is_important': self.random.random() < 0.05
+                })
+        for row, communication_id in zip(rows, self.ids('communications', len(rows))):
+            row['id'] = communication_id
+        self.insert(Communication, rows)
+
+    def time_entries(self, orders, employees):
+        rows = []
+        for order in orders:
+            if order['status'] not in ('completed', 'in_progress'):
+                continue
+            user_id, user_name = self.random.choice(employees)
+            start = min(datetime.combine(order['scheduled_date'], order['scheduled_time']), self.now)
+            for _ in range(self.random.randint(1, 2)):
+                activity_type = self.random.choice(ACTIVITY_TYPES)
+                minutes = self.random.randint(15, 60) if activity_type != 'work' else self.random.randint(60, 300)
+                end = start + timedelta(minutes=minutes)
+                running = order['status'] == 'in_progress' or end > self.now
+                rows.append({
+                    'user_id': user_id,
+                    'user_name': user_name,
+                    'customer_id': order['customer_id'],
+                    'order_id': order['id'],
+                    'start_time': start,
+                    'end_time': None if running else end,
+                    'description': order['title'],
+                    'activity_type': activity_type,
+                    'status': 'active' if running else 'completed',
+                    'created_at': start,
+                    'updated_at': start if running else end
+                })
+                start = end
+        for row, entry_id in zip(rows, self.ids('time_entries', len(rows))):
+            row['id'] = entry_id
+        self.insert(TimeEntry, rows)
+
+    def quality_checks(self, orders, employees):
+        rows = []
+        for order in orders:
+            if order['status'] != 'completed' or self.random.random() < 0.6:
+                continue
+            inspector_id, inspector_name = self.random.choice(employees)
+            scores = {criterion: self.random.randint(60, 100) for criterion in QUALITY_CRITERIA}
+            checked = order['completed_at'] + timedelta(hours=1)
+            score = round(sum(scores.values()) / len(scores), 1)
+            rows.append({
+                'order_id': order['id'],
+                'customer_id': order['customer_id'],
+                'inspector_id': inspector_id,
+                'inspector_name': inspector_name,
+                'check_date': checked,
+                'check_type': self.random.choice(('cleaning', 'maintenance', 'inspection', 'final')),
+                'overall_score': score,
+                'status': 'completed' if score >= 70 else 'failed',
+                'check_details': json.dumps(scores, ensure_ascii=False),
+                'recommendations': 'Glasflächen häufiger reinigen' if score < 80 else None,
+                'created_at': checked,
+                'updated_at': checked
+            })
+        for row, check_id in zip(rows, self.ids('quality_checks', len(rows))):
+            row['id'] = check_id
+        self.insert(QualityCheck, rows)
+
+
+def generate(connection, rows=10_000, seed=0, now=None, progress=None):
+    """Insert about `rows` synthetic rows in the connection's transaction; returns {table: rows inserted}
+
+    progress(rows written so far), if given, is called after every batch.
+    """
+    generator = _Generator(connection, seed, now or datetime.now().replace(microsecond=0))
+    customer_count = max(rows // ROWS_PER_CUSTOMER, 1)
+    employees = generator.employees(min(max(customer_count // CUSTOMERS_PER_EMPLOYEE, 3), MAX_EMPLOYEES))
+    generator.inventory()
+
+    for start in range(0, customer_count, CUSTOMERS_PER_BATCH):
+        customers = generator.customers(min(CUSTOMERS_PER_BATCH, customer_count - start))
+        orders = generator.orders(customers)
+        generator.quotes(customers)
+        generator.invoices(orders)
+        generator.communications(customers)
+        generator.time_entries(orders, employees)
+        generator.quality_checks(orders, employees)
+        if progress:
+            progress(sum(generator.counts.values()))
+
+    rebuild_counters(connection)
+    return dict(generator.counts)
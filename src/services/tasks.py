@@ -0,0 +1,164 @@
+"""
+Job queue task handlers
+
+Each handler takes the job payload and returns a JSON-serializable result
+that is stored on the job. Database writes are committed by the worker
+together with the job's completion, so handlers must not commit themselves.
+"""
+
+import os
+from datetime import date, datetime
+
+from sqlalchemy.orm import joinedload
+
+from src.models.communication import Communication
+from src.models.invoice import Invoice
+from src.models.order import Order
+from src.models.quote import Quote
+from src.models.user import db
+from src.services.events import prune_events
+from src.services.jobs import enqueue, task
+from src.services.mail import send_email
+from src.services.numbering import next_number
+from src.services.pdf import cached_pdf, invoice_document, pdf_cache, quote_document
+from src.services.recurrence import materialize_upcoming
+from src.services.reports import timetracking_report
+
+
+def _send_document(customer, order_id, subject, body, document):
+    """Email a rendered document to the customer and log it as a communication"""
+    key, path = cached_pdf(document)
+    with open(path, 'rb') as handle:
+        attachment = (document['filename'], handle.read(), 'application/pdf')
+    delivered = send_email(customer.email, subject, body, [attachment])
+    db.session.add(Communication(
+        customer_id=customer.id,
+        order_id=order_id,
+        type='email',
+        direction='outbound',
+        subject=subject,
+        content=body,
+        contact_method=customer.email,
+        status='completed' if delivered else 'pending',
+        communication_date=datetime.utcnow()
+    ))
+    return {'pdf': key, 'delivered': delivered}
+
+
+@task('send_invoice', lane='high')
+def send_invoice(payload):
+    invoice = db.session.get(Invoice, payload['invoice_id'])
+    if invoice is None:
+        return {'sent': False, 'reason': 'Invoice not found'}
+    customer = invoice.customer
+    body = (f"Guten Tag {customer.first_name} {customer.last_name},\n\n"
+            f"anbei erhalten Sie unsere Rechnung {invoice.invoice_number}.\n\n"
+            f"Mit freundlichen Grüßen\nGoClean Harz")
+    result = _send_document(customer, invoice.order_id, f'Rechnung {invoice.invoice_number}', body,
+                            invoice_document(invoice))
+    return {'invoice_id': invoice.id, **result}
+
+
+@task('send_quote', lane='high')
+def send_quote(payload):
+    quote = db.session.get(Quote, payload['quote_id'])
+    if quote is None:
+        return {'sent': False, 'reason': 'Quote not found'}
+    customer = quote.customer
+    body = (f"Guten Tag {customer.first_name} {customer.last_name},\n\n"
+            f"vielen Dank für Ihre Anfrage. Anbei erhalten Sie unser Angebot {quote.quote_number}.\n\n"
+            f"Mit freundlichen Grüßen\nGoClean Harz")
+    result = _send_document(customer, None, f'Angebot {quote.quote_number}', body, quote_document(quote))
+    return {'quote_id': quote.id, **result}
+
+
+@task('quote_accepted')
+def quote_accepted(payload):
+    """Turn an accepted quote into a pending order"""
+    quote = db.session.get(Quote, payload['quote_id'])
+    if quote is None or quote.status != 'accepted':
+        return {'order_id': None}
+    order = Order(
+        order_number=next_number('order'),
+        customer_id=quote.customer_id,
+        title=quote.title,
+        description=quote.description,
+        service_type=quote.service_type,
+        service_street=quote.service_street,
+        service_house_number=quote.service_house_number,
+        service_postal_code=quote.service_postal_code,
+        service_city=quote.service_city,
+        estimated_price=quote.total_amount,
+        status='pending'
+    )
+    db.session.add(order)
+    db.session.flush()
+    return {'order_id': order.id, 'order_number': order.order_number}
+
+
+@task('dunning', lane='low')
+def dunning(payload):
+    """Mark sent invoices past their due date overdue and queue a reminder for each"""
+    invoices = Invoice.query.filter(Invoice.status == 'sent', Invoice.due_date < date.today()).all()
+    for invoice in invoices:
+        invoice.status = 'overdue'
+        invoice.updated_at = datetime.utcnow()
+        enqueue('payment_reminder', {'invoice_id': invoice.id}, idempotency_key=f'payment_reminder:{invoice.id}')
+    return {'overdue': [invoice.id for invoice in invoices]}
+
+
+@task('payment_reminder')
+def payment_reminder(payload):
+    invoice = db.session.get(Invoice, payload['invoice_id'])
+    if invoice is None or invoice.status != 'overdue':
+        return {'sent': False}
+    customer = invoice.customer
+    body = (f"Guten Tag {customer.first_name} {customer.last_name},\n\n"
+            f"sicher ist es Ihrer Aufmerksamkeit entgangen: Die Rechnung {invoice.invoice_number} "
+            f"war am {invoice.due_date:%d.%m.%Y} fällig. Bitte überweisen Sie den offenen Betrag "
+            f"in den nächsten Tagen.\n\nMit freundlichen Grüßen\nGoClean Harz")
+    result = _send_document(customer, invoice.order_id, f'Zahlungserinnerung {invoice.invoice_number}', body,
+                            invoice_document(invoice))
+    return {'invoice_id': invoice.id, **result}
+
+
+@task('follow_up_reminders', lane='low')
+def follow_up_reminders(payload):
+    """Daily digest of the communications whose follow-up date has passed"""
+    due = Communication.query.options(joinedload(Communication.customer)).filter(
+        Communication.follow_up_date <= datetime.utcnow(),
+        db.or_(Communication.follow_up_completed.is_(False), Communication.follow_up_completed.is_(None))
+    ).order_by(Communication.follow_up_date).all()
+    if due:
+        lines = [f"- {item.follow_up_date:%d.%m.%Y}: {item.customer.first_name} {item.customer.last_name} "
+                 f"- {item.subject or item.type}" for item in due]
+        send_email(os.environ.get('MAIL_STAFF'), f'Wiedervorlagen: {len(due)} fällig',
+                   'Folgende Kontakte warten auf Rückmeldung:\n\n' + '\n'.join(lines))
+    return {'due': [item.id for item in due]}
+
+
+@task('materialize_recurring', lane='low')
+def materialize_recurring(payload):
+    """Turn the occurrences of recurring orders in the next days into real orders"""
+    return {'orders': materialize_upcoming()}
+
+
+@task('prune_events', lane='low')
+def prune_outbox_events(payload):
+    """Drop change-feed events past their retention; clients that far behind get a reset"""
+    return {'deleted': prune_events()}
+
+
+@task('prune_pdf_cache', lane='low')
+def prune_pdf_cache(payload):
+    """Drop the least recently used PDFs once the cache outgrows PDF_CACHE_MAX_BYTES"""
+    return {'deleted': pdf_cache.prune()}
+
+
+@task('timetracking_report', lane='low')
+def build_timetracking_report(payload):
+    report = timetracking_report(datetime.fromisoformat(payload['date_from']),
+                                 datetime.fromisoformat(payload['date_to']),
+                                 payload.get('user_id'))
+    report['period'] = {'from': payload['date_from'], 'to': payload['date_to']}
+    return report
@@ -0,0 +1,186 @@
+"""
+Quote and invoice totals
+
+Item total_price and the subtotal/tax_amount/total_amount of quotes and
+invoices are kept current by SQLite triggers (migration 3), so every insert,
+update and delete of an item - ORM, Query.delete() or raw SQL - adjusts the
+stored totals in the same statement and nothing has to load the items or
+commit twice. All arithmetic is done in integer cents and rounds half away
+from zero; quantities are taken to 3 decimals, prices and tax rates to 2.
+
+The Decimal functions below are the reference for that arithmetic;
+verify_totals() recomputes every document with them and reports (or
+repairs) drift.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import text
+
+# (document table, item table, item foreign key)
+TOTALED_TABLES = [
+    ('quotes', 'quote_items', 'quote_id'),
+    ('invoices', 'invoice_items', 'invoice_id'),
+]
+
+
+def _scaled(value, places):
+    """Decimal value as an integer number of 10**-places units"""
+    exponent = Decimal(1).scaleb(-places)
+    return int(Decimal(str(value or 0)).quantize(exponent, ROUND_HALF_UP).scaleb(places))
+
+
+def _div_half_up(numerator, denominator):
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if 2 * remainder >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def to_cents(amount):
+    return _scaled(amount, 2)
+
+
+def from_cents(cents):
+    return float(Decimal(cents).scaleb(-2))
+
+
+def line_total_cents(quantity, unit_price):
+    """quantity x unit_price in cents"""
+    return _div_half_up(_scaled(quantity, 3) * _scaled(unit_price, 2), 1000)
+
+
+def tax_cents(subtotal_cents, tax_rate):
+    """tax_rate percent of the subtotal in cents"""
+    return _div_half_up(subtotal_cents * _scaled(tax_rate, 2), 10000)
+
+
+# Relative nudge away from zero before ROUND(). _scaled() rounds the shortest
+# decimal form of a float (1.005 is 1.005 there), SQL sees the binary value
+# (1.00499999999999989...), which is off by at most ~2e-16 of the value.
+# 1e-12 covers that and is still far below the gap to the half for any
+# amount with up to 11 significant digits.
+ROUNDING_EPSILON = 1e-12
+
+
+# The same arithmetic as SQL expressions for the triggers
+def _sql_scaled(expression, places):
+    return f'CAST(ROUND(COALESCE({expression}, 0) * {10 ** places} * {1 + ROUNDING_EPSILON!r}) AS INTEGER)'
+
+
+def _sql_div_half_up(numerator, denominator):
+    half = denominator // 2
+    return (f'(CASE WHEN ({numerator}) >= 0 THEN (({numerator}) + {half}) / {denominator} '
+            f'ELSE -((-({numerator}) + {half}) / {denominator}) END)')
+
+
+def _sql_line_total(row):
+    return _sql_div_half_up(f"{_sql_scaled(f'{row}.quantity', 3)} * {_sql_scaled(f'{row}.unit_price', 2)}", 1000)
+
+
+def total_triggers(table, item_table, foreign_key):
+    """CREATE TRIGGER statements maintaining one document table from its items"""
+    cents = lambda expression: _sql_scaled(expression, 2)
+    add = lambda row, sign: (
+        f'UPDATE {table} SET subtotal = ({cents("subtotal")} {sign} {cents(f"{row}.total_price")}) / 100.0 '
+        f'WHERE id = {row}.{foreign_key};'
+    )
+    tax = _sql_div_half_up(f"{cents('NEW.subtotal')} * {_sql_scaled('NEW.tax_rate', 2)}", 10000)
+    return [
+        # New item: count it as given, then normalize its total_price (which re-enters below)
+        f'CREATE TRIGGER IF NOT EXISTS trg_{item_table}_insert AFTER INSERT ON {item_table} BEGIN '
+        f'{add("NEW", "+")} '
+        f'UPDATE {item_table} SET total_price = {_sql_line_total("NEW")} / 100.0 '
+        f'WHERE id = NEW.id AND {cents("total_price")} <> {_sql_line_total("NEW")}; END',
+
+        f'CREATE TRIGGER IF NOT EXISTS trg_{item_table}_price AFTER UPDATE OF quantity, unit_price ON {item_table} BEGIN '
+        f'UPDATE {item_table} SET total_price = {_sql_line_total("NEW")} / 100.0 WHERE id = NEW.id; END',
+
+        f'CREATE TRIGGER IF NOT EXISTS trg_{item_table}_total AFTER UPDATE OF total_price, {foreign_key} ON {item_table} BEGIN '
+        f'{add("OLD", "-")} {add("NEW", "+")} END',
+
+        f'CREATE TRIGGER IF NOT EXISTS trg_{item_table}_delete AFTER DELETE ON {item_table} BEGIN '
+        f'{add("OLD", "-")} END',
+
+        # Tax and total follow the subtotal and the tax rate
+        f'CREATE TRIGGER IF NOT EXISTS trg_{table}_totals AFTER UPDATE OF subtotal, tax_rate ON {table} BEGIN '
+        f'UPDATE {table} SET tax_amount = {tax} / 100.0, total_amount = ({cents("NEW.subtotal")} + {tax}) / 100.0 '
+        f'WHERE id = NEW.id; END',
+    ]
+
+
+def install_total_triggers(connection):
+    for table, item_table, foreign_key in TOTALED_TABLES:
+        for statement in total_triggers(table, item_table, foreign_key):
+            connection.exec_driver_sql(statement)
+
+
+def reinstall_total_triggers(connection):
+    """Replace the installed triggers with the current total_triggers() SQL"""
+    for table, item_table, _ in TOTALED_TABLES:
+        for name in [f'trg_{item_table}_insert', f'trg_{item_table}_price', f'trg_{item_table}_total',
+                     f'trg_{item_table}_delete', f'trg_{table}_totals']:
+            connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {name}')
+    install_total_triggers(connection)
+
+
+def verify_totals(connection, repair=False):
+    """Recompute every item and document total; returns a list of drifted values
+
+    Each entry is {'table', 'id', 'column', 'stored', 'expected'} with amounts
+    as strings. With repair=True the stored values are corrected as well.
+    """
+    drift = []
+    for table, item_table, foreign_key in TOTALED_TABLES:
+        subtotals = {}
+        items = connection.execute(text(
+            f'SELECT id, {foreign_key}, quantity, unit_price, total_price FROM {item_table}'
+        ))
+        item_fixes = []
+        fixed_parents = set()
+        for item_id, parent_id, quantity, unit_price, total_price in items:
+            expected = line_total_cents(quantity, unit_price)
+            subtotals[parent_id] = subtotals.get(parent_id, 0) + expected
+            if to_cents(total_price) != expected:
+                drift.append(_drift(item_table, item_id, 'total_price', total_price, expected))
+                item_fixes.append({'id': item_id, 'total_price': from_cents(expected)})
+                fixed_parents.add(parent_id)
+
+        documents = connection.execute(text(
+            f'SELECT id, tax_rate, subtotal, tax_amount, total_amount FROM {table}'
+        ))
+        document_fixes = []
+        for document_id, tax_rate, subtotal, tax_amount, total_amount in documents:
+            expected_subtotal = subtotals.get(document_id, 0)
+            expected_tax = tax_cents(expected_subtotal, tax_rate)
+            expected = {
+                'subtotal': expected_subtotal,
+                'tax_amount': expected_tax,
+                'total_amount': expected_subtotal + expected_tax,
+            }
+            stored = {'subtotal': subtotal, 'tax_amount': tax_amount, 'total_amount': total_amount}
+            drifted = [column for column in expected if to_cents(stored[column]) != expected[column]]
+            for column in drifted:
+                drift.append(_drift(table, document_id, column, stored[column], expected[column]))
+            if drifted or document_id in fixed_parents:
+                document_fixes.append({'id': document_id, 'subtotal': from_cents(expected_subtotal)})
+
+        if repair:
+            # Items first: their triggers shift the subtotals, which are then set outright
+            if item_fixes:
+                connection.execute(text(f'UPDATE {item_table} SET total_price = :total_price WHERE id = :id'),
+                                   item_fixes)
+            if document_fixes:
+                connection.execute(text(f'UPDATE {table} SET subtotal = :subtotal WHERE id = :id'),
+                                   document_fixes)
+    return drift
+
+
+def _drift(table, row_id, column, stored, expected_cents):
+    return {
+        'table': table,
+        'id': row_id,
+        'column': column,
+        'stored': str(Decimal(str(stored or 0)).quantize(Decimal('0.01'), ROUND_HALF_UP)),
+        'expected': str(Decimal(expected_cents).scaleb(-2)),
+    }
@@ -92,7 +92,9 @@ export const api = {
 
 // Spezifische API-Funktionen für verschiedene Module
 export const customerAPI = {
-  getAll: () => api.get('/customers'),
+  // view: 'list' (Tabellenspalten) oder 'picker' (Auswahlfelder); ohne view alle Felder
+  getAll: (view) => api.get(view ? `/customers?view=${view}` : '/customers'),
+  lookup: (q = '', limit = 20) => api.get(`/customers/lookup?${new URLSearchParams({ q, limit })}`),
   getById: (id) => api.get(`/customers/${id}`),
   create: (data) => api.post('/customers', data),
   update: (id, data) => api.put(`/customers/${id}`, data),
@@ -100,7 +102,7 @@ export const customerAPI = {
 }
 
 export const orderAPI = {
-  getAll: () => api.get('/orders'),
+  getAll: (view) => api.get(view ? `/orders?view=${view}` : '/orders'),
   getById: (id) => api.get(`/orders/${id}`),
   create: (data) => api.post('/orders', data),
   update: (id, data) => api.put(`/orders/${id}`, data),
@@ -122,3 +124,17 @@ export const invoiceAPI = {
   update: (id, data) => api.put(`/invoices/${id}`, data),
   delete: (id) => api.delete(`/invoices/${id}`)
 }
+
+// Änderungen als Server-Sent Events (/api/events). Der Browser verbindet sich
+// selbst neu und setzt dabei Last-Event-ID, es gehen also keine Änderungen verloren.
+// onReset: die Lücke ist zu alt für eine Wiederholung, die Liste neu laden.
+// Gibt eine Funktion zum Abmelden zurück.
+export const subscribeToChanges = ({ entity, customerId } = {}, onChange, onReset) => {
+  const params = new URLSearchParams()
+  if (entity) params.append('entity', entity)
+  if (customerId) params.append('customer_id', customerId)
+  const source = new EventSource(`${API_BASE_URL}/events?${params}`)
+  source.onmessage = (message) => onChange(JSON.parse(message.data))
+  source.addEventListener('reset', () => onReset && onReset())
+  return () => source.close()
+}
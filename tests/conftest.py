@@ -0,0 +1,135 @@
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from datetime import datetime, timedelta, date
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from src.models.user import db, User
+from src.models.customer import Customer
+from src.models.order import Order
+from src.models.quote import Quote
+from src.models.invoice import Invoice
+from src.models.communication import Communication
+from src.models.quality import QualityCheck
+from src.models.inventory import InventoryItem, InventoryTransaction
+from src.models.timetracking import TimeEntry
+from src.services.migrations import run_migrations
+from src.services.cache import response_cache
+from src.services.pdf import pdf_cache
+from src.services.recurrence import occurrence_cache
+from src.services.events import broker
+from src.routes.customer import customer_bp
+from src.routes.order import order_bp
+from src.routes.quote import quote_bp
+from src.routes.communication import communication_bp
+from src.routes.invoice import invoice_bp
+from src.routes.quality import quality_bp
+from src.routes.inventory import inventory_bp
+from src.routes.timetracking import timetracking_bp
+from src.routes.search import search_bp
+from src.routes.jobs import jobs_bp
+from src.routes.analytics import analytics_bp
+from src.routes.schedule import schedule_bp
+from src.routes.portal import portal_bp
+from src.routes.events import events_bp
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    for blueprint in (customer_bp, order_bp, quote_bp, communication_bp,
+                      invoice_bp, quality_bp, inventory_bp, timetracking_bp, search_bp, jobs_bp,
+                      analytics_bp, schedule_bp, portal_bp, events_bp):
+        app.register_blueprint(blueprint, url_prefix='/api')
+
+    db.init_app(app)
+    # Every test starts from an empty database, so nothing cached may survive it
+    response_cache.clear()
+    occurrence_cache.clear()
+    broker.subscribers.clear()
+    monkeypatch.setattr(pdf_cache, 'directory', str(tmp_path / 'pdf_cache'))
+    with app.app_context():
+        db.create_all()
+        run_migrations(db.engine)
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def query_counter(app):
+    """Collects every (statement, parameters) pair executed while the fixture is active"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def sample_data(app):
+    """A handful of rows per table, every child row pointing at a customer/order"""
+    now = datetime(2024, 3, 1, 8, 0)
+    user = User(username='team', email='team@goclean-harz.de', password_hash='x')
+    db.session.add(user)
+
+    customers = []
+    orders = []
+    for i in range(5):
+        customer = Customer(customer_number=f'K-{i:04d}', first_name=f'Vorname{i}',
+                            last_name=f'Nachname{i}', email=f'kunde{i}@example.de',
+                            created_at=now + timedelta(minutes=i))
+        db.session.add(customer)
+        db.session.flush()
+        order = Order(order_number=f'AU-{i:04d}', customer_id=customer.id, title=f'Auftrag {i}',
+                      service_type='building_cleaning', status='pending',
+                      scheduled_date=date(2024, 3, 1) + timedelta(days=i),
+                      created_at=now + timedelta(minutes=i))
+        db.session.add(order)
+        db.session.flush()
+        customers.append(customer)
+        orders.append(order)
+
+    item = InventoryItem(name='Allzweckreiniger', category='Reinigungsmittel', sku='AW-001')
+    db.session.add(item)
+    db.session.flush()
+
+    for i in range(40):
+        customer = customers[i % len(customers)]
+        order = orders[i % len(orders)]
+        created = now + timedelta(hours=i)
+        db.session.add(Quote(quote_number=f'AN-{i:04d}', customer_id=customer.id, title=f'Angebot {i}',
+                             service_type='building_cleaning', status='draft', created_at=created))
+        db.session.add(Invoice(invoice_number=f'RE-{i:04d}', customer_id=customer.id, order_id=order.id,
+                               invoice_date=created.date(), status='sent', total_amount=100.0 + i,
+                               created_at=created))
+        db.session.add(Communication(customer_id=customer.id, order_id=order.id, type='email',
+                                     direction='outbound', subject=f'Betreff {i}', content='Inhalt',
+                                     created_at=created))
+        db.session.add(QualityCheck(customer_id=customer.id, order_id=order.id, check_type='cleaning',
+                                    overall_score=80 + i % 20, status='completed', created_at=created))
+        db.session.add(TimeEntry(user_id=user.id, user_name='Team', customer_id=customer.id,
+                                 order_id=order.id, start_time=created,
+                                 end_time=created + timedelta(hours=2), status='completed',
+                                 created_at=created))
+        db.session.add(InventoryTransaction(item_id=item.id, transaction_type='out', quantity=1,
+                                            transaction_date=created))
+
+    db.session.commit()
+    return {'user': user, 'customers': customers, 'orders': orders, 'item': item}
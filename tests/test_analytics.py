@@ -0,0 +1,123 @@
+from datetime import date, datetime
+
+import pytest
+
+from src.models.user import db
+from src.models.invoice import Invoice
+from src.models.quality import QualityCheck
+from src.services import analytics
+
+
+@pytest.fixture(params=['python', 'numpy'])
+def backend(request, monkeypatch):
+    """Run each test with the plain-Python columns and, where installed, with NumPy"""
+    if request.param == 'numpy':
+        monkeypatch.setattr(analytics, 'np', pytest.importorskip(
+            'numpy', reason='NumPy not installed (pip install -r requirements-optional.txt)'))
+    else:
+        monkeypatch.setattr(analytics, 'np', None)
+    return request.param
+
+
+@pytest.fixture
+def history(sample_data):
+    """Spread the sample invoices and quality checks over January to April 2024"""
+    invoices = Invoice.query.order_by(Invoice.id).all()
+    for i, invoice in enumerate(invoices):
+        invoice.invoice_date = date(2024, 1 + i % 4, 1 + i // 4)
+        invoice.status = ('sent', 'paid', 'draft', 'paid')[i % 4]
+    checks = QualityCheck.query.order_by(QualityCheck.id).all()
+    for i, check in enumerate(checks):
+        check.check_date = datetime(2024, 1 + i % 4, 10, 9, 0)
+        check.check_type = 'cleaning' if i % 2 else 'final'
+        check.overall_score = 60 + i % 4 * 10  # January 60, February 70, ...
+    db.session.commit()
+    return sample_data
+
+
+def test_revenue_report(backend, history):
+    report = analytics.revenue_report(date(2024, 1, 1), date(2024, 5, 31))
+
+    assert [month['month'] for month in report['monthly']] == ['2024-01', '2024-02', '2024-03', '2024-04', '2024-05']
+    january, february, march, april, may = report['monthly']
+    amounts = [100.0 + i for i in range(40)]
+    assert january['invoiced'] == sum(amounts[0::4]) and january['paid'] == 0
+    assert february['paid'] == february['invoiced'] == sum(amounts[1::4])
+    assert march['invoices'] == 0  # drafts only
+    assert april['open'] == 0 and may['invoices'] == 0
+    assert report['by_status']['draft'] == {'count': 10, 'amount': sum(amounts[2::4])}
+    assert report['total_invoiced'] == sum(amounts) - sum(amounts[2::4])
+    revenue = sorted(amounts[0::4] + amounts[1::4] + amounts[3::4])
+    assert report['invoice_percentiles']['p50'] == (revenue[14] + revenue[15]) / 2
+    assert report['average_invoice'] == round(sum(revenue) / 30, 2)
+
+
+def test_revenue_report_filters_period(backend, history):
+    report = analytics.revenue_report(date(2024, 2, 1), date(2024, 2, 5))
+
+    assert [month['invoices'] for month in report['monthly']] == [5]
+
+
+def test_quality_report(backend, history):
+    report = analytics.quality_report(date(2024, 1, 1), date(2024, 4, 30), window=2)
+
+    assert [month['average'] for month in report['monthly']] == [60.0, 70.0, 80.0, 90.0]
+    assert [month['rolling_average'] for month in report['monthly']] == [60.0, 65.0, 75.0, 85.0]
+    assert report['score_percentiles']['p50'] == 75.0
+    assert report['by_check_type'] == {'final': {'checks': 20, 'average': 70.0},
+                                       'cleaning': {'checks': 20, 'average': 80.0}}
+
+
+def test_utilization_report(backend, sample_data):
+    report = analytics.utilization_report(date(2024, 3, 1), date(2024, 3, 31))
+
+    [team] = report['employees']
+    assert report['capacity_hours'] == 21 * 8.0
+    assert (team['user_name'], team['hours'], team['days_worked']) == ('Team', 80.0, 2)
+    assert team['daily_hours_percentiles'] == {'p50': 40.0, 'p90': 46.4}  # 32 h and 48 h
+    assert team['utilization'] == round(80 / 168, 4)
+    assert team['monthly_hours'] == [80.0]
+
+
+def test_empty_period(backend, app):
+    summary = analytics.analytics_summary(date(2023, 1, 1), date(2023, 12, 31))
+
+    assert summary['revenue']['total_invoiced'] == 0
+    assert summary['revenue']['invoice_percentiles']['p50'] is None
+    assert summary['quality']['monthly'][0] == {'month': '2023-01', 'checks': 0, 'average': None,
+                                                'rolling_average': None}
+    assert summary['utilization']['employees'] == []
+
+
+def test_backends_agree(history, monkeypatch):
+    numpy = pytest.importorskip('numpy', reason='NumPy not installed (pip install -r requirements-optional.txt)')
+    period = (date(2023, 11, 1), date(2024, 6, 30))
+
+    monkeypatch.setattr(analytics, 'np', None)
+    expected = analytics.analytics_summary(*period, window=2)
+    monkeypatch.setattr(analytics, 'np', numpy)
+
+    assert analytics.analytics_summary(*period, window=2) == expected
+
+
+def test_analytics_endpoints(client, history, query_counter):
+    revenue = client.get('/api/analytics/revenue?date_from=2022-01-01&date_to=2024-12-31').get_json()
+    assert len(revenue['monthly']) == 36
+    assert len([statement for statement, _ in query_counter if 'FROM invoices' in statement]) == 1
+
+    summary = client.get('/api/analytics/summary?date_from=2024-01-01&date_to=2024-04-30&window=2').get_json()
+    assert summary['revenue']['total_invoiced'] == revenue['total_invoiced']
+    assert summary['quality']['window'] == 2
+    assert client.get('/api/analytics/utilization?date_from=2024-03-01&date_to=2024-03-31'
+                      '&hours_per_day=4').get_json()['capacity_hours'] == 84.0
+
+    assert client.get('/api/analytics/revenue?date_from=2024-05-01&date_to=2024-01-01').status_code == 400
+    assert client.get('/api/analytics/quality?window=0').status_code == 400
+    assert client.get('/api/analytics/utilization?date_to=morgen').status_code == 400
+
+
+def test_default_period_is_twelve_months(client, app):
+    report = client.get('/api/analytics/revenue?date_to=2024-03-15').get_json()
+
+    assert report['period'] == {'from': '2023-04-01', 'to': '2024-03-15'}
+    assert len(report['monthly']) == 12
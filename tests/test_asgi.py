@@ -0,0 +1,95 @@
+import asyncio
+import http.client
+import json
+import socket
+import time
+
+from src.services.asgi import AsgiAdapter, wsgi_environ
+from src.services.loadtest import asgi_server, http_sender, slow_clients
+
+
+def call(asgi_app, method, path, query=b'', body=b'', headers=()):
+    """(status, headers, body chunks) of one request sent straight to the ASGI app"""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'http_version': '1.1', 'method': method, 'path': path, 'query_string': query,
+             'headers': [(name.encode(), value.encode()) for name, value in headers],
+             'client': ('127.0.0.1', 50000), 'server': ('testserver', 80)}
+    asyncio.run(asgi_app(scope, receive, send))
+    start, *bodies = sent
+    return start['status'], dict(start['headers']), [message['body'] for message in bodies]
+
+
+def test_adapter_serves_the_blueprints(app, client, sample_data):
+    asgi_app = AsgiAdapter(app, threads=2)
+
+    status, headers, chunks = call(asgi_app, 'GET', '/api/quotes', b'status=draft&per_page=5')
+    assert status == 200 and headers[b'content-type'] == b'application/json'
+    assert json.loads(b''.join(chunks)) == client.get('/api/quotes?status=draft&per_page=5').get_json()
+
+    body = json.dumps({'first_name': 'Jörg', 'last_name': 'Öztürk', 'email': 'joerg@example.de'}).encode()
+    status, _, chunks = call(asgi_app, 'POST', '/api/customers', body=body,
+                             headers=[('Content-Type', 'application/json')])
+    assert status == 201 and json.loads(b''.join(chunks))['last_name'] == 'Öztürk'
+
+
+def test_streamed_responses_keep_their_request_context(app, client, sample_data):
+    asgi_app = AsgiAdapter(app, threads=2, stream_threads=2)
+
+    status, headers, chunks = call(asgi_app, 'GET', '/api/customers/export', b'format=csv')
+
+    assert status == 200 and b'content-length' not in headers
+    assert len(chunks) > 1
+    assert b''.join(chunks) == client.get('/api/customers/export?format=csv').get_data()
+
+
+def test_environ_of_a_scope():
+    scope = {'type': 'http', 'method': 'GET', 'path': '/crm/api/search', 'root_path': '/crm',
+             'query_string': b'q=M%C3%BCller', 'headers': [(b'accept', b'text/html'), (b'accept', b'*/*'),
+                                                           (b'content-type', b'text/plain')]}
+    environ = wsgi_environ(scope, b'')
+
+    assert (environ['SCRIPT_NAME'], environ['PATH_INFO']) == ('/crm', '/api/search')
+    assert environ['HTTP_ACCEPT'] == 'text/html,*/*' and environ['CONTENT_TYPE'] == 'text/plain'
+    assert environ['QUERY_STRING'] == 'q=M%C3%BCller' and environ['CONTENT_LENGTH'] == '0'
+
+
+def test_slow_clients_do_not_hold_up_the_others(app, sample_data):
+    with asgi_server(AsgiAdapter(app, threads=2)) as (host, port):
+        send = http_sender(host, port, timeout=5)
+        with slow_clients(host, port, '/api/time-entries', 200, seconds=2, ramp_seconds=0.5) as slow:
+            started = time.perf_counter()
+            assert [send('/api/customers/lookup')[0] for _ in range(5)] == [200] * 5
+            # Both worker threads would be taken for two seconds at a time otherwise
+            assert time.perf_counter() - started < 1.0
+            deadline = time.perf_counter() + 15
+            while slow['completed'] < 200 and time.perf_counter() < deadline:
+                time.sleep(0.1)
+        assert slow['completed'] >= 200 and slow['failed'] == 0
+
+
+def test_server_rejects_what_it_cannot_serve(app):
+    with asgi_server(AsgiAdapter(app, threads=1, max_body_bytes=10)) as (host, port):
+        connection = http.client.HTTPConnection(host, port, timeout=5)
+        connection.request('POST', '/api/customers', body=b'{"first_name": "zu lang"}',
+                           headers={'Content-Type': 'application/json'})
+        assert connection.getresponse().status == 413
+
+        with socket.create_connection((host, port), timeout=5) as raw:
+            raw.sendall(b'NONSENSE\r\n\r\n')
+            assert raw.recv(100).startswith(b'HTTP/1.1 400')
+
+        # A huge body is refused from its Content-Length, before any of it is buffered
+        with socket.create_connection((host, port), timeout=5) as raw:
+            raw.sendall(b'POST /api/customers HTTP/1.1\r\nHost: x\r\nContent-Length: 209715200\r\n\r\n')
+            raw.sendall(b'x' * 65536)
+            assert raw.recv(100).startswith(b'HTTP/1.1 413')
@@ -0,0 +1,108 @@
+import pytest
+
+from src.models.user import db
+from src.models.communication import Communication
+from src.models.customer import Customer
+from src.models.inventory import InventoryItem
+from src.models.order import Order
+from src.models.timetracking import TimeEntry
+from src.services.counters import rebuild_counters
+
+
+def customers(count):
+    return [{'first_name': f'Vorname{i}', 'last_name': f'Nachname{i}', 'email': f'neu{i}@example.de'}
+            for i in range(count)]
+
+
+def test_bulk_customers_insert_in_one_transaction(client, sample_data, query_counter):
+    response = client.post('/api/customers/bulk', json=customers(1200))
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['created'] == 1200
+    assert [row['index'] for row in body['results']] == list(range(1200))
+    assert Customer.query.count() == 1205
+    inserts = [statement for statement, _ in query_counter if statement.startswith('INSERT INTO customers')]
+    assert 0 < len(inserts) < 20
+    assert rebuild_counters(db.session.connection(), dry_run=True) == {}
+
+
+def test_bulk_ids_match_input_order(client, sample_data):
+    body = client.post('/api/customers/bulk', json={'records': customers(3)}).get_json()
+
+    for result, record in zip(body['results'], customers(3)):
+        assert db.session.get(Customer, result['id']).email == record['email']
+
+
+def test_invalid_row_rejects_whole_batch(client, sample_data):
+    records = customers(3)
+    del records[1]['email']
+
+    response = client.post('/api/customers/bulk', json=records)
+
+    assert response.status_code == 400
+    results = response.get_json()['results']
+    assert [row['status'] for row in results] == ['valid', 'invalid', 'valid']
+    assert 'email' in results[1]['error']
+    assert Customer.query.count() == 5
+
+
+def test_bulk_orders_check_customers_and_update_counters(client, sample_data):
+    customer_id = sample_data['customers'][0].id
+    records = [{'customer_id': customer_id, 'title': f'Auftrag {i}', 'service_type': 'building_cleaning',
+                'scheduled_date': '2024-03-01'} for i in range(10)]
+
+    assert client.post('/api/orders/bulk', json=records + [dict(records[0], customer_id=9999)]).status_code == 400
+    assert client.post('/api/orders/bulk', json=records).status_code == 201
+
+    assert Order.query.count() == 15
+    assert rebuild_counters(db.session.connection(), dry_run=True) == {}
+
+
+def test_bulk_time_entries_reject_bad_timestamps(client, sample_data):
+    user_id = sample_data['user'].id
+    good = {'user_id': user_id, 'start_time': '2024-03-01T08:00:00', 'end_time': '2024-03-01T10:00:00'}
+
+    response = client.post('/api/time-entries/bulk', json=[good, dict(good, start_time='gestern')])
+    assert response.status_code == 400
+    assert client.post('/api/time-entries/bulk', json=[good, good]).status_code == 201
+    assert TimeEntry.query.count() == 42
+
+
+def test_bulk_inventory_rejects_duplicate_skus(client, sample_data):
+    records = [{'name': 'Glasreiniger', 'category': 'Reinigungsmittel', 'sku': 'GR-001'},
+               {'name': 'Glasreiniger', 'category': 'Reinigungsmittel', 'sku': 'GR-001'},
+               {'name': 'Allzweckreiniger', 'category': 'Reinigungsmittel', 'sku': 'AW-001'},
+               {'name': 'Mikrofasertuch', 'category': 'Zubehör'}]
+
+    results = client.post('/api/inventory/bulk', json=records).get_json()['results']
+
+    assert [row['status'] for row in results] == ['valid', 'invalid', 'invalid', 'valid']
+    assert client.post('/api/inventory/bulk', json=[records[0], records[3]]).status_code == 201
+    assert InventoryItem.query.count() == 3
+
+
+@pytest.mark.parametrize('body', [[], {}, {'records': 'x'}])
+def test_bulk_requires_a_list(client, body):
+    assert client.post('/api/customers/bulk', json=body).status_code == 400
+
+
+def test_bulk_update_communications_is_one_statement(client, sample_data, query_counter):
+    ids = [communication.id for communication in Communication.query.limit(10)]
+
+    response = client.post('/api/communications/bulk',
+                           json={'communication_ids': ids + [9999], 'updates': {'status': 'read'}})
+
+    body = response.get_json()
+    assert body['updated'] == 10
+    assert body['results'][-1] == {'id': 9999, 'status': 'not_found'}
+    updates = [statement for statement, _ in query_counter if statement.startswith('UPDATE communications')]
+    assert len(updates) == 1
+    assert Communication.query.filter_by(status='read').count() == 10
+
+
+def test_bulk_update_rejects_unknown_fields(client, sample_data):
+    response = client.post('/api/communications/bulk',
+                           json={'communication_ids': [1], 'updates': {'id': 5}})
+
+    assert response.status_code == 400
@@ -0,0 +1,242 @@
+import fnmatch
+import multiprocessing
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+import src.services.cache as cache_module
+from src.services.cache_backends import MemoryCache, NullCache, RedisCache, SQLiteCache, make_cache
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    """Just enough of the Redis protocol for RedisCache, with data kept in one dict"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeRedisHandler)
+        self.data = {}  # key -> (value, expires_at or None)
+        self.lock = threading.Lock()
+        self.commands = []
+
+    def live(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at < time.time():
+            del self.data[key]
+            return None
+        return value
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            with self.server.lock:
+                self.server.commands.append(args[0].upper())
+                reply = getattr(self, 'cmd_' + args[0].decode().lower())(*args[1:])
+            self.wfile.write(self.encode(reply))
+
+    def encode(self, reply):
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, str):
+            return b'+' + reply.encode() + b'\r\n'
+        if isinstance(reply, int):
+            return b':%d\r\n' % reply
+        if isinstance(reply, bytes):
+            return b'$%d\r\n%s\r\n' % (len(reply), reply)
+        return b'*%d\r\n' % len(reply) + b''.join(self.encode(item) for item in reply)
+
+    def cmd_ping(self):
+        return 'PONG'
+
+    def cmd_select(self, db):
+        return 'OK'
+
+    def cmd_get(self, key):
+        return self.server.live(key)
+
+    def cmd_set(self, key, value, *options):
+        expires_at = time.time() + int(options[1]) / 1000 if options else None
+        self.server.data[key] = (value, expires_at)
+        return 'OK'
+
+    def cmd_del(self, *keys):
+        return sum(1 for key in keys if self.server.live(key) is not None and self.server.data.pop(key))
+
+    def cmd_sadd(self, key, *members):
+        members_set = self.server.live(key) or set()
+        added = len(set(members) - members_set)
+        self.server.data[key] = (members_set | set(members), self.server.data.get(key, (None, None))[1])
+        return added
+
+    def cmd_srem(self, key, *members):
+        members_set = self.server.live(key) or set()
+        removed = len(members_set & set(members))
+        members_set -= set(members)
+        return removed
+
+    def cmd_smembers(self, key):
+        return sorted(self.server.live(key) or set())
+
+    def cmd_pexpire(self, key, milliseconds):
+        if self.server.live(key) is None:
+            return 0
+        self.server.data[key] = (self.server.data[key][0], time.time() + int(milliseconds) / 1000)
+        return 1
+
+    def cmd_scan(self, cursor, match, pattern, count, limit):
+        keys = [key for key in list(self.server.data)
+                if self.server.live(key) is not None and fnmatch.fnmatchcase(key.decode(), pattern.decode())]
+        return [b'0', keys]
+
+
+@pytest.fixture
+def redis_server():
+    server = FakeRedisServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def backend_factory(request, tmp_path):
+    """Factory for cache instances; with a shared backend every instance sees the same store"""
+    if request.param == 'memory':
+        shared = MemoryCache(max_entries=3)
+        return lambda: shared
+    if request.param == 'sqlite':
+        return lambda: SQLiteCache(str(tmp_path / 'cache.db'), max_entries=3)
+    server = request.getfixturevalue('redis_server')
+    return lambda: RedisCache(port=server.server_address[1])
+
+
+def test_backend_get_set_and_tag_invalidation(backend_factory):
+    cache = backend_factory()
+    cache.set('/api/invoices/statistics', b'invoices', tags=('invoices', 'invoice_items'))
+    cache.set('/api/orders/dashboard', b'orders', tags=('orders',))
+
+    assert cache.get('/api/invoices/statistics') == b'invoices'
+    assert cache.get('/api/missing') is None
+    assert len(cache) == 2
+
+    assert cache.invalidate(['invoice_items', 'customers']) == 1
+    assert cache.get('/api/invoices/statistics') is None
+    assert cache.get('/api/orders/dashboard') == b'orders'
+
+    cache.clear()
+    assert cache.get('/api/orders/dashboard') is None
+    assert len(cache) == 0
+
+
+def test_backend_entries_expire(backend_factory):
+    cache = backend_factory()
+    cache.set('short', b'value', ttl=0.05)
+    cache.set('long', b'value', ttl=60)
+
+    time.sleep(0.1)
+
+    assert cache.get('short') is None
+    assert cache.get('long') == b'value'
+
+
+def test_invalidation_reaches_every_worker(backend_factory):
+    worker_a, worker_b = backend_factory(), backend_factory()
+    worker_a.set('/api/communications/statistics', b'stats', tags=('communications',))
+    assert worker_b.get('/api/communications/statistics') == b'stats'
+
+    worker_b.invalidate(['communications'])
+
+    assert worker_a.get('/api/communications/statistics') is None
+
+
+def test_sqlite_cache_is_bounded(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), max_entries=3)
+    for index in range(5):
+        cache.set(f'key-{index}', b'value', tags=('orders',), ttl=10 + index)
+
+    assert len(cache) == 3
+    assert cache.get('key-0') is None
+    assert cache.get('key-4') == b'value'
+    assert cache.invalidate(['orders']) == 3
+
+
+def _invalidate_in_child(path):
+    SQLiteCache(path).invalidate(['quality_checks'])
+
+
+def test_sqlite_cache_invalidation_across_processes(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = SQLiteCache(path)
+    cache.set('/api/quality-checks/statistics', b'stats', tags=('quality_checks',))
+
+    child = multiprocessing.get_context('fork').Process(target=_invalidate_in_child, args=(path,))
+    child.start()
+    child.join(10)
+
+    assert child.exitcode == 0
+    assert cache.get('/api/quality-checks/statistics') is None
+
+
+def test_redis_cache_pipelines_writes(redis_server):
+    cache = RedisCache(port=redis_server.server_address[1])
+    cache.get('warm-up')
+    del redis_server.commands[:]
+
+    cache.set('key', b'value', tags=('orders', 'customers'))
+
+    assert redis_server.commands == [b'SET', b'SADD', b'PEXPIRE', b'SADD', b'PEXPIRE']
+    assert redis_server.live(b'crm:cache:tag:orders') == {b'crm:cache:entry:key'}
+
+
+def test_unreachable_redis_is_a_cache_miss():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    cache = RedisCache(port=port, timeout=0.2)
+
+    cache.set('key', b'value', tags=('orders',))
+    assert cache.get('key') is None
+    assert cache.invalidate(['orders']) == 0
+
+
+def test_make_cache_urls(tmp_path):
+    assert isinstance(make_cache(None), MemoryCache)
+    assert isinstance(make_cache('memory://'), MemoryCache)
+    null = make_cache('none://')
+    null.set('/api/orders/statistics', b'x', tags=('orders',))
+    assert isinstance(null, NullCache) and null.get('/api/orders/statistics') is None and len(null) == 0
+    assert make_cache(f'sqlite:///{tmp_path}/cache.db').path == f'{tmp_path}/cache.db'
+    redis = make_cache('redis://:geheim@cache.local:6380/2')
+    assert (redis.host, redis.port, redis.db, redis.password) == ('cache.local', 6380, 2, 'geheim')
+    with pytest.raises(ValueError):
+        make_cache('memcached://localhost')
+
+
+def test_commit_in_one_worker_evicts_shared_entries(client, sample_data, tmp_path, monkeypatch, query_counter):
+    path = str(tmp_path / 'cache.db')
+    monkeypatch.setattr(cache_module, 'response_cache', SQLiteCache(path))
+    other_worker = SQLiteCache(path)
+
+    client.get('/api/invoices/statistics')
+    assert len(other_worker) == 1
+    del query_counter[:]
+    assert client.get('/api/invoices/statistics').status_code == 200
+    assert len(query_counter) == 0
+
+    client.post('/api/invoices', json={'customer_id': sample_data['customers'][0].id})
+
+    assert len(other_worker) == 0
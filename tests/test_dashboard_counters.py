@@ -0,0 +1,56 @@
+from datetime import date
+
+from src.models.user import db
+from src.models.order import Order
+from src.services.counters import rebuild_counters
+
+
+def dashboard(client):
+    response = client.get('/api/orders/dashboard')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_counters_follow_orm_writes(client, sample_data):
+    customer_id = sample_data['customers'][0].id
+    assert dashboard(client)['order_counts']['pending'] == 5
+    assert dashboard(client)['total_customers'] == 5
+
+    response = client.post('/api/orders', json={
+        'customer_id': customer_id, 'title': 'Fensterreinigung', 'service_type': 'building_cleaning',
+        'scheduled_date': date.today().isoformat()
+    })
+    order_id = response.get_json()['id']
+    data = dashboard(client)
+    assert data['order_counts']['pending'] == 6
+    assert data['todays_orders'] == 1
+    assert data['this_week_orders'] >= 1
+
+    client.put(f'/api/orders/{order_id}', json={'status': 'confirmed'})
+    data = dashboard(client)
+    assert data['order_counts']['pending'] == 5
+    assert data['order_counts']['confirmed'] == 1
+
+    client.delete(f'/api/orders/{order_id}')
+    client.delete(f'/api/customers/{customer_id}')
+    data = dashboard(client)
+    assert data['order_counts']['confirmed'] == 0
+    assert data['todays_orders'] == 0
+    assert data['total_customers'] == 4
+
+    with db.engine.begin() as connection:
+        assert rebuild_counters(connection, dry_run=True) == {}
+
+
+def test_rebuild_reports_and_repairs_drift(app, sample_data):
+    # Bulk updates bypass the session events
+    Order.query.filter_by(status='pending').update({'status': 'completed'})
+    db.session.commit()
+
+    with db.engine.begin() as connection:
+        drift = rebuild_counters(connection)
+    assert drift['orders.status.pending'] == (5, 0)
+    assert drift['orders.status.completed'] == (0, 5)
+
+    with db.engine.begin() as connection:
+        assert rebuild_counters(connection, dry_run=True) == {}
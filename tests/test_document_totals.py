@@ -0,0 +1,99 @@
+from sqlalchemy import text
+
+from src.models.user import db
+from src.models.invoice import Invoice, InvoiceItem
+from src.models.quote import Quote
+from src.services.totals import line_total_cents, tax_cents, verify_totals
+
+ITEMS = [
+    {'description': 'Unterhaltsreinigung', 'quantity': 2.5, 'unit_price': 37.99},
+    {'description': 'Glasreinigung', 'quantity': 3, 'unit_price': 0.1},
+]
+
+
+def totals(document):
+    db.session.refresh(document)
+    return document.subtotal, document.tax_amount, document.total_amount
+
+
+def test_cent_arithmetic_rounds_half_up():
+    assert line_total_cents(2.5, 37.99) == 9498
+    assert line_total_cents(3, 0.1) == 30
+    assert line_total_cents(-1, 5.555) == -556
+    assert tax_cents(9528, 19.0) == 1810
+    assert tax_cents(250, 7) == 18
+
+
+def test_quote_totals_follow_items(client, sample_data):
+    customer_id = sample_data['customers'][0].id
+    quote_id = client.post('/api/quotes', json={'customer_id': customer_id, 'title': 'Reinigung',
+                                                'quote_items': ITEMS}).get_json()['quote_id']
+    quote = db.session.get(Quote, quote_id)
+
+    assert totals(quote) == (95.28, 18.1, 113.38)
+    assert [item.total_price for item in quote.items] == [94.98, 0.3]
+
+    client.put(f'/api/quotes/{quote_id}', json={'quote_items': ITEMS[1:], 'tax_rate': 7})
+    assert totals(quote) == (0.3, 0.02, 0.32)
+
+
+def test_invoice_totals_follow_bulk_and_raw_changes(client, sample_data):
+    customer_id = sample_data['customers'][0].id
+    invoice_id = client.post('/api/invoices', json={'customer_id': customer_id,
+                                                    'invoice_items': ITEMS}).get_json()['invoice_id']
+    invoice = db.session.get(Invoice, invoice_id)
+
+    db.session.execute(text('UPDATE invoice_items SET quantity = 1 WHERE unit_price = 37.99'))
+    assert totals(invoice) == (38.29, 7.28, 45.57)
+
+    InvoiceItem.query.filter_by(invoice_id=invoice_id, unit_price=0.1).delete()
+    assert totals(invoice) == (37.99, 7.22, 45.21)
+    # The sample invoices carry a made-up total_amount without items; only this one must be exact
+    assert [entry for entry in verify_totals(db.session.connection()) if entry['id'] == invoice_id] == []
+
+
+def test_triggers_round_like_the_reference(client, sample_data):
+    # Half cents that binary floats put just below the half: 1.005 is 1.00499999999999989...
+    prices = [1.005, 0.285, 2.675, 10.005, 0.5 * 2.01, 1234.565]
+    items = [{'description': str(price), 'quantity': 1, 'unit_price': price} for price in prices]
+    items += [{'description': 'Teilmenge', 'quantity': 0.5, 'unit_price': 2.01},
+              {'description': 'Gutschrift', 'quantity': -1, 'unit_price': 1.005},
+              {'description': 'Menge', 'quantity': 1.0005, 'unit_price': 10}]
+    invoice_id = client.post('/api/invoices', json={'customer_id': sample_data['customers'][0].id,
+                                                    'invoice_items': items}).get_json()['invoice_id']
+    invoice = db.session.get(Invoice, invoice_id)
+
+    expected = [line_total_cents(item['quantity'], item['unit_price']) for item in items]
+    assert [round(item.total_price * 100) for item in invoice.items] == expected
+    subtotal = sum(expected)
+    assert totals(invoice) == (subtotal / 100, tax_cents(subtotal, 19) / 100,
+                               (subtotal + tax_cents(subtotal, 19)) / 100)
+    assert [entry for entry in verify_totals(db.session.connection()) if entry['id'] == invoice_id] == []
+
+
+def test_create_commits_once(client, sample_data, query_counter):
+    customer_id = sample_data['customers'][0].id
+
+    client.post('/api/quotes', json={'customer_id': customer_id, 'title': 'Reinigung', 'quote_items': ITEMS})
+
+    updates = [statement for statement, _ in query_counter if statement.startswith('UPDATE quotes')]
+    assert updates == []
+
+
+def test_verify_reports_and_repairs_drift(client, sample_data):
+    customer_id = sample_data['customers'][0].id
+    quote_id = client.post('/api/quotes', json={'customer_id': customer_id, 'title': 'Reinigung',
+                                                'quote_items': ITEMS}).get_json()['quote_id']
+    db.session.execute(text('DROP TRIGGER trg_quotes_totals'))
+    db.session.execute(text('UPDATE quotes SET total_amount = 1 WHERE id = :id'), {'id': quote_id})
+    db.session.execute(text('UPDATE quote_items SET total_price = 0 WHERE quote_id = :id'), {'id': quote_id})
+
+    drift = [entry for entry in verify_totals(db.session.connection()) if entry['table'].startswith('quote')]
+    assert {(entry['table'], entry['column']) for entry in drift} == {
+        ('quote_items', 'total_price'), ('quotes', 'subtotal'), ('quotes', 'total_amount')
+    }
+
+    db.session.execute(text('DELETE FROM quote_items WHERE quote_id = :id'), {'id': quote_id})
+    db.session.execute(text('UPDATE quotes SET subtotal = 5, tax_amount = 5 WHERE id = :id'), {'id': quote_id})
+    verify_totals(db.session.connection(), repair=True)
+    assert db.session.execute(text('SELECT subtotal FROM quotes WHERE id = :id'), {'id': quote_id}).scalar() == 0
@@ -0,0 +1,187 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models.user import db
+from src.models.communication import Communication
+from src.models.event import OutboxEvent
+from src.models.order import Order
+from src.services import events
+from src.services.events import broker, prune_events, read_events
+
+
+def outbox():
+    return [(item.entity, item.entity_id, item.customer_id, item.action)
+            for item in OutboxEvent.query.order_by(OutboxEvent.id)]
+
+
+def latest_id():
+    return db.session.query(db.func.max(OutboxEvent.id)).scalar() or 0
+
+
+def parse(chunk):
+    """(id, event name, data) of one text/event-stream message"""
+    fields = dict(line.split(': ', 1) for line in chunk.decode().strip().split('\n'))
+    return (int(fields['id']) if 'id' in fields else None, fields.get('event'),
+            json.loads(fields['data']) if 'data' in fields else None)
+
+
+@pytest.fixture
+def stream(client):
+    """Opens /api/events and hands back an iterator over its messages; closes it afterwards"""
+    responses = []
+
+    def open_stream(url='/api/events', **headers):
+        response = client.get(url, headers=headers, buffered=False)
+        responses.append(response)
+        assert response.status_code == 200 and response.mimetype == 'text/event-stream'
+        chunks = response.iter_encoded()
+        assert next(chunks).startswith(b'retry: ')
+        return chunks
+
+    yield open_stream
+    # Each stream holds its request context until closed, so close the last one first
+    for response in reversed(responses):
+        response.close()
+    assert not broker.subscribers
+
+
+def test_changes_are_written_to_the_outbox_in_the_same_transaction(app, sample_data):
+    order = sample_data['orders'][0]
+    start = latest_id()
+
+    order.status = 'confirmed'
+    db.session.commit()
+    message = Communication(customer_id=order.customer_id, type='note', direction='inbound', content='Hallo')
+    db.session.add(message)
+    db.session.commit()
+    db.session.delete(message)
+    db.session.commit()
+
+    order.status = 'cancelled'
+    db.session.flush()
+    db.session.rollback()
+
+    assert outbox()[-3:] == [('order', order.id, order.customer_id, 'updated'),
+                             ('communication', message.id, order.customer_id, 'created'),
+                             ('communication', message.id, order.customer_id, 'deleted')]
+    updated = read_events(start)[0]
+    assert updated['changed'] == ['status']
+    assert updated['data']['status'] == 'confirmed'
+
+
+def test_bulk_writes_are_published(client, sample_data):
+    start = latest_id()
+    response = client.post('/api/customers/bulk', json=[
+        {'first_name': 'Anna', 'last_name': f'Neu{i}', 'email': f'neu{i}@example.de'} for i in range(3)])
+    assert response.status_code == 201
+
+    created = read_events(start, entities={'customer'})
+    ids = [row['id'] for row in response.get_json()['results']]
+    assert [(item['entity_id'], item['customer_id']) for item in created] == list(zip(ids, ids))
+    assert created[0]['data']['last_name'] == 'Neu0'
+
+    message = Communication.query.first()
+    start = latest_id()
+    client.post('/api/communications/bulk', json={'communication_ids': [message.id], 'updates': {'status': 'pending'}})
+    [updated] = read_events(start)
+    assert (updated['entity_id'], updated['customer_id'], updated['data']['status']) == (
+        message.id, message.customer_id, 'pending')
+
+
+def test_replay_after_last_event_id_with_filters(app, sample_data, stream):
+    first, second = sample_data['orders'][:2]
+    start = latest_id()
+    first.status = 'confirmed'
+    db.session.commit()
+    db.session.add(Communication(customer_id=first.customer_id, type='note', direction='inbound', content='Hallo'))
+    db.session.commit()
+    second.status = 'confirmed'
+    db.session.commit()
+
+    messages = stream(f'/api/events?entity=order&customer_id={first.customer_id}', **{'Last-Event-ID': str(start)})
+    event_id, name, data = parse(next(messages))
+
+    assert (name, data['entity'], data['entity_id'], data['action']) == (None, 'order', first.id, 'updated')
+    assert event_id == data['id'] > start
+
+    everything = stream(f'/api/events?last_event_id={start}')
+    assert [parse(next(everything))[2]['entity'] for _ in range(3)] == ['order', 'communication', 'order']
+
+
+def test_live_events_reach_subscribers(app, sample_data, stream):
+    order = sample_data['orders'][0]
+    orders = stream('/api/events?entity=order')
+    stream('/api/events?entity=invoice')
+
+    order.status = 'in_progress'
+    db.session.commit()
+
+    event_id, _, data = parse(next(orders))
+    assert (data['entity_id'], data['data']['status']) == (order.id, 'in_progress')
+    assert event_id == latest_id()
+    [invoice_subscription] = [item for item in broker.subscribers if item.entities == {'invoice'}]
+    assert not invoice_subscription.buffer
+
+
+def test_quiet_stream_sends_heartbeats(app, sample_data, stream, monkeypatch):
+    monkeypatch.setattr(events, 'HEARTBEAT_SECONDS', 0.01)
+    messages = stream()
+
+    assert next(messages) == b': keep-alive\n\n'
+
+
+def test_slow_subscriber_catches_up_from_the_outbox(app, sample_data):
+    subscription = broker.subscribe()
+    subscription.size = 3
+    try:
+        for i, order in enumerate(sample_data['orders']):
+            order.priority = 'high'
+            db.session.commit()
+
+        assert subscription.lagged and not subscription.buffer
+        batch = subscription.next_batch(0)
+
+        assert [item['entity_id'] for item in batch] == [order.id for order in sample_data['orders']]
+        assert subscription.last_id == latest_id()
+        assert subscription.next_batch(0) == []
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def test_events_from_other_processes_are_found_between_heartbeats(app, sample_data):
+    subscription = broker.subscribe()
+    try:
+        # A commit this process did not see: no after_commit hook ran for it
+        db.session.connection().exec_driver_sql(
+            "INSERT INTO outbox_events (entity, entity_id, customer_id, action, payload, created_at) "
+            "VALUES ('order', 99, 1, 'deleted', '{}', '2024-03-01 08:00:00')")
+        db.session.commit()
+
+        assert [item['entity_id'] for item in subscription.next_batch(0.01)] == [99]
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def test_pruned_history_asks_the_client_to_reset(app, sample_data, stream):
+    db.session.query(OutboxEvent).update({'created_at': datetime.utcnow() - timedelta(days=30)})
+    db.session.commit()
+    order = Order.query.first()
+    order.status = 'confirmed'
+    db.session.commit()
+    old = len(outbox()) - 1
+    assert prune_events() == old
+    db.session.commit()
+
+    event_id, name, data = parse(next(stream(**{'Last-Event-ID': '1'})))
+
+    assert (name, data) == ('reset', {'reason': 'events_pruned'})
+    assert event_id == latest_id()
+
+
+def test_bad_filters(client, app):
+    assert client.get('/api/events?entity=orders').status_code == 400
+    assert client.get('/api/events?customer_id=abc').status_code == 400
+    assert client.get('/api/events', headers={'Last-Event-ID': 'x'}).status_code == 400
+    assert not broker.subscribers
@@ -0,0 +1,67 @@
+import csv
+import io
+import json
+
+import pytest
+
+from src.services import export
+
+EXPORT_ENDPOINTS = [
+    ('/api/customers/export', 5),
+    ('/api/orders/export', 5),
+    ('/api/quotes/export', 40),
+    ('/api/invoices/export', 40),
+    ('/api/communications/export', 40),
+    ('/api/time-entries/export', 40),
+    ('/api/inventory/export', 1),
+]
+
+
+@pytest.mark.parametrize('url,count', EXPORT_ENDPOINTS)
+def test_ndjson_export_streams_every_row(client, sample_data, url, count):
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(rows) == count
+    assert [row['id'] for row in rows] == sorted(row['id'] for row in rows)
+
+
+@pytest.mark.parametrize('url,count', EXPORT_ENDPOINTS)
+def test_csv_export_has_header_and_rows(client, sample_data, url, count):
+    response = client.get(f'{url}?format=csv')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0][0] == 'id'
+    assert len(rows) == count + 1
+
+
+def test_export_honours_list_filters(client, sample_data):
+    customer_id = sample_data['customers'][0].id
+
+    body = client.get(f'/api/invoices/export?customer_id={customer_id}').get_data(as_text=True)
+
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert len(rows) == 8
+    assert {row['customer_id'] for row in rows} == {customer_id}
+
+
+def test_export_is_written_in_batches(client, sample_data, monkeypatch):
+    monkeypatch.setattr(export, 'BATCH_SIZE', 7)
+
+    response = client.get('/api/quotes/export')
+
+    chunks = list(response.response)
+    assert len(chunks) == 6
+    assert sum(chunk.count(b'\n') for chunk in chunks) == 40
+
+
+def test_unknown_export_format_is_rejected(client, sample_data):
+    response = client.get('/api/quotes/export?format=xlsx')
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
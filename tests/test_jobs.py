@@ -0,0 +1,291 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from src.models.user import db
+from src.models.communication import Communication
+from src.models.invoice import Invoice
+from src.models.job import Job
+from src.models.order import Order
+from src.services import jobs
+from src.services.migrations import run_migrations
+from src.services.jobs import TASKS, Task, Worker, enqueue, enqueue_periodic, requeue_stale, retry_delay
+
+
+@pytest.fixture
+def worker(app):
+    return Worker(app, name='test-worker')
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    """A 'record' task that remembers its payloads, and a 'flaky' one that fails twice"""
+    calls = []
+    failures = {'left': 2}
+
+    def flaky(payload):
+        if failures['left']:
+            failures['left'] -= 1
+            raise ConnectionError('SMTP nicht erreichbar')
+        return {'ok': True}
+
+    monkeypatch.setitem(TASKS, 'record', Task(lambda payload: calls.append(payload) or len(calls), 'default', 3))
+    monkeypatch.setitem(TASKS, 'flaky', Task(flaky, 'default', 3))
+    return calls
+
+
+def run_all(worker):
+    ran = []
+    while (job_id := worker.run_once()) is not None:
+        ran.append(job_id)
+    return ran
+
+
+def test_idempotency_key_enqueues_once(app, recorded):
+    first = enqueue('record', {'n': 1}, idempotency_key='report:2024-03')
+    second = enqueue('record', {'n': 2}, idempotency_key='report:2024-03')
+    db.session.commit()
+
+    assert first == second
+    assert Job.query.count() == 1
+    with pytest.raises(ValueError):
+        enqueue('unknown')
+
+
+def test_lanes_are_claimed_in_priority_order(app, worker, recorded):
+    enqueue('record', {'n': 'low'}, lane='low')
+    enqueue('record', {'n': 'default'})
+    enqueue('record', {'n': 'high'}, lane='high')
+    enqueue('record', {'n': 'later'}, lane='high', delay=3600)
+    db.session.commit()
+
+    run_all(worker)
+
+    assert [call['n'] for call in recorded] == ['high', 'default', 'low']
+
+
+def test_worker_limited_to_lanes(app, recorded):
+    enqueue('record', {'n': 'report'}, lane='low')
+    enqueue('record', {'n': 'mail'}, lane='high')
+    db.session.commit()
+
+    run_all(Worker(app, lanes=['high']))
+
+    assert recorded == [{'n': 'mail'}]
+
+
+def test_failures_retry_with_backoff(app, worker, recorded):
+    job_id = enqueue('flaky')
+    db.session.commit()
+
+    assert worker.run_once() == job_id
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.attempts) == ('queued', 1)
+    assert 'SMTP nicht erreichbar' in job.last_error
+    assert job.run_at > datetime.utcnow() + timedelta(seconds=retry_delay(1) - 5)
+    assert worker.run_once() is None
+
+    for _ in range(2):
+        job.run_at = datetime.utcnow()
+        db.session.commit()
+        worker.run_once()
+        db.session.refresh(job)
+
+    assert (job.status, job.attempts, job.result) == ('succeeded', 3, '{"ok": true}')
+    assert retry_delay(1) == jobs.BACKOFF_BASE and retry_delay(20) == jobs.BACKOFF_MAX
+
+
+def test_job_fails_after_max_attempts(app, worker, monkeypatch):
+    monkeypatch.setitem(TASKS, 'broken', Task(lambda payload: 1 / 0, 'default', 1))
+    job_id = enqueue('broken')
+    db.session.commit()
+
+    worker.run_once()
+
+    job = db.session.get(Job, job_id)
+    assert job.status == 'failed'
+    assert job.last_error.startswith('ZeroDivisionError')
+
+
+def test_handler_writes_roll_back_with_failed_job(app, worker, sample_data, monkeypatch):
+    customer_id = sample_data['customers'][0].id
+
+    def half_done(payload):
+        db.session.add(Communication(customer_id=customer_id, type='note', direction='outbound', content='x'))
+        db.session.flush()
+        raise RuntimeError('abgebrochen')
+
+    monkeypatch.setitem(TASKS, 'half_done', Task(half_done, 'default', 2))
+    count = Communication.query.count()
+    enqueue('half_done')
+    db.session.commit()
+
+    worker.run_once()
+
+    assert Communication.query.count() == count
+
+
+def test_stale_running_job_is_requeued(app, recorded):
+    job_id = enqueue('record')
+    db.session.commit()
+    row = Worker(app, name='crashed').claim()
+    assert row.id == job_id
+
+    assert requeue_stale(now=datetime.utcnow() + timedelta(seconds=jobs.LEASE_SECONDS + 1)) == 1
+    db.session.commit()
+
+    assert db.session.get(Job, job_id).status == 'queued'
+
+
+def test_stale_job_out_of_attempts_is_finished(app, monkeypatch):
+    monkeypatch.setitem(TASKS, 'once', Task(lambda payload: None, 'default', 1))
+    job_id = enqueue('once')
+    db.session.commit()
+    Worker(app, name='crashed').claim()
+
+    later = datetime.utcnow() + timedelta(seconds=jobs.LEASE_SECONDS + 1)
+    requeue_stale(now=later)
+    db.session.commit()
+
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.finished_at, job.last_error) == ('failed', later, 'Worker lease expired')
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    """An app on a database file: the heartbeat needs a connection of its own"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'jobs.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        run_migrations(db.engine)
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_long_running_job_keeps_its_lease(file_app, monkeypatch):
+    monkeypatch.setattr(jobs, 'LEASE_SECONDS', 1)
+    monkeypatch.setattr(jobs, 'HEARTBEAT_SECONDS', 0.2)
+    runs = []
+    started = threading.Event()
+
+    def long_report(payload):
+        runs.append(threading.current_thread().name)
+        started.set()
+        time.sleep(2.5)
+        return {'rows': 1}
+
+    monkeypatch.setitem(TASKS, 'long_report', Task(long_report, 'low', 3))
+    job_id = enqueue('long_report')
+    db.session.commit()
+
+    first = threading.Thread(target=Worker(file_app, name='first').run_once, name='first')
+    first.start()
+    # Only race the second worker once the first one holds the job
+    assert started.wait(5)
+    second = Worker(file_app, name='second')
+    # The other worker keeps reclaiming stale jobs for twice the lease
+    while first.is_alive():
+        with file_app.app_context():
+            requeue_stale()
+            db.session.commit()
+        second.run_once()
+        time.sleep(0.1)
+    first.join()
+
+    assert runs == ['first']
+    db.session.expire_all()
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.attempts, job.result) == ('succeeded', 1, '{"rows": 1}')
+
+
+def test_send_invoice_is_queued_and_sent_by_worker(client, worker, sample_data):
+    customer_id = sample_data['customers'][0].id
+    invoice_id = client.post('/api/invoices', json={
+        'customer_id': customer_id, 'due_date': '2024-04-14',
+        'invoice_items': [{'description': 'Grundreinigung', 'quantity': 2, 'unit_price': 40}]
+    }).get_json()['invoice_id']
+
+    response = client.post(f'/api/invoices/{invoice_id}/send')
+
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['message'] == 'Invoice sent successfully'
+    assert client.get(body['status_url']).get_json()['status'] == 'queued'
+    assert db.session.get(Invoice, invoice_id).status == 'sent'
+
+    run_all(worker)
+
+    job = client.get(body['status_url']).get_json()
+    assert job['status'] == 'succeeded'
+    assert job['lane'] == 'high'
+    assert job['result']['delivered'] is False  # no MAIL_SERVER configured
+    logged = Communication.query.filter_by(subject=f'Rechnung {db.session.get(Invoice, invoice_id).invoice_number}').one()
+    assert logged.status == 'pending'
+
+
+def test_accepted_quote_becomes_order_once(client, worker, sample_data):
+    customer_id = sample_data['customers'][0].id
+    quote_id = client.post('/api/quotes', json={
+        'customer_id': customer_id, 'title': 'Treppenhausreinigung', 'service_type': 'building_cleaning',
+        'quote_items': [{'description': 'Treppenhaus', 'quantity': 4, 'unit_price': 25}]
+    }).get_json()['quote_id']
+    orders = Order.query.count()
+
+    first = client.put(f'/api/quotes/{quote_id}/status', json={'status': 'accepted'}).get_json()
+    second = client.put(f'/api/quotes/{quote_id}/status', json={'status': 'accepted'}).get_json()
+    run_all(worker)
+
+    assert first['job_id'] == second['job_id']
+    assert Order.query.count() == orders + 1
+    order = Order.query.filter_by(title='Treppenhausreinigung').one()
+    assert (order.customer_id, order.estimated_price) == (customer_id, 119.0)
+
+
+def test_dunning_marks_overdue_and_queues_reminders(app, worker, sample_data):
+    overdue = Invoice.query.filter_by(status='sent').limit(3).all()
+    for invoice in overdue:
+        invoice.due_date = date.today() - timedelta(days=10)
+    db.session.commit()
+
+    enqueue_periodic()
+    enqueue_periodic()
+    db.session.commit()
+    run_all(worker)
+
+    assert {invoice.status for invoice in overdue} == {'overdue'}
+    reminders = Job.query.filter_by(task='payment_reminder', status='succeeded').count()
+    assert reminders == 3
+    assert Job.query.filter_by(task='dunning').count() == 1
+
+
+def test_report_job_via_api(client, worker, sample_data):
+    response = client.post('/api/time-entries/report', json={'date_from': '2024-03-01', 'date_to': '2024-03-02'},
+                           headers={'Idempotency-Key': 'report-march'})
+    assert response.status_code == 202
+    assert client.post('/api/time-entries/report', json={'date_from': 'gestern', 'date_to': '2024-03-02'}).status_code == 400
+
+    run_all(worker)
+
+    job = client.get(response.get_json()['status_url']).get_json()
+    direct = client.get('/api/time-entries/report?date_from=2024-03-01&date_to=2024-03-02').get_json()
+    assert job['result'] == direct
+    assert direct['total_hours'] > 0
+
+
+def test_jobs_endpoint(client, recorded):
+    created = client.post('/api/jobs', json={'task': 'record', 'payload': {'n': 1}, 'lane': 'high'},
+                          headers={'Idempotency-Key': 'abc'})
+    repeated = client.post('/api/jobs', json={'task': 'record'}, headers={'Idempotency-Key': 'abc'})
+
+    assert created.status_code == 202
+    assert repeated.get_json()['job_id'] == created.get_json()['job_id']
+    job = client.get(f"/api/jobs/{created.get_json()['job_id']}").get_json()
+    assert (job['task'], job['lane'], job['payload']) == ('record', 'high', {'n': 1})
+    assert client.post('/api/jobs', json={'task': 'rm -rf'}).status_code == 400
+    assert client.post('/api/jobs', json={'task': 'record', 'lane': 'urgent'}).status_code == 400
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+from sqlalchemy import func
+
+from src.models.user import db
+from src.models.customer import Customer
+from src.models.invoice import Invoice
+from src.models.order import Order
+from src.services.counters import rebuild_counters
+from src.services.numbering import next_number
+from src.services.loadtest import SKIPPED_ROUTES, benchmark_targets, client_sender, compare, run_benchmark
+from src.services.synthetic import generate
+from src.services.totals import verify_totals
+
+NOW = datetime(2024, 6, 3, 12, 0)
+
+
+def generated(rows=1500, seed=7):
+    with db.engine.begin() as connection:
+        return generate(connection, rows, seed, now=NOW)
+
+
+def test_generated_data_is_consistent_and_repeatable(app):
+    counts = generated()
+
+    assert 0.85 * 1500 < sum(counts.values()) < 1.15 * 1500
+    assert counts['customers'] == Customer.query.count() and counts['quote_items'] > counts['quotes']
+    with db.engine.begin() as connection:
+        assert verify_totals(connection) == []
+        assert rebuild_counters(connection, dry_run=True) == {}
+    assert db.session.query(func.max(Invoice.created_at)).scalar() <= NOW
+    assert Invoice.query.filter(Invoice.total_amount <= 0).count() == 0
+
+    first = [(customer.customer_number, customer.last_name, customer.city)
+             for customer in Customer.query.order_by(Customer.id).limit(20)]
+    db.drop_all()
+    db.create_all()
+    generated()
+    assert [(customer.customer_number, customer.last_name, customer.city)
+            for customer in Customer.query.order_by(Customer.id).limit(20)] == first
+
+
+def test_generated_rows_leave_the_numbering_to_the_app(app):
+    generated(500)
+    latest = db.session.query(func.max(Order.order_number)).filter(Order.order_number.like('AU-2024-%')).scalar()
+    customers = db.session.query(func.max(Customer.customer_number)).scalar()
+
+    assert next_number('order', when=NOW) > latest
+    assert next_number('customer') > customers
+
+
+def test_every_get_route_answers_on_generated_data(app):
+    generated()
+    with db.engine.connect() as connection:
+        targets = benchmark_targets(app, connection, today=NOW.date())
+
+    api_routes = {rule.rule for rule in app.url_map.iter_rules()
+                  if 'GET' in rule.methods and rule.rule.startswith('/api')}
+    # Only the job lookup lacks a row here: nothing was queued
+    assert api_routes - set(targets) - SKIPPED_ROUTES == {'/api/jobs/<int:job_id>'}
+    assert all('<' not in url for urls in targets.values() for url in urls)
+
+    results = run_benchmark(client_sender(app), targets, requests=2, concurrency=2, rounds=1, warmup=0)
+
+    failing = {route: result['errors'] for route, result in results.items() if result['errors']}
+    assert failing == {}
+    assert all(result['p50_ms'] <= result['p95_ms'] <= result['max_ms'] for result in results.values())
+
+
+def test_compare_flags_slower_routes_beyond_the_noise():
+    baseline = {'/api/orders': {'errors': 0, 'rps': 200.0, 'p50_ms': 10.0, 'p95_ms': 20.0},
+                '/api/customers': {'errors': 0, 'rps': 3000.0, 'p50_ms': 0.3, 'p95_ms': 0.5}}
+    results = {'/api/orders': {'errors': 1, 'rps': 80.0, 'p50_ms': 25.0, 'p95_ms': 80.0},
+               # Twice as slow, but only by fractions of a millisecond
+               '/api/customers': {'errors': 0, 'rps': 1500.0, 'p50_ms': 0.6, 'p95_ms': 1.0},
+               '/api/new': {'errors': 0, 'rps': 1.0, 'p50_ms': 900.0, 'p95_ms': 990.0}}
+
+    assert compare(results, baseline) == ['/api/orders: 1 errors (baseline 0)',
+                                          '/api/orders: p50_ms 25.0 (baseline 10.0)',
+                                          '/api/orders: 80.0 requests/s (baseline 200.0)']
@@ -0,0 +1,86 @@
+import threading
+
+from sqlalchemy import create_engine, text
+
+from src.models.user import db
+from src.models.quote import Quote
+from src.models.sequence import NumberSequence
+from src.services import numbering
+
+
+def create_invoice(client, customer_id, **extra):
+    return client.post('/api/invoices', json={'customer_id': customer_id, 'invoice_date': '2025-02-03', **extra})
+
+
+def test_invoice_numbers_are_consecutive_per_year(client, sample_data, query_counter):
+    customer_id = sample_data['customers'][0].id
+
+    numbers = [create_invoice(client, customer_id).get_json()['invoice_number'] for _ in range(3)]
+    next_year = client.post('/api/invoices', json={'customer_id': customer_id,
+                                                   'invoice_date': '2026-01-02'}).get_json()
+
+    assert numbers == ['RE-2025-00001', 'RE-2025-00002', 'RE-2025-00003']
+    assert next_year['invoice_number'] == 'RE-2026-00001'
+    assert not any('count(' in statement.lower() for statement, _ in query_counter)
+
+
+def test_failed_invoice_returns_its_number(client, sample_data):
+    customer_id = sample_data['customers'][0].id
+
+    assert create_invoice(client, customer_id).status_code == 201
+    assert create_invoice(client, customer_id, invoice_items=[{'description': 'x'}]).status_code == 500
+    response = create_invoice(client, customer_id)
+
+    assert response.get_json()['invoice_number'] == 'RE-2025-00002'
+
+
+def test_documents_get_sequence_numbers(client, sample_data):
+    customer_id = sample_data['customers'][0].id
+
+    quote = client.post('/api/quotes', json={'customer_id': customer_id, 'title': 'Fensterreinigung'})
+    customer = client.post('/api/customers', json={'first_name': 'Erika', 'last_name': 'Muster',
+                                                   'email': 'erika@example.de'})
+
+    assert db.session.get(Quote, quote.get_json()['quote_id']).quote_number.startswith('AN-')
+    assert customer.get_json()['customer_number'] == 'K-000001'
+
+
+def test_bulk_insert_reserves_one_block(client, sample_data):
+    records = [{'first_name': 'A', 'last_name': 'B', 'email': f'{i}@example.de'} for i in range(50)]
+
+    client.post('/api/customers/bulk', json=records)
+
+    assert db.session.get(NumberSequence, ('customer', 0)).last_value == 50
+
+
+def test_concurrent_allocation_is_unique_and_gap_free(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/numbers.db', connect_args={'timeout': 30})
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE number_sequences (document_type TEXT, year INTEGER, '
+                                'last_value INTEGER NOT NULL, PRIMARY KEY (document_type, year))'))
+    values = []
+
+    def worker():
+        for _ in range(25):
+            with engine.begin() as connection:
+                values.append(numbering.reserve(connection, 'invoice', 2025))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(values) == list(range(1, 201))
+
+
+def test_block_allocation_skips_invoices(app, monkeypatch):
+    monkeypatch.setattr(numbering, 'BLOCK_SIZES', numbering.parse_block_sizes('order=5,invoice=5'))
+    numbering._blocks.clear()
+
+    orders = [numbering.next_number('order') for _ in range(3)]
+
+    assert [number[-5:] for number in orders] == ['00001', '00002', '00003']
+    assert db.session.query(NumberSequence.last_value).filter_by(document_type='order').scalar() == 5
+    assert 'invoice' not in numbering.BLOCK_SIZES
+    numbering._blocks.clear()
@@ -0,0 +1,56 @@
+import pytest
+
+from tests.test_query_plans import FULL_SCAN, query_plan
+
+CURSOR_ENDPOINTS = [
+    ('/api/quotes', 'quotes'),
+    ('/api/invoices', 'invoices'),
+    ('/api/communications', 'communications'),
+    ('/api/quality-checks', 'quality_checks'),
+    ('/api/time-entries', 'time_entries'),
+    ('/api/inventory/transactions', 'transactions'),
+]
+
+
+def walk(client, url, key, limit):
+    ids = []
+    after = ''
+    while True:
+        body = client.get(f'{url}?limit={limit}&after={after}').get_json()
+        ids.extend(row['id'] for row in body[key])
+        if not body['has_more']:
+            return ids
+        after = body['next_cursor']
+
+
+@pytest.mark.parametrize('url,key', CURSOR_ENDPOINTS)
+def test_cursor_walk_matches_offset_order(client, sample_data, url, key):
+    offset_ids = [row['id'] for row in client.get(f'{url}?per_page=100').get_json()[key]]
+
+    assert walk(client, url, key, limit=7) == offset_ids
+
+
+def test_cursor_mode_skips_count_unless_requested(client, sample_data, query_counter):
+    body = client.get('/api/communications?limit=5').get_json()
+    assert 'total' not in body
+    assert not any('count(' in statement.lower() for statement, _ in query_counter)
+
+    body = client.get('/api/communications?limit=5&with_total=true').get_json()
+    assert body['total'] == 40
+
+
+@pytest.mark.parametrize('url,key', [('/api/communications', 'communications'), ('/api/time-entries', 'time_entries')])
+def test_deep_cursor_page_seeks_on_index(client, sample_data, query_counter, url, key):
+    after = client.get(f'{url}?limit=30').get_json()['next_cursor']
+    query_counter.clear()
+    client.get(f'{url}?limit=5&after={after}')
+
+    statement, parameters = query_counter[0]
+    plan = query_plan(statement, parameters)
+    assert not any(FULL_SCAN.match(step) or 'TEMP B-TREE' in step for step in plan), plan
+
+
+def test_invalid_cursor_is_rejected(client, sample_data):
+    response = client.get('/api/quotes?after=not-a-cursor')
+
+    assert response.status_code == 400
@@ -0,0 +1,153 @@
+import os
+import re
+import zlib
+
+from src.models.user import db
+from src.models.invoice import Invoice
+from src.routes.quote import QUOTE_TEMPLATES
+from src.services import pdf
+from src.services.pdf import (document_key, format_amount, pdf_cache, render, render_batch,
+                              template_document, text_width, wrap)
+
+ITEMS = [
+    {'description': 'Unterhaltsreinigung Büroräume', 'quantity': 2.5, 'unit_price': 37.99,
+     'unit': 'Stunden', 'notes': 'Staubsaugen, Wischen, Mülleimer leeren'},
+    {'description': 'Glasreinigung', 'quantity': 3, 'unit_price': 0.1},
+]
+
+
+def page_text(data):
+    """Decoded content streams of a PDF, checking the xref offsets on the way"""
+    xref = int(re.search(rb'startxref\n(\d+)', data).group(1))
+    offsets = re.findall(rb'(\d{10}) 00000 n', data[xref:])
+    for number, offset in enumerate(offsets, 1):
+        assert data[int(offset):].startswith(b'%d 0 obj' % number)
+    streams = re.findall(rb'stream\n(.*?)\nendstream', data, re.S)
+    return [zlib.decompress(stream).decode('cp1252') for stream in streams]
+
+
+def fail_render(document):
+    raise AssertionError('unchanged document was rendered again')
+
+
+def create_invoice(client, sample_data):
+    customer = sample_data['customers'][0]
+    customer.company_name = 'Müller & Söhne GmbH'
+    customer.postal_code, customer.city = '38640', 'Goslar'
+    db.session.commit()
+    return client.post('/api/invoices', json={
+        'customer_id': customer.id, 'invoice_date': '2024-03-31', 'due_date': '2024-04-14',
+        'invoice_items': ITEMS
+    }).get_json()['invoice_id']
+
+
+def test_invoice_pdf_content(client, sample_data):
+    invoice_id = create_invoice(client, sample_data)
+
+    response = client.get(f'/api/invoices/{invoice_id}/pdf')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/pdf'
+    assert response.data.startswith(b'%PDF-1.4')
+    text = '\n'.join(page_text(response.data))
+    invoice = db.session.get(Invoice, invoice_id)
+    assert f'Rechnung {invoice.invoice_number}' in text
+    assert 'Müller & Söhne GmbH' in text
+    assert '38640 Goslar' in text
+    assert '14.04.2024' in text
+    assert '94,98 €' in text and '113,38 €' in text
+    assert 'Seite 1 von 1' in text
+
+
+def test_unchanged_invoice_is_served_from_cache(client, sample_data, monkeypatch):
+    invoice_id = create_invoice(client, sample_data)
+    first = client.get(f'/api/invoices/{invoice_id}/pdf')
+    monkeypatch.setattr(pdf, 'render', fail_render)
+
+    second = client.get(f'/api/invoices/{invoice_id}/pdf')
+    not_modified = client.get(f'/api/invoices/{invoice_id}/pdf', headers={'If-None-Match': first.headers['ETag']})
+
+    assert second.data == first.data
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert not_modified.status_code == 304
+
+
+def test_changed_invoice_gets_new_key(client, sample_data):
+    invoice_id = create_invoice(client, sample_data)
+    before = client.get(f'/api/invoices/{invoice_id}/pdf').headers['ETag']
+
+    client.put(f'/api/invoices/{invoice_id}', json={'invoice_items': ITEMS[1:]})
+    after = client.get(f'/api/invoices/{invoice_id}/pdf')
+
+    assert after.headers['ETag'] != before
+    assert '94,98 €' not in '\n'.join(page_text(after.data))
+
+
+def test_quote_and_template_pdfs(client, sample_data):
+    customer_id = sample_data['customers'][1].id
+    quote_id = client.post('/api/quotes', json={
+        'customer_id': customer_id, 'title': 'Grundreinigung Praxis',
+        'terms_conditions': 'Dieses Angebot ist 30 Tage gültig.', 'quote_items': ITEMS
+    }).get_json()['quote_id']
+
+    quote_text = '\n'.join(page_text(client.get(f'/api/quotes/{quote_id}/pdf').data))
+    template = client.get('/api/quote-templates/2/pdf?download=1')
+
+    assert 'Grundreinigung Praxis' in quote_text and '30 Tage gültig' in quote_text
+    assert template.headers['Content-Disposition'].startswith('attachment; filename=Vorlage-2.pdf')
+    template_text = '\n'.join(page_text(template.data))
+    assert 'Gewerbereinigung' in template_text and '148,75 €' in template_text
+    assert client.get('/api/quote-templates/99/pdf').status_code == 404
+
+
+def test_long_documents_break_pages():
+    document = template_document({'id': 9, 'name': 'Jahresvertrag', 'items': ITEMS * 40})
+
+    pages = page_text(render(document))
+
+    assert len(pages) > 2
+    assert all(f'von {len(pages)}' in page for page in pages)
+    # The table header is repeated on every continuation page
+    assert all('Einzelpreis' in page for page in pages[:-1])
+
+
+def test_wrap_respects_width():
+    text = 'Grundreinigung aller Sanitärbereiche inklusive Entkalkung ' * 4 + 'Donaudampfschifffahrtsgesellschaft' * 3
+    lines = wrap(text, 150)
+
+    assert len(lines) > 4
+    assert all(text_width(line) <= 150 for line in lines)
+    assert ''.join(lines).replace(' ', '') == text.replace(' ', '')
+
+
+def test_batch_renders_new_documents_only(app):
+    documents = [template_document({'id': index, 'name': f'Vorlage {index}', 'items': ITEMS})
+                 for index in range(40)]
+    documents.append(documents[0])
+
+    assert render_batch(documents, processes=2) == (40, 1)
+    assert all(os.path.exists(pdf_cache.path(document_key(document))) for document in documents)
+    assert render_batch(documents[:5]) == (0, 5)
+
+
+def test_prune_drops_least_recently_used(tmp_path):
+    cache = pdf.PdfCache(str(tmp_path))
+    for index, key in enumerate(['aa01', 'bb02', 'cc03', 'dd04']):
+        os.utime(cache.put(key, b'x' * 100), (1000 + index, 1000 + index))
+    cache.get('aa01')  # used just now, so it outlives the untouched ones
+    stale = tmp_path / 'bb' / 'dead.tmp'
+    stale.write_bytes(b'partial')
+    os.utime(stale, (0, 0))
+
+    assert cache.prune(max_bytes=250, min_age=60) == 2
+    assert [key for key in ['aa01', 'bb02', 'cc03', 'dd04'] if os.path.exists(cache.path(key))] == ['aa01', 'dd04']
+    assert not stale.exists()
+    # Nothing old enough to go: the cache may stay over the limit for a while
+    assert cache.prune(max_bytes=0, min_age=10 ** 12) == 0
+
+
+def test_document_key_depends_on_content():
+    template = QUOTE_TEMPLATES[0]
+    assert document_key(template_document(template)) == document_key(template_document(template))
+    assert document_key(template_document(template)) != document_key(template_document(template, tax_rate=7))
+    assert format_amount(1234.5) == '1.234,50 €'
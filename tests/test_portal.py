@@ -0,0 +1,162 @@
+from datetime import date, timedelta
+
+import pytest
+
+from src.models.user import db
+from src.models.customer import Customer, CustomerSummary
+from src.models.communication import Communication
+from src.models.invoice import Invoice
+from src.models.order import Order
+from src.services.portal import COUNTERS, rebuild_summaries
+
+
+def summaries():
+    rows = db.session.query(CustomerSummary).populate_existing().order_by(CustomerSummary.customer_id)
+    return {row.customer_id: (*(round(getattr(row, column), 2) for column in COUNTERS), row.last_message_at,
+                              row.next_appointment, row.next_order_id) for row in rows}
+
+
+def add_order(customer_id, days_ahead, status='pending', **fields):
+    order = Order(order_number=f'AU-P{Order.query.count():04d}', customer_id=customer_id, title='Unterhaltsreinigung',
+                  service_type='building_cleaning', status=status,
+                  scheduled_date=date.today() + timedelta(days=days_ahead), **fields)
+    db.session.add(order)
+    db.session.commit()
+    return order
+
+
+def test_triggers_match_a_rebuild_after_mixed_writes(app, sample_data):
+    customers = sample_data['customers']
+    first, second = customers[0].id, customers[1].id
+    assert summaries()[first][:4] == (1, 8, sum(100.0 + i for i in range(0, 40, 5)), 8)
+
+    soon = add_order(first, 3)
+    later = add_order(first, 10, status='confirmed')
+    soon.status = 'completed'
+    later.customer_id = second
+    sample_data['orders'][2].status = 'cancelled'
+    invoices = Invoice.query.filter_by(customer_id=first).order_by(Invoice.id).all()
+    invoices[0].status = 'paid'
+    invoices[1].total_amount = 999.0
+    invoices[2].customer_id = second
+    db.session.delete(invoices[3])
+    db.session.add(Communication(customer_id=second, type='note', direction='inbound', content='Rückruf'))
+    db.session.delete(Communication.query.filter_by(customer_id=first).first())
+    db.session.commit()
+
+    incremental = summaries()
+    assert incremental[second][-2:] == (later.scheduled_date, later.id)
+    assert incremental[first][-2] is None
+
+    rebuild_summaries(db.session.connection())
+    assert summaries() == incremental
+
+
+def test_rows_follow_customers(app, sample_data):
+    customer = Customer(customer_number='K-9000', first_name='Neu', last_name='Kunde', email='neu@example.de')
+    db.session.add(customer)
+    db.session.commit()
+    assert summaries()[customer.id][:4] == (0, 0, 0, 0)
+
+    db.session.delete(customer)
+    db.session.commit()
+    assert customer.id not in summaries()
+
+
+def test_portal_lists(client, sample_data):
+    customer = sample_data['customers'][0]
+
+    orders = client.get(f'/api/customer/{customer.id}/orders').get_json()
+    invoices = client.get(f'/api/customer/{customer.id}/invoices').get_json()
+    messages = client.get(f'/api/customer/{customer.id}/messages?limit=3').get_json()
+    profile = client.get(f'/api/customer/{customer.id}/profile').get_json()
+
+    assert orders['open_orders'] == 1 and [order['order_number'] for order in orders['orders']] == ['AU-0000']
+    assert orders['next_appointment'] is None  # the sample orders are in the past
+    assert invoices['unpaid_invoices'] == 8 and len(invoices['invoices']) == 8
+    assert invoices['unpaid_amount'] == pytest.approx(sum(invoice['total_amount'] for invoice in invoices['invoices']))
+    assert [message['subject'] for message in messages['messages']] == ['Betreff 35', 'Betreff 30', 'Betreff 25']
+    assert messages['message_count'] == 8
+    assert profile['email'] == customer.email and profile['summary']['open_orders'] == 1
+    assert client.get('/api/customer/999/orders').status_code == 404
+
+
+def test_next_appointment_prefers_the_earliest_real_or_recurring_date(client, sample_data):
+    customer_id = sample_data['customers'][0].id
+    url = f'/api/customer/{customer_id}/summary'
+    real = add_order(customer_id, 20)
+
+    assert client.get(url).get_json()['next_appointment']['order_id'] == real.id
+
+    series = add_order(customer_id, -1, is_recurring=True, recurring_interval='weekly')
+    upcoming = client.get(url).get_json()['next_appointment']
+    assert upcoming['virtual'] and upcoming['series_id'] == series.id
+    assert upcoming['date'] == (series.scheduled_date + timedelta(days=7)).isoformat()
+
+
+def test_stale_next_appointment_is_looked_up_again(client, sample_data):
+    customer_id = sample_data['customers'][0].id
+    tomorrow = add_order(customer_id, 1)
+    after = add_order(customer_id, 5)
+    # As if the stored value was written before yesterday's order passed
+    db.session.connection().exec_driver_sql(
+        'UPDATE customer_summaries SET next_appointment = ?, next_order_id = ? WHERE customer_id = ?',
+        ((date.today() - timedelta(days=1)).isoformat(), tomorrow.id, customer_id))
+    db.session.commit()
+
+    assert client.get(f'/api/customer/{customer_id}/summary').get_json()['next_appointment']['order_id'] == tomorrow.id
+    tomorrow.status = 'cancelled'
+    db.session.commit()
+    assert client.get(f'/api/customer/{customer_id}/summary').get_json()['next_appointment']['order_id'] == after.id
+
+
+def test_etag_follows_the_customer_version(client, sample_data, query_counter):
+    first, second = (customer.id for customer in sample_data['customers'][:2])
+    url = f'/api/customer/{first}/invoices'
+    etag = client.get(url).headers['ETag']
+
+    query_counter.clear()
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+    assert len(query_counter) == 1  # the version seek
+
+    # Writes for another customer leave the ETag alone
+    invoice = Invoice.query.filter_by(customer_id=second).first()
+    invoice.status = 'paid'
+    db.session.commit()
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    invoice = Invoice.query.filter_by(customer_id=first).first()
+    invoice.status = 'paid'
+    db.session.commit()
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    assert response.get_json()['unpaid_invoices'] == 7
+
+
+def test_update_profile(client, sample_data):
+    customer_id = sample_data['customers'][0].id
+    url = f'/api/customer/{customer_id}/profile'
+    etag = client.get(url).headers['ETag']
+
+    assert client.put(url, json={'customer_number': 'K-1'}).status_code == 400
+    assert client.put(url, json={'email': ' '}).status_code == 400
+    response = client.put(url, json={'phone': '05321 12345', 'city': 'Goslar'})
+
+    assert response.status_code == 200 and response.get_json()['city'] == 'Goslar'
+    profile = client.get(url, headers={'If-None-Match': etag})
+    assert profile.status_code == 200 and profile.get_json()['phone'] == '05321 12345'
+    assert client.put('/api/customer/999/profile', json={'city': 'Goslar'}).status_code == 404
+
+
+def test_send_message(client, sample_data):
+    customer_id = sample_data['customers'][0].id
+    url = f'/api/customer/{customer_id}/messages'
+
+    assert client.post(url, json={'subject': 'Termin'}).status_code == 400
+    created = client.post(url, json={'subject': 'Termin', 'content': 'Bitte eine Stunde später kommen.'})
+    assert created.status_code == 201
+
+    messages = client.get(url).get_json()
+    assert messages['message_count'] == 9
+    assert messages['messages'][0]['id'] == created.get_json()['message_id']
+    assert (messages['messages'][0]['direction'], messages['messages'][0]['status']) == ('inbound', 'pending')
@@ -0,0 +1,96 @@
+import re
+
+import pytest
+from flask import Flask, jsonify
+
+from src.models.user import db
+from src.services.profiling import PERF_ENDPOINT, ProfiledConnection, init_profiling, percentile, perf_log
+
+
+@pytest.fixture
+def profiled_client(app):
+    perf_log.clear()
+    init_profiling(app, model_base=db.Model)
+    yield app.test_client()
+    perf_log.clear()
+
+
+def server_timing(response):
+    timings = re.findall(r'(\w+);dur=([\d.]+)', response.headers['Server-Timing'])
+    return {name: float(duration) for name, duration in timings}
+
+
+def test_requests_carry_server_timing(profiled_client, sample_data):
+    response = profiled_client.get('/api/customers')
+
+    timing = server_timing(response)
+    assert set(timing) == {'db', 'to_dict', 'json', 'total'}
+    assert 0 < timing['db'] <= timing['total'] and timing['to_dict'] > 0
+    assert re.search(r'desc="[1-9]\d* queries"', response.headers['Server-Timing'])
+
+
+def test_perf_summary_per_route(profiled_client, sample_data):
+    for _ in range(3):
+        profiled_client.get('/api/customers')
+    body = profiled_client.get('/api/orders').get_data()
+
+    summary = profiled_client.get(PERF_ENDPOINT).get_json()
+
+    assert summary['samples'] == 4  # the summary request itself is not recorded
+    routes = {item['route']: item for item in summary['routes']}
+    assert set(routes) == {'GET /api/customers', 'GET /api/orders'}
+    orders = routes['GET /api/orders']
+    assert orders['count'] == 1 and orders['response_bytes']['p50'] == len(body)
+    assert orders['sql_count']['p50'] >= 1 and orders['slowest_statement']['sql'].startswith('SELECT')
+    assert set(orders['total_ms']) == {'p50', 'p95', 'p99', 'max'}
+
+    only = profiled_client.get(f'{PERF_ENDPOINT}?route=GET /api/orders').get_json()['routes']
+    assert [item['route'] for item in only] == ['GET /api/orders']
+    profiled_client.delete(PERF_ENDPOINT)
+    assert profiled_client.get(PERF_ENDPOINT).get_json()['samples'] == 0
+
+
+def test_profiling_is_opt_in(client, sample_data):
+    response = client.get('/api/customers')
+
+    assert 'Server-Timing' not in response.headers
+    assert client.get(PERF_ENDPOINT).status_code == 404
+
+
+def test_percentiles_interpolate_between_ranks():
+    ordered = list(range(1, 101))
+
+    assert percentile(ordered, 50) == pytest.approx(50.5)
+    assert percentile(ordered, 99) == pytest.approx(99.01)
+    assert percentile([7], 95) == 7
+
+
+STATEMENTS = ['CREATE TABLE numbers (value INTEGER)',
+              'INSERT INTO numbers VALUES (?)',
+              'SELECT value FROM numbers ORDER BY value * 7 % 13, value']
+
+
+def test_sqlite3_connections_report_statements_and_fetches():
+    app = Flask(__name__)
+    perf_log.clear()
+    init_profiling(app)
+
+    @app.route('/numbers')
+    def numbers():
+        connection = ProfiledConnection(':memory:')
+        connection.execute(STATEMENTS[0])
+        connection.executemany(STATEMENTS[1], [(i,) for i in range(20000)])
+        cursor = connection.cursor()
+        cursor.execute(STATEMENTS[2])
+        rows = cursor.fetchall()
+        connection.close()
+        return jsonify({'rows': len(rows)})
+
+    response = app.test_client().get('/numbers')
+
+    [sample] = perf_log.samples()
+    assert sample.sql_count == 3 and sample.route == 'GET /numbers'
+    assert sample.slowest_sql in STATEMENTS
+    assert sample.db_seconds >= sample.slowest_seconds > 0
+    assert 'db;dur=' in response.headers['Server-Timing']
+    perf_log.clear()
@@ -0,0 +1,31 @@
+import pytest
+
+LIST_ENDPOINTS = [
+    '/api/quotes',
+    '/api/invoices',
+    '/api/communications',
+    '/api/quality-checks',
+    '/api/time-entries',
+    '/api/inventory/transactions',
+]
+
+
+@pytest.mark.parametrize('url', LIST_ENDPOINTS)
+def test_list_query_count_does_not_grow_with_page_size(client, sample_data, query_counter, url):
+    counts = []
+    for per_page in (5, 40):
+        query_counter.clear()
+        response = client.get(f'{url}?per_page={per_page}')
+        assert response.status_code == 200
+        counts.append(len(query_counter))
+
+    # One COUNT(*) for the pagination plus one SELECT that joins the related rows
+    assert counts == [2, 2]
+
+
+def test_list_payload_includes_related_names(client, sample_data):
+    response = client.get('/api/time-entries?per_page=3')
+    entry = response.get_json()['time_entries'][0]
+
+    assert entry['customer_name'].startswith('Vorname')
+    assert entry['order_title'].startswith('Auftrag')
@@ -0,0 +1,62 @@
+import re
+
+import pytest
+
+from src.models.user import db
+
+# Hot list/dashboard requests with the filters the frontend actually sends
+HOT_REQUESTS = [
+    '/api/customers',
+    '/api/customers/lookup',
+    '/api/orders/dashboard',
+    '/api/quotes',
+    '/api/quotes?status=draft',
+    '/api/quotes?customer_id=1',
+    '/api/invoices',
+    '/api/invoices?status=sent',
+    '/api/invoices?customer_id=1',
+    '/api/communications',
+    '/api/communications?status=completed',
+    '/api/communications?customer_id=1',
+    '/api/communications?order_id=1',
+    '/api/communications?type=email',
+    '/api/quality-checks',
+    '/api/quality-checks?status=completed',
+    '/api/quality-checks?order_id=1',
+    '/api/time-entries',
+    '/api/time-entries?user_id=1',
+    '/api/time-entries?order_id=1',
+    '/api/time-entries?date_from=2024-03-01T00:00:00',
+    '/api/inventory',
+    '/api/inventory?category=Reinigungsmittel',
+    '/api/inventory/transactions',
+    '/api/inventory/transactions?item_id=1',
+    '/api/customer/1/summary',
+    '/api/customer/1/orders',
+    '/api/customer/1/invoices',
+    '/api/customer/1/profile',
+    '/api/customer/1/messages',
+]
+
+# A bare "SCAN <table>" reads every row; "SCAN <table> USING INDEX" walks an index in order
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def query_plan(statement, parameters):
+    rows = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+    return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize('url', HOT_REQUESTS)
+def test_hot_routes_do_not_full_scan(client, sample_data, query_counter, url):
+    response = client.get(url)
+    assert response.status_code == 200
+
+    selects = [(s, p) for s, p in query_counter if s.lstrip().upper().startswith('SELECT')]
+    assert selects
+
+    for statement, parameters in selects:
+        plan = query_plan(statement, parameters)
+        scans = [step for step in plan if FULL_SCAN.match(step)]
+        assert not scans, f'{url} full-scans {scans}:\n{statement}'
+        assert not any('TEMP B-TREE FOR ORDER BY' in step for step in plan), f'{url} sorts without an index:\n{statement}'
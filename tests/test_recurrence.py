@@ -0,0 +1,203 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from src.models.user import db
+from src.models.order import Order
+from src.models.recurrence import RecurrenceException
+from src.services.recurrence import Recurrence, materialize_upcoming
+
+
+def dates(*values):
+    return [date.fromisoformat(value) for value in values]
+
+
+def brute_force(recurrence, date_from, date_to):
+    """Day-by-day definition of the rule, to check the arithmetic against"""
+    found, index, day = [], 0, recurrence.start
+    while day <= date_to and (recurrence.until is None or day <= recurrence.until):
+        if recurrence.freq == 'daily':
+            matches = (day - recurrence.start).days % recurrence.interval == 0
+        elif recurrence.freq == 'weekly':
+            weeks = (day - recurrence.start + timedelta(days=recurrence.start.weekday())).days // 7
+            matches = day.weekday() in recurrence.by_weekday and weeks % recurrence.interval == 0
+        else:
+            months = (day.year - recurrence.start.year) * 12 + day.month - recurrence.start.month
+            matches = months % recurrence.interval == 0 and day == recurrence._month_day(
+                day.year * 12 + day.month - 1)
+        if matches:
+            if recurrence.count is not None and index >= recurrence.count:
+                break
+            index += 1
+            if day >= date_from:
+                found.append(day)
+        day += timedelta(days=1)
+    return found
+
+
+def test_weekly_rule_on_several_weekdays():
+    # Start on a Wednesday: the Monday of the first week does not occur
+    rule = Recurrence(date(2024, 3, 6), 'weekly', interval=2, by_weekday=[0, 2], count=4)
+
+    assert list(rule.between(date(2024, 1, 1), date(2024, 12, 31))) == dates(
+        '2024-03-06', '2024-03-18', '2024-03-20', '2024-04-01')
+
+
+def test_monthly_rules_move_to_the_last_day():
+    on_31st = Recurrence(date(2024, 1, 31), 'monthly')
+    last_day = Recurrence(date(2024, 1, 15), 'monthly', by_month_day=-1)
+
+    assert list(on_31st.between(date(2024, 1, 1), date(2024, 4, 30))) == dates(
+        '2024-01-31', '2024-02-29', '2024-03-31', '2024-04-30')
+    assert list(last_day.between(date(2024, 1, 1), date(2024, 3, 31))) == dates(
+        '2024-01-31', '2024-02-29', '2024-03-31')
+    assert list(Recurrence(date(2024, 2, 29), 'yearly').between(date(2025, 1, 1), date(2028, 12, 31))) == dates(
+        '2025-02-28', '2026-02-28', '2027-02-28', '2028-02-29')
+
+
+def test_until_and_far_windows():
+    rule = Recurrence(date(2024, 3, 4), 'weekly', until=date(2024, 3, 20))
+    assert list(rule.between(date(2024, 3, 1), date(2024, 4, 30))) == dates('2024-03-04', '2024-03-11', '2024-03-18')
+
+    # A window decades ahead is computed directly, not by walking there
+    daily = Recurrence(date(2024, 3, 1), 'daily', interval=3)
+    assert list(daily.between(date(2124, 3, 1), date(2124, 3, 10)))[0] == date(2124, 3, 2)
+    assert daily.includes(date(2024, 3, 4)) and not daily.includes(date(2024, 3, 5))
+
+
+def test_arithmetic_matches_day_by_day_expansion():
+    random.seed(5)
+    for _ in range(150):
+        start = date(2023, 1, 1) + timedelta(days=random.randrange(700))
+        freq = random.choice(['daily', 'weekly', 'monthly'])
+        options = {'interval': random.randint(1, 4), 'count': random.choice([None, 1, 5, 17])}
+        if freq == 'weekly' and random.random() < 0.5:
+            options['by_weekday'] = random.sample(range(7), random.randint(1, 3))
+        if freq == 'monthly' and random.random() < 0.5:
+            options['by_month_day'] = random.choice([1, 15, 29, 30, 31, -1])
+        rule = Recurrence(start, freq, **options)
+        date_from = start + timedelta(days=random.randrange(-30, 200))
+        date_to = date_from + timedelta(days=random.randrange(120))
+
+        assert list(rule.between(date_from, date_to)) == brute_force(rule, date_from, date_to), (freq, options)
+
+
+def test_invalid_rules():
+    with pytest.raises(ValueError):
+        Recurrence(date(2024, 3, 1), 'hourly')
+    with pytest.raises(ValueError):
+        Recurrence(date(2024, 3, 1), 'monthly', by_weekday=[1])
+    with pytest.raises(ValueError):
+        Recurrence(date(2024, 3, 1), 'weekly', interval=0)
+
+
+@pytest.fixture
+def weekly_order(sample_data):
+    order = sample_data['orders'][0]  # scheduled 2024-03-01, a Friday
+    order.is_recurring = True
+    order.recurring_interval = 'weekly'
+    db.session.commit()
+    return order
+
+
+def march(client, **params):
+    query = '&'.join(f'{name}={value}' for name, value in params.items())
+    response = client.get(f'/api/orders/calendar?date_from=2024-03-01&date_to=2024-03-31&{query}')
+    return response.get_json()['orders']
+
+
+def test_calendar_expands_recurring_orders(client, weekly_order):
+    entries = [entry for entry in march(client) if entry['series_id'] == weekly_order.id]
+
+    assert [(entry['scheduled_date'], entry['virtual']) for entry in entries] == [
+        ('2024-03-01', False), ('2024-03-08', True), ('2024-03-15', True), ('2024-03-22', True), ('2024-03-29', True)]
+    assert entries[1]['id'] is None and entries[1]['status'] == 'planned'
+    assert entries[1]['title'] == weekly_order.title
+    assert len(march(client)) == 5 + 4  # the other sample orders are real ones
+
+
+def test_calendar_is_filtered_by_customer(client, weekly_order, sample_data):
+    other = sample_data['customers'][1].id
+
+    assert [entry['virtual'] for entry in march(client, customer_id=other)] == [False]
+    assert len(march(client, customer_id=weekly_order.customer_id)) == 5
+
+
+def test_skip_and_move_occurrences(client, weekly_order):
+    base = f'/api/orders/{weekly_order.id}/occurrences'
+    assert client.post(f'{base}/2024-03-08', json={'action': 'skip'}).status_code == 200
+    moved = client.post(f'{base}/2024-03-15', json={'action': 'move', 'moved_date': '2024-03-18', 'moved_time': '07:30'})
+    assert moved.get_json()['moved_date'] == '2024-03-18'
+
+    virtual = [(entry['scheduled_date'], entry['occurrence_date'], entry['scheduled_time'])
+               for entry in march(client) if entry['virtual']]
+    assert virtual == [('2024-03-18', '2024-03-15', '07:30:00'), ('2024-03-22', '2024-03-22', None),
+                       ('2024-03-29', '2024-03-29', None)]
+
+    assert client.delete(f'{base}/2024-03-08').status_code == 200
+    assert '2024-03-08' in [entry['scheduled_date'] for entry in march(client)]
+    assert client.post(f'{base}/2024-03-09', json={'action': 'skip'}).status_code == 400
+    assert client.post(f'{base}/2024-03-22', json={'action': 'cancel'}).status_code == 400
+
+
+def test_materialized_occurrence_replaces_virtual_one(client, weekly_order):
+    url = f'/api/orders/{weekly_order.id}/occurrences/2024-03-22/materialize'
+    created = client.post(url)
+    again = client.post(url)
+
+    assert created.status_code == 201
+    assert again.get_json()['id'] == created.get_json()['id']
+    order = db.session.get(Order, created.get_json()['id'])
+    assert (order.scheduled_date, order.is_recurring, order.customer_id) == (
+        date(2024, 3, 22), False, weekly_order.customer_id)
+
+    [entry] = [entry for entry in march(client) if entry['scheduled_date'] == '2024-03-22']
+    assert (entry['id'], entry['virtual'], entry['series_id']) == (order.id, False, weekly_order.id)
+    assert client.post(f'/api/orders/{weekly_order.id}/occurrences/2024-03-22',
+                       json={'action': 'skip'}).status_code == 409
+
+
+def test_calendar_reads_series_from_cache(client, weekly_order, query_counter):
+    march(client)
+    query_counter.clear()
+
+    march(client)
+
+    assert not [statement for statement, _ in query_counter if 'recurrence_' in statement]
+    assert len(query_counter) == 1  # the range scan of real orders
+
+    client.post(f'/api/orders/{weekly_order.id}/occurrences/2024-03-08', json={'action': 'skip'})
+    assert '2024-03-08' not in [entry['scheduled_date'] for entry in march(client)]
+
+
+def test_recurrence_rule_endpoints(client, sample_data):
+    order = sample_data['orders'][1]  # scheduled 2024-03-02
+    url = f'/api/orders/{order.id}/recurrence'
+
+    assert client.get(url).status_code == 404
+    assert client.put(url, json={'freq': 'weekly', 'by_weekday': [9]}).status_code == 400
+    response = client.put(url, json={'freq': 'weekly', 'interval': 2, 'by_weekday': [0, 5], 'count': 4})
+    assert response.status_code == 200
+    assert db.session.get(Order, order.id).recurring_interval == 'biweekly'
+
+    rule = client.get(f'{url}?after=2024-01-01').get_json()
+    assert rule['rule']['by_weekday'] == [0, 5]
+    assert rule['upcoming'] == ['2024-03-02', '2024-03-11', '2024-03-16', '2024-03-25']
+
+    assert client.delete(url).status_code == 200
+    assert not [entry for entry in march(client) if entry['virtual']]
+
+
+def test_legacy_recurring_interval_and_materialize_job(app, sample_data):
+    order = sample_data['orders'][2]  # scheduled 2024-03-03
+    order.is_recurring = True
+    order.recurring_interval = 'quarterly'
+    db.session.commit()
+
+    created = materialize_upcoming(days=14, today=date(2024, 5, 25))
+    db.session.commit()
+
+    assert [db.session.get(Order, order_id).scheduled_date for order_id in created] == [date(2024, 6, 3)]
+    assert materialize_upcoming(days=14, today=date(2024, 5, 25)) == []
+    assert RecurrenceException.query.filter_by(order_id=order.id, action='materialized').count() == 1
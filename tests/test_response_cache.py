@@ -0,0 +1,97 @@
+import time
+
+from src.services.cache_backends import MemoryCache
+
+CACHED_ENDPOINTS = [
+    '/api/quote-templates',
+    '/api/quality-checks/standards',
+    '/api/inventory/categories',
+    '/api/communications/statistics',
+    '/api/invoices/statistics',
+    '/api/quality-checks/statistics',
+    '/api/inventory/statistics',
+    '/api/orders/dashboard',
+]
+
+
+def queries_for(client, query_counter, url, **kwargs):
+    del query_counter[:]
+    response = client.get(url, **kwargs)
+    return response, len(query_counter)
+
+
+def test_repeated_requests_are_served_from_cache(client, sample_data, query_counter):
+    for url in CACHED_ENDPOINTS:
+        first, _ = queries_for(client, query_counter, url)
+        second, queries = queries_for(client, query_counter, url)
+
+        assert first.status_code == 200, url
+        assert queries == 0, url
+        assert second.get_data() == first.get_data()
+        assert second.headers['ETag'] == first.headers['ETag']
+
+
+def test_matching_etag_returns_304(client, sample_data):
+    etag = client.get('/api/invoices/statistics').headers['ETag']
+
+    response = client.get('/api/invoices/statistics', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert client.get('/api/invoices/statistics', headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_query_args_are_normalized(client, sample_data, query_counter):
+    client.get('/api/invoices/statistics?b=2&a=1')
+
+    _, queries = queries_for(client, query_counter, '/api/invoices/statistics?a=1&b=2')
+
+    assert queries == 0
+
+
+def test_commit_invalidates_only_dependent_entries(client, sample_data, query_counter):
+    customer_id = sample_data['customers'][0].id
+    before = client.get('/api/invoices/statistics').get_json()
+    client.get('/api/inventory/statistics')
+
+    client.post('/api/invoices', json={'customer_id': customer_id, 'status': 'draft'})
+
+    after, queries = queries_for(client, query_counter, '/api/invoices/statistics')
+    assert queries > 0
+    assert after.get_json()['status_counts'] != before['status_counts']
+    assert queries_for(client, query_counter, '/api/inventory/statistics')[1] == 0
+
+
+def test_bulk_and_counter_writes_invalidate(client, sample_data):
+    customer_id = sample_data['customers'][0].id
+    before = client.get('/api/orders/dashboard').get_json()
+
+    client.post('/api/orders/bulk', json=[{'customer_id': customer_id, 'title': 'Neu',
+                                           'service_type': 'building_cleaning'}])
+
+    after = client.get('/api/orders/dashboard').get_json()
+    assert after['order_counts']['pending'] == before['order_counts']['pending'] + 1
+
+
+def test_failed_write_keeps_cache(client, sample_data, query_counter):
+    client.get('/api/invoices/statistics')
+
+    assert client.post('/api/invoices', json={'customer_id': 1, 'invoice_items': [{}]}).status_code == 500
+
+    assert queries_for(client, query_counter, '/api/invoices/statistics')[1] == 0
+
+
+def test_memory_cache_lru_ttl_and_tags():
+    cache = MemoryCache(max_entries=2)
+    cache.set('a', 1, tags=('invoices',))
+    cache.set('b', 2, tags=('orders',))
+    cache.get('a')
+    cache.set('c', 3, tags=('invoices',))
+
+    assert cache.get('b') is None
+    assert cache.invalidate(['invoices']) == 2
+    assert len(cache) == 0
+
+    cache.set('d', 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('d') is None
@@ -0,0 +1,119 @@
+import random
+import time
+from datetime import time as clock
+
+from src.models.user import db
+from src.models.order import Order
+from src.services.scheduling import (TRAVEL_MINUTES, ZONE_INDEX, ZONES, Crew, Job, Planner, locate,
+                                     parse_clock, plan_day)
+
+GOSLAR = ZONE_INDEX['38640']
+
+
+def crews(count, start='07:00', end='16:00'):
+    return [Crew(f'Team {i + 1}', parse_clock(start), parse_clock(end), GOSLAR) for i in range(count)]
+
+
+def planned_ids(plan):
+    return [stop['order_id'] for crew in plan['crews'] for stop in crew['stops']]
+
+
+def test_travel_matrix_and_postal_code_fallback():
+    assert all(TRAVEL_MINUTES[a][b] == TRAVEL_MINUTES[b][a] for a in range(len(ZONES)) for b in range(len(ZONES)))
+    assert TRAVEL_MINUTES[GOSLAR][GOSLAR] == 5
+    assert 20 < TRAVEL_MINUTES[GOSLAR][ZONE_INDEX['38855']] < 45  # Goslar - Wernigerode
+    assert ZONES[locate('38644')] == '38644'
+    assert ZONES[locate('38859')].startswith('3885')
+    assert locate('80331') is None and locate('') is None and locate(None) is None
+
+
+def test_every_order_is_planned_once_within_the_shift():
+    random.seed(7)
+    orders = [{'id': i, 'postal_code': random.choice(ZONES), 'estimated_duration': 45} for i in range(24)]
+
+    plan = plan_day(orders, crews(4))
+
+    assert sorted(planned_ids(plan)) == list(range(24))
+    assert plan['unassigned'] == []
+    for crew in plan['crews']:
+        assert crew['overtime_minutes'] == 0
+        assert crew['drive_minutes'] + crew['work_minutes'] <= 9 * 60
+        assert crew['drive_minutes'] >= sum(stop['drive_minutes'] for stop in crew['stops'])
+
+
+def test_low_priority_orders_are_left_over_first():
+    orders = [{'id': i, 'postal_code': '38640', 'estimated_duration': 120,
+               'priority': 'low' if i % 2 else 'urgent'} for i in range(10)]
+
+    plan = plan_day(orders, crews(1))
+
+    assert sorted(planned_ids(plan)) == [0, 2, 4, 6]
+    assert {item['reason'] for item in plan['unassigned']} == {'no_capacity'}
+    assert len(plan['unassigned']) == 6
+
+
+def test_scheduled_time_is_not_before():
+    orders = [{'id': 1, 'postal_code': '38640', 'estimated_duration': 60, 'scheduled_time': parse_clock('10:30')}]
+
+    [stop] = plan_day(orders, crews(1))['crews'][0]['stops']
+
+    assert (stop['arrival'], stop['start'], stop['end']) == ('07:05', '10:30', '11:30')
+
+
+def test_local_search_untangles_routes():
+    random.seed(3)
+    jobs = [Job(i, random.randrange(len(ZONES)), 10, 2, None) for i in range(80)]
+    planner = Planner(jobs, crews(2, end='23:59'), time_limit=5)
+    for j in range(len(jobs)):
+        planner.routes[j % 2].append(j)
+    for crew in range(2):
+        planner.load[crew] = planner.travel(crew) + sum(jobs[j].duration for j in planner.routes[crew])
+    before = planner.travel(0) + planner.travel(1)
+
+    for crew in range(2):
+        planner.two_opt(crew)
+    planner.relocate()
+
+    assert planner.travel(0) + planner.travel(1) < before / 2
+    assert sorted(planner.routes[0] + planner.routes[1]) == list(range(80))
+    for crew in range(2):
+        assert planner.load[crew] == planner.travel(crew) + sum(jobs[j].duration for j in planner.routes[crew])
+
+
+def test_a_few_hundred_orders_in_under_a_second():
+    random.seed(11)
+    orders = [{'id': i, 'postal_code': random.choice(ZONES), 'estimated_duration': random.choice([30, 60, 90]),
+               'priority': random.choice(['low', 'normal', 'high'])} for i in range(300)]
+
+    started = time.perf_counter()
+    plan = plan_day(orders, crews(25))
+
+    assert time.perf_counter() - started < 1.0
+    assert len(planned_ids(plan)) + len(plan['unassigned']) == 300
+
+
+def test_schedule_endpoint(client, sample_data):
+    orders = Order.query.order_by(Order.id).all()
+    for order, postal_code in zip(orders, ['38640', '38855', '38667', '37520', None]):
+        order.scheduled_date = sample_data['orders'][0].scheduled_date
+        order.service_postal_code = postal_code
+        order.estimated_duration = 90
+    orders[2].scheduled_time = clock(13, 0)
+    db.session.commit()
+
+    plan = client.get('/api/schedule/2024-03-01?crews=Team Nord,Team Süd&start=06:30').get_json()
+
+    assert plan['orders'] == 5 and plan['assigned'] == 4
+    assert plan['unassigned'] == [{'order_id': orders[4].id, 'reason': 'unknown_postal_code'}]
+    assert [crew['crew'] for crew in plan['crews']] == ['Team Nord', 'Team Süd']
+    assert plan['crews'][0]['shift'] == {'start': '06:30', 'end': '16:00'}
+    stops = {stop['order_id']: stop for crew in plan['crews'] for stop in crew['stops']}
+    assert stops[orders[2].id]['start'] >= '13:00'
+    assert client.get('/api/schedule/2024-03-02').get_json()['assigned'] == 0
+
+
+def test_schedule_endpoint_rejects_bad_input(client, app):
+    assert client.get('/api/schedule/morgen').status_code == 400
+    assert client.get('/api/schedule/2024-03-01?crews=0').status_code == 400
+    assert client.get('/api/schedule/2024-03-01?start=16:00&end=08:00').status_code == 400
+    assert client.get('/api/schedule/2024-03-01?depot=80331').status_code == 400
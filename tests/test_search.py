@@ -0,0 +1,83 @@
+import pytest
+
+from src.models.user import db
+from src.models.communication import Communication
+from src.models.customer import Customer
+from src.services.search import fold, fts_query
+
+
+@pytest.fixture
+def people(app, sample_data):
+    customers = [
+        Customer(customer_number='K-9001', first_name='Jürgen', last_name='Müller', email='mueller@example.de',
+                 city='Wernigerode'),
+        Customer(customer_number='K-9002', first_name='Erika', last_name='Weiß', email='weiss@example.de',
+                 company_name='Weiß Gebäudeservice GmbH', city='Goslar'),
+        Customer(customer_number='K-9003', first_name='Müller', last_name='Schmidt', email='schmidt@example.de',
+                 city='Quedlinburg'),
+    ]
+    db.session.add_all(customers)
+    db.session.flush()
+    db.session.add(Communication(customer_id=customers[0].id, type='email', direction='inbound',
+                                 subject='Reklamation Treppenhaus', content='Die Stufen wurden nicht gewischt.',
+                                 tags='reklamation'))
+    db.session.commit()
+    return customers
+
+
+def search(client, q, **args):
+    return client.get('/api/search', query_string={'q': q, **args}).get_json()
+
+
+def test_query_is_folded_prefixed_and_quoted():
+    assert fold('Straße Öl Äpfel') == 'Strasse oel aepfel'
+    assert fts_query('Mül* OR "x"') == '"Muel"* "OR"* "x"*'
+    assert fts_query(' -- ') is None
+
+
+@pytest.mark.parametrize('q', ['Müller', 'mueller', 'MÜLL', 'muel'])
+def test_umlaut_spellings_find_the_same_customer(client, people, q):
+    ids = {result['id'] for result in search(client, q, types='customers')['results']}
+
+    assert people[0].id in ids
+
+
+def test_eszett_matches_ss(client, people):
+    results = search(client, 'weiss gebaeude')['results']
+
+    assert [(result['type'], result['id']) for result in results] == [('customer', people[1].id)]
+
+
+def test_results_are_ranked_by_column_weight(client, people):
+    results = search(client, 'müller', types='customers')['results']
+
+    # Last name outranks first name
+    assert [result['id'] for result in results] == [people[0].id, people[2].id]
+
+
+def test_search_spans_entities(client, people):
+    results = search(client, 'reklamation')['results']
+
+    assert [result['type'] for result in results] == ['communication']
+    assert results[0]['customer_id'] == people[0].id
+
+
+def test_index_follows_updates_and_deletes(client, people):
+    client.put(f'/api/customers/{people[2].id}', json={'first_name': 'Karl'})
+    assert [result['id'] for result in search(client, 'müller', types='customers')['results']] == [people[0].id]
+
+    db.session.delete(db.session.get(Customer, people[1].id))
+    db.session.commit()
+    assert search(client, 'goslar')['results'] == []
+
+
+def test_list_endpoints_accept_search(client, people):
+    customers = client.get('/api/customers?search=goslar').get_json()
+    communications = client.get('/api/communications?search=treppenhaus').get_json()['communications']
+
+    assert [customer['id'] for customer in customers] == [people[1].id]
+    assert len(communications) == 1
+
+
+def test_unknown_type_is_rejected(client, people):
+    assert client.get('/api/search?q=x&types=invoices').status_code == 400
@@ -0,0 +1,105 @@
+import json
+from datetime import date, datetime, time
+
+import pytest
+
+from src.models.user import db
+from src.models.customer import Customer
+from src.models.quote import Quote
+from src.services import serialization
+from src.services.serialization import Field, dumps
+
+
+def selects(query_counter):
+    return [statement for statement, _ in query_counter if statement.lstrip().upper().startswith('SELECT')]
+
+
+def test_fields_narrow_payload_and_select(client, sample_data, query_counter):
+    response = client.get('/api/orders?fields=id,title,status')
+
+    assert response.status_code == 200
+    orders = response.get_json()
+    assert len(orders) == 5
+    assert all(set(order) == {'id', 'title', 'status'} for order in orders)
+    [statement] = selects(query_counter)
+    assert 'description' not in statement and 'special_instructions' not in statement
+
+
+def test_unknown_field_is_rejected(client, sample_data):
+    response = client.get('/api/quotes?fields=id,secret')
+
+    assert response.status_code == 400
+    assert 'secret' in response.get_json()['error']
+
+
+def test_cursor_pages_work_without_the_sort_key_in_the_payload(client, sample_data):
+    first = client.get('/api/quotes?limit=15&fields=id').get_json()
+    second = client.get(f"/api/quotes?limit=15&fields=id&after={first['next_cursor']}").get_json()
+    offset_ids = [row['id'] for row in client.get('/api/quotes?per_page=30').get_json()['quotes']]
+
+    assert [row['id'] for row in first['quotes'] + second['quotes']] == offset_ids
+
+
+def test_related_names_only_when_asked_for(client, sample_data, query_counter):
+    # A quote whose customer was removed behind the app's back
+    db.session.add(Quote(quote_number='AN-9999', customer_id=999, title='Ohne Kunde', service_type='building_cleaning'))
+    db.session.commit()
+
+    quotes = client.get('/api/quotes?per_page=100&fields=title,customer_name').get_json()['quotes']
+    names = {quote['title']: quote['customer_name'] for quote in quotes}
+    assert names['Ohne Kunde'] == 'Unbekannt'
+    assert names['Angebot 0'] == 'Vorname0 Nachname0'
+    # The COUNT of the page never reads the customers
+    assert all('customers' not in statement for statement in selects(query_counter) if 'count(' in statement)
+
+    query_counter.clear()
+    client.get('/api/quotes?fields=title')
+    assert all('customers' not in statement for statement in selects(query_counter))
+
+
+def test_views_name_a_field_list(client, sample_data, query_counter):
+    customers = client.get('/api/customers?view=picker').get_json()
+
+    assert all(set(customer) == {'id', 'customer_number', 'first_name', 'last_name', 'company_name'}
+               for customer in customers)
+    [statement] = selects(query_counter)
+    assert 'email' not in statement and 'street' not in statement
+
+
+@pytest.mark.parametrize('url', ['/api/orders?view=nope', '/api/orders?view=picker&fields=id'])
+def test_bad_views_are_rejected(client, sample_data, url):
+    response = client.get(url)
+
+    assert response.status_code == 400
+    assert 'view' in response.get_json()['error']
+
+
+def test_customer_lookup(client, sample_data):
+    db.session.add(Customer(customer_number='K-0099', first_name='Jürgen', last_name='Müller',
+                            company_name='Müller Bau', email='mueller@example.de'))
+    db.session.commit()
+
+    [match] = client.get('/api/customers/lookup?q=mül').get_json()['customers']
+    assert match == {'id': match['id'], 'customer_number': 'K-0099', 'display_name': 'Jürgen Müller (Müller Bau)'}
+
+    newest = client.get('/api/customers/lookup?limit=2').get_json()['customers']
+    assert [customer['customer_number'] for customer in newest] == ['K-0099', 'K-0004']
+    assert newest[1]['display_name'] == 'Vorname4 Nachname4'
+
+
+def test_json_fallback_writes_the_same_document(monkeypatch):
+    payload = {'name': 'Müller & Söhne', 'day': date(2024, 3, 1), 'at': datetime(2024, 3, 1, 8, 30, 5, 120),
+               'time': time(14, 15), 'hours': 1.5, 'items': [None, True, 3]}
+    expected = {'name': 'Müller & Söhne', 'day': '2024-03-01', 'at': '2024-03-01T08:30:05.000120',
+                'time': '14:15:00', 'hours': 1.5, 'items': [None, True, 3]}
+
+    assert json.loads(dumps(payload)) == expected
+    monkeypatch.setattr(serialization, 'orjson', None)
+    assert json.loads(dumps(payload)) == expected
+    with pytest.raises(TypeError):
+        dumps({'raw': object()})
+
+
+def test_field_needs_convert_for_several_columns():
+    with pytest.raises(ValueError):
+        Field('service_address', Quote.service_street, Quote.service_city)
@@ -0,0 +1,108 @@
+import csv
+import io
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from src.models.user import db
+from src.models.timetracking import TimeEntry, TimeRollup
+from src.services.rollups import rebuild_rollups, summarize
+
+
+def rollup_state():
+    return sorted((row.day, row.user_id, row.activity_type, row.order_id, row.seconds, row.entry_count)
+                  for row in TimeRollup.query.all())
+
+
+def total_seconds():
+    return sum(row.seconds for row in TimeRollup.query.all())
+
+
+def test_rollups_follow_inserted_entries(app, sample_data):
+    assert total_seconds() == 40 * 7200
+    by_day = {item['day']: item for item in summarize(('day',))}
+    assert by_day['2024-03-01']['entry_count'] == 16  # 08:00..23:00
+    assert by_day['2024-03-02']['hours'] == 48.0
+
+
+def test_stopping_an_entry_books_its_time(client, sample_data):
+    user_id = sample_data['user'].id + 1
+    entry = TimeEntry(user_id=user_id, user_name='Anna', start_time=datetime.utcnow() - timedelta(minutes=90),
+                      activity_type='travel', status='active')
+    db.session.add(entry)
+    db.session.commit()
+    assert summarize(('activity',), user_id=user_id) == []
+
+    assert client.post(f'/api/time-entries/{entry.id}/stop').status_code == 200
+
+    [travel] = summarize(('user', 'activity'), user_id=user_id)
+    assert (travel['user_name'], travel['activity_type'], travel['entry_count']) == ('Anna', 'travel', 1)
+    assert abs(travel['seconds'] - 5400) <= 2
+
+
+def test_edits_and_deletes_adjust_rollups(client, sample_data):
+    entry = TimeEntry.query.order_by(TimeEntry.id).first()
+
+    client.put(f'/api/time-entries/{entry.id}', json={'end_time': '2024-03-01T08:30:00'})
+    assert total_seconds() == 39 * 7200 + 1800
+
+    client.put(f'/api/time-entries/{entry.id}', json={'start_time': '2024-02-28T08:00:00',
+                                                     'end_time': '2024-02-28T09:00:00'})
+    assert summarize(('day',), date_to='2024-02-29')[0]['seconds'] == 3600
+
+    client.put(f'/api/time-entries/{entry.id}', json={'status': 'cancelled'})
+    assert summarize(('day',), date_to='2024-02-29') == []
+
+    other = TimeEntry.query.order_by(TimeEntry.id.desc()).first()
+    client.delete(f'/api/time-entries/{other.id}')
+    assert total_seconds() == 38 * 7200
+
+
+def test_bulk_and_raw_sql_writes_are_counted(client, sample_data):
+    user_id = sample_data['user'].id + 1
+    response = client.post('/api/time-entries/bulk', json=[
+        {'user_id': user_id, 'start_time': f'2024-04-0{day}T07:00:00', 'end_time': f'2024-04-0{day}T15:00:00',
+         'status': 'completed'} for day in range(1, 6)
+    ])
+    assert response.status_code == 201
+    assert summarize(('user',), date_from='2024-04-01', user_id=user_id)[0]['hours'] == 40.0
+
+    db.session.execute(text("UPDATE time_entries SET activity_type = 'cleaning' WHERE user_id = :user_id"),
+                       {'user_id': user_id})
+    db.session.commit()
+    assert [item['activity_type'] for item in summarize(('activity',), user_id=user_id)] == ['cleaning']
+
+
+def test_rebuild_matches_trigger_maintained_rows(client, sample_data):
+    entry = TimeEntry.query.order_by(TimeEntry.id).first()
+    client.put(f'/api/time-entries/{entry.id}', json={'end_time': '2024-03-01T09:15:00'})
+    maintained = rollup_state()
+
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('DELETE FROM time_rollups')
+        rebuild_rollups(connection)
+    db.session.expire_all()
+
+    assert rollup_state() == maintained
+
+
+def test_statistics_uses_rollups(client, sample_data):
+    data = client.get('/api/time-entries/statistics').get_json()
+
+    assert data['activity_hours'] == {'work': 80.0}
+
+
+def test_summary_endpoint_json_and_csv(client, sample_data):
+    data = client.get('/api/time-entries/summary?group_by=user,day&date_from=2024-03-01&date_to=2024-03-01').get_json()
+    assert data['total_hours'] == 32.0
+    assert data['summary'][0]['user_name'] == 'Team'
+    assert data['summary'][0]['day'] == '2024-03-01'
+
+    response = client.get('/api/time-entries/summary?group_by=order&format=csv')
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert response.mimetype == 'text/csv'
+    assert 'attachment' in response.headers['Content-Disposition']
+    assert len(rows) == 5 and sum(int(row['seconds']) for row in rows) == 40 * 7200
+
+    assert client.get('/api/time-entries/summary?group_by=customer').status_code == 400
+    assert client.get('/api/time-entries/summary?date_from=März').status_code == 400
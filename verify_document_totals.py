@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Check the trigger-maintained quote and invoice totals against their items
+
+Usage: python verify_document_totals.py [--repair]
+  --repair  also correct every drifted value (default: report only, exit 1 on drift)
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(__file__))
+
+from main import app
+from src.models.user import db
+from src.services.totals import verify_totals
+
+def main():
+    repair = '--repair' in sys.argv[1:]
+    
+    with app.app_context():
+        with db.engine.begin() as connection:
+            drift = verify_totals(connection, repair=repair)
+    
+    for entry in drift:
+        print(f"⚠️  {entry['table']} #{entry['id']} {entry['column']}: "
+              f"gespeichert {entry['stored']}, erwartet {entry['expected']}")
+    
+    if not drift:
+        print("✅ Angebots- und Rechnungssummen sind konsistent")
+    elif repair:
+        print(f"✅ {len(drift)} Werte korrigiert")
+    else:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()